@@ -19,6 +19,7 @@ from litex.soc.integration.soc_core import *
 from litex.soc.integration.builder import *
 
 from litedram.common import PHYPadsReducer
+from litedram.core.controller import ControllerSettings
 from litedram.phy import s7ddrphy
 from litedram.modules import MT41K128M16
 
@@ -68,7 +69,8 @@ class _CRG(Module, AutoCSR):
 # Bench SoC ----------------------------------------------------------------------------------------
 
 class BenchSoC(SoCCore):
-    def __init__(self, uart="crossover", sys_clk_freq=int(125e6), with_bist=False, with_analyzer=False):
+    def __init__(self, uart="crossover", sys_clk_freq=int(125e6), with_bist=False, with_analyzer=False,
+        with_perf_counters=False):
         platform = digilent_arty.Platform()
 
         # SoCCore ----------------------------------------------------------------------------------
@@ -88,10 +90,11 @@ class BenchSoC(SoCCore):
             nphases      = 4,
             sys_clk_freq = sys_clk_freq)
         self.add_sdram("sdram",
-            phy       = self.ddrphy,
-            module    = MT41K128M16(sys_clk_freq, "1:4"),
-            origin    = self.mem_map["main_ram"],
-            with_bist = with_bist)
+            phy                 = self.ddrphy,
+            module              = MT41K128M16(sys_clk_freq, "1:4"),
+            origin              = self.mem_map["main_ram"],
+            with_bist           = with_bist,
+            controller_settings = ControllerSettings(with_perf_counters=with_perf_counters))
 
         # UARTBone ---------------------------------------------------------------------------------
         if uart != "serial":
@@ -131,9 +134,12 @@ def main():
     parser.add_argument("--load-bios",     action="store_true", help="Load BIOS")
     parser.add_argument("--sys-clk-freq",  default=None,        help="Set sys_clk_freq")
     parser.add_argument("--test",          action="store_true", help="Run Full Bench")
+    parser.add_argument("--with-perf-counters", action="store_true", help="Add LiteDRAM performance counters")
+    parser.add_argument("--perf-counters",      action="store_true", help="Sample LiteDRAM performance counters")
     args = parser.parse_args()
 
-    soc     = BenchSoC(uart=args.uart, with_bist=args.with_bist, with_analyzer=args.with_analyzer)
+    soc     = BenchSoC(uart=args.uart, with_bist=args.with_bist, with_analyzer=args.with_analyzer,
+        with_perf_counters=args.with_perf_counters)
     builder = Builder(soc, csr_csv="csr.csv")
     builder.build(run=args.build)
 
@@ -158,5 +164,9 @@ def main():
             vco_freq      = soc.crg.main_pll.compute_config()["vco"],
             bios_filename = "build/digilent_arty/software/bios/bios.bin")
 
+    if args.perf_counters:
+        from common import perf_counters_monitor
+        perf_counters_monitor()
+
 if __name__ == "__main__":
     main()
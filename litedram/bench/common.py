@@ -330,4 +330,66 @@ def us_set_sys_clk(clk_freq, vco_freq):
 
     # # #
 
-    bus.close()
\ No newline at end of file
+    bus.close()
+
+
+# Performance Counters -----------------------------------------------------------------------------
+
+class PerfCounters:
+    """Samples LiteDRAM performance counters (ControllerPerfCounters/PortPerfCounters)
+
+    Each group of counters is identified by its `<group>_update` register (ex: sdram_controller_perf,
+    sdram_crossbar_port0); counters are free-running and sample() returns their increments since the
+    previous sample.
+    """
+    def __init__(self, bus, prefix="sdram", counter_width=32):
+        self.bus     = bus
+        self.mask    = 2**counter_width - 1
+        self.groups  = {}
+        regs = bus.regs.d
+        for name in regs:
+            if name.startswith(prefix) and name.endswith("_update"):
+                group = name[:-len("_update")]
+                self.groups[group] = [n for n in regs if n.startswith(group + "_") and n != name]
+        self.values = {}
+
+    def sample(self):
+        deltas = {}
+        for group, names in self.groups.items():
+            getattr(self.bus.regs, group + "_update").write(1)
+            for name in names:
+                value = getattr(self.bus.regs, name).read()
+                deltas[name] = (value - self.values.get(name, 0)) & self.mask
+                self.values[name] = value
+        return deltas
+
+def perf_counters_monitor(period=1.0, prefix="sdram"):
+    from litex import RemoteClient
+
+    bus = RemoteClient()
+    bus.open()
+
+    # # #
+
+    perf = PerfCounters(bus, prefix)
+    if not perf.groups:
+        print("No performance counters found (build with ControllerSettings(with_perf_counters=True)).")
+    perf.sample()
+    try:
+        while True:
+            time.sleep(period)
+            deltas = perf.sample()
+            print("-"*80)
+            for group in sorted(perf.groups):
+                cycles = max(deltas[group + "_cycles"], 1)
+                print(group)
+                for name in perf.groups[group]:
+                    if name != group + "_cycles" and deltas[name]:
+                        print("  {:<32} {:>12d} ({:6.2f}/kcycle)".format(
+                            name[len(group) + 1:], deltas[name], 1e3*deltas[name]/cycles))
+    except KeyboardInterrupt:
+        pass
+
+    # # #
+
+    bus.close()
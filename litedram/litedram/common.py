@@ -271,8 +271,8 @@ class TimingSettings(Settings):
 
 # Layouts/Interface --------------------------------------------------------------------------------
 
-def cmd_layout(address_width):
-    return [
+def cmd_layout(address_width, id_width=0):
+    layout = [
         ("valid",            1, DIR_M_TO_S),
         ("ready",            1, DIR_S_TO_M),
         ("we",               1, DIR_M_TO_S),
@@ -282,6 +282,14 @@ def cmd_layout(address_width):
         ("wdata_ready",      1, DIR_S_TO_M),
         ("rdata_valid",      1, DIR_S_TO_M)
     ]
+    if id_width:
+        # With command reordering, requests are tagged with the port id.
+        layout += [
+            ("id",           id_width, DIR_M_TO_S), # Port of the request.
+            ("locks",    2**id_width, DIR_S_TO_M), # Ports with pending requests.
+            ("data_id",      id_width, DIR_S_TO_M), # Port of wdata_ready/rdata_valid.
+        ]
+    return layout
 
 def data_layout(data_width):
     return [
@@ -316,8 +324,11 @@ class LiteDRAMInterface(Record):
         self.nbanks   = settings.phy.nranks*(2**settings.geom.bankbits)
         self.nranks   = settings.phy.nranks
         self.settings = settings
+        self.id_width = 0
+        if getattr(settings, "with_cmd_reordering", False):
+            self.id_width = settings.cmd_reordering_id_width
 
-        layout = [("bank"+str(i), cmd_layout(self.address_width)) for i in range(self.nbanks)]
+        layout = [("bank"+str(i), cmd_layout(self.address_width, self.id_width)) for i in range(self.nbanks)]
         layout += data_layout(self.data_width)
         Record.__init__(self, layout)
 
@@ -354,9 +365,14 @@ class LiteDRAMNativePort(Settings):
         self.dw = self.data_width
         self.cd = self.clock_domain
 
-    def get_bank_address(self, bank_bits, cba_shift):
+    def get_bank_address(self, bank_bits, cba_shift, rca_bits=None, xor_shift=None):
         cba_upper = cba_shift + bank_bits
-        return self.cmd.addr[cba_shift:cba_upper]
+        bank_address = self.cmd.addr[cba_shift:cba_upper]
+        if xor_shift is not None:
+            # Permutation: XOR the bank bits with the row/column address bits at xor_shift.
+            rca = self.get_row_column_address(bank_bits, rca_bits, cba_shift)
+            bank_address = bank_address ^ rca[xor_shift:xor_shift + bank_bits]
+        return bank_address
 
     def get_row_column_address(self, bank_bits, rca_bits, cba_shift):
         cba_upper = cba_shift + bank_bits
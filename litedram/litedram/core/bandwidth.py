@@ -38,15 +38,19 @@ class Bandwidth(Module, AutoCSR):
         Number of READ commands issued during a period
     nwrites : CSRStatus, out
         Number of WRITE commands issued during a period
+    nturnarounds : CSRStatus, out
+        Number of READ/WRITE commands issued during a period after a command
+        of the other type (read/write turnarounds)
     data_width : CSRStatus, out
         Can be read to calculate bandwidth in bits/sec as:
             bandwidth = (nreads+nwrites) * data_width / period
     """
     def __init__(self, cmd, data_width, period_bits=24):
-        self.update     = CSR()
-        self.nreads     = CSRStatus(period_bits + 1)
-        self.nwrites    = CSRStatus(period_bits + 1)
-        self.data_width = CSRStatus(bits_for(data_width), reset=data_width)
+        self.update       = CSR()
+        self.nreads       = CSRStatus(period_bits + 1)
+        self.nwrites      = CSRStatus(period_bits + 1)
+        self.nturnarounds = CSRStatus(period_bits + 1)
+        self.data_width   = CSRStatus(bits_for(data_width), reset=data_width)
 
         # # #
 
@@ -61,30 +65,50 @@ class Bandwidth(Module, AutoCSR):
             cmd_is_write.eq(cmd.is_write)
         ]
 
-        counter   = Signal(period_bits)
-        period    = Signal()
-        nreads    = Signal(period_bits + 1)
-        nwrites   = Signal(period_bits + 1)
-        nreads_r  = Signal(period_bits + 1)
-        nwrites_r = Signal(period_bits + 1)
+        # Read/write turnarounds: read after a write or write after a read.
+        last_valid    = Signal()
+        last_is_write = Signal()
+        turnaround    = Signal()
+        self.comb += turnaround.eq(cmd_valid & cmd_ready & last_valid &
+            ((cmd_is_read & last_is_write) | (cmd_is_write & ~last_is_write)))
+        self.sync += If(cmd_valid & cmd_ready & (cmd_is_read | cmd_is_write),
+            last_valid.eq(1),
+            last_is_write.eq(cmd_is_write)
+        )
+
+        counter        = Signal(period_bits)
+        period         = Signal()
+        nreads         = Signal(period_bits + 1)
+        nwrites        = Signal(period_bits + 1)
+        nturnarounds   = Signal(period_bits + 1)
+        nreads_r       = Signal(period_bits + 1)
+        nwrites_r      = Signal(period_bits + 1)
+        nturnarounds_r = Signal(period_bits + 1)
         self.sync += [
             Cat(counter, period).eq(counter + 1),
             If(period,
                 nreads_r.eq(nreads),
                 nwrites_r.eq(nwrites),
+                nturnarounds_r.eq(nturnarounds),
                 nreads.eq(0),
                 nwrites.eq(0),
+                nturnarounds.eq(0),
                 # don't miss command if there is one on period boundary
                 If(cmd_valid & cmd_ready,
                     If(cmd_is_read, nreads.eq(1)),
                     If(cmd_is_write, nwrites.eq(1)),
-                )
-            ).Elif(cmd_valid & cmd_ready,
-                If(cmd_is_read, nreads.eq(nreads + 1)),
-                If(cmd_is_write, nwrites.eq(nwrites + 1)),
+                ),
+                If(turnaround, nturnarounds.eq(1))
+            ).Else(
+                If(cmd_valid & cmd_ready,
+                    If(cmd_is_read, nreads.eq(nreads + 1)),
+                    If(cmd_is_write, nwrites.eq(nwrites + 1)),
+                ),
+                If(turnaround, nturnarounds.eq(nturnarounds + 1))
             ),
             If(self.update.re,
                 self.nreads.status.eq(nreads_r),
-                self.nwrites.status.eq(nwrites_r)
+                self.nwrites.status.eq(nwrites_r),
+                self.nturnarounds.status.eq(nturnarounds_r)
             )
         ]
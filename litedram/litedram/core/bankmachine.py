@@ -8,6 +8,8 @@
 """LiteDRAM BankMachine (Rows/Columns management)."""
 
 import math
+from functools import reduce
+from operator import or_
 
 from migen import *
 
@@ -48,6 +50,112 @@ class _AddressSlicer:
                 address[:split]
             )
 
+# ReorderingCmdBuffer ------------------------------------------------------------------------------
+
+class _ReorderingCmdBuffer(Module):
+    """Command buffer presenting row-hit commands first (FR-FCFS)
+
+    Commands are kept in age order. The presented command (`source`) is the
+    oldest command targeting the opened row that is also the oldest buffered
+    command of its port (commands of a port are issued in order, so that its
+    data stay in order), or the oldest command if no such command exists.
+
+    Once `max_age` commands have been issued ahead of the oldest command, the
+    oldest command is presented to avoid starving it.
+
+    Parameters
+    ----------
+    layout : list
+        Command layout, with the port id ("id") field
+    depth : int
+        Number of buffered commands
+    max_age : int
+        Maximum number of commands issued ahead of the oldest command
+    row : Signal
+        Opened row
+    row_opened : Signal
+        Row is opened
+    row_of : function
+        Returns the row of a command address
+
+    Attributes
+    ----------
+    locks : Signal(2**len(id)), out
+        Ports with buffered commands
+    other_row_hit : Signal(), out
+        Another buffered command targets the row of the presented command
+    other_valid : Signal(), out
+        Other commands are buffered
+    """
+    def __init__(self, layout, depth, max_age, row, row_opened, row_of):
+        self.sink   = sink   = stream.Endpoint(layout)
+        self.source = source = stream.Endpoint(layout)
+        self.locks         = Signal(2**len(sink.id))
+        self.other_row_hit = Signal()
+        self.other_valid   = Signal()
+
+        # # #
+
+        entries = [Record(layout) for i in range(depth)]
+        level   = Signal(max=depth + 1)
+        valids  = [level > i for i in range(depth)]
+
+        # Selection --------------------------------------------------------------------------------
+        age      = Signal(max=max_age + 1)
+        sel      = Signal(max=max(depth, 2))
+        for i in reversed(range(depth)):
+            # Oldest command of its port...
+            eligible = 1
+            if i > 0:
+                eligible = ~reduce(or_, [entries[j].id == entries[i].id for j in range(i)])
+            # ...targeting the opened row.
+            row_hit  = row_opened & (row_of(entries[i].addr) == row)
+            self.comb += If((age != max_age) & valids[i] & eligible & row_hit, sel.eq(i))
+
+        self.comb += [
+            source.valid.eq(level != 0),
+            source.we.eq(Array(e.we for e in entries)[sel]),
+            source.addr.eq(Array(e.addr for e in entries)[sel]),
+            source.id.eq(Array(e.id for e in entries)[sel]),
+            self.other_valid.eq(level > 1),
+        ]
+        for i in range(depth):
+            self.comb += If(valids[i] & (sel != i) & (row_of(entries[i].addr) == row_of(source.addr)),
+                self.other_row_hit.eq(1)
+            )
+        self.comb += self.locks.eq(Cat(*[
+            reduce(or_, [valids[i] & (entries[i].id == port) for i in range(depth)])
+            for port in range(2**len(sink.id))]))
+
+        # Insertion / Removal ----------------------------------------------------------------------
+        push  = Signal()
+        pop   = Signal()
+        self.comb += [
+            sink.ready.eq(level != depth),
+            push.eq(sink.valid & sink.ready),
+            pop.eq(source.valid & source.ready),
+        ]
+        for i in range(depth):
+            # Remove the presented command, shifting the younger ones.
+            if i + 1 < depth:
+                self.sync += If(pop & (sel <= i), entries[i].eq(entries[i + 1]))
+            # Insert after the youngest command.
+            self.sync += If(push & ((level - pop) == i),
+                entries[i].we.eq(sink.we),
+                entries[i].addr.eq(sink.addr),
+                entries[i].id.eq(sink.id),
+            )
+        self.sync += [
+            level.eq(level + push - pop),
+            If(pop,
+                If(sel == 0,
+                    age.eq(0)
+                ).Else(
+                    age.eq(age + 1)
+                )
+            )
+        ]
+
 # BankMachine --------------------------------------------------------------------------------------
 
 class BankMachine(Module):
@@ -67,6 +175,11 @@ class BankMachine(Module):
     can be "looked ahead", and auto-precharge can be performed (if enabled in
     settings).
 
+    With `settings.with_cmd_reordering`, requests of the different ports are
+    tagged with their port id and queued together in a `_ReorderingCmdBuffer`
+    issuing row hits first; `lock` is then held per port (`locks`) and
+    `data_id` gives the port of wdata_ready/rdata_valid.
+
     Lock (cmd_layout.lock) is used to synchronise with LiteDRAMCrossbar. It is
     being held when:
      - there is a valid command awaiting in `cmd_buffer_lookahead` - this buffer
@@ -97,39 +210,66 @@ class BankMachine(Module):
         Indicates that refresh permission has been granted, satisfying timings
     cmd : Endpoint(cmd_request_rw_layout)
         Stream of commands to the Multiplexer
+    write_level : Signal, out
+        Number of buffered write requests
     """
     def __init__(self, n, address_width, address_align, nranks, settings):
-        self.req = req = Record(cmd_layout(address_width))
+        reordering = getattr(settings, "with_cmd_reordering", False)
+        id_width   = settings.cmd_reordering_id_width if reordering else 0
+        self.req = req = Record(cmd_layout(address_width, id_width))
         self.refresh_req = refresh_req = Signal()
         self.refresh_gnt = refresh_gnt = Signal()
 
         a  = settings.geom.addressbits
         ba = settings.geom.bankbits + log2_int(nranks)
         self.cmd = cmd = stream.Endpoint(cmd_request_rw_layout(a, ba))
+        self.write_level = write_level = Signal(max=settings.cmd_buffer_depth + 3)
 
         # # #
 
         auto_precharge = Signal()
 
-        # Command buffer ---------------------------------------------------------------------------
-        cmd_buffer_layout    = [("we", 1), ("addr", len(req.addr))]
-        cmd_buffer_lookahead = stream.SyncFIFO(
-            cmd_buffer_layout, settings.cmd_buffer_depth,
-            buffered=settings.cmd_buffer_buffered)
-        cmd_buffer = stream.Buffer(cmd_buffer_layout) # 1 depth buffer to detect row change
-        self.submodules += cmd_buffer_lookahead, cmd_buffer
-        self.comb += [
-            req.connect(cmd_buffer_lookahead.sink, keep={"valid", "ready", "we", "addr"}),
-            cmd_buffer_lookahead.source.connect(cmd_buffer.sink),
-            cmd_buffer.source.ready.eq(req.wdata_ready | req.rdata_valid),
-            req.lock.eq(cmd_buffer_lookahead.source.valid | cmd_buffer.source.valid),
-        ]
-
         slicer = _AddressSlicer(settings.geom.colbits, address_align)
 
-        # Row tracking -----------------------------------------------------------------------------
+        # Command buffer ---------------------------------------------------------------------------
         row        = Signal(settings.geom.rowbits)
         row_opened = Signal()
+        if reordering:
+            cmd_buffer_layout = [("we", 1), ("addr", len(req.addr)), ("id", len(req.id))]
+            cmd_buffer = _ReorderingCmdBuffer(cmd_buffer_layout,
+                depth      = settings.cmd_buffer_depth,
+                max_age    = settings.cmd_reordering_max_age,
+                row        = row,
+                row_opened = row_opened,
+                row_of     = slicer.row)
+            self.submodules += cmd_buffer
+            self.comb += [
+                req.connect(cmd_buffer.sink, keep={"valid", "ready", "we", "addr", "id"}),
+                cmd_buffer.source.ready.eq(req.wdata_ready | req.rdata_valid),
+                req.lock.eq(cmd_buffer.source.valid),
+                req.locks.eq(cmd_buffer.locks),
+                req.data_id.eq(cmd_buffer.source.id),
+            ]
+        else:
+            cmd_buffer_layout    = [("we", 1), ("addr", len(req.addr))]
+            cmd_buffer_lookahead = stream.SyncFIFO(
+                cmd_buffer_layout, settings.cmd_buffer_depth,
+                buffered=settings.cmd_buffer_buffered)
+            cmd_buffer = stream.Buffer(cmd_buffer_layout) # 1 depth buffer to detect row change
+            self.submodules += cmd_buffer_lookahead, cmd_buffer
+            self.comb += [
+                req.connect(cmd_buffer_lookahead.sink, keep={"valid", "ready", "we", "addr"}),
+                cmd_buffer_lookahead.source.connect(cmd_buffer.sink),
+                cmd_buffer.source.ready.eq(req.wdata_ready | req.rdata_valid),
+                req.lock.eq(cmd_buffer_lookahead.source.valid | cmd_buffer.source.valid),
+            ]
+
+        # Write level ------------------------------------------------------------------------------
+        write_push = Signal()
+        self.comb += write_push.eq(req.valid & req.ready & req.we)
+        self.sync += write_level.eq(write_level + write_push - req.wdata_ready)
+
+        # Row tracking -----------------------------------------------------------------------------
         row_hit    = Signal()
         row_open   = Signal()
         row_close  = Signal()
@@ -169,7 +309,13 @@ class BankMachine(Module):
 
         # Auto Precharge generation ----------------------------------------------------------------
         # generate auto precharge when current and next cmds are to different rows
-        if settings.with_auto_precharge:
+        if settings.with_auto_precharge and reordering:
+            # generate auto precharge when no other buffered cmd targets the current row
+            self.comb += \
+                If(cmd_buffer.other_valid & ~cmd_buffer.other_row_hit,
+                    auto_precharge.eq(row_close == 0)
+                )
+        elif settings.with_auto_precharge:
             self.comb += \
                 If(cmd_buffer_lookahead.source.valid & cmd_buffer.source.valid,
                     If(slicer.row(cmd_buffer_lookahead.source.addr) !=
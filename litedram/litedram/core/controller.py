@@ -27,9 +27,17 @@ class ControllerSettings(Settings):
         read_time           = 32,             # Maximum time (in cycles) allowed for a read operation before switching to a write.
         write_time          = 16,             # Maximum time (in cycles) allowed for a write operation before switching to a read.
 
+        # Write drain.
+        write_drain_high    = 0,              # Buffered writes (over all banks) starting a write batch (0: disabled).
+        write_drain_low     = 0,              # Buffered writes (over all banks) ending a write batch.
+        write_drain_time    = 128,            # Maximum time (in cycles) of a write batch when reads are waiting.
+
         # Bandwidth.
         with_bandwidth      = False,          # Enable bandwidth calculation and monitoring.
 
+        # Performance counters.
+        with_perf_counters  = False,          # Enable per-bank/refresh and per-port performance counters.
+
         # Refresh.
         with_refresh        = True,           # Enable periodic refresh operations.
         refresh_cls         = Refresher,      # Class used for refresh logic.
@@ -39,8 +47,16 @@ class ControllerSettings(Settings):
         # Auto-Precharge.
         with_auto_precharge = True,           # Enable auto-precharge after read/write operations.
 
+        # Command reordering.
+        with_cmd_reordering      = False,     # Issue row-hit requests ahead of older row-miss ones (FR-FCFS).
+        cmd_reordering_max_age   = 16,        # Maximum number of requests issued ahead of the oldest one.
+        cmd_reordering_id_width  = 3,         # Width of the port ids (up to 2**id_width crossbar ports).
+
         # Address mapping.
-        address_mapping     = "ROW_BANK_COL", # Address mapping scheme (e.g., row-bank-column).
+        address_mapping     = "ROW_BANK_COL", # Address mapping scheme: "ROW_BANK_COL", "ROW_COL_BANK"
+                                              # (banks interleaved every bank_interleave bytes) or
+                                              # "ROW_BANK_COL_XOR" (bank bits XORed with row bits).
+        bank_interleave     = 0,              # Byte granularity of ROW_COL_BANK (0: one controller word).
 
         # Bank byte alignment.
         bank_byte_alignment = 0):             # Minimum byte alignment between bank changes. Ensures a
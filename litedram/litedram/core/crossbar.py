@@ -15,14 +15,16 @@ from migen import *
 from migen.genlib import roundrobin
 
 from litex.soc.interconnect import stream
+from litex.soc.interconnect.csr import AutoCSR
 
 from litedram.common import *
 from litedram.core.controller import *
+from litedram.core.perfcounters import PortPerfCounters
 from litedram.frontend.adapter import *
 
 # LiteDRAMCrossbar ---------------------------------------------------------------------------------
 
-class LiteDRAMCrossbar(Module):
+class LiteDRAMCrossbar(Module, AutoCSR):
     """Multiplexes LiteDRAMController (slave) between ports (masters)
 
     To get a port to LiteDRAM, use the `get_port` method. It handles data width
@@ -31,7 +33,13 @@ class LiteDRAMCrossbar(Module):
     The crossbar routes requests from masters to the BankMachines
     (bankN.cmd_layout) and connects data path directly to the Multiplexer
     (data_layout). It performs address translation based on chosen
-    `controller.settings.address_mapping`.
+    `controller.settings.address_mapping`:
+     - "ROW_BANK_COL": bank changes every row (or `bank_byte_alignment` bytes)
+     - "ROW_COL_BANK": bank changes every `bank_interleave` bytes, so that
+       sequential accesses are spread over the banks
+     - "ROW_BANK_COL_XOR": as "ROW_BANK_COL", with the bank bits XORed with
+       the lowest row bits, so that strides of a row size are spread over
+       the banks
     Internally, all masters are multiplexed between controller banks based on
     the bank address (extracted from the presented address). Each bank has
     a RoundRobin arbiter, that selects from masters that want to access this
@@ -48,9 +56,20 @@ class LiteDRAMCrossbar(Module):
        * i.e. no other bank's arbiter granted permission for this master (with
          bank.lock being active)
 
+    With command reordering (`controller.settings.with_cmd_reordering`), the
+    requests of different masters can be queued in a bank at the same time:
+    they are tagged with the master id, the arbiter moves to the next master
+    after each request and a master is locked only by banks holding requests
+    of this master (bank.locks). Data ready/valid signals are then routed with
+    the id given by the bank (bank.data_id).
+
     Data ready/valid signals for banks are routed from bankmachines with
     a latency that synchronizes them with the data coming over datapath.
 
+    With `controller.settings.with_perf_counters`, each master gets a
+    PortPerfCounters (CSRs `port<id>_*`), in the controller clock domain and
+    data width.
+
     Parameters
     ----------
     controller : LiteDRAMInterface
@@ -93,6 +112,10 @@ class LiteDRAMCrossbar(Module):
             id            = len(self.masters))
         self.masters.append(port)
 
+        # Performance counters ---------------------------------------------------------------------
+        if getattr(self.controller.settings, "with_perf_counters", False):
+            setattr(self.submodules, "port{}".format(port.id), PortPerfCounters(port))
+
         # Clock domain crossing --------------------------------------------------------------------
         if clock_domain != "sys":
             new_port = LiteDRAMNativePort(
@@ -127,16 +150,34 @@ class LiteDRAMCrossbar(Module):
         nmasters   = len(self.masters)
 
         # Address mapping --------------------------------------------------------------------------
+        col_bits  = controller.settings.geom.colbits - controller.address_align
+        row_bank_col_shift = max(
+            col_bits,
+            log2_int(getattr(controller.settings, "bank_byte_alignment", 0) //(controller.data_width // 8))
+        )
+        row_col_bank_shift = log2_int(
+            max(getattr(controller.settings, "bank_interleave", 0), controller.data_width // 8) //
+            (controller.data_width // 8))
+        assert row_col_bank_shift <= col_bits, "bank_interleave larger than a row"
         cba_shifts = {
-            "ROW_BANK_COL": max(
-                controller.settings.geom.colbits - controller.address_align,
-                log2_int(getattr(controller.settings, "bank_byte_alignment", 0) //(controller.data_width // 8))
-            )
+            "ROW_BANK_COL":     row_bank_col_shift,
+            "ROW_COL_BANK":     row_col_bank_shift,
+            "ROW_BANK_COL_XOR": row_bank_col_shift,
+        }
+        # Row bits XORed with the bank bits.
+        xor_shifts = {
+            "ROW_BANK_COL_XOR": col_bits,
         }
         cba_shift = cba_shifts[controller.settings.address_mapping]
-        m_ba      = [m.get_bank_address(self.bank_bits, cba_shift)for m in self.masters]
+        xor_shift = xor_shifts.get(controller.settings.address_mapping, None)
+        m_ba      = [m.get_bank_address(self.bank_bits, cba_shift, self.rca_bits, xor_shift) for m in self.masters]
         m_rca     = [m.get_row_column_address(self.bank_bits, self.rca_bits, cba_shift) for m in self.masters]
 
+        reordering = controller.id_width != 0
+        if reordering:
+            assert nmasters <= 2**controller.id_width, \
+                "Too many ports for cmd_reordering_id_width={}".format(controller.id_width)
+
         master_readys       = [0]*nmasters
         master_wdata_readys = [0]*nmasters
         master_rdata_valids = [0]*nmasters
@@ -154,16 +195,20 @@ class LiteDRAMCrossbar(Module):
                 for other_nb, other_arbiter in enumerate(arbiters):
                     if other_nb != nb:
                         other_bank = getattr(controller, "bank"+str(other_nb))
-                        locked = locked | (other_bank.lock & (other_arbiter.grant == nm))
+                        if reordering:
+                            locked = locked | other_bank.locks[nm]
+                        else:
+                            locked = locked | (other_bank.lock & (other_arbiter.grant == nm))
                 master_locked.append(locked)
 
             # Arbitrate ----------------------------------------------------------------------------
             bank_selected  = [(ba == nb) & ~locked for ba, locked in zip(m_ba, master_locked)]
             bank_requested = [bs & master.cmd.valid for bs, master in zip(bank_selected, self.masters)]
-            self.comb += [
-                arbiter.request.eq(Cat(*bank_requested)),
-                arbiter.ce.eq(~bank.valid & ~bank.lock)
-            ]
+            self.comb += arbiter.request.eq(Cat(*bank_requested))
+            if reordering:
+                self.comb += arbiter.ce.eq(~bank.valid | bank.ready)
+            else:
+                self.comb += arbiter.ce.eq(~bank.valid & ~bank.lock)
 
             # Route requests -----------------------------------------------------------------------
             self.comb += [
@@ -171,11 +216,16 @@ class LiteDRAMCrossbar(Module):
                 bank.we.eq(Array(self.masters)[arbiter.grant].cmd.we),
                 bank.valid.eq(Array(bank_requested)[arbiter.grant])
             ]
+            if reordering:
+                self.comb += bank.id.eq(arbiter.grant)
+                data_id = bank.data_id
+            else:
+                data_id = arbiter.grant
             master_readys = [master_ready | ((arbiter.grant == nm) & bank_selected[nm] & bank.ready)
                 for nm, master_ready in enumerate(master_readys)]
-            master_wdata_readys = [master_wdata_ready | ((arbiter.grant == nm) & bank.wdata_ready)
+            master_wdata_readys = [master_wdata_ready | ((data_id == nm) & bank.wdata_ready)
                 for nm, master_wdata_ready in enumerate(master_wdata_readys)]
-            master_rdata_valids = [master_rdata_valid | ((arbiter.grant == nm) & bank.rdata_valid)
+            master_rdata_valids = [master_rdata_valid | ((data_id == nm) & bank.rdata_valid)
                 for nm, master_rdata_valid in enumerate(master_rdata_valids)]
 
         # Delay write/read signals based on their latency
@@ -10,7 +10,7 @@
 
 import math
 from functools import reduce
-from operator import or_, and_
+from operator import or_, and_, add
 
 from migen import *
 from migen.genlib.roundrobin import *
@@ -21,6 +21,7 @@ from litex.soc.interconnect.csr import AutoCSR
 
 from litedram.common import *
 from litedram.core.bandwidth import Bandwidth
+from litedram.core.perfcounters import ControllerPerfCounters
 
 # _CommandChooser ----------------------------------------------------------------------------------
 
@@ -202,6 +203,15 @@ class Multiplexer(Module, AutoCSR):
     and BankMachines to ensure there are no conflicts. Enforces required timings
     between commands (some timings are enforced by BankMachines).
 
+    By default, writes are issued as soon as no read is available (or when the
+    `read_time` anti-starvation timer expires). With `write_drain_high`, writes
+    are instead held off (up to `read_time`) until `write_drain_high` write
+    requests are buffered in the BankMachines, and are then drained until
+    only `write_drain_low` remain, to reduce the number of read/write
+    turnarounds. A drain is interrupted after `write_drain_time` cycles when
+    reads are waiting: reads are then served (up to `read_time`) before the
+    drain resumes.
+
     Parameters
     ----------
     settings : ControllerSettings
@@ -295,6 +305,26 @@ class Multiplexer(Module, AutoCSR):
             write_available.eq(reduce(or_, writes))
         ]
 
+        # Write drain ------------------------------------------------------------------------------
+        write_drain_high = getattr(settings, "write_drain_high", 0)
+        write_drain_low  = getattr(settings, "write_drain_low",  0)
+        write_drain      = Signal()
+        write_yield      = Signal() # Drain interrupted, serve the reads before resuming it.
+        write_request    = Signal() # Switch to WRITE without waiting for read anti-starvation.
+        if not write_drain_high:
+            self.comb += write_request.eq(~read_available)
+        else:
+            assert write_drain_low < write_drain_high
+            write_level = Signal(bits_for(sum(2**len(bm.write_level) - 1 for bm in bank_machines)))
+            self.comb += write_level.eq(reduce(add, [bm.write_level for bm in bank_machines]))
+            self.sync += \
+                If(write_level >= write_drain_high,
+                    write_drain.eq(1)
+                ).Elif(write_level <= write_drain_low,
+                    write_drain.eq(0)
+                )
+            self.comb += write_request.eq(write_drain & (~write_yield | ~read_available))
+
         # Anti Starvation --------------------------------------------------------------------------
 
         def anti_starvation(timeout):
@@ -315,6 +345,7 @@ class Multiplexer(Module, AutoCSR):
 
         read_time_en,   max_read_time = anti_starvation(settings.read_time)
         write_time_en, max_write_time = anti_starvation(settings.write_time)
+        drain_time_en, max_drain_time = anti_starvation(getattr(settings, "write_drain_time", 128))
 
         # Refresh ----------------------------------------------------------------------------------
         self.comb += [bm.refresh_req.eq(refresher.cmd.valid) for bm in bank_machines]
@@ -360,7 +391,7 @@ class Multiplexer(Module, AutoCSR):
             steerer_sel(steerer, access="read"),
             If(write_available,
                 # TODO: switch only after several cycles of ~read_available?
-                If(~read_available | max_read_time,
+                If(write_request | max_read_time,
                     NextState("RTW")
                 )
             ),
@@ -370,6 +401,8 @@ class Multiplexer(Module, AutoCSR):
         )
         fsm.act("WRITE",
             write_time_en.eq(1),
+            drain_time_en.eq(1),
+            NextValue(write_yield, 0),
             choose_req.want_writes.eq(1),
             If(settings.phy.nphases == 1,
                 choose_req.cmd.ready.eq(cas_allowed & (~choose_req.activate() | ras_allowed))
@@ -380,7 +413,8 @@ class Multiplexer(Module, AutoCSR):
             ),
             steerer_sel(steerer, access="write"),
             If(read_available,
-                If(~write_available | max_write_time,
+                If(~write_available | Mux(write_drain, max_drain_time, max_write_time),
+                    NextValue(write_yield, write_drain & write_available),
                     NextState("WTR")
                 )
             ),
@@ -406,3 +440,6 @@ class Multiplexer(Module, AutoCSR):
         if settings.with_bandwidth:
             data_width = settings.phy.dfi_databits*settings.phy.nphases
             self.submodules.bandwidth = Bandwidth(self.choose_req.cmd, data_width)
+
+        if getattr(settings, "with_perf_counters", False):
+            self.submodules.perf = ControllerPerfCounters(bank_machines, refresher)
@@ -0,0 +1,199 @@
+#
+# This file is part of LiteDRAM.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""LiteDRAM Performance Counters."""
+
+from functools import reduce
+from operator import or_
+
+from migen import *
+
+from litex.soc.interconnect.csr import *
+
+# Performance Counters -----------------------------------------------------------------------------
+
+class _PerfCounters(Module, AutoCSR):
+    """Free-running event counters
+
+    Counters are free-running (wrapping) and copied to their status registers on a write to the
+    `update` register, so that all the counters are sampled on the same cycle. Software computes
+    the differences between two samples (modulo 2^counter_width).
+    """
+    def __init__(self, counter_width=32):
+        self.counter_width = counter_width
+        self.update = CSR()
+        self.add_counter("cycles", 1, "Number of cycles.")
+
+    def add_counter(self, name, event, description):
+        counter = Signal(self.counter_width)
+        status  = CSRStatus(self.counter_width, name=name, description=description)
+        setattr(self, name, status)
+        self.sync += [
+            If(event, counter.eq(counter + 1)),
+            If(self.update.re, status.status.eq(counter))
+        ]
+        return status
+
+    def add_histogram(self, name, start, done, nbins, description):
+        """Latency histogram of in-order start/done events
+
+        Samples the latency of one request at a time: a request starting while no request is being
+        sampled is sampled, its latency being the number of cycles from its `start` to its own
+        `done` (after the `done` of the requests that were already outstanding). Bin n counts
+        latencies in [2^n, 2^(n+1)) cycles, the last bin counts all the latencies >= 2^(nbins-1).
+        """
+        outstanding = Signal(16)
+        sampling    = Signal()
+        skip        = Signal(16)
+        latency     = Signal(nbins)
+        index       = Signal(max=nbins)
+        record      = Signal()
+        self.comb += [
+            record.eq(sampling & done & (skip == 0)),
+            [If(latency >= 2**n, index.eq(n)) for n in range(nbins)],
+        ]
+        self.sync += [
+            outstanding.eq(outstanding + start - done),
+            If(sampling,
+                If(latency != (2**nbins - 1), # Saturate.
+                    latency.eq(latency + 1)
+                ),
+                If(done,
+                    If(skip == 0,
+                        sampling.eq(0)
+                    ).Else(
+                        skip.eq(skip - 1)
+                    )
+                )
+            ).Elif(start,
+                sampling.eq(1),
+                skip.eq(outstanding - done),
+                latency.eq(1)
+            )
+        ]
+        return [self.add_counter("{}{}".format(name, n), record & (index == n),
+            "{} (latency bin {}).".format(description, n)) for n in range(nbins)]
+
+# Controller Performance Counters ------------------------------------------------------------------
+
+class ControllerPerfCounters(_PerfCounters):
+    """Counts DRAM events per bank and refresh stalls
+
+    Requests are classified when their read/write command is issued by their BankMachine:
+
+    - row hit: issued on the row already opened.
+    - row miss: issued after an ACTIVATE on a closed bank (row closed by a refresh, or by an
+      auto-precharge).
+    - row conflict: issued after a PRECHARGE of another row and an ACTIVATE.
+
+    Parameters
+    ----------
+    bank_machines : list of BankMachine
+        Bank machines, each `cmd` is monitored.
+    refresher : Refresher
+        Refresher, its `cmd` is monitored.
+
+    Attributes
+    ----------
+    bank{n}_row_hits/row_misses/row_conflicts : CSRStatus, out
+        Row hits/misses/conflicts of bank n.
+    bank{n}_activates/precharges : CSRStatus, out
+        ACTIVATE/PRECHARGE (explicit or auto-precharge) commands issued to bank n.
+    refreshes : CSRStatus, out
+        Number of refresh sequences.
+    refresh_stall_cycles : CSRStatus, out
+        Number of cycles during which a refresh was pending while requests were waiting.
+    """
+    def __init__(self, bank_machines, refresher, counter_width=32):
+        _PerfCounters.__init__(self, counter_width)
+
+        # # #
+
+        # Banks ------------------------------------------------------------------------------------
+        for n, bm in enumerate(bank_machines):
+            cmd        = bm.cmd
+            issued     = Signal()
+            activate   = Signal()
+            precharge  = Signal()
+            cas        = Signal()
+            activated  = Signal()
+            precharged = Signal()
+            self.comb += [
+                issued.eq(cmd.valid & cmd.ready),
+                activate.eq(issued & cmd.ras & ~cmd.cas & ~cmd.we),
+                precharge.eq(issued & cmd.ras & ~cmd.cas & cmd.we),
+                cas.eq(issued & cmd.cas),
+            ]
+            self.sync += [
+                If(activate,  activated.eq(1)),
+                If(precharge, precharged.eq(1)),
+                If(cas,
+                    activated.eq(0),
+                    precharged.eq(0)
+                )
+            ]
+            for name, event, description in [
+                ("row_hits",      cas & ~activated,               "row hits"),
+                ("row_misses",    cas &  activated & ~precharged, "row misses"),
+                ("row_conflicts", cas &  activated &  precharged, "row conflicts"),
+                ("activates",     activate,                       "ACTIVATE commands"),
+                ("precharges",    precharge | (cas & cmd.a[10]),  "PRECHARGE commands"),
+            ]:
+                self.add_counter("bank{}_{}".format(n, name), event,
+                    "Number of {} on bank {}.".format(description, n))
+
+        # Refresh ----------------------------------------------------------------------------------
+        pending = Signal()
+        self.comb += pending.eq(reduce(or_, [bm.req.valid | bm.req.lock for bm in bank_machines]))
+        self.add_counter("refreshes",
+            refresher.cmd.last,
+            "Number of refresh sequences.")
+        self.add_counter("refresh_stall_cycles",
+            refresher.cmd.valid & pending,
+            "Number of cycles with a pending refresh and waiting requests.")
+
+# Port Performance Counters ------------------------------------------------------------------------
+
+class PortPerfCounters(_PerfCounters):
+    """Counts requests, arbitration wait and latency histograms of a crossbar port
+
+    Parameters
+    ----------
+    port : LiteDRAMNativePort
+        Crossbar port (in the controller clock domain and data width).
+    nbins : int
+        Number of bins of the latency histograms (see `add_histogram`).
+
+    Attributes
+    ----------
+    reads/writes : CSRStatus, out
+        Number of read/write commands.
+    wait_cycles : CSRStatus, out
+        Number of cycles with a command waiting for the crossbar (arbitration and bank buffers).
+    read_latency{n} : CSRStatus, out
+        Histogram of the latency from a read command to its data.
+    write_latency{n} : CSRStatus, out
+        Histogram of the latency from a write command to its data request.
+    """
+    def __init__(self, port, nbins=8, counter_width=32):
+        _PerfCounters.__init__(self, counter_width)
+
+        # # #
+
+        cmd_read  = Signal()
+        cmd_write = Signal()
+        self.comb += [
+            cmd_read.eq(port.cmd.valid  & port.cmd.ready & ~port.cmd.we),
+            cmd_write.eq(port.cmd.valid & port.cmd.ready &  port.cmd.we),
+        ]
+        self.add_counter("reads",  cmd_read,  "Number of read commands.")
+        self.add_counter("writes", cmd_write, "Number of write commands.")
+        self.add_counter("wait_cycles", port.cmd.valid & ~port.cmd.ready,
+            "Number of cycles with a command waiting to be accepted.")
+        # Note: the crossbar does not wait for rdata.ready/wdata.valid.
+        self.add_histogram("read_latency",  cmd_read,  port.rdata.valid, nbins,
+            "Number of read commands sampled")
+        self.add_histogram("write_latency", cmd_write, port.wdata.ready, nbins,
+            "Number of write commands sampled")
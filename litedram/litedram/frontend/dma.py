@@ -74,6 +74,7 @@ class LiteDRAMDMAReader(Module, AutoCSR):
 
         res_fifo = stream.SyncFIFO([("dummy", 1)], fifo_depth)
         self.submodules += res_fifo
+        self.rsv_level = res_fifo.level
 
         # Request issuance -------------------------------------------------------------------------
 
@@ -273,3 +274,301 @@ class LiteDRAMDMAWriter(Module, AutoCSR):
             )
         )
         fsm.act("DONE", self._done.status.eq(1))
+
+# LiteDRAMDMADescriptorReader ----------------------------------------------------------------------
+
+class LiteDRAMDMADescriptorReader(Module):
+    """Read a ring of DMA descriptors from DRAM memory.
+
+    Descriptors are stored one per port word: address (bytes) in bits 0-31 and length (bytes) in
+    bits 32-63. They are read ahead (up to `fifo_depth`), so that the next descriptor is available
+    as soon as the current one has been processed.
+
+    Parameters
+    ----------
+    port : port
+        Port on the DRAM memory controller to read the descriptors from (Native or AXI, at least
+        64-bit, ex: `crossbar.get_port(data_width=64)`).
+
+    fifo_depth : int
+        How many descriptors are read ahead.
+
+    Attributes
+    ----------
+    enable : Signal(), in
+        Read the ring (from its first descriptor) when set.
+
+    base : Signal(port.address_width), in
+        Address of the ring (in port words).
+
+    size : Signal(32), in
+        Number of descriptors of the ring.
+
+    loop : Signal(), in
+        Restart from the first descriptor after the last one.
+
+    source : Record("address", "length")
+        Source for the descriptors, last on the last descriptor of the ring.
+
+    done : Signal(), out
+        All the descriptors of the ring have been read (without loop).
+    """
+    def __init__(self, port, fifo_depth=2):
+        assert port.data_width >= 64
+        self.enable = Signal()
+        self.base   = Signal(port.address_width)
+        self.size   = Signal(32)
+        self.loop   = Signal()
+        self.source = source = stream.Endpoint([("address", 32), ("length", 32)])
+        self.done   = Signal()
+
+        # # #
+
+        self.submodules.dma = dma = LiteDRAMDMAReader(port, fifo_depth)
+        self.comb += dma.enable.eq(self.enable)
+
+        index = Signal(32)
+        fsm = FSM(reset_state="IDLE")
+        fsm = ResetInserter()(fsm)
+        self.submodules.fsm = fsm
+        self.comb += fsm.reset.eq(~self.enable)
+        fsm.act("IDLE",
+            NextValue(index, 0),
+            NextState("RUN"),
+        )
+        fsm.act("RUN",
+            dma.sink.valid.eq(self.size != 0),
+            dma.sink.last.eq(index == (self.size - 1)),
+            dma.sink.address.eq(self.base + index),
+            If(dma.sink.valid & dma.sink.ready,
+                NextValue(index, index + 1),
+                If(dma.sink.last,
+                    NextValue(index, 0),
+                    If(~self.loop,
+                        NextState("DONE")
+                    )
+                )
+            )
+        )
+        fsm.act("DONE", self.done.eq(1))
+
+        self.comb += [
+            dma.source.connect(source, omit={"data"}),
+            source.address.eq(dma.source.data[0:32]),
+            source.length.eq(dma.source.data[32:64]),
+        ]
+
+# LiteDRAMDMASGReader ------------------------------------------------------------------------------
+
+class _LiteDRAMDMASG(Module, AutoCSR):
+    def __init__(self, port, desc_port, fifo_depth, default_burst_length):
+        assert 1 <= default_burst_length <= fifo_depth
+        self._ring_base    = CSRStorage(32)
+        self._ring_size    = CSRStorage(32)
+        self._enable       = CSRStorage()
+        self._loop         = CSRStorage()
+        self._burst_length = CSRStorage(bits_for(fifo_depth), reset=default_burst_length)
+        self._done         = CSRStatus()
+        self._index        = CSRStatus(32)
+        self._bytes        = CSRStatus(32)
+        self._cycles       = CSRStatus(32)
+
+        # # #
+
+        shift       = log2_int(port.data_width//8)
+        self.enable = enable = self._enable.storage
+
+        # Descriptors ------------------------------------------------------------------------------
+        self.submodules.descriptors = descriptors = LiteDRAMDMADescriptorReader(desc_port)
+        self.comb += [
+            descriptors.enable.eq(enable),
+            descriptors.base.eq(self._ring_base.storage[log2_int(desc_port.data_width//8):]),
+            descriptors.size.eq(self._ring_size.storage),
+            descriptors.loop.eq(self._loop.storage),
+        ]
+
+        # Burst length (limited to the FIFO depth) -------------------------------------------------
+        burst_length = Signal(bits_for(fifo_depth))
+        self.comb += [
+            burst_length.eq(self._burst_length.storage),
+            If(self._burst_length.storage == 0,
+                burst_length.eq(1)
+            ).Elif(self._burst_length.storage > fifo_depth,
+                burst_length.eq(fifo_depth)
+            )
+        ]
+
+        # Descriptors processing -------------------------------------------------------------------
+        # The words of a descriptor are transfered in bursts: a burst only starts when the FIFO can
+        # accept (Reader) or provide (Writer) all its words, its commands are then issued
+        # back-to-back (BURST state, see add_burst_state).
+        self.burst_ready = Signal()                         # Set by Reader/Writer.
+        self.drained     = Signal()                         # Set by Reader/Writer.
+        self.burst_count = burst_count = Signal(bits_for(fifo_depth))
+        self.count       = count       = Signal(bits_for(fifo_depth))
+        self.address     = address     = Signal(port.address_width)
+        self.remaining   = remaining   = Signal(32)
+        self.transfer    = Signal()
+        desc      = descriptors.source
+        last_desc = Signal()
+        self.comb += If(remaining < burst_length,
+            burst_count.eq(remaining)
+        ).Else(
+            burst_count.eq(burst_length)
+        )
+
+        self.submodules.fsm = fsm = ResetInserter()(FSM(reset_state="IDLE"))
+        self.comb += fsm.reset.eq(~enable)
+        fsm.act("IDLE",
+            desc.ready.eq(1),
+            If(desc.valid,
+                NextValue(address,   desc.address[shift:]),
+                NextValue(remaining, desc.length[shift:]),
+                NextValue(last_desc, desc.last & ~self._loop.storage),
+                NextState("WAIT")
+            )
+        )
+        fsm.act("WAIT",
+            If(remaining == 0,
+                If(last_desc,
+                    NextState("DONE")
+                ).Else(
+                    NextState("IDLE")
+                )
+            ).Elif(self.burst_ready,
+                NextValue(count, burst_count),
+                NextState("BURST")
+            )
+        )
+        fsm.act("DONE", self._done.status.eq(self.drained))
+
+        # Counters ---------------------------------------------------------------------------------
+        self.sync += [
+            If(~enable,
+                self._index.status.eq(0),
+                self._bytes.status.eq(0),
+                self._cycles.status.eq(0),
+            ).Else(
+                If(desc.valid & desc.ready,
+                    self._index.status.eq(self._index.status + 1)
+                ),
+                If(self.transfer,
+                    self._bytes.status.eq(self._bytes.status + port.data_width//8)
+                ),
+                If(~self._done.status,
+                    self._cycles.status.eq(self._cycles.status + 1)
+                )
+            )
+        ]
+
+    def add_burst_state(self, sink, valid):
+        self.fsm.act("BURST",
+            sink.valid.eq(valid),
+            sink.last.eq(self.remaining == 1),
+            sink.address.eq(self.address),
+            If(sink.valid & sink.ready,
+                NextValue(self.address,   self.address   + 1),
+                NextValue(self.remaining, self.remaining - 1),
+                NextValue(self.count,     self.count     - 1),
+                If(self.count == 1,
+                    NextState("WAIT")
+                )
+            )
+        )
+        self.comb += self.transfer.eq(sink.valid & sink.ready)
+
+
+class LiteDRAMDMASGReader(_LiteDRAMDMASG):
+    """Scatter-gather DMA reader: read DRAM memory to a stream, following a ring of descriptors.
+
+    Each descriptor (see `LiteDRAMDMADescriptorReader`) gives the address and the length (bytes) of
+    a buffer to read, the descriptors of the ring are processed in order (and again when looping)
+    without CPU intervention. Reads are issued in bursts of `burst_length` words.
+
+    Parameters
+    ----------
+    port : port
+        Port on the DRAM memory controller to read from (Native or AXI).
+
+    desc_port : port
+        Port on the DRAM memory controller to read the descriptors from (at least 64-bit).
+
+    fifo_depth : int
+        How many read requests can be outstanding at once.
+
+    fifo_buffered : bool
+        Implement FIFO in Block Ram.
+
+    default_burst_length : int
+        Reset value of the burst length CSR (in words, up to `fifo_depth`).
+
+    Attributes
+    ----------
+    source : Record("data")
+        Source for DRAM words, last on the last word of each descriptor.
+    """
+    def __init__(self, port, desc_port, fifo_depth=16, fifo_buffered=False, default_burst_length=8):
+        _LiteDRAMDMASG.__init__(self, port, desc_port, fifo_depth, default_burst_length)
+
+        # # #
+
+        self.submodules.dma = dma = LiteDRAMDMAReader(port, fifo_depth, fifo_buffered)
+        self.source = dma.source
+        self.comb += [
+            dma.enable.eq(self.enable),
+            self.burst_ready.eq((fifo_depth - dma.rsv_level) >= self.burst_count),
+            self.drained.eq(dma.rsv_level == 0),
+        ]
+        self.add_burst_state(dma.sink, valid=1)
+
+# LiteDRAMDMASGWriter ------------------------------------------------------------------------------
+
+class LiteDRAMDMASGWriter(_LiteDRAMDMASG):
+    """Scatter-gather DMA writer: write a stream to DRAM memory, following a ring of descriptors.
+
+    Each descriptor (see `LiteDRAMDMADescriptorReader`) gives the address and the length (bytes) of
+    a buffer to write, the descriptors of the ring are processed in order (and again when looping)
+    without CPU intervention. Writes are issued in bursts of `burst_length` words, once buffered.
+
+    Parameters
+    ----------
+    port : port
+        Port on the DRAM memory controller to write to (Native or AXI).
+
+    desc_port : port
+        Port on the DRAM memory controller to read the descriptors from (at least 64-bit).
+
+    fifo_depth : int
+        How many words can be buffered (and thus the maximum burst length).
+
+    fifo_buffered : bool
+        Implement FIFO in Block Ram.
+
+    default_burst_length : int
+        Reset value of the burst length CSR (in words, up to `fifo_depth`).
+
+    Attributes
+    ----------
+    sink : Record("data")
+        Sink for DRAM words to be written.
+    """
+    def __init__(self, port, desc_port, fifo_depth=16, fifo_buffered=False, default_burst_length=8):
+        assert fifo_depth >= 2
+        _LiteDRAMDMASG.__init__(self, port, desc_port, fifo_depth, default_burst_length)
+        self.sink = sink = stream.Endpoint([("data", port.data_width)])
+
+        # # #
+
+        fifo = stream.SyncFIFO([("data", port.data_width)], fifo_depth, fifo_buffered)
+        fifo = ResetInserter()(fifo)
+        self.submodules.fifo = fifo
+        self.submodules.dma  = dma = LiteDRAMDMAWriter(port, fifo_depth, fifo_buffered)
+        self.comb += [
+            fifo.reset.eq(~self.enable),
+            sink.connect(fifo.sink),
+            dma.sink.data.eq(fifo.source.data),
+            fifo.source.ready.eq(self.fsm.ongoing("BURST") & dma.sink.ready),
+            self.burst_ready.eq(fifo.level >= self.burst_count),
+            self.drained.eq(~dma.fifo.source.valid),
+        ]
+        self.add_burst_state(dma.sink, valid=fifo.source.valid)
@@ -13,6 +13,7 @@ from migen import *
 from litex.gen import *
 
 from litex.soc.interconnect import stream
+from litex.soc.interconnect.csr import *
 
 from litedram.common           import LiteDRAMNativePort
 from litedram.frontend.adapter import LiteDRAMNativePortConverter
@@ -82,6 +83,325 @@ class LiteDRAMWishbone2Native(LiteXModule):
             )
         )
 
+# LiteDRAMWishboneCache ----------------------------------------------------------------------------
+
+class LiteDRAMWishboneCache(LiteXModule):
+    """Wishbone to LiteDRAM native port with a small cache of port words.
+
+    Narrow Wishbone accesses (ex 32-bit CPU accesses over a 128/256-bit controller) are served from
+    `nlines` fully-associative lines of one port word each (round-robin replacement):
+
+    - Reads: a miss reads the line from the port and, with `prefetch`, the next line with a
+      back-to-back command, so that sequential reads only wait for the DRAM once every two lines.
+    - Writes: write-combining, writes are merged in the lines (with their byte enables) and only
+      written to the port (with the byte enables of the written bytes) when the line is replaced
+      or flushed. A write miss does not read the line from the port.
+
+    The cache is not coherent with the other ports: `flush` (or the flush CSR) writes back and
+    invalidates all the lines.
+
+    Parameters
+    ----------
+    wishbone : Interface
+        Wishbone slave interface (word addressing), up to the port data width.
+
+    port : LiteDRAMNativePort
+        Port on the DRAM memory controller.
+
+    nlines : int
+        Number of lines (port words).
+
+    prefetch : bool
+        Prefetch the next line on read misses.
+
+    with_csr : bool
+        Add the flush CSR and the read/write hits/misses counters CSRs.
+    """
+    def __init__(self, wishbone, port, nlines=4, prefetch=True, base_address=0x00000000, with_csr=True):
+        wishbone_data_width = len(wishbone.dat_w)
+        port_data_width     = len(port.wdata.data)
+        ratio               = port_data_width//wishbone_data_width
+
+        assert wishbone.addressing == "word"
+        assert port_data_width % wishbone_data_width == 0 and ratio & (ratio - 1) == 0
+        assert nlines >= 2
+        self.flush = Signal()
+
+        # # #
+
+        wishbone_bytes = wishbone_data_width//8
+        port_bytes     = port_data_width//8
+        offset         = base_address >> log2_int(wishbone_bytes)
+
+        # Address decoding -------------------------------------------------------------------------
+        adr       = Signal(len(wishbone.adr))
+        line_adr  = Signal(port.address_width)
+        word      = Signal(max(log2_int(ratio), 1))
+        self.comb += [
+            adr.eq(wishbone.adr - offset),
+            line_adr.eq(adr[log2_int(ratio):]),
+            word.eq(adr[:log2_int(ratio)]),
+        ]
+
+        # Lines ------------------------------------------------------------------------------------
+        tags  = Array(Signal(port.address_width) for _ in range(nlines))
+        datas = Array(Signal(port_data_width)    for _ in range(nlines))
+        valid = Array(Signal()                   for _ in range(nlines)) # Data read from the port.
+        dirty = Array(Signal(port_bytes)         for _ in range(nlines)) # Bytes written by Wishbone.
+
+        def lookup(address):
+            # Returns the (present, readable, index) of the line of an address.
+            present  = Signal()
+            readable = Signal()
+            index    = Signal(max=nlines)
+            for i in reversed(range(nlines)):
+                match = (tags[i] == address) & (valid[i] | (dirty[i] != 0))
+                self.comb += If(match, present.eq(1), readable.eq(valid[i]), index.eq(i))
+            return present, readable, index
+
+        hit, hit_readable, hit_index = lookup(line_adr)
+        next_line_adr = Signal(port.address_width)
+        next_present, _, _ = lookup(next_line_adr)
+
+        # Replacement: round-robin.
+        victim      = Signal(max=nlines)
+        victim_next = Signal(max=nlines)
+        self.comb += victim_next.eq(Mux(victim == (nlines - 1), 0, victim + 1))
+
+        # First dirty line (flush).
+        dirty_any   = Signal()
+        dirty_index = Signal(max=nlines)
+        for i in reversed(range(nlines)):
+            self.comb += If(dirty[i] != 0, dirty_any.eq(1), dirty_index.eq(i))
+
+        # Lines updates ----------------------------------------------------------------------------
+        # Write: merge Wishbone data in a line (and set its tag when allocating it).
+        write       = Signal()
+        write_alloc = Signal()
+        write_index = Signal(max=nlines)
+        write_mask  = Signal(port_bytes)
+        write_data  = Signal(port_data_width)
+        self.comb += [
+            write_mask.eq(wishbone.sel << (word*wishbone_bytes)),
+            write_data.eq(Replicate(wishbone.dat_w, ratio)),
+        ]
+        # Reserve: set the tag of a line to be read from the port.
+        reserve       = Signal()
+        reserve_index = Signal(max=nlines)
+        reserve_adr   = Signal(port.address_width)
+        # Fill: store data read from the port.
+        fill       = Signal()
+        fill_index = Signal(max=nlines)
+        # Clean: line written back to the port.
+        clean       = Signal()
+        clean_index = Signal(max=nlines)
+        # Invalidate: all lines.
+        invalidate = Signal()
+
+        for i in range(nlines):
+            merged = Cat(*[Mux(write_mask[b], write_data[8*b:8*(b+1)], datas[i][8*b:8*(b+1)])
+                for b in range(port_bytes)])
+            self.sync += [
+                If(write & (write_index == i),
+                    datas[i].eq(merged),
+                    If(write_alloc,
+                        tags[i].eq(line_adr),
+                        valid[i].eq(0),
+                        dirty[i].eq(write_mask),
+                    ).Else(
+                        dirty[i].eq(dirty[i] | write_mask),
+                    )
+                ),
+                If(reserve & (reserve_index == i),
+                    tags[i].eq(reserve_adr),
+                    valid[i].eq(0),
+                ),
+                If(fill & (fill_index == i),
+                    datas[i].eq(port.rdata.data),
+                    valid[i].eq(1),
+                ),
+                If(clean & (clean_index == i),
+                    dirty[i].eq(0),
+                ),
+                If(invalidate,
+                    valid[i].eq(0),
+                )
+            ]
+
+        # Wishbone read data -----------------------------------------------------------------------
+        def word_of(data):
+            return Array(data[k*wishbone_data_width:(k+1)*wishbone_data_width] for k in range(ratio))[word]
+
+        # Control ----------------------------------------------------------------------------------
+        flush_pending  = Signal()
+        missed         = Signal()
+        prefetching    = Signal()
+        request        = Signal()
+        miss_adr       = Signal(port.address_width)
+        miss_index     = Signal(max=nlines)
+        prefetch_index = Signal(max=nlines)
+        writeback      = Signal(max=nlines)
+
+        self.read_hit    = read_hit    = Signal()
+        self.read_miss   = read_miss   = Signal()
+        self.write_hit   = write_hit   = Signal()
+        self.write_miss  = write_miss  = Signal()
+
+        self.sync += If(self.flush, flush_pending.eq(1))
+        self.comb += [
+            request.eq(wishbone.cyc & wishbone.stb),
+            next_line_adr.eq(miss_adr + 1),
+            port.cmd.last.eq(~port.cmd.we),
+            port.rdata.ready.eq(1),
+        ]
+
+        self.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            NextValue(missed, 0),
+            If(flush_pending,
+                If(dirty_any,
+                    NextValue(writeback, dirty_index),
+                    NextState("WRITEBACK-CMD")
+                ).Else(
+                    invalidate.eq(1),
+                    NextValue(flush_pending, 0)
+                )
+            ).Elif(request & wishbone.we,
+                If(hit,
+                    # Write hit: merge in the line.
+                    write.eq(1),
+                    write_index.eq(hit_index),
+                    write_hit.eq(1),
+                    wishbone.ack.eq(1)
+                ).Elif(dirty[victim] != 0,
+                    NextValue(writeback, victim),
+                    NextState("WRITEBACK-CMD")
+                ).Else(
+                    # Write miss: allocate the line (without reading it).
+                    write.eq(1),
+                    write_alloc.eq(1),
+                    write_index.eq(victim),
+                    write_miss.eq(1),
+                    wishbone.ack.eq(1),
+                    NextValue(victim, victim_next)
+                )
+            ).Elif(request,
+                If(hit & hit_readable,
+                    # Read hit (or the missed line, now filled).
+                    read_hit.eq(~missed),
+                    wishbone.ack.eq(1),
+                    wishbone.dat_r.eq(word_of(datas[hit_index]))
+                ).Elif(hit,
+                    # Line only written: write it back before reading it.
+                    NextValue(writeback, hit_index),
+                    NextState("WRITEBACK-CMD")
+                ).Elif(dirty[victim] != 0,
+                    NextValue(writeback, victim),
+                    NextState("WRITEBACK-CMD")
+                ).Else(
+                    NextValue(miss_adr,   line_adr),
+                    NextValue(miss_index, victim),
+                    NextState("READ-CMD")
+                )
+            )
+        )
+        fsm.act("WRITEBACK-CMD",
+            port.cmd.valid.eq(1),
+            port.cmd.we.eq(1),
+            port.cmd.addr.eq(tags[writeback]),
+            If(port.cmd.ready,
+                NextState("WRITEBACK-DATA")
+            )
+        )
+        fsm.act("WRITEBACK-DATA",
+            port.wdata.valid.eq(1),
+            port.wdata.data.eq(datas[writeback]),
+            port.wdata.we.eq(dirty[writeback]),
+            If(port.wdata.ready,
+                clean.eq(1),
+                clean_index.eq(writeback),
+                NextState("IDLE")
+            )
+        )
+        fsm.act("READ-CMD",
+            port.cmd.valid.eq(1),
+            port.cmd.we.eq(0),
+            port.cmd.addr.eq(miss_adr),
+            If(port.cmd.ready,
+                read_miss.eq(1),
+                reserve.eq(1),
+                reserve_index.eq(miss_index),
+                reserve_adr.eq(miss_adr),
+                NextValue(victim, victim_next),
+                NextValue(missed, 1),
+                NextValue(prefetching, 0),
+                # Prefetch the next line if not present and if its line can be replaced.
+                If(prefetch & ~next_present & (dirty[victim_next] == 0),
+                    NextState("PREFETCH-CMD")
+                ).Else(
+                    NextState("READ-DATA")
+                )
+            )
+        )
+        # Read data of the missed line can arrive before the prefetch command is accepted.
+        for state, read_done in [("PREFETCH-CMD", False), ("PREFETCH-CMD-READ-DONE", True)]:
+            fsm.act(state,
+                port.cmd.valid.eq(1),
+                port.cmd.we.eq(0),
+                port.cmd.addr.eq(next_line_adr),
+                If(port.cmd.ready,
+                    reserve.eq(1),
+                    reserve_index.eq(victim),
+                    reserve_adr.eq(next_line_adr),
+                    NextValue(prefetch_index, victim),
+                    NextValue(victim, victim_next),
+                    NextValue(prefetching, 1),
+                    NextState("PREFETCH-DATA" if read_done else "READ-DATA")
+                ),
+                If(port.rdata.valid & (not read_done),
+                    fill.eq(1),
+                    fill_index.eq(miss_index),
+                    If(port.cmd.ready,
+                        NextState("PREFETCH-DATA")
+                    ).Else(
+                        NextState("PREFETCH-CMD-READ-DONE")
+                    )
+                )
+            )
+        fsm.act("READ-DATA",
+            If(port.rdata.valid,
+                fill.eq(1),
+                fill_index.eq(miss_index),
+                If(prefetching,
+                    NextState("PREFETCH-DATA")
+                ).Else(
+                    NextState("IDLE")
+                )
+            )
+        )
+        fsm.act("PREFETCH-DATA",
+            If(port.rdata.valid,
+                fill.eq(1),
+                fill_index.eq(prefetch_index),
+                NextState("IDLE")
+            )
+        )
+
+        # CSRs -------------------------------------------------------------------------------------
+        if with_csr:
+            self._flush        = CSR()
+            self._read_hits    = CSRStatus(32, description="Number of Wishbone reads served by the cache.")
+            self._read_misses  = CSRStatus(32, description="Number of lines read from the port on a miss.")
+            self._write_hits   = CSRStatus(32, description="Number of Wishbone writes combined in a line.")
+            self._write_misses = CSRStatus(32, description="Number of Wishbone writes allocating a line.")
+            self.sync += If(self._flush.re, flush_pending.eq(1))
+            for event, csr in [
+                (read_hit,   self._read_hits),
+                (read_miss,  self._read_misses),
+                (write_hit,  self._write_hits),
+                (write_miss, self._write_misses)]:
+                self.sync += If(event, csr.status.eq(csr.status + 1))
+
 # LiteDRAMNative2Wishbone --------------------------------------------------------------------------
 
 class LiteDRAMNative2Wishbone(LiteXModule):
@@ -18,13 +18,177 @@ from litedram.modules import _speedgrade_timings, _technology_timings
 from functools import reduce
 from operator import or_
 
-import struct
+import os
+import re
+import mmap
 
 
 SDRAM_VERBOSE_OFF = 0
 SDRAM_VERBOSE_STD = 1
 SDRAM_VERBOSE_DBG = 2
 
+# Sparse Memory ------------------------------------------------------------------------------------
+
+class SparseMemory:
+    """Sparse memory of `width`-bit words
+
+    Contents are stored little-endian in pages of `page_size` bytes, allocated on first write, so
+    that memories of several GBs only use the memory of the pages actually touched. Init images can
+    be mapped from files (`add_file`): their pages are only read when accessed.
+
+    Can be used as a list of words (indexing, iteration, comparison) and as the `init` of a
+    `Memory`, whose Verilog initialization file then only contains the initialized pages (see
+    `readmemh`).
+
+    Parameters
+    ----------
+    width : int
+        Word width
+    depth : int
+        Number of words
+    init : list
+        Initial words
+    page_size : int
+        Page size in bytes (rounded down to a multiple of the word size)
+    """
+    def __init__(self, width, depth, init=[], page_size=4096):
+        self.width      = width
+        self.depth      = depth
+        self.word_bytes = (width + 7)//8
+        self.page_size  = max(page_size//self.word_bytes, 1)*self.word_bytes
+        self._pages     = {}
+        self._files     = []
+        for addr, data in enumerate(init):
+            self[addr] = data
+
+    # Files ----------------------------------------------------------------------------------------
+
+    def add_file(self, filename, base=0, endianness="little"):
+        """Maps the contents of a file at byte address `base`
+
+        With "big" endianness, the file is made of big-endian 32-bit words (as `get_mem_data`).
+        """
+        assert endianness in ["big", "little"]
+        with open(filename, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        assert base + size <= self.depth*self.word_bytes, "{} is too big: {}/{} bytes".format(
+            filename, base + size, self.depth*self.word_bytes)
+        self._files.append((base, size, data, endianness == "big"))
+
+    def _load_page(self, n):
+        start = n*self.page_size
+        end   = start + self.page_size
+        page  = None
+        for base, size, data, swap in self._files:
+            if base >= end or base + size <= start:
+                continue
+            if page is None:
+                page = bytearray(self.page_size)
+            # Copy the 32-bit aligned words of the file overlapping the page.
+            lo    = max(start, base)
+            hi    = min(end, base + size)
+            chunk = bytearray(data[lo - base:hi - base])
+            if swap:
+                skip  = (lo - base)%4
+                chunk = bytearray(skip) + chunk
+                chunk.extend(bytearray(-len(chunk)%4))
+                for i in range(0, len(chunk), 4):
+                    chunk[i:i + 4] = chunk[i:i + 4][::-1]
+                chunk = chunk[skip:skip + hi - lo]
+            page[lo - start:hi - start] = chunk
+        return page
+
+    # Pages ----------------------------------------------------------------------------------------
+
+    def _page(self, n, allocate=False):
+        page = self._pages.get(n)
+        if page is None:
+            page = self._load_page(n)
+            if page is None and allocate:
+                page = bytearray(self.page_size)
+            if page is not None:
+                self._pages[n] = page
+        return page
+
+    def pages(self):
+        """Yields the (byte address, contents) of the initialized pages, in address order"""
+        indexes = set(self._pages)
+        for base, size, data, swap in self._files:
+            indexes.update(range(base//self.page_size, -(-(base + size)//self.page_size)))
+        for n in sorted(indexes):
+            yield n*self.page_size, self._page(n)
+
+    def read_bytes(self, address, length):
+        data = bytearray()
+        while length > 0:
+            n, offset = divmod(address, self.page_size)
+            size = min(length, self.page_size - offset)
+            page = self._page(n)
+            data += bytearray(size) if page is None else page[offset:offset + size]
+            address += size
+            length  -= size
+        return bytes(data)
+
+    def write_bytes(self, address, data):
+        while data:
+            n, offset = divmod(address, self.page_size)
+            size = min(len(data), self.page_size - offset)
+            self._page(n, allocate=True)[offset:offset + size] = data[:size]
+            address += size
+            data     = data[size:]
+
+    # Words ----------------------------------------------------------------------------------------
+
+    def _word(self, addr):
+        if not 0 <= addr < self.depth:
+            raise IndexError("Address 0x{:x} out of range".format(addr))
+        n, offset = divmod(addr*self.word_bytes, self.page_size)
+        return n, offset
+
+    def __getitem__(self, addr):
+        if isinstance(addr, slice):
+            return [self[i] for i in range(*addr.indices(self.depth))]
+        n, offset = self._word(addr)
+        page = self._page(n)
+        if page is None:
+            return 0
+        return int.from_bytes(page[offset:offset + self.word_bytes], "little")
+
+    def __setitem__(self, addr, data):
+        n, offset = self._word(addr)
+        page = self._page(n, allocate=True)
+        data &= 2**self.width - 1
+        page[offset:offset + self.word_bytes] = data.to_bytes(self.word_bytes, "little")
+
+    def __len__(self):
+        return self.depth
+
+    def __iter__(self):
+        for addr in range(self.depth):
+            yield self[addr]
+
+    def __eq__(self, other):
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return "SparseMemory({}x{}, {} pages)".format(self.depth, self.width, len(self._pages))
+
+    def readmemh(self):
+        """Returns the contents as a $readmemh file, with an address for each initialized page"""
+        content   = []
+        formatter = "{:0" + str(self.width//4) + "x}"
+        for address, page in self.pages():
+            if not any(page):
+                continue
+            content.append("@{:x}".format(address//self.word_bytes))
+            for offset in range(0, min(len(page), self.depth*self.word_bytes - address), self.word_bytes):
+                content.append(formatter.format(int.from_bytes(page[offset:offset + self.word_bytes], "little")))
+        return "".join(line + "\n" for line in content)
+
 # Bank Model ---------------------------------------------------------------------------------------
 
 class BankModel(Module):
@@ -265,9 +429,9 @@ class DFITimingsChecker(Module):
                     self.sync += [
                         If((state == cmd.enc) & self.logging_enabled,
                             If(all_banks,
-                                Display("[%016dps] P%0d " + cmd.name, ps, np)
+                                Display("[%016dps] P{} ".format(np) + cmd.name, ps)
                             ).Else(
-                                Display("[%016dps] P%0d B%0d " + cmd.name, ps, np, phase.bank)
+                                Display("[%016dps] P{} B%0d ".format(np) + cmd.name, ps, phase.bank)
                             )
                         )
                     ]
@@ -285,7 +449,7 @@ class DFITimingsChecker(Module):
                                 self.sync += [
                                     If(self.logging_enabled & cmd_recv & (last_cmd[i] == prev.enc) &
                                        (ps < (last_cmd_ps[i][prev.idx] + rule.delay)),
-                                        Display("[%016dps] {} violation on bank %0d".format(rule.name), ps, i)
+                                        Display("[%016dps] {} violation on bank {}".format(rule.name, i), ps)
                                     )
                                 ]
 
@@ -300,14 +464,14 @@ class DFITimingsChecker(Module):
                         # act_curr points to newest ACT timestamp
                         self.sync += [
                             If(self.logging_enabled & cmd_recv & (ps < (act_ps[act_curr] + self.timings["tRRD"])),
-                                Display("[%016dps] tRRD violation on bank %0d", ps, i)
+                                Display("[%016dps] tRRD violation on bank {}".format(i), ps)
                             )
                         ]
 
                         # act_next points to the oldest ACT timestamp
                         self.sync += [
                             If(self.logging_enabled & cmd_recv & (ps < (act_ps[act_next] + self.timings["tFAW"])),
-                                Display("[%016dps] tFAW violation on bank %0d", ps, i)
+                                Display("[%016dps] tFAW violation on bank {}".format(i), ps)
                             )
                         ]
 
@@ -373,6 +537,102 @@ class DFITimingsChecker(Module):
                 )
             ]
 
+# DFI Trace Timings Checker ------------------------------------------------------------------------
+
+class DFITraceTimingsChecker(DFITimingsChecker):
+    """DFI timings checker working on a trace of the DFI commands
+
+    Instead of comparing timestamps in the simulated gateware (as `DFITimingsChecker`), only displays
+    the commands issued on the DFI (one `TRACE_FORMAT` line per command) and checks them after the
+    simulation with NumPy over the whole trace (`check`/`report`): `RULES` on each bank, tRRD/tFAW
+    between ACTs and the maximum delay between refreshes.
+    """
+    TRACE_FORMAT  = "DFI-CMD %d {phase} %d %d %d" # Cycle, phase, command, bank, all banks
+    TRACE_PATTERN = re.compile(r"^DFI-CMD (\d+) (\d+) (\d+) (\d+) (\d+)$", re.MULTILINE)
+
+    def __init__(self, dfi, nbanks, nphases, timings, refresh_mode, memtype, verbose=False):
+        self.logging_enabled = Signal(reset=1)
+
+        self.prepare_timings(timings, refresh_mode, memtype)
+        self.add_cmds()
+        self.add_rules()
+        self.nbanks       = nbanks
+        self.nphases      = nphases
+        self.refresh_mode = "1x" if refresh_mode is None else refresh_mode
+        self.memtype      = memtype
+
+        cycle = Signal(64)
+        self.sync += cycle.eq(cycle + 1)
+
+        for n, phase in enumerate([getattr(dfi, "p" + str(n)) for n in range(nphases)]):
+            state = Signal(4)
+            self.comb += state.eq(Cat(phase.we_n, phase.cas_n, phase.ras_n, phase.cs_n))
+            all_banks = Signal()
+            self.comb += all_banks.eq(
+                (self.cmds["REF"].enc == state) |
+                ((self.cmds["PRE"].enc == state) & phase.address[10])
+            )
+            self.sync += [
+                If(self.logging_enabled & (state == cmd.enc),
+                    Display(self.TRACE_FORMAT.format(phase=n), cycle, state, phase.bank, all_banks)
+                ) for cmd in self.cmds.values()
+            ]
+
+    @classmethod
+    def parse(cls, output):
+        """Returns the trace (array of cycle, phase, command, bank, all banks) from the simulation output"""
+        import numpy as np
+        trace = np.array(cls.TRACE_PATTERN.findall(output), dtype=np.int64)
+        return trace.reshape(-1, 5)
+
+    def check(self, trace):
+        """Returns the timing violations (ps, timing name, bank) of a trace"""
+        import numpy as np
+        cmds  = {cmd.name: cmd.enc for cmd in self.cmds.values()}
+        ps    = (trace[:, 0]*self.nphases + trace[:, 1])*self.timings["tCK"]
+        order = np.argsort(ps, kind="stable")
+        ps, cmd, bank, all_banks = ps[order], trace[order, 2], trace[order, 3], trace[order, 4] != 0
+
+        violations = []
+        def add_violations(name, mask, ps, banks=None):
+            for i in np.flatnonzero(mask):
+                violations.append((int(ps[i]), name, None if banks is None else int(banks[i])))
+
+        # Rules between consecutive commands of a bank (all banks commands are sent to each bank).
+        nall   = np.count_nonzero(all_banks)
+        b_ps   = np.concatenate([ps[~all_banks],   np.repeat(ps[all_banks],  self.nbanks)])
+        b_cmd  = np.concatenate([cmd[~all_banks],  np.repeat(cmd[all_banks], self.nbanks)])
+        b_bank = np.concatenate([bank[~all_banks], np.tile(np.arange(self.nbanks), nall)])
+        order  = np.lexsort((b_ps, b_bank))
+        b_ps, b_cmd, b_bank = b_ps[order], b_cmd[order], b_bank[order]
+        same_bank = b_bank[1:] == b_bank[:-1]
+        for rule in self.rules:
+            mask = same_bank & (b_cmd[:-1] == cmds[rule.prev]) & (b_cmd[1:] == cmds[rule.curr])
+            mask &= (b_ps[1:] - b_ps[:-1]) < rule.delay
+            add_violations(rule.name, mask, b_ps[1:], b_bank[1:])
+
+        # tRRD & tFAW: delays to the previous/4th previous ACT (on any bank).
+        act_ps, act_bank = ps[cmd == cmds["ACT"]], bank[cmd == cmds["ACT"]]
+        add_violations("tRRD", (act_ps[1:] - act_ps[:-1]) < self.timings["tRRD"], act_ps[1:], act_bank[1:])
+        add_violations("tFAW", (act_ps[4:] - act_ps[:-4]) < self.timings["tFAW"], act_ps[4:], act_bank[4:])
+
+        # tREFI: maximum delay between refreshes (refreshes can be postponed on >=DDR).
+        ref_ps    = np.unique(ps[cmd == cmds["REF"]])
+        ref_limit = 1 if self.memtype == "SDR" else {"1x": 9, "2x": 17, "4x": 36}[self.refresh_mode]
+        add_violations("tREFI", (ref_ps[1:] - ref_ps[:-1]) > ref_limit*self.timings["tREFI"], ref_ps[1:])
+
+        return sorted(violations, key=lambda v: v[0])
+
+    def report(self, output):
+        """Checks the trace of the simulation output, displays the violations and returns them"""
+        violations = self.check(self.parse(output))
+        for ps, name, bank in violations:
+            if bank is None:
+                print("[{:016d}ps] {} violation".format(ps, name))
+            else:
+                print("[{:016d}ps] {} violation on bank {}".format(ps, name, bank))
+        return violations
+
 # SDRAM PHY Settings -------------------------------------------------------------------------------
 
 sdram_module_nphases = {
@@ -449,52 +709,33 @@ class SDRAMPHYModel(Module):
         mem_size          = (self.settings.databits//8)*(nrows*ncols*nbanks)
         bank_size         = mem_size // nbanks
         column_size       = bank_size // nrows
-        model_bank_size   = bank_size // (data_width//8)
-        model_column_size = model_bank_size // nrows
-        model_data_ratio  = data_width // 32
         data_width_bytes  = data_width // 8
-        bank_init         = [[] for i in range(nbanks)]
-
-        # Pad init if too short
-        if len(init)%data_width_bytes != 0:
-            init.extend([0]*(data_width_bytes-len(init)%data_width_bytes))
-
-
-        # Convert init data width from 32-bit to data_width if needed
-        if model_data_ratio > 1:
-            new_init = [0]*(len(init)//model_data_ratio)
-            for i in range(0, len(init), model_data_ratio):
-                ints = init[i:i+model_data_ratio]
-                strs = "".join("{:08x}".format(x) for x in reversed(ints))
-                new_init[i//model_data_ratio] = int(strs, 16)
-            init = new_init
-        elif model_data_ratio == 0:
-            assert data_width_bytes in [1, 2]
-            model_data_ratio = 4 // data_width_bytes
-            struct_unpack_patterns = {1: "4B", 2: "2H"}
-            new_init = [0]*int(len(init)*model_data_ratio)
-            for i in range(len(init)):
-                new_init[model_data_ratio*i:model_data_ratio*(i+1)] = struct.unpack(
-                    struct_unpack_patterns[data_width_bytes],
-                    struct.pack("I", init[i])
-                )[0:model_data_ratio]
-            init = new_init
-
-        if address_mapping == "ROW_BANK_COL":
-            for row in range(nrows):
-                for bank in range(nbanks):
-                    start = (row*nbanks*model_column_size + bank*model_column_size)
-                    end   = min(start + model_column_size, len(init))
-                    if start > len(init):
-                        break
-                    bank_init[bank].extend(init[start:end])
-        elif address_mapping == "BANK_ROW_COL":
-            for bank in range(nbanks):
-                start = bank*model_bank_size
-                end   = min(start + model_bank_size, len(init))
-                if start > len(init):
-                    break
-                bank_init[bank] = init[start:end]
+        bank_init         = [SparseMemory(data_width, bank_size//data_width_bytes) for i in range(nbanks)]
+
+        # Init data: 32-bit words (list) or SparseMemory, copied little-endian to the banks.
+        if not isinstance(init, SparseMemory):
+            init = SparseMemory(32, len(init), init)
+
+        # Copy the initialized pages to the banks.
+        chunk_size = {
+            "ROW_BANK_COL": column_size,
+            "BANK_ROW_COL": bank_size,
+        }[address_mapping]
+        for address, page in init.pages():
+            offset = 0
+            while offset < len(page):
+                n, chunk_offset = divmod(address + offset, chunk_size)
+                size  = min(len(page) - offset, chunk_size - chunk_offset)
+                chunk = page[offset:offset + size]
+                offset += size
+                if address_mapping == "ROW_BANK_COL":
+                    row, bank    = divmod(n, nbanks)
+                    bank_address = row*column_size + chunk_offset
+                else:
+                    bank         = n
+                    bank_address = chunk_offset
+                if any(chunk) and bank < nbanks and bank_address < bank_size:
+                    bank_init[bank].write_bytes(bank_address, chunk)
 
         return bank_init
 
@@ -502,7 +743,9 @@ class SDRAMPHYModel(Module):
         we_granularity         = 8,
         init                   = [],
         address_mapping        = "ROW_BANK_COL",
-        verbosity              = SDRAM_VERBOSE_OFF):
+        verbosity              = SDRAM_VERBOSE_OFF,
+        timings_checker        = "gateware"):
+        assert timings_checker in ["gateware", "trace"]
 
         # PHY Settings -----------------------------------------------------------------------------
         if settings is None:
@@ -563,7 +806,13 @@ class SDRAMPHYModel(Module):
                 key = self.module.timing_settings.fine_refresh_mode if name in REF else None
                 timings[name] = self.module.get(name, key)
 
-            timing_checker = DFITimingsChecker(
+            # "gateware" checks the timings during the simulation, "trace" only displays the DFI
+            # commands, to be checked afterwards (see DFITraceTimingsChecker.report).
+            timing_checker_cls = {
+                "gateware": DFITimingsChecker,
+                "trace":    DFITraceTimingsChecker,
+            }[timings_checker]
+            self.timing_checker = timing_checker = timing_checker_cls(
                 dfi          = self.dfi,
                 nbanks       = nbanks,
                 nphases      = nphases,
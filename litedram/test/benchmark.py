@@ -6,8 +6,11 @@
 # Copyright (c) 2020 Florent Kermarrec <florent@enjoy-digital.fr>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import os
 import csv
+import json
 import logging
+import subprocess
 import argparse
 from operator import and_
 from functools import reduce
@@ -25,11 +28,24 @@ from litex.soc.integration.builder import *
 
 from litex.tools.litex_sim import SimSoC
 
+from litedram.core.controller import ControllerSettings
 from litedram.frontend.bist import _LiteDRAMBISTGenerator, _LiteDRAMBISTChecker
 from litedram.frontend.bist import _LiteDRAMPatternGenerator, _LiteDRAMPatternChecker
 
 # LiteDRAM Benchmark SoC ---------------------------------------------------------------------------
 
+def check_bist_config(bist_base, bist_end, bist_random, bist_alternating, bist_addr_width):
+    assert not (bist_random and not bist_alternating), \
+        "Write to random address may overwrite previously written data before reading!"
+
+    # Check address correctness
+    assert bist_end > bist_base
+    assert bist_end <= 2**bist_addr_width - 1, "End address outside of range"
+    bist_addr_range = bist_end - bist_base
+    assert bist_addr_range > 0 and bist_addr_range & (bist_addr_range - 1) == 0, \
+        "Length of the address range must be a power of 2"
+
+
 class LiteDRAMBenchmarkSoC(SimSoC):
     def __init__(self,
         mode             = "bist",
@@ -43,6 +59,9 @@ class LiteDRAMBenchmarkSoC(SimSoC):
         num_generators   = 1,
         num_checkers     = 1,
         access_pattern   = None,
+        cmd_reordering   = False,
+        address_mapping  = "ROW_BANK_COL",
+        bank_interleave  = 0,
         **kwargs):
         assert mode in ["bist", "pattern"]
         assert not (mode == "pattern" and access_pattern is None)
@@ -52,6 +71,10 @@ class LiteDRAMBenchmarkSoC(SimSoC):
             with_sdram       = True,
             sdram_module     = sdram_module,
             sdram_data_width = sdram_data_width,
+            sdram_controller_settings = ControllerSettings(
+                with_cmd_reordering = cmd_reordering,
+                address_mapping     = address_mapping,
+                bank_interleave     = bank_interleave),
             **kwargs
         )
 
@@ -78,26 +101,32 @@ class LiteDRAMBenchmarkSoC(SimSoC):
                         "Duplicate address 0x%08x in access_pattern, write will overwrite previous value!" % addr
                     address_set.add(addr)
         if mode == "bist":
+            self.bist_addr_width = len(generators[0].end)
+            check_bist_config(bist_base, bist_end, bist_random, bist_alternating, self.bist_addr_width)
+
+            # The BIST settings are read from a memory: its init file can be rewritten to run the
+            # simulation again with other settings, without rebuilding it (see --no-build).
+            self.specials.bist_config = Memory(32, 4, name="bist_config",
+                init=[bist_base, bist_end, bist_length, bist_random])
+            bist_config_ports = [self.bist_config.get_port(async_read=True) for i in range(4)]
+            self.specials += bist_config_ports
+            self.comb += [port.adr.eq(i) for i, port in enumerate(bist_config_ports)]
+            base, end, length, random = [port.dat_r for port in bist_config_ports]
+
             # Make sure that we perform at least one access
-            bist_length = max(bist_length, self.sdram.controller.interface.data_width // 8)
+            min_length = self.sdram.controller.interface.data_width // 8
             def bist_config(module):
                 return [
-                    module.base.eq(bist_base),
-                    module.end.eq(bist_end),
-                    module.length.eq(bist_length),
-                    module.random_addr.eq(bist_random),
+                    module.base.eq(base),
+                    module.end.eq(end),
+                    If(length < min_length,
+                        module.length.eq(min_length)
+                    ).Else(
+                        module.length.eq(length)
+                    ),
+                    module.random_addr.eq(random),
                 ]
 
-            assert not (bist_random and not bist_alternating), \
-                "Write to random address may overwrite previously written data before reading!"
-
-            # Check address correctness
-            assert bist_end > bist_base
-            assert bist_end <= 2**(len(generators[0].end)) - 1, "End address outside of range"
-            bist_addr_range = bist_end - bist_base
-            assert bist_addr_range > 0 and bist_addr_range & (bist_addr_range - 1) == 0, \
-                "Length of the address range must be a power of 2"
-
         def combined_read(modules, signal, operator):
             sig = Signal()
             self.comb += sig.eq(reduce(operator, (getattr(m, signal) for m in modules)))
@@ -205,6 +234,31 @@ def load_access_pattern(filename):
         access_pattern = [(int(addr, 0), int(data, 0)) for addr, data in reader]
     return access_pattern
 
+# The build configuration is saved to the gateware directory, to run the simulation again with other
+# BIST settings (--no-build).
+BUILD_CONFIG = "benchmark.json"
+
+def save_build_config(gateware_dir, bist_config_file, bist_alternating, bist_addr_width):
+    with open(os.path.join(gateware_dir, BUILD_CONFIG), "w") as f:
+        json.dump({
+            "bist_config_file": bist_config_file,
+            "bist_alternating": bist_alternating,
+            "bist_addr_width":  bist_addr_width,
+        }, f)
+
+def run_built(gateware_dir, bist_base, bist_end, bist_length, bist_random):
+    with open(os.path.join(gateware_dir, BUILD_CONFIG)) as f:
+        build_config = json.load(f)
+    # Access patterns are part of the gateware, BIST settings are written to their memory init file.
+    if build_config["bist_config_file"] is not None:
+        check_bist_config(bist_base, bist_end, bist_random,
+            bist_alternating = build_config["bist_alternating"],
+            bist_addr_width  = build_config["bist_addr_width"])
+        with open(os.path.join(gateware_dir, build_config["bist_config_file"]), "w") as f:
+            for value in [bist_base, bist_end, bist_length, bist_random]:
+                f.write("{:08x}\n".format(value))
+    subprocess.run([os.path.join("obj_dir", "Vsim")], cwd=gateware_dir, check=True)
+
 def main():
     parser = argparse.ArgumentParser(description="LiteDRAM Benchmark SoC Simulation")
     builder_args(parser)
@@ -218,12 +272,17 @@ def main():
     parser.add_argument("--trace-end",        default=-1,             help="Cycle to end VCD tracing")
     parser.add_argument("--opt-level",        default="O0",           help="Compilation optimization level")
     parser.add_argument("--bist-base",        default="0x00000000",   help="Base address of the test (default=0)")
+    parser.add_argument("--bist-end",         default="0x00100000",   help="End address of the test (default=0x100000)")
     parser.add_argument("--bist-length",      default="1024",         help="Length of the test (default=1024)")
     parser.add_argument("--bist-random",      action="store_true",    help="Use random data during the test")
     parser.add_argument("--bist-alternating", action="store_true",    help="Perform alternating writes/reads (WRWRWR... instead of WWW...RRR...)")
     parser.add_argument("--num-generators",   default=1,              help="Number of BIST generators")
     parser.add_argument("--num-checkers",     default=1,              help="Number of BIST checkers")
     parser.add_argument("--access-pattern",                           help="Load access pattern (address, data) from CSV (ignores --bist-*)")
+    parser.add_argument("--cmd-reordering",   action="store_true",    help="Enable FR-FCFS command reordering in the BankMachines")
+    parser.add_argument("--address-mapping",  default="ROW_BANK_COL", help="Address mapping (ROW_BANK_COL, ROW_COL_BANK or ROW_BANK_COL_XOR)")
+    parser.add_argument("--bank-interleave",  default="0",            help="Bank interleave granularity (bytes) for ROW_COL_BANK")
+    parser.add_argument("--no-build",         action="store_true",    help="Run the simulation built in --output-dir again with new --bist-* settings")
     parser.add_argument("--log-level",        default="info",         help="Set logging verbosity",
         choices=["critical", "error", "warning", "info", "debug"])
     args = parser.parse_args()
@@ -243,28 +302,50 @@ def main():
     soc_kwargs["sdram_data_width"] = int(args.sdram_data_width)
     soc_kwargs["sdram_verbosity"]  = int(args.sdram_verbosity)
     soc_kwargs["bist_base"]        = int(args.bist_base, 0)
+    soc_kwargs["bist_end"]         = int(args.bist_end, 0)
     soc_kwargs["bist_length"]      = int(args.bist_length, 0)
     soc_kwargs["bist_random"]      = args.bist_random
     soc_kwargs["bist_alternating"] = args.bist_alternating
     soc_kwargs["num_generators"]   = int(args.num_generators)
     soc_kwargs["num_checkers"]     = int(args.num_checkers)
+    soc_kwargs["cmd_reordering"]   = args.cmd_reordering
+    soc_kwargs["address_mapping"]  = args.address_mapping
+    soc_kwargs["bank_interleave"]  = int(args.bank_interleave, 0)
 
     if args.access_pattern:
         soc_kwargs["access_pattern"] = load_access_pattern(args.access_pattern)
 
+    # Run (without rebuilding) ---------------------------------------------------------------------
+    if args.no_build:
+        builder_kwargs["output_dir"] = builder_kwargs["output_dir"] or os.path.join("build", "sim")
+        run_built(os.path.join(builder_kwargs["output_dir"], "gateware"),
+            bist_base   = soc_kwargs["bist_base"],
+            bist_end    = soc_kwargs["bist_end"],
+            bist_length = soc_kwargs["bist_length"],
+            bist_random = soc_kwargs["bist_random"])
+        return
+
     # SoC ------------------------------------------------------------------------------------------
     soc = LiteDRAMBenchmarkSoC(mode="pattern" if args.access_pattern else "bist", **soc_kwargs)
 
     # Build/Run ------------------------------------------------------------------------------------
     builder_kwargs["csr_csv"] = "csr.csv"
     builder = Builder(soc, **builder_kwargs)
+    def pre_run_callback(vns):
+        bist_config_file = None
+        bist_addr_width  = None
+        if not args.access_pattern:
+            bist_config_file = "{}_{}.init".format(soc.get_build_name(), vns.get_name(soc.bist_config))
+            bist_addr_width  = soc.bist_addr_width
+        save_build_config(builder.gateware_dir, bist_config_file, args.bist_alternating, bist_addr_width)
     vns = builder.build(
-        threads     = args.threads,
-        sim_config  = sim_config,
-        opt_level   = args.opt_level,
-        trace       = args.trace,
-        trace_start = int(args.trace_start),
-        trace_end   = int(args.trace_end)
+        threads          = args.threads,
+        sim_config       = sim_config,
+        opt_level        = args.opt_level,
+        trace            = args.trace,
+        trace_start      = int(args.trace_start),
+        trace_end        = int(args.trace_end),
+        pre_run_callback = pre_run_callback,
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of LiteDRAM.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Wishbone frontends benchmark.
+
+Simulates memtest (write then read back a buffer) and memcpy (copy a buffer) CPU-like Wishbone
+accesses through LiteDRAMWishbone2Native and LiteDRAMWishboneCache connected to a native port
+model with a fixed read latency, and reports the number of cycles and the Wishbone throughput::
+
+    python3 -m test.benchmark_wishbone --port-data-width 128 --length 256 --read-latency 16
+"""
+
+import argparse
+from collections import deque
+
+from migen import *
+
+from litex.gen.sim import run_simulation, passive
+from litex.soc.interconnect import wishbone
+
+from litedram.common import LiteDRAMNativePort
+from litedram.frontend.wishbone import LiteDRAMWishbone2Native, LiteDRAMWishboneCache
+
+# Native port model --------------------------------------------------------------------------------
+
+class NativePortModel:
+    """Pipelined native port: one command per cycle, read data returned in order after `read_latency`"""
+    def __init__(self, port, read_latency=16):
+        self.port         = port
+        self.read_latency = read_latency
+        self.mem          = {}
+
+    @passive
+    def handler(self):
+        port   = self.port
+        reads  = deque()
+        writes = deque()
+        cycle  = 0
+        yield port.cmd.ready.eq(1)
+        yield port.wdata.ready.eq(1)
+        while True:
+            if (yield port.cmd.valid):
+                addr = (yield port.cmd.addr)
+                if (yield port.cmd.we):
+                    writes.append(addr)
+                else:
+                    reads.append((cycle + self.read_latency, addr))
+            if (yield port.wdata.valid):
+                addr = writes.popleft()
+                data = (yield port.wdata.data)
+                we   = (yield port.wdata.we)
+                mask = sum(0xff << 8*b for b in range(len(port.wdata.we)) if we & (1 << b))
+                self.mem[addr] = (self.mem.get(addr, 0) & ~mask) | (data & mask)
+            if reads and reads[0][0] <= cycle:
+                _, addr = reads.popleft()
+                yield port.rdata.valid.eq(1)
+                yield port.rdata.data.eq(self.mem.get(addr, 0))
+            else:
+                yield port.rdata.valid.eq(0)
+            cycle += 1
+            yield
+
+# Benchmark ----------------------------------------------------------------------------------------
+
+def memtest(wb, length, start, base=0):
+    start()
+    for i in range(length):
+        yield from wb.write(base + i, i)
+    for i in range(length):
+        data = (yield from wb.read(base + i))
+        assert data == i, "memtest error @0x{:08x}: 0x{:08x}".format(base + i, data)
+    start(stop=True)
+
+def memcpy(wb, length, start, src=0, dst=0x10000):
+    for i in range(length):
+        yield from wb.write(src + i, i)
+    start()
+    for i in range(length):
+        yield from wb.write(dst + i, (yield from wb.read(src + i)))
+    start(stop=True)
+    for i in range(length):
+        data = (yield from wb.read(dst + i))
+        assert data == i, "memcpy error @0x{:08x}: 0x{:08x}".format(dst + i, data)
+
+def benchmark(frontend, test, length, port_data_width=128, read_latency=16, **kwargs):
+    wb   = wishbone.Interface(adr_width=30, data_width=32)
+    port = LiteDRAMNativePort("both", address_width=30, data_width=port_data_width)
+    if frontend == "bridge":
+        dut = LiteDRAMWishbone2Native(wb, port)
+    else:
+        dut = LiteDRAMWishboneCache(wb, port, **kwargs)
+    model  = NativePortModel(port, read_latency)
+    cycles = [0, 0, 0] # Current, start, stop.
+
+    @passive
+    def counter():
+        while True:
+            cycles[0] += 1
+            yield
+
+    def start(stop=False):
+        cycles[2 if stop else 1] = cycles[0]
+
+    def generator():
+        yield from {"memtest": memtest, "memcpy": memcpy}[test](wb, length, start)
+
+    run_simulation(dut, [generator(), counter(), model.handler()])
+    # Both tests do a read and a write per word.
+    return {"cycles": cycles[2] - cycles[1], "bytes": 2*length*len(wb.dat_w)//8}
+
+# Run ----------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="LiteDRAM Wishbone frontends benchmark.")
+    parser.add_argument("--port-data-width", default=128, type=int, help="Native port data width.")
+    parser.add_argument("--length",          default=256, type=int, help="Buffer length (32-bit words).")
+    parser.add_argument("--read-latency",    default=16,  type=int, help="Native port read latency (cycles).")
+    parser.add_argument("--nlines",          default=4,   type=int, help="Cache lines.")
+    args = parser.parse_args()
+
+    configs = [
+        ("bridge",         "bridge", {}),
+        ("cache",          "cache",  dict(nlines=args.nlines, prefetch=False)),
+        ("cache+prefetch", "cache",  dict(nlines=args.nlines, prefetch=True)),
+    ]
+    print("{:<16} {:<8} {:>10} {:>14}".format("Frontend", "Test", "Cycles", "Bytes/cycle"))
+    for name, frontend, kwargs in configs:
+        for test in ["memtest", "memcpy"]:
+            r = benchmark(frontend, test, args.length, args.port_data_width, args.read_latency, **kwargs)
+            print("{:<16} {:<8} {:>10} {:>14.3f}".format(name, test, r["cycles"], r["bytes"]/r["cycles"]))
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,8 @@ from operator import or_
 
 from migen import *
 
+from litedram.phy.model import SparseMemory
+
 
 def seed_to_data(seed, random=True, nbits=32):
     if nbits == 32:
@@ -198,11 +200,7 @@ class DRAMMemory:
     def __init__(self, width, depth, init=[]):
         self.width = width
         self.depth = depth
-        self.mem = []
-        for d in init:
-            self.mem.append(d)
-        for _ in range(depth-len(init)):
-            self.mem.append(0)
+        self.mem = SparseMemory(width, depth, init)
 
         # "W" enables write msgs, "R" - read msgs and "1" both
         self._debug = os.environ.get("DRAM_MEM_DEBUG", "0")
@@ -15,12 +15,15 @@ def main():
 
     Each address in range [base, base+length) will be accessed only once, but in random order.
     This ensures that no data will be overwritten.
+
+    With --stride, addresses base, base+stride, base+2*stride... are accessed in order instead.
     """
     parser = argparse.ArgumentParser(description=description)
     parser.add_argument("base",       help="Base address")
     parser.add_argument("length",     help="Number of (address, data) pairs")
     parser.add_argument("data_width", help="Width of data (used to determine max value)")
     parser.add_argument("--seed",     help="Use given random seed (int)")
+    parser.add_argument("--stride",   help="Access addresses in order with given stride (int)")
     args = parser.parse_args()
 
     if args.seed:
@@ -30,8 +33,11 @@ def main():
     length     = int(args.length, 0)
     data_width = int(args.data_width, 0)
 
-    address = list(range(length))
-    random.shuffle(address)
+    if args.stride:
+        address = [base + i*int(args.stride, 0) for i in range(length)]
+    else:
+        address = list(range(length))
+        random.shuffle(address)
     data = [random.randrange(0, 2**data_width) for _ in range(length)]
 
     for a, d in zip(address, data):
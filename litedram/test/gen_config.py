@@ -56,6 +56,9 @@ defaults = {
     "--bist-random":      [True, False],
     "--num-generators":   [1],
     "--num-checkers":     [1],
+    "--cmd-reordering":   [False],
+    "--address-mapping":  ["ROW_BANK_COL"],
+    "--bank-interleave":  [0],
     "--access-pattern":   ["access_pattern.csv"]
 }
 
@@ -95,8 +98,11 @@ def main():
     convert_string_arg(args, "bist_random",      bool)
     convert_string_arg(args, "num_generators",   int)
     convert_string_arg(args, "num_checkers",     int)
+    convert_string_arg(args, "cmd_reordering",   bool)
+    convert_string_arg(args, "bank_interleave",  int)
 
-    common_args            = ("sdram_module", "sdram_data_width", "bist_alternating", "num_generators", "num_checkers")
+    common_args            = ("sdram_module", "sdram_data_width", "bist_alternating", "num_generators", "num_checkers",
+                              "cmd_reordering", "address_mapping", "bank_interleave")
     generated_pattern_args = ("bist_length", "bist_random")
     custom_pattern_args    = ("access_pattern", )
 
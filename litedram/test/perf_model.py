@@ -0,0 +1,741 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of LiteDRAM.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""LiteDRAM performance model.
+
+Cycle-approximate, pure-Python model of the LiteDRAM controller (crossbar, bank machines,
+multiplexer and refresher) driven by the BIST/Pattern generators and checkers of the benchmark SoC
+(see benchmark.py). The model uses the same `litedram.modules` timings, PHY settings and
+`ControllerSettings` as the simulation and reports the same ticks, but runs in milliseconds instead
+of minutes, which allows exploring many configurations::
+
+    python3 -m test.perf_model --sdram-module MT41K128M16 --bist-length 4096 --bist-random --bist-alternating
+    python3 -m test.perf_model --access-pattern test/access_pattern.csv
+    python3 -m test.run_benchmarks test/benchmarks.yml --model
+
+The model can be validated against results of simulated benchmarks stored with
+`run_benchmarks.py --results-cache`::
+
+    python3 -m test.perf_model --compare results.json
+
+Not modeled: ZQ calibration, data width/clock domain conversion and the idle CPU/L2 cache port of
+the benchmark SoC. The refresh timer is assumed to start with the BIST, while in the benchmark SoC
+its phase depends on the duration of the SDRAM initialization.
+"""
+
+import csv
+import sys
+import argparse
+from collections import deque
+from itertools import zip_longest
+
+from litedram import modules as litedram_modules
+from litedram.common import burst_lengths
+from litedram.core.controller import ControllerSettings
+from litedram.phy.model import sdram_module_nphases, get_sdram_phy_settings
+
+# Helpers ------------------------------------------------------------------------------------------
+
+def _cycles(txxd):
+    # tXXDController: commands are allowed txxd cycles after the previous one (None: no constraint).
+    return 0 if txxd is None else txxd
+
+
+def _round_robin(grant, requests, n):
+    # migen RoundRobin (SP_CE): the grant moves to the next requester after the current one.
+    for i in range(1, n):
+        j = (grant + i) % n
+        if j in requests:
+            return j
+    return grant
+
+
+def bist_addresses(base, end, length, random, data_width, address_width):
+    """Port addresses generated by _LiteDRAMBISTGenerator/_LiteDRAMBISTChecker"""
+    ashift    = (data_width//8).bit_length() - 1
+    addr_mask = (end - base) - 1
+    count     = max(length, data_width//8) >> ashift
+    addresses = []
+    state     = 0
+    for i in range(count):
+        if random:
+            # PRBS31 LFSR (taps 27, 30) of the BIST Generator.
+            bits = [(state >> n) & 1 for n in range(31)]
+            for n in range(31):
+                bits.insert(0, 1 ^ bits[27] ^ bits[30])
+                bits.pop()
+            value = sum(bit << n for n, bit in enumerate(bits))
+            state = value
+        else:
+            value = i
+        addresses.append(((base >> ashift) + (value & addr_mask)) & (2**address_width - 1))
+    return addresses
+
+# Masters ------------------------------------------------------------------------------------------
+
+class _Master:
+    """BIST/Pattern generator (write) or checker (read) with its DMA on a crossbar port"""
+    def __init__(self, we, addresses, length, pattern=False, fifo_depth=16):
+        self.we         = we
+        self.addresses  = addresses
+        self.length     = length
+        self.pattern    = pattern
+        self.fifo_depth = fifo_depth
+        self.cascade    = None       # Master gating the commands (bist_alternating).
+        self.state      = "IDLE"
+        self.issued     = 0          # Commands accepted by the crossbar.
+        self.level      = 0          # Write data (DMAWriter) / read reservations (DMAReader) pending.
+        self.received   = 0          # Read data received.
+        self.ticks      = 0
+        self.out        = False      # run_cascade_out.
+        self.data_run   = False      # Checker data FSM running.
+        self.done       = False
+
+    @property
+    def valid(self):
+        return (self.state == "RUN" and self.issued < len(self.addresses) and
+            self.level < self.fifo_depth)
+
+    def step(self, cascade_in):
+        if self.we:
+            if self.state == "RUN":
+                self.ticks += 1
+        elif self.data_run and not self.done:
+            self.ticks += 1
+            if self.received == self.length:
+                self.done = True
+        if self.state == "START":
+            self.data_run = not self.we
+            self.state    = "RUN" if self.we or (self.pattern and cascade_in) else "WAIT"
+        elif self.state == "WAIT":
+            if cascade_in:
+                self.state = "RUN"
+        elif self.state == "RUN":
+            if self.out:
+                if (self.issued + 1) % self.length == 0:
+                    if not self.we:
+                        self.state = "DONE"
+                    elif self.pattern:
+                        # _LiteDRAMPatternGenerator does not wait for its writes to complete.
+                        self.state = "DONE"
+                        self.done  = True
+                    else:
+                        self.state = "FLUSH"
+                elif not cascade_in:
+                    self.state = "WAIT"
+        elif self.state == "FLUSH":
+            if self.level == 0:
+                self.state = "DONE"
+                self.done  = True
+        elif self.state == "DONE" and not self.we:
+            # The (empty) DONE state of the checkers' command FSM behaves as IDLE: while start is
+            # held, commands restart until the reservations of the DMAReader are exhausted.
+            self.state = "RUN" if self.pattern and cascade_in else "WAIT"
+
+# Bank Machine -------------------------------------------------------------------------------------
+
+class _BankMachine:
+    """BankMachine with its command buffer (FIFO lookahead + 1 entry buffer or FR-FCFS buffer)"""
+    def __init__(self, settings):
+        self.settings   = settings
+        self.reordering = settings.with_cmd_reordering
+        self.fifo       = deque()    # Commands: [we, row, master].
+        self.buffer     = None
+        self.age        = 0
+        self.sel        = 0
+        self.state      = "REGULAR"
+        self.delay      = 0
+        self.row        = None
+        self.row_opened = False
+        self.twtp_ready = 0
+        self.trc_ready  = 0
+        self.tras_ready = 0
+        self.writes     = 0          # write_level.
+        self.gnt        = False      # refresh_gnt.
+
+    # Crossbar side --------------------------------------------------------------------------------
+    @property
+    def ready(self):
+        return len(self.fifo) < self.settings.cmd_buffer_depth
+
+    @property
+    def lock(self):
+        return len(self.fifo) > 0 or self.buffer is not None
+
+    # Command buffer -------------------------------------------------------------------------------
+    def head(self):
+        if not self.reordering:
+            return self.buffer
+        if not self.fifo:
+            return None
+        # Oldest command of its port targeting the opened row, or oldest command.
+        self.sel = 0
+        if self.row_opened and self.age != self.settings.cmd_reordering_max_age:
+            masters = set()
+            for i, cmd in enumerate(self.fifo):
+                if cmd[2] not in masters and cmd[1] == self.row:
+                    self.sel = i
+                    break
+                masters.add(cmd[2])
+        return self.fifo[self.sel]
+
+    def auto_precharge(self, head):
+        if not self.settings.with_auto_precharge:
+            return False
+        if self.reordering:
+            return len(self.fifo) > 1 and not any(cmd[1] == head[1]
+                for i, cmd in enumerate(self.fifo) if i != self.sel)
+        return len(self.fifo) > 0 and self.fifo[0][1] != head[1]
+
+    def pop(self):
+        if self.reordering:
+            del self.fifo[self.sel]
+            self.age = 0 if self.sel == 0 else self.age + 1
+        else:
+            self.buffer = None
+
+    def push(self, cmd):
+        # Pull the lookahead FIFO into the buffer (commands are visible 2 cycles after their push).
+        if not self.reordering and self.buffer is None and self.fifo:
+            self.buffer = self.fifo.popleft()
+        if cmd is not None:
+            self.fifo.append(cmd)
+            self.writes += cmd[0]
+
+    # FSM ------------------------------------------------------------------------------------------
+    def request(self, t, refresh_req):
+        """Command presented to the Multiplexer ("read", "write", "precharge", "activate" or None)"""
+        state    = self.state
+        self.gnt = False
+        if state == "REGULAR":
+            if refresh_req:
+                self.state = "REFRESH"
+                return None
+            head = self.head()
+            if head is None:
+                return None
+            if self.row_opened:
+                if head[1] == self.row:
+                    return "write" if head[0] else "read"
+                self.state = "PRECHARGE"
+            else:
+                self.state = "ACTIVATE"
+            return None
+        elif state in ["PRECHARGE", "AUTOPRECHARGE"]:
+            self.row_opened = False
+            if t >= self.twtp_ready and t >= self.tras_ready:
+                if state == "PRECHARGE":
+                    return "precharge"
+                self.precharged()
+        elif state == "ACTIVATE":
+            if t >= self.trc_ready and self.head() is not None:
+                return "activate"
+        elif state in ["TRP", "TRCD"]:
+            self.delay -= 1
+            if self.delay <= 0:
+                self.state = {"TRP": "ACTIVATE", "TRCD": "REGULAR"}[state]
+        elif state == "REFRESH":
+            self.row_opened = False
+            self.gnt        = t >= self.twtp_ready
+            if not refresh_req:
+                self.state = "REGULAR"
+        return None
+
+    def precharged(self):
+        self.state = "TRP"
+        self.delay = self.settings.timing.tRP - 1
+        if self.delay <= 0:
+            self.state = "ACTIVATE"
+
+    def accept(self, t, cmd):
+        timing = self.settings.timing
+        if cmd == "activate":
+            self.row        = self.head()[1]
+            self.row_opened = True
+            self.trc_ready  = t + _cycles(timing.tRC)
+            self.tras_ready = t + _cycles(timing.tRAS)
+            self.state      = "TRCD"
+            self.delay      = timing.tRCD - 1
+            if self.delay <= 0:
+                self.state = "REGULAR"
+        elif cmd == "precharge":
+            self.precharged()
+        else:
+            head = self.head()
+            if head[0]:
+                self.twtp_ready = t + self.settings.precharge_time
+                self.writes    -= 1
+            if self.auto_precharge(head):
+                self.state = "AUTOPRECHARGE"
+            self.pop()
+            return head[2]
+
+# Controller ---------------------------------------------------------------------------------------
+
+class ControllerModel:
+    """Performance model of LiteDRAMController and LiteDRAMCrossbar
+
+    Parameters
+    ----------
+    phy_settings : PhySettings
+        PHY settings (nphases, read/write latencies)
+    geom_settings : GeomSettings
+        SDRAM geometry
+    timing_settings : TimingSettings
+        SDRAM timings (in controller cycles)
+    controller_settings : ControllerSettings
+        Controller settings (command buffer, auto-precharge, refresh, reordering, address mapping,
+        read/write anti-starvation and write drain)
+    """
+    def __init__(self, phy_settings, geom_settings, timing_settings,
+        controller_settings=None):
+        self.settings        = settings = controller_settings or ControllerSettings()
+        self.settings.phy    = phy_settings
+        self.settings.geom   = geom_settings
+        self.settings.timing = timing_settings
+
+        if phy_settings.memtype == "SDR":
+            burst_length = phy_settings.nphases
+        else:
+            burst_length = burst_lengths[phy_settings.memtype]
+        address_align = burst_length.bit_length() - 1
+
+        self.nbanks        = 2**geom_settings.bankbits
+        self.data_width    = phy_settings.dfi_databits*phy_settings.nphases
+        self.col_bits      = geom_settings.colbits - address_align
+        self.address_width = geom_settings.rowbits + self.col_bits + geom_settings.bankbits
+        self.read_latency  = phy_settings.read_latency + 1
+        self.write_latency = phy_settings.write_latency + 1
+
+        cwl_latency = -(-(phy_settings.cwl or 0)//phy_settings.nphases)
+        settings.precharge_time = cwl_latency + timing_settings.tWR + _cycles(timing_settings.tCCD)
+        self.twtr = timing_settings.tWTR + cwl_latency + _cycles(timing_settings.tCCD)
+        if timing_settings.tCCD is None:
+            self.twtr = 0
+
+        # Address mapping (see LiteDRAMCrossbar).
+        bank_bits = geom_settings.bankbits
+        data_bytes = self.data_width//8
+        row_bank_col_shift = max(self.col_bits,
+            (max(getattr(settings, "bank_byte_alignment", 0)//data_bytes, 1)).bit_length() - 1)
+        row_col_bank_shift = (max(getattr(settings, "bank_interleave", 0), data_bytes)//data_bytes).bit_length() - 1
+        self.cba_shift = {
+            "ROW_BANK_COL":     row_bank_col_shift,
+            "ROW_COL_BANK":     row_col_bank_shift,
+            "ROW_BANK_COL_XOR": row_bank_col_shift,
+        }[getattr(settings, "address_mapping", "ROW_BANK_COL")]
+        self.xor = getattr(settings, "address_mapping", "ROW_BANK_COL") == "ROW_BANK_COL_XOR"
+
+    def decode(self, address):
+        """Returns the (bank, row) of a port address"""
+        bank_bits = self.settings.geom.bankbits
+        shift     = self.cba_shift
+        bank      = (address >> shift) & (self.nbanks - 1)
+        rca       = (address & (2**shift - 1)) | ((address >> (shift + bank_bits)) << shift)
+        if self.xor:
+            bank ^= (rca >> self.col_bits) & (self.nbanks - 1)
+        return bank, rca >> self.col_bits
+
+    def run(self, generators, checkers, length, alternating=False, pattern=False, timeout=10**7):
+        """Runs the BIST sequence of the benchmark SoC and returns the generators/checkers ticks
+
+        Each generator/checker is given as the port addresses of its commands: the first `length`
+        ones, followed for checkers by the ones issued when their command FSM restarts.
+        """
+        settings   = self.settings
+        timing     = settings.timing
+        nphases    = settings.phy.nphases
+        generators = [_Master(True,  addresses[:length], length, pattern) for addresses in generators]
+        checkers   = [_Master(False, addresses, length, pattern) for addresses in checkers]
+        masters    = generators + checkers
+        targets    = [[self.decode(address) for address in m.addresses] for m in masters]
+        banks      = [_BankMachine(settings) for _ in range(self.nbanks)]
+        nmasters   = len(masters)
+        nbanks     = self.nbanks
+        events     = {}                  # Data ready/valid of issued commands, by cycle.
+
+        # Crossbar state.
+        grants = [0]*nbanks
+
+        # Multiplexer state.
+        state         = "READ"
+        state_delay   = 0
+        grant_cmd     = 0
+        grant_req     = 0
+        tccd_ready    = 0
+        trrd_ready    = 0
+        twtr_ready    = 0
+        activates     = deque()
+        read_time     = 0
+        write_time    = 0
+        write_drain   = False
+        write_yield   = False
+        drain_time    = 0
+        drain_high    = getattr(settings, "write_drain_high", 0)
+        drain_low     = getattr(settings, "write_drain_low",  0)
+        drain_timeout = getattr(settings, "write_drain_time", 128)
+
+        # Refresher state.
+        refresh_period   = timing.tREFI*settings.refresh_postponing
+        refresh_duration = settings.refresh_postponing*(timing.tRP + timing.tRFC + 1)
+        refresh_next     = refresh_period + 1
+        refresh_req      = False
+        refresh_end      = None
+
+        # BIST sequence: generators then checkers, or both with commands alternating.
+        if alternating:
+            for g, c in zip_longest(generators, checkers):
+                g = g or generators[0]
+                c = c or checkers[0]
+                c.cascade = g
+                g.cascade = c
+            active = masters
+        else:
+            active = generators
+        for m in active:
+            m.state = "START"
+        phase = "GENERATORS"
+
+        t = 0
+        while t < timeout:
+            # Refresher ----------------------------------------------------------------------------
+            if settings.with_refresh and t == refresh_next:
+                refresh_req = True
+
+            # BankMachines -------------------------------------------------------------------------
+            readys   = [bank.ready for bank in banks]
+            if settings.with_cmd_reordering:
+                locks = [{id(cmd[2]) for cmd in bank.fifo} for bank in banks]
+            else:
+                locks = [bank.lock for bank in banks]
+            requests = [bank.request(t, refresh_req) for bank in banks]
+
+            # Multiplexer --------------------------------------------------------------------------
+            accepted = [None]*nbanks
+            if state in ["READ", "WRITE"]:
+                cas         = "read" if state == "READ" else "write"
+                ras_allowed = t >= trrd_ready and (timing.tFAW is None or len(activates) < 4)
+                cas_allowed = t >= tccd_ready
+                if nphases == 1:
+                    valids = {n for n, r in enumerate(requests) if r == cas or r == "precharge" or
+                        (r == "activate" and ras_allowed)}
+                    if grant_req in valids:
+                        if cas_allowed:
+                            accepted[grant_req] = requests[grant_req]
+                    if grant_req not in valids or cas_allowed:
+                        grant_req = _round_robin(grant_req, valids, nbanks)
+                else:
+                    valids = {n for n, r in enumerate(requests) if r in ["precharge", "activate"]}
+                    ready  = True
+                    if grant_cmd in valids:
+                        ready = requests[grant_cmd] != "activate" or ras_allowed
+                        if ready:
+                            accepted[grant_cmd] = requests[grant_cmd]
+                    if ready:
+                        grant_cmd = _round_robin(grant_cmd, valids, nbanks)
+                    valids = {n for n, r in enumerate(requests) if r == cas}
+                    if grant_req in valids:
+                        if cas_allowed:
+                            accepted[grant_req] = cas
+                    if grant_req not in valids or cas_allowed:
+                        grant_req = _round_robin(grant_req, valids, nbanks)
+            else:
+                # Choosers only see precharges/activates (no reads/writes wanted) and are not ready.
+                valids = {n for n, r in enumerate(requests) if r in ["precharge", "activate"]}
+                if grant_cmd not in valids:
+                    grant_cmd = _round_robin(grant_cmd, valids, nbanks)
+                if grant_req not in valids:
+                    grant_req = _round_robin(grant_req, valids, nbanks)
+
+            # Issued commands.
+            for n, cmd in enumerate(accepted):
+                if cmd is None:
+                    continue
+                master = banks[n].accept(t, cmd)
+                if cmd == "activate":
+                    trrd_ready = t + _cycles(timing.tRRD)
+                    activates.append(t)
+                elif cmd in ["read", "write"]:
+                    tccd_ready = t + _cycles(timing.tCCD)
+                    if cmd == "write":
+                        twtr_ready = t + self.twtr
+                        latency = self.write_latency
+                    else:
+                        latency = self.read_latency + 1
+                    events.setdefault(t + latency, []).append(master)
+            if timing.tFAW is not None:
+                while activates and activates[0] <= t - timing.tFAW:
+                    activates.popleft()
+
+            # Multiplexer FSM.
+            read_available  = "read"  in requests
+            write_available = "write" in requests
+            max_read_time   = state == "READ"  and read_time  == 0
+            max_write_time  = state == "WRITE" and write_time == 0
+            max_drain_time  = state == "WRITE" and drain_timeout != 0 and drain_time == 0
+            if drain_high:
+                write_request = write_drain and (not write_yield or not read_available)
+            else:
+                write_request = not read_available
+            go_to_refresh = all(bank.gnt for bank in banks)
+            if state == "READ":
+                read_time = max(read_time - 1, 0)
+                if write_available and (write_request or max_read_time):
+                    state, state_delay = "RTW", settings.phy.read_latency - 1
+                if go_to_refresh:
+                    state = "REFRESH"
+            elif state == "WRITE":
+                write_time  = max(write_time - 1, 0)
+                drain_time  = max(drain_time - 1, 0)
+                write_yield = False
+                if read_available and (not write_available or
+                    (max_drain_time if write_drain else max_write_time)):
+                    write_yield = write_drain and write_available
+                    state = "WTR"
+                if go_to_refresh:
+                    state = "REFRESH"
+            elif state == "RTW":
+                state_delay -= 1
+                if state_delay <= 0:
+                    state = "WRITE"
+            elif state == "WTR":
+                if t >= twtr_ready:
+                    state = "READ"
+            elif state == "REFRESH":
+                if refresh_end is None:
+                    refresh_end = t + refresh_duration
+                if t == refresh_end - 1:
+                    refresh_req = False
+                if t == refresh_end:
+                    refresh_end  = None
+                    refresh_next = refresh_next + refresh_period
+                    refresh_next = max(refresh_next, t + 2)
+                    state = "READ"
+            if state != "READ":
+                read_time = settings.read_time - 1
+            if state != "WRITE":
+                write_time = settings.write_time - 1
+                drain_time = drain_timeout - 1
+            write_level = sum(bank.writes for bank in banks)
+            if drain_high:
+                if write_level >= drain_high:
+                    write_drain = True
+                elif write_level <= drain_low:
+                    write_drain = False
+
+            # Crossbar -----------------------------------------------------------------------------
+            pushed = [None]*nbanks
+            outs   = [m.valid for m in masters]
+            for b, bank in enumerate(banks):
+                requested = set()
+                for nm, m in enumerate(masters):
+                    if not outs[nm] or targets[nm][m.issued][0] != b:
+                        continue
+                    if settings.with_cmd_reordering:
+                        locked = any(id(m) in locks[nb] for nb in range(nbanks) if nb != b)
+                    else:
+                        locked = any(locks[nb] and grants[nb] == nm for nb in range(nbanks) if nb != b)
+                    if not locked:
+                        requested.add(nm)
+                valid = grants[b] in requested
+                if valid and readys[b]:
+                    m = masters[grants[b]]
+                    pushed[b] = [m.we, targets[grants[b]][m.issued][1], m]
+                if settings.with_cmd_reordering:
+                    ce = not valid or readys[b]
+                else:
+                    ce = not valid and not locks[b]
+                if ce:
+                    grants[b] = _round_robin(grants[b], requested, nmasters)
+            for bank, cmd in zip(banks, pushed):
+                bank.push(cmd)
+
+            # Masters ------------------------------------------------------------------------------
+            generators_done = all(g.done for g in generators)
+            for m in masters:
+                m.out = False
+            for cmd in pushed:
+                if cmd is not None:
+                    cmd[2].out = True
+            consumed = events.pop(t, [])
+            for m in consumed:
+                # Read data received (DMAReader FIFO).
+                if not m.we:
+                    m.received += 1
+            outs = [m.out or (m.we and m.state == "DONE") for m in masters]
+            for m in masters:
+                m.step(m.cascade is None or outs[masters.index(m.cascade)])
+            for m in consumed:
+                # Write data / read reservation released.
+                m.level -= 1
+            for cmd in pushed:
+                if cmd is not None:
+                    cmd[2].issued += 1
+                    cmd[2].level  += 1
+
+            # BIST sequence ------------------------------------------------------------------------
+            if phase == "GENERATORS" and generators_done:
+                phase = "CHECKERS"
+                if not alternating:
+                    for c in checkers:
+                        c.state = "START"
+            elif phase == "CHECKERS" and all(c.done for c in checkers):
+                break
+            t += 1
+        else:
+            raise RuntimeError("Model timeout")
+
+        return {
+            "generator_ticks": max(g.ticks for g in generators),
+            "checker_errors":  0,
+            "checker_ticks":   max(c.ticks for c in checkers),
+        }
+
+# Benchmark ----------------------------------------------------------------------------------------
+
+def benchmark_model(
+    sdram_module     = "MT48LC16M16",
+    sdram_data_width = 32,
+    bist_base        = 0x0000000,
+    bist_end         = 0x0100000,
+    bist_length      = 1024,
+    bist_random      = False,
+    bist_alternating = False,
+    num_generators   = 1,
+    num_checkers     = 1,
+    access_pattern   = None,
+    cmd_reordering   = False,
+    address_mapping  = "ROW_BANK_COL",
+    bank_interleave  = 0):
+    """Models LiteDRAMBenchmarkSoC (same parameters) and returns its results"""
+    # SDRAM configuration of SimSoC.
+    sdram_clk_freq   = int(100e6)
+    sdram_module_cls = getattr(litedram_modules, sdram_module)
+    sdram_rate       = "1:{}".format(sdram_module_nphases[sdram_module_cls.memtype])
+    sdram_module     = sdram_module_cls(sdram_clk_freq, sdram_rate)
+    phy_settings     = get_sdram_phy_settings(
+        memtype    = sdram_module.memtype,
+        data_width = sdram_data_width,
+        clk_freq   = sdram_clk_freq)
+    model = ControllerModel(phy_settings, sdram_module.geom_settings, sdram_module.timing_settings,
+        ControllerSettings(
+            with_cmd_reordering = cmd_reordering,
+            address_mapping     = address_mapping,
+            bank_interleave     = bank_interleave))
+
+    # Checkers restart after their last command, until their DMA reservations are exhausted.
+    restarts = 16
+    if access_pattern is not None:
+        pattern   = [addr for addr, _ in access_pattern]
+        length    = len(pattern)
+        addresses = pattern*(1 + -(-restarts//length))
+    else:
+        assert not (bist_random and not bist_alternating), \
+            "Write to random address may overwrite previously written data before reading!"
+        bist_addr_range = bist_end - bist_base
+        assert bist_addr_range > 0 and bist_addr_range & (bist_addr_range - 1) == 0, \
+            "Length of the address range must be a power of 2"
+        data_bytes = model.data_width//8
+        bist_length = max(bist_length, data_bytes)
+        length      = bist_length//data_bytes
+        addresses   = bist_addresses(bist_base, bist_end, bist_length + restarts*data_bytes,
+            bist_random, model.data_width, model.address_width)
+
+    return model.run(
+        generators  = [addresses[:length]]*num_generators,
+        checkers    = [addresses]*num_checkers,
+        length      = length,
+        alternating = bist_alternating,
+        pattern     = access_pattern is not None)
+
+
+def load_access_pattern(filename):
+    with open(filename, newline="") as f:
+        reader = csv.reader(f)
+        access_pattern = [(int(addr, 0), int(data, 0)) for addr, data in reader]
+    return access_pattern
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(description="LiteDRAM performance model")
+    parser.add_argument("--sdram-module",     default="MT48LC16M16",  help="Select SDRAM chip")
+    parser.add_argument("--sdram-data-width", default=32,             help="Set SDRAM chip data width")
+    parser.add_argument("--bist-base",        default="0x00000000",   help="Base address of the test (default=0)")
+    parser.add_argument("--bist-end",         default="0x00100000",   help="End address of the test (default=0x100000)")
+    parser.add_argument("--bist-length",      default="1024",         help="Length of the test (default=1024)")
+    parser.add_argument("--bist-random",      action="store_true",    help="Use random data during the test")
+    parser.add_argument("--bist-alternating", action="store_true",    help="Perform alternating writes/reads (WRWRWR... instead of WWW...RRR...)")
+    parser.add_argument("--num-generators",   default=1,              help="Number of BIST generators")
+    parser.add_argument("--num-checkers",     default=1,              help="Number of BIST checkers")
+    parser.add_argument("--access-pattern",                           help="Load access pattern (address, data) from CSV (ignores --bist-*)")
+    parser.add_argument("--cmd-reordering",   action="store_true",    help="Enable FR-FCFS command reordering in the BankMachines")
+    parser.add_argument("--address-mapping",  default="ROW_BANK_COL", help="Address mapping (ROW_BANK_COL, ROW_COL_BANK or ROW_BANK_COL_XOR)")
+    parser.add_argument("--bank-interleave",  default="0",            help="Bank interleave granularity (bytes) for ROW_COL_BANK")
+    parser.add_argument("--compare",                                  help="Compare the model to the results cache (JSON) of run_benchmarks.py")
+    return parser.parse_args(argv)
+
+
+def model_output(argv):
+    """Runs the model with benchmark.py arguments and returns the output of the simulation"""
+    args = get_args(argv)
+    kwargs = dict(
+        sdram_module     = args.sdram_module,
+        sdram_data_width = int(args.sdram_data_width),
+        bist_base        = int(args.bist_base, 0),
+        bist_end         = int(args.bist_end, 0),
+        bist_length      = int(args.bist_length, 0),
+        bist_random      = args.bist_random,
+        bist_alternating = args.bist_alternating,
+        num_generators   = int(args.num_generators),
+        num_checkers     = int(args.num_checkers),
+        cmd_reordering   = args.cmd_reordering,
+        address_mapping  = args.address_mapping,
+        bank_interleave  = int(args.bank_interleave, 0),
+    )
+    if args.access_pattern:
+        kwargs["access_pattern"] = load_access_pattern(args.access_pattern)
+    results = benchmark_model(**kwargs)
+    return "\n".join([
+        "BIST-GENERATOR ticks:  %08d" % results["generator_ticks"],
+        "BIST-CHECKER errors:   %08d" % results["checker_errors"],
+        "BIST-CHECKER ticks:    %08d" % results["checker_ticks"],
+    ])
+
+# Compare ------------------------------------------------------------------------------------------
+
+def compare(results_cache):
+    """Compares the model to simulated benchmarks and returns the max relative error"""
+    from test.run_benchmarks import RunCache, BenchmarkResult
+
+    max_error = 0
+    print("{:<40} {:>12} {:>12} {:>8} {:>12} {:>12} {:>8}".format("name",
+        "gen ticks", "model", "error", "chk ticks", "model", "error"))
+    for data in RunCache.load_json(results_cache):
+        if data.result is None:
+            continue
+        model = BenchmarkResult(model_output(data.config.as_args()))
+        line  = "{:<40}".format(data.config.name)
+        for attr in ["generator_ticks", "checker_ticks"]:
+            ticks = getattr(data.result, attr)
+            error = getattr(model, attr)/ticks - 1
+            max_error = max(max_error, abs(error))
+            line += " {:>12d} {:>12d} {:>+7.1f}%".format(ticks, getattr(model, attr), 100*error)
+        print(line)
+    print("Max error: {:.1f}%".format(100*max_error))
+    return max_error
+
+# Main ---------------------------------------------------------------------------------------------
+
+def main():
+    args = get_args()
+    if args.compare:
+        compare(args.compare)
+    else:
+        print(model_output(sys.argv[1:]))
+
+if __name__ == "__main__":
+    main()
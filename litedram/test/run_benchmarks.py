@@ -14,8 +14,10 @@ import os
 import re
 import sys
 import json
+import hashlib
 import argparse
 import datetime
+import functools
 import subprocess
 from collections import defaultdict, namedtuple
 
@@ -30,14 +32,36 @@ except ImportError as e:
     _summary = False
     print("[WARNING] Results summary not available:", e, file=sys.stderr)
 
+import litex
+import litedram
 from litex.tools.litex_sim import get_sdram_phy_settings, sdram_module_nphases
 from litedram import modules as litedram_modules
 from litedram.common import Settings as _Settings
 
 from test import benchmark
+from test import perf_model
 
 # Benchmark configuration --------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=None)
+def gateware_sources_hash():
+    # Hash of the LiteX/LiteDRAM sources and of the benchmark SoC: builds are invalidated on changes.
+    h = hashlib.sha1()
+    paths = [os.path.dirname(litex.__file__), os.path.dirname(litedram.__file__), benchmark.__file__]
+    for path in paths:
+        files = [path]
+        if os.path.isdir(path):
+            files = []
+            for root, dirs, filenames in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+                files  += [os.path.join(root, f) for f in sorted(filenames)]
+        for f in files:
+            h.update(os.path.relpath(f, os.path.dirname(path)).encode())
+            with open(f, "rb") as fd:
+                h.update(fd.read())
+    return h.hexdigest()
+
+
 class Settings(_Settings):
     def as_dict(self):
         d = dict()
@@ -90,10 +114,14 @@ class CustomAccess(Settings):
 
 class BenchmarkConfiguration(Settings):
     def __init__(self, name, sdram_module, sdram_data_width, bist_alternating,
-                 num_generators, num_checkers, access_pattern):
+                 num_generators, num_checkers, access_pattern, cmd_reordering=False,
+                 address_mapping="ROW_BANK_COL", bank_interleave=0):
         self.set_attributes(locals())
 
     def as_args(self):
+        return self.gateware_args() + self.runtime_args()
+
+    def gateware_args(self):
         args = [
             "--sdram-module=%s" % self.sdram_module,
             "--sdram-data-width=%d" % self.sdram_data_width,
@@ -102,9 +130,30 @@ class BenchmarkConfiguration(Settings):
         ]
         if self.bist_alternating:
             args.append("--bist-alternating")
-        args += self.access_pattern.as_args()
+        if self.cmd_reordering:
+            args.append("--cmd-reordering")
+        if self.address_mapping != "ROW_BANK_COL":
+            args.append("--address-mapping=%s" % self.address_mapping)
+        if self.bank_interleave:
+            args.append("--bank-interleave=%d" % self.bank_interleave)
+        if isinstance(self.access_pattern, CustomAccess):
+            args += self.access_pattern.as_args()
         return args
 
+    def runtime_args(self):
+        # BIST settings can be changed without rebuilding the simulation (see benchmark.py --no-build).
+        if isinstance(self.access_pattern, GeneratedAccess):
+            return self.access_pattern.as_args()
+        return []
+
+    @property
+    def gateware_hash(self):
+        # The arguments do not cover the access pattern contents and the sources of the gateware.
+        key = self.gateware_args() + [gateware_sources_hash()]
+        if isinstance(self.access_pattern, CustomAccess):
+            key.append(str(self.access_pattern.pattern))
+        return hashlib.sha1(" ".join(key).encode()).hexdigest()[:16]
+
     def __eq__(self, other):
         if not isinstance(other, BenchmarkConfiguration):
             return NotImplemented
@@ -248,6 +297,9 @@ class ResultsSummary:
             "bist_alternating": lambda d: d.config.bist_alternating,
             "num_generators":   lambda d: d.config.num_generators,
             "num_checkers":     lambda d: d.config.num_checkers,
+            "cmd_reordering":   lambda d: d.config.cmd_reordering,
+            "address_mapping":  lambda d: d.config.address_mapping,
+            "bank_interleave":  lambda d: d.config.bank_interleave,
             "bist_length":      lambda d: getattr(d.config.access_pattern, "bist_length", None),
             "bist_random":      lambda d: getattr(d.config.access_pattern, "bist_random", None),
             "pattern_file":     lambda d: getattr(d.config.access_pattern, "pattern_file", None),
@@ -384,7 +436,8 @@ class ResultsSummary:
 
         common_columns = [
             "name", "sdram_module", "sdram_memtype", "sdram_data_width",
-            "bist_alternating", "num_generators", "num_checkers"
+            "bist_alternating", "num_generators", "num_checkers", "cmd_reordering",
+            "address_mapping", "bank_interleave"
         ]
         latency_columns = ["write_latency", "read_latency"]
         performance_columns = [
@@ -499,15 +552,30 @@ def run_python(script, args, **kwargs):
     return str(proc.stdout)
 
 
-BenchmarkArgs = namedtuple("BenchmarkArgs", ["config", "output_dir", "ignore_failures", "timeout"])
+BenchmarkArgs = namedtuple("BenchmarkArgs", ["config", "output_dir", "ignore_failures", "timeout", "model", "build"])
+
+
+def get_build_dir(output_base_dir, config):
+    # One build directory per gateware, shared by the configurations only differing by BIST settings.
+    return os.path.join(output_base_dir, config.gateware_hash)
+
+
+def is_built(build_dir):
+    gateware_dir = os.path.join(build_dir, "gateware")
+    return all(os.path.exists(os.path.join(gateware_dir, f)) for f in [os.path.join("obj_dir", "Vsim"), benchmark.BUILD_CONFIG])
 
 
 def run_single_benchmark(fargs):
-    # Run as separate process, because else we cannot capture all output from verilator
     print("  {}: {}".format(fargs.config.name, " ".join(fargs.config.as_args())))
     try:
-        args   = fargs.config.as_args() + ["--output-dir", fargs.output_dir, "--log-level", "warning"]
-        output = run_python(benchmark.__file__, args, timeout=fargs.timeout)
+        if fargs.model:
+            output = perf_model.model_output(fargs.config.as_args())
+        else:
+            # Run as separate process, because else we cannot capture all output from verilator
+            args   = fargs.config.as_args() + ["--output-dir", fargs.output_dir, "--log-level", "warning"]
+            if not fargs.build:
+                args.append("--no-build")
+            output = run_python(benchmark.__file__, args, timeout=fargs.timeout)
         result = BenchmarkResult(output)
         # Exit if checker had any read error
         if result.checker_errors != 0:
@@ -528,35 +596,50 @@ InQueueItem = namedtuple("InQueueItem", ["index", "config"])
 OutQueueItem = namedtuple("OutQueueItem", ["index", "result"])
 
 
-def run_parallel(configurations, output_base_dir, njobs, ignore_failures, timeout):
+def group_configurations(configurations):
+    # Group the configurations (with their index) by gateware, each group is built only once.
+    groups = defaultdict(list)
+    for i, config in enumerate(configurations):
+        groups[config.gateware_hash].append(InQueueItem(i, config))
+    return list(groups.values())
+
+
+def run_group(items, output_base_dir, ignore_failures, timeout, model, rebuild):
+    out_items = []
+    for n, item in enumerate(items):
+        build_dir = get_build_dir(output_base_dir, item.config)
+        # Build on first use (or until a build succeeds), then only run the simulation again.
+        build  = not model and ((rebuild and n == 0) or not is_built(build_dir))
+        fargs  = BenchmarkArgs(item.config, build_dir, ignore_failures, timeout, model, build)
+        result = run_single_benchmark(fargs)
+        out_items.append(OutQueueItem(item.index, result))
+    return out_items
+
+
+def run_parallel(configurations, output_base_dir, njobs, ignore_failures, timeout, model, rebuild):
     from multiprocessing import Process, Queue
     import queue
 
-    def worker(in_queue, out_queue, out_dir):
+    def worker(in_queue, out_queue):
         while True:
-            in_item = in_queue.get()
-            if in_item is None:
+            in_items = in_queue.get()
+            if in_items is None:
                 return
-            fargs  = BenchmarkArgs(in_item.config, out_dir, ignore_failures, timeout)
-            result = run_single_benchmark(fargs)
-            out_queue.put(OutQueueItem(in_item.index, result))
+            for out_item in run_group(in_items, output_base_dir, ignore_failures, timeout, model, rebuild):
+                out_queue.put(out_item)
 
     if njobs == 0:
         njobs = os.cpu_count()
     print("Using {:d} parallel jobs".format(njobs))
 
-    # Use one directory per worker, as running each benchmark in separate directory
-    # takes too much disk space (~2GB per 100 benchmarks)
-    dir_pool = [os.path.join(output_base_dir, "worker_%02d" % i) for i in range(njobs)]
-
     in_queue, out_queue = Queue(), Queue()
-    workers = [Process(target=worker, args=(in_queue, out_queue, dir)) for dir in dir_pool]
+    workers = [Process(target=worker, args=(in_queue, out_queue)) for _ in range(njobs)]
     for w in workers:
         w.start()
 
-    # Put all benchmark configurations with index to retrieve them in order
-    for i, config in enumerate(configurations):
-        in_queue.put(InQueueItem(i, config))
+    # Put all benchmark configurations (grouped by gateware) with index to retrieve them in order
+    for items in group_configurations(configurations):
+        in_queue.put(items)
 
     # Send "finish signal" for each worker
     for _ in workers:
@@ -572,13 +655,15 @@ def run_parallel(configurations, output_base_dir, njobs, ignore_failures, timeou
     return results
 
 
-def run_benchmarks(configurations, output_base_dir, njobs, ignore_failures, timeout):
-    print("Running {:d} benchmarks ...".format(len(configurations)))
+def run_benchmarks(configurations, output_base_dir, njobs, ignore_failures, timeout, model=False, rebuild=False):
+    groups = group_configurations(configurations)
+    print("Running {:d} benchmarks ({:d} builds) ...".format(len(configurations), len(groups)))
     if njobs == 1:
-        results = [run_single_benchmark(BenchmarkArgs(config, output_base_dir, ignore_failures, timeout))
-                   for config in configurations]
+        out_items = sum([run_group(items, output_base_dir, ignore_failures, timeout, model, rebuild)
+                         for items in groups], [])
+        results   = [out.result for out in sorted(out_items, key=lambda o: o.index)]
     else:
-        results = run_parallel(configurations, output_base_dir, njobs, ignore_failures, timeout)
+        results = run_parallel(configurations, output_base_dir, njobs, ignore_failures, timeout, model, rebuild)
     run_data = [RunCache.RunData(config, result) for config, result in zip(configurations, results)]
     return run_data
 
@@ -598,10 +683,12 @@ def main(argv=None):
     parser.add_argument("--plot-output-dir",  default="plots",     help="Specify where to save the plots")
     parser.add_argument("--plot-theme",       default="default",   help="Use different matplotlib theme")
     parser.add_argument("--fail-fast",        action="store_true", help="Exit on any benchmark error, do not continue")
-    parser.add_argument("--output-dir",       default="build",     help="Directory to store benchmark build output")
+    parser.add_argument("--output-dir",       default="build",     help="Directory to store benchmark build output (one build per gateware, reused between runs)")
+    parser.add_argument("--rebuild",          action="store_true", help="Rebuild the simulations already built in --output-dir")
     parser.add_argument("--njobs",            default=0, type=int, help="Use N parallel jobs to run benchmarks (default=0, which uses CPU count)")
     parser.add_argument("--heartbeat",        default=0, type=int, help="Print heartbeat message with given interval (default=0 => never)")
     parser.add_argument("--timeout",          default=None,        help="Set timeout for a single benchmark")
+    parser.add_argument("--model",            action="store_true", help="Use the performance model (perf_model.py) instead of simulations")
     parser.add_argument("--results-cache",                         help="""Use given JSON file as results cache. If the file exists,
                                                                            it will be loaded instead of running actual benchmarks,
                                                                            else benchmarks will be run normally, and then saved
@@ -640,7 +727,8 @@ def main(argv=None):
             heartbeat = subprocess.Popen(heartbeat_cmd)
         if args.timeout is not None:
             args.timeout = int(args.timeout)
-        run_data = run_benchmarks(configurations, args.output_dir, args.njobs, not args.fail_fast, args.timeout)
+        run_data = run_benchmarks(configurations, args.output_dir, args.njobs, not args.fail_fast, args.timeout,
+            args.model, args.rebuild)
         if args.heartbeat:
             heartbeat.kill()
 
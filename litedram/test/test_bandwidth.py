@@ -168,6 +168,30 @@ class TestBandwidth(unittest.TestCase):
 
         self.assertEqual(results["nreads"], cmd_driver.cmd_counts["read"])
 
+    def test_correct_turnaround_counts(self):
+        # Verify that READ/WRITE commands following a command of the other type are counted.
+        timeline = {10: "read", 11: "read", 14: "write", 15: "activate", 16: "write", 20: "read",
+                    30: "refresh", 31: "read", 40: "write"}
+        results  = {}
+
+        def main_generator(dut):
+            # Wait for the first period to end
+            for _ in range(2**6):
+                yield
+            yield from dut.bandwidth.update.write(1)
+            yield
+            results["nturnarounds"] = (yield from dut.bandwidth.nturnarounds.read())
+
+        dut = BandwidthDUT(period_bits=6)
+        cmd_driver = CommandDriver(dut.cmd)
+        generators = [
+            main_generator(dut),
+            cmd_driver.timeline_generator(timeline.items()),
+        ]
+        run_simulation(dut, generators)
+
+        self.assertEqual(results["nturnarounds"], 3)
+
     def test_correct_period_length(self):
         # Verify that period length is correct by measuring time between CSR changes.
         period_bits = 5
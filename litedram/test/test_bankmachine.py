@@ -428,3 +428,90 @@ class TestBankMachine(unittest.TestCase):
         self.bankmachine_commands_test(dut=dut, requests=requests, generators=[cmd_checker])
         # Bankmachine does not produce refresh commands
         self.assertEqual(checked, {"activate", "precharge", "write", "read"})
+
+    def reordering_commands_test(self, dut, requests):
+        # Queue all requests before letting commands out and return registered commands.
+        commands = []
+        queued   = []
+
+        def producer(dut):
+            for req in requests:
+                yield dut.bankmachine.req.addr.eq(req["addr"])
+                yield dut.bankmachine.req.we.eq(req["we"])
+                yield dut.bankmachine.req.id.eq(req["id"])
+                yield dut.bankmachine.req.valid.eq(1)
+                yield
+                while not (yield dut.bankmachine.req.ready):
+                    yield
+                yield dut.bankmachine.req.valid.eq(0)
+            queued.append(True)
+
+        def cmd_consumer(dut):
+            while not queued:
+                yield
+            n = 0
+            while n < len(requests):
+                while not (yield dut.bankmachine.cmd.valid):
+                    yield
+                yield dut.bankmachine.cmd.ready.eq(1)
+                yield
+                cmd = (yield from dut.get_cmd())
+                if cmd["type"] in ["read", "write"]:
+                    n += 1
+                commands.append(cmd)
+                yield dut.bankmachine.cmd.ready.eq(0)
+                yield
+
+        run_simulation(dut, [producer(dut), cmd_consumer(dut), timeout_generator(50 * len(requests))])
+        # Drop auto-precharge flag.
+        return [(cmd["type"], cmd["a"] & ~(1 << 10)) for cmd in commands]
+
+    def test_cmd_reordering(self):
+        # Verify that row hits are issued first, keeping the order of the requests of each port.
+        settings = dict(with_cmd_reordering=True, cmd_reordering_max_age=16, cmd_reordering_id_width=2)
+        dut = BankMachineDUT(1, controller_settings=settings)
+        requests = [
+            dict(addr=dut.req_address(row=0xa, col=0x1), we=0, id=0),
+            dict(addr=dut.req_address(row=0xb, col=0x2), we=0, id=1),
+            dict(addr=dut.req_address(row=0xb, col=0x3), we=1, id=0),
+            dict(addr=dut.req_address(row=0xa, col=0x4), we=0, id=2),
+            dict(addr=dut.req_address(row=0xa, col=0x5), we=1, id=1),
+        ]
+        commands = self.reordering_commands_test(dut=dut, requests=requests)
+        commands = [cmd for cmd in commands if cmd[0] != "precharge"]
+        expected = [
+            ("activate", 0xa),
+            ("read",     0x1 << dut.address_align),
+            ("read",     0x4 << dut.address_align), # Row hit of port 2.
+            ("activate", 0xb),
+            ("read",     0x2 << dut.address_align),
+            ("write",    0x3 << dut.address_align), # After the row hit of port 0 (in order).
+            ("activate", 0xa),
+            ("write",    0x5 << dut.address_align), # After the row miss of port 1 (in order).
+        ]
+        self.assertEqual(commands, expected)
+
+    def test_cmd_reordering_max_age(self):
+        # Verify that the oldest request is issued after max_age requests have been issued ahead.
+        settings = dict(with_cmd_reordering=True, cmd_reordering_max_age=2, cmd_reordering_id_width=2)
+        dut = BankMachineDUT(1, controller_settings=settings)
+        requests = [
+            dict(addr=dut.req_address(row=0xa, col=0x1), we=0, id=0),
+            dict(addr=dut.req_address(row=0xb, col=0x2), we=0, id=1),
+            dict(addr=dut.req_address(row=0xa, col=0x3), we=0, id=2),
+            dict(addr=dut.req_address(row=0xa, col=0x4), we=0, id=3),
+            dict(addr=dut.req_address(row=0xa, col=0x5), we=0, id=0),
+        ]
+        commands = self.reordering_commands_test(dut=dut, requests=requests)
+        commands = [cmd for cmd in commands if cmd[0] != "precharge"]
+        expected = [
+            ("activate", 0xa),
+            ("read",     0x1 << dut.address_align),
+            ("read",     0x3 << dut.address_align),
+            ("read",     0x4 << dut.address_align),
+            ("activate", 0xb),
+            ("read",     0x2 << dut.address_align), # Aged.
+            ("activate", 0xa),
+            ("read",     0x5 << dut.address_align),
+        ]
+        self.assertEqual(commands, expected)
@@ -13,7 +13,11 @@ from collections import namedtuple, defaultdict
 from migen import *
 
 from litedram.common import *
+from litedram.modules import MT48LC16M16
+from litedram.phy.model import SDRAMPHYModel
+from litedram.core.controller import ControllerSettings, LiteDRAMController
 from litedram.core.crossbar import LiteDRAMCrossbar
+from litedram.frontend.bist import _LiteDRAMBISTGenerator, _LiteDRAMBISTChecker
 
 from test.common import timeout_generator, NativePortDriver
 
@@ -192,15 +196,23 @@ class CrossbarDUT(Module):
 
     def addr_port(self, bank, row, col):
         # construct an address the way port master would do it
-        assert self.settings.address_mapping == "ROW_BANK_COL"
+        mapping = self.settings.address_mapping
         aa = self.address_align
         cb = self.settings.geom.colbits
         rb = self.settings.geom.rowbits
         bb = self.settings.geom.bankbits
         col  = (col  & (2**cb - 1)) >> aa
-        bank = (bank & (2**bb - 1)) << (cb - aa)
-        row  = (row  & (2**rb - 1)) << (cb + bb - aa)
-        return row | bank | col
+        bank = (bank & (2**bb - 1))
+        row  = (row  & (2**rb - 1))
+        if mapping == "ROW_BANK_COL_XOR":
+            bank ^= row & (2**bb - 1)
+        if mapping == "ROW_COL_BANK":
+            word  = self.interface.data_width//8
+            shift = log2_int(max(getattr(self.settings, "bank_interleave", 0), word)//word)
+            col   = ((col >> shift) << (shift + bb)) | (col & (2**shift - 1))
+            return (row << (cb + bb - aa)) | (bank << shift) | col
+        assert mapping in ["ROW_BANK_COL", "ROW_BANK_COL_XOR"]
+        return (row << (cb + bb - aa)) | (bank << (cb - aa)) | col
 
     def addr_iface(self, row, col):
         # construct address the way bankmachine should receive it
@@ -234,15 +246,16 @@ class TestCrossbar(unittest.TestCase):
         return controller.data
 
     def test_available_address_mappings(self):
-        # Check that the only supported address mapping is ROW_BANK_COL (if we start supporting new
-        # mappings, then update these tests to also test these other mappings).
+        # Check that the supported address mappings are ROW_BANK_COL, ROW_COL_BANK and
+        # ROW_BANK_COL_XOR (if we start supporting new mappings, then update these tests to also
+        # test these other mappings).
         def finalize_crossbar(mapping):
             dut = CrossbarDUT(controller_settings=dict(address_mapping=mapping))
             dut.crossbar.get_port()
             dut.crossbar.finalize()
 
-        for mapping in ["ROW_BANK_COL", "BANK_ROW_COL"]:
-            if mapping in ["ROW_BANK_COL"]:
+        for mapping in ["ROW_BANK_COL", "ROW_COL_BANK", "ROW_BANK_COL_XOR", "BANK_ROW_COL"]:
+            if mapping in ["ROW_BANK_COL", "ROW_COL_BANK", "ROW_BANK_COL_XOR"]:
                 finalize_crossbar(mapping)
             else:
                 with self.assertRaises(KeyError):
@@ -250,6 +263,16 @@ class TestCrossbar(unittest.TestCase):
 
     def test_address_mappings(self):
         # Verify that address is translated correctly.
+        for controller_settings in [
+            dict(address_mapping="ROW_BANK_COL"),
+            dict(address_mapping="ROW_COL_BANK"),
+            dict(address_mapping="ROW_COL_BANK", bank_interleave=4*8),
+            dict(address_mapping="ROW_BANK_COL_XOR"),
+        ]:
+            with self.subTest(**controller_settings):
+                self.address_mapping_test(controller_settings)
+
+    def address_mapping_test(self, controller_settings):
         reads = []
 
         def producer(dut, driver):
@@ -264,7 +287,7 @@ class TestCrossbar(unittest.TestCase):
                     raise TypeError(t["rw"])
 
         geom_settings = dict(colbits=10, rowbits=13, bankbits=2)
-        dut  = CrossbarDUT(geom_settings=geom_settings)
+        dut  = CrossbarDUT(controller_settings=controller_settings, geom_settings=geom_settings)
         port = dut.crossbar.get_port()
         driver = NativePortDriver(port)
         transfers = [
@@ -515,3 +538,49 @@ class TestCrossbar(unittest.TestCase):
             with self.subTest(mode=mode, data_width=data_width):
                 port = dut.crossbar.get_port(mode=mode, data_width=data_width)
                 self.assertEqual(port.data_width, data_width)
+
+    def test_cmd_reordering(self):
+        # Verify data integrity of masters sharing banks with command reordering, on a controller
+        # and SDRAM model.
+        class SmallModule(MT48LC16M16):
+            # Small geometry to keep the SDRAM model simulation fast (with A10 for auto-precharge).
+            nrows = 2048
+            ncols = 8
+
+        class DUT(Module):
+            def __init__(self):
+                module = SmallModule(100e6, "1:1")
+                self.submodules.phy = SDRAMPHYModel(module, data_width=16, clk_freq=100e6)
+                self.submodules.controller = LiteDRAMController(
+                    phy_settings        = self.phy.settings,
+                    geom_settings       = module.geom_settings,
+                    timing_settings     = module.timing_settings,
+                    clk_freq            = 100e6,
+                    controller_settings = ControllerSettings(with_cmd_reordering=True))
+                self.comb += self.controller.dfi.connect(self.phy.dfi)
+                self.submodules.crossbar = LiteDRAMCrossbar(self.controller.interface)
+                self.generators = [_LiteDRAMBISTGenerator(self.crossbar.get_port()) for _ in range(3)]
+                self.checkers   = [_LiteDRAMBISTChecker(self.crossbar.get_port())   for _ in range(3)]
+                self.submodules += self.generators + self.checkers
+
+        def main_generator(dut):
+            # Each master accesses its own row in all the banks (shared with the other masters).
+            for n, module in enumerate(dut.generators + dut.checkers):
+                yield module.base.eq((n % 3)*0x40)
+                yield module.end.eq((n % 3)*0x40 + 0x40)
+                yield module.length.eq(0x40)
+                yield module.random_data.eq(1)
+            for modules in [dut.generators, dut.checkers]:
+                for module in modules:
+                    yield module.start.eq(1)
+                yield
+                for module in modules:
+                    yield module.start.eq(0)
+                for module in modules:
+                    while not (yield module.done):
+                        yield
+            for checker in dut.checkers:
+                self.assertEqual((yield checker.errors), 0)
+
+        dut = DUT()
+        run_simulation(dut, [main_generator(dut), timeout_generator(2000)])
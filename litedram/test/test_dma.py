@@ -175,3 +175,115 @@ class TestDMA(MemoryTestDataMixin, unittest.TestCase):
         # Verify DMAReader with a buffered FIFO.
         data = self.pattern_test_data["32bit_long_sequential"]
         self.dma_reader_test(data["pattern"], data["expected"], data_width=32, fifo_buffered=True)
+
+    # LiteDRAMDMASGReader/LiteDRAMDMASGWriter ------------------------------------------------------
+
+    def dma_sg_start(self, dma, descriptors, loop=0, burst_length=None):
+        yield from dma._ring_base.write(0)
+        yield from dma._ring_size.write(len(descriptors))
+        yield from dma._loop.write(loop)
+        if burst_length is not None:
+            yield from dma._burst_length.write(burst_length)
+        yield from dma._enable.write(1)
+
+    def dma_sg_reader_test(self, descriptors, mem, loop=0, n=None, burst_length=None, **kwargs):
+        class DUT(Module):
+            def __init__(self):
+                self.port      = LiteDRAMNativeReadPort(address_width=32, data_width=32)
+                self.desc_port = LiteDRAMNativeReadPort(address_width=32, data_width=64)
+                self.submodules.dma = LiteDRAMDMASGReader(self.port, self.desc_port, **kwargs)
+
+        dut      = DUT()
+        desc_mem = DRAMMemory(64, len(descriptors), init=[addr | (length << 32) for addr, length in descriptors])
+        data_mem = DRAMMemory(32, len(mem), init=mem)
+        data     = []
+        status   = {}
+
+        def main_generator():
+            yield from self.dma_sg_start(dut.dma, descriptors, loop, burst_length)
+            yield dut.dma.source.ready.eq(1)
+            for _ in range(2000):
+                if (yield dut.dma.source.valid):
+                    data.append(((yield dut.dma.source.data), (yield dut.dma.source.last)))
+                    if len(data) == n:
+                        break
+                if (yield dut.dma._done.status):
+                    break
+                yield
+            for csr in ["done", "index", "bytes", "cycles"]:
+                status[csr] = (yield from getattr(dut.dma, "_" + csr).read())
+
+        generators = [
+            main_generator(),
+            data_mem.read_handler(dut.port),
+            desc_mem.read_handler(dut.desc_port),
+        ]
+        run_simulation(dut, generators)
+        return data, status
+
+    def test_dma_sg_reader(self):
+        # Verify DMASGReader with a ring of 3 descriptors (including an empty one).
+        mem         = [0x1000 + i for i in range(64)]
+        descriptors = [(0x10, 16), (0x40, 0), (0x80, 40)]
+        for burst_length in [1, 4, 8]:
+            with self.subTest(burst_length=burst_length):
+                data, status = self.dma_sg_reader_test(descriptors, mem, burst_length=burst_length)
+                expected = [(mem[i], int(i == 7)) for i in range(4, 8)]
+                expected += [(mem[i], int(i == 41)) for i in range(32, 42)]
+                self.assertEqual(data, expected)
+                self.assertEqual(status["done"], 1)
+                self.assertEqual(status["index"], 3)
+                self.assertEqual(status["bytes"], 56)
+                self.assertGreater(status["cycles"], 14)
+
+    def test_dma_sg_reader_loop(self):
+        # Verify DMASGReader looping on its ring of descriptors.
+        mem         = [0x1000 + i for i in range(64)]
+        descriptors = [(0x00, 8), (0x20, 12)]
+        data, status = self.dma_sg_reader_test(descriptors, mem, loop=1, n=15, fifo_buffered=True)
+        self.assertEqual([d for d, _ in data], 3*[mem[0], mem[1], mem[8], mem[9], mem[10]])
+        self.assertEqual(status["done"], 0)
+        self.assertGreaterEqual(status["index"], 6)
+
+    def test_dma_sg_writer(self):
+        # Verify DMASGWriter with a ring of 2 descriptors.
+        descriptors = [(0x20, 12), (0x100, 20)]
+        for burst_length in [1, 3, 16]:
+            with self.subTest(burst_length=burst_length):
+                class DUT(Module):
+                    def __init__(self):
+                        self.port      = LiteDRAMNativeWritePort(address_width=32, data_width=32)
+                        self.desc_port = LiteDRAMNativeReadPort(address_width=32, data_width=64)
+                        self.submodules.dma = LiteDRAMDMASGWriter(self.port, self.desc_port)
+
+                dut      = DUT()
+                desc_mem = DRAMMemory(64, len(descriptors),
+                    init=[addr | (length << 32) for addr, length in descriptors])
+                data_mem = DRAMMemory(32, 128)
+                status   = {}
+
+                def main_generator():
+                    yield from self.dma_sg_start(dut.dma, descriptors, burst_length=burst_length)
+                    for i in range(8):
+                        yield dut.dma.sink.valid.eq(1)
+                        yield dut.dma.sink.data.eq(0x2000 + i)
+                        yield
+                        while not (yield dut.dma.sink.ready):
+                            yield
+                    yield dut.dma.sink.valid.eq(0)
+                    while not (yield dut.dma._done.status):
+                        yield
+                    for csr in ["done", "index", "bytes"]:
+                        status[csr] = (yield from getattr(dut.dma, "_" + csr).read())
+
+                generators = [
+                    main_generator(),
+                    data_mem.write_handler(dut.port),
+                    desc_mem.read_handler(dut.desc_port),
+                ]
+                run_simulation(dut, generators)
+                mem_expected = [0]*128
+                mem_expected[0x08:0x0b] = [0x2000 + i for i in range(3)]
+                mem_expected[0x40:0x45] = [0x2003 + i for i in range(5)]
+                self.assertEqual(data_mem.mem, mem_expected)
+                self.assertEqual(status, {"done": 1, "index": 2, "bytes": 32})
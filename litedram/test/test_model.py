@@ -0,0 +1,206 @@
+#
+# This file is part of LiteDRAM.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import io
+import os
+import re
+import struct
+import tempfile
+import unittest
+import contextlib
+
+from migen import *
+
+from litedram.modules import MT41K128M16, _speedgrade_timings, _technology_timings
+from litedram.phy import dfi
+from litedram.phy.model import SparseMemory, SDRAMPHYModel
+from litedram.phy.model import DFITimingsChecker, DFITraceTimingsChecker
+
+try:
+    import numpy
+    _numpy = True
+except ImportError:
+    _numpy = False
+
+
+class TestSparseMemory(unittest.TestCase):
+    def test_words(self):
+        mem = SparseMemory(32, 1 << 28, init=[1, 2, 3])
+        self.assertEqual(mem[:4], [1, 2, 3, 0])
+        mem[(1 << 28) - 1] = 0xdeadbeef
+        self.assertEqual(mem[(1 << 28) - 1], 0xdeadbeef)
+        self.assertEqual(mem[1 << 20], 0)
+        # Only the written pages are allocated (reads do not allocate).
+        self.assertEqual(len(mem._pages), 2)
+        self.assertEqual(len(mem), 1 << 28)
+        with self.assertRaises(IndexError):
+            mem[1 << 28]
+
+    def test_bytes(self):
+        mem = SparseMemory(64, 1024, page_size=16)
+        mem.write_bytes(12, bytes(range(8)))
+        self.assertEqual(mem[1], 0x0302010000000000)
+        self.assertEqual(mem[2], 0x0000000007060504)
+        self.assertEqual(mem.read_bytes(10, 12), bytes(2) + bytes(range(8)) + bytes(2))
+
+    def test_list_compare(self):
+        mem = SparseMemory(16, 4, init=[0x1234, 0xabcd])
+        self.assertEqual(mem, [0x1234, 0xabcd, 0, 0])
+        self.assertNotEqual(mem, [0x1234, 0xabcd, 0, 1])
+        self.assertEqual(list(mem), [0x1234, 0xabcd, 0, 0])
+
+    def test_add_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "image.bin")
+            with open(filename, "wb") as f:
+                f.write(struct.pack(">3I", 0x00010203, 0x04050607, 0x08090a0b))
+            mem = SparseMemory(32, 1 << 20, page_size=8)
+            mem.add_file(filename, base=4, endianness="big")
+            self.assertEqual(mem[:5], [0, 0x00010203, 0x04050607, 0x08090a0b, 0])
+            mem = SparseMemory(32, 1 << 20, page_size=8)
+            mem.add_file(filename, base=4, endianness="little")
+            self.assertEqual(mem[:5], [0, 0x03020100, 0x07060504, 0x0b0a0908, 0])
+            # Writes override the file contents.
+            mem[2] = 0x55
+            self.assertEqual(mem[:5], [0, 0x03020100, 0x55, 0x0b0a0908, 0])
+            with self.assertRaises(AssertionError):
+                mem.add_file(filename, base=(1 << 22) - 8)
+
+    def test_readmemh(self):
+        mem = SparseMemory(32, 1 << 20, page_size=8)
+        mem[1]       = 0x12345678
+        mem[0x10001] = 0xcafe
+        self.assertEqual(mem.readmemh(),
+            "@0\n00000000\n12345678\n"
+            "@10000\n00000000\n0000cafe\n")
+
+
+class TestSDRAMPHYModel(unittest.TestCase):
+    def bank_init(self, address_mapping, init):
+        module = MT41K128M16(100e6, "1:4")
+        phy    = SDRAMPHYModel(module, data_width=16)
+        geom   = module.geom_settings
+        banks  = phy._SDRAMPHYModel__prepare_bank_init_data(init,
+            nbanks          = 2**geom.bankbits,
+            nrows           = 2**geom.rowbits,
+            ncols           = 2**geom.colbits,
+            data_width      = phy.settings.dfi_databits*phy.settings.nphases,
+            address_mapping = address_mapping)
+        # Bank words are made of 32-bit init words, little-endian.
+        ratio        = banks[0].width//32
+        column_words = phy.settings.databits*2**geom.colbits//32
+        return banks, ratio, column_words
+
+    def pack(self, words, ratio):
+        return [sum(w << 32*i for i, w in enumerate(words[n:n + ratio])) for n in range(0, len(words), ratio)]
+
+    def test_init_row_bank_col(self):
+        words = [i + 1 for i in range(4096)]
+        banks, ratio, column_words = self.bank_init("ROW_BANK_COL", words)
+        for n in range(len(words)//column_words):
+            row, bank = divmod(n, len(banks))
+            column    = column_words//ratio
+            self.assertEqual(banks[bank][row*column:(row + 1)*column],
+                self.pack(words[n*column_words:(n + 1)*column_words], ratio))
+
+    def test_init_bank_row_col(self):
+        words = [i + 1 for i in range(4096)]
+        banks, ratio, column_words = self.bank_init("BANK_ROW_COL", words)
+        self.assertEqual(banks[0][:len(words)//ratio], self.pack(words, ratio))
+        for bank in range(1, len(banks)):
+            self.assertEqual(len(banks[bank]._pages), 0)
+
+    def test_init_sparse(self):
+        init = SparseMemory(32, 2**28//4)
+        init[0]            = 0x11111111
+        init[2**28//4 - 1] = 0x22222222
+        banks, ratio, column_words = self.bank_init("ROW_BANK_COL", init)
+        self.assertEqual(banks[0][0], 0x11111111)
+        self.assertEqual(banks[-1][len(banks[-1]) - 1], 0x22222222 << 32*(ratio - 1))
+        self.assertEqual(sum(len(bank._pages) for bank in banks), 2)
+
+
+class CheckersDUT(Module):
+    def __init__(self, module, nphases=4, clk_freq=100e6):
+        geom = module.geom_settings
+        self.dfi = dfi.Interface(geom.addressbits, geom.bankbits, 1, 32, nphases)
+        timings  = {"tCK": (1e9 / clk_freq) / nphases}
+        for name in _speedgrade_timings + _technology_timings:
+            timings[name] = module.get(name)
+        kwargs = dict(dfi=self.dfi, nbanks=2**geom.bankbits, nphases=nphases, timings=timings,
+            refresh_mode=None, memtype=module.memtype)
+        self.submodules.gateware = DFITimingsChecker(**kwargs)
+        self.submodules.trace    = DFITraceTimingsChecker(**kwargs)
+
+
+@unittest.skipUnless(_numpy, "NumPy not available")
+class TestDFITraceTimingsChecker(unittest.TestCase):
+    cmds = {
+        # Name: cs_n, ras_n, cas_n, we_n
+        "PRE": (0, 0, 1, 0),
+        "REF": (0, 0, 0, 1),
+        "ACT": (0, 0, 1, 1),
+        "RD":  (0, 1, 0, 1),
+        "WR":  (0, 1, 0, 0),
+    }
+
+    def run_commands(self, dut, commands):
+        # Commands: (cycle, phase, name, bank, address), one command per cycle.
+        def generator():
+            commands_dict = {cycle: cmd for cycle, *cmd in commands}
+            for cycle in range(max(commands_dict) + 2):
+                for phase in dut.dfi.phases:
+                    for signal, value in zip(["cs_n", "ras_n", "cas_n", "we_n"], [0, 1, 1, 1]):
+                        yield getattr(phase, signal).eq(value)
+                if cycle in commands_dict:
+                    n, name, bank, address = commands_dict[cycle]
+                    phase = dut.dfi.phases[n]
+                    for signal, value in zip(["cs_n", "ras_n", "cas_n", "we_n"], self.cmds[name]):
+                        yield getattr(phase, signal).eq(value)
+                    yield phase.bank.eq(bank)
+                    yield phase.address.eq(address)
+                yield
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            run_simulation(dut, generator())
+        return output.getvalue()
+
+    def test_same_violations(self):
+        dut = CheckersDUT(MT41K128M16(100e6, "1:4"))
+        output = self.run_commands(dut, [
+            (20, 0, "ACT", 0, 0),
+            (21, 1, "RD",  0, 0),     # tRCD
+            (22, 2, "PRE", 0, 0),
+            (23, 3, "ACT", 0, 0),     # tRP
+            (24, 1, "ACT", 1, 0),     # tRRD
+            (40, 0, "WR",  1, 0),
+            (41, 0, "RD",  1, 0),     # tWTR
+            (50, 1, "ACT", 2, 0),
+            (51, 0, "ACT", 3, 0),
+            (52, 0, "ACT", 4, 0),
+            (53, 0, "ACT", 5, 0),
+            (54, 0, "ACT", 6, 0),     # tFAW
+            (60, 0, "PRE", 0, 1<<10), # All banks
+            (61, 0, "ACT", 2, 0),     # tRP
+        ])
+        gateware = [(int(ps), name, int(bank)) for ps, name, bank in
+            re.findall(r"\[(\d+)ps\] (\S+) violation on bank (\d+)", output)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            trace = dut.trace.report(output)
+        self.assertEqual(sorted(trace), sorted(gateware))
+        self.assertEqual(sorted(set(name for _, name, _ in trace)),
+            ["ACT->RD", "PRE->ACT", "WR->RD", "tFAW", "tRRD"])
+        self.assertEqual(len(dut.trace.parse(output)), 14)
+
+    def test_refresh(self):
+        dut    = CheckersDUT(MT41K128M16(100e6, "1:4"))
+        trefi  = dut.trace.timings["tREFI"]//dut.trace.timings["tCK"]
+        trace  = numpy.array([[cycle, 0, 0b0001, 0, 1] for cycle in [10, 10 + trefi, 10 + 11*trefi]])
+        self.assertEqual([name for _, name, _ in dut.trace.check(trace)], ["tREFI"])
+
+
+if __name__ == "__main__":
+    unittest.main()
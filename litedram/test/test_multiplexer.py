@@ -39,6 +39,7 @@ class BankMachineStub:
         self.cmd = stream.Endpoint(cmd_request_rw_layout(a=abits, ba=babits))
         self.refresh_req = Signal()
         self.refresh_gnt = Signal()
+        self.write_level = Signal(4)
 
 
 class RefresherStub:
@@ -392,6 +393,93 @@ class TestMultiplexer(unittest.TestCase):
         ]
         run_simulation(dut, generators)
 
+    def test_fsm_write_drain(self):
+        # Check that writes are held off until write_drain_high writes are buffered and drained
+        # down to write_drain_low.
+        def main_generator(dut):
+            yield from dut.bm_drivers[2].read()
+            yield from dut.bm_drivers[3].write()
+            yield dut.bank_machines[3].write_level.eq(3)
+
+            # READ -> RTW -> WRITE
+            while (yield from dut.fsm_state()) != "WRITE":
+                yield
+
+            # Writes are drained beyond write_time until the low watermark
+            for _ in range(2*dut.settings.write_time):
+                self.assertEqual((yield from dut.fsm_state()), "WRITE")
+                yield
+            yield dut.bank_machines[3].write_level.eq(1)
+
+            # WRITE -> WTR -> READ
+            while (yield from dut.fsm_state()) != "READ":
+                yield
+
+            # Writes are held off below the high watermark
+            yield dut.bank_machines[3].write_level.eq(2)
+            for _ in range(dut.settings.read_time//2):
+                self.assertEqual((yield from dut.fsm_state()), "READ")
+                yield
+            yield dut.bank_machines[3].write_level.eq(3)
+            for _ in range(3):
+                yield
+            self.assertEqual((yield from dut.fsm_state()), "RTW")
+
+        dut = MultiplexerDUT(controller_settings=dict(
+            read_time        = 64,
+            write_drain_high = 3,
+            write_drain_low  = 1,
+        ))
+        generators = [
+            main_generator(dut),
+            timeout_generator(200),
+        ]
+        run_simulation(dut, generators)
+
+    def test_fsm_write_drain_time(self):
+        # Check that a drain is interrupted after write_drain_time when reads are waiting, even if
+        # writes stay above the low watermark, and that reads are then served before resuming it.
+        def main_generator(dut):
+            yield from dut.bm_drivers[2].read()
+            yield from dut.bm_drivers[3].write()
+            yield dut.bank_machines[3].write_level.eq(3)
+
+            # READ -> RTW -> WRITE
+            while (yield from dut.fsm_state()) != "WRITE":
+                yield
+
+            # WRITE -> WTR -> READ after write_drain_time
+            for _ in range(dut.settings.write_drain_time - 1):
+                self.assertEqual((yield from dut.fsm_state()), "WRITE")
+                yield
+            cycles = 0
+            while (yield from dut.fsm_state()) != "READ":
+                cycles += 1
+                self.assertLess(cycles, 16)
+                yield
+
+            # Reads are served (up to read_time) before the drain resumes
+            for _ in range(dut.settings.read_time - 1):
+                self.assertEqual((yield from dut.fsm_state()), "READ")
+                yield
+            cycles = 0
+            while (yield from dut.fsm_state()) != "RTW":
+                cycles += 1
+                self.assertLess(cycles, 4)
+                yield
+
+        dut = MultiplexerDUT(controller_settings=dict(
+            read_time        = 16,
+            write_drain_high = 3,
+            write_drain_low  = 1,
+            write_drain_time = 32,
+        ))
+        generators = [
+            main_generator(dut),
+            timeout_generator(200),
+        ]
+        run_simulation(dut, generators)
+
     def test_write_datapath(self):
         # Verify that data is transmitted from native interface to DFI.
         def main_generator(dut):
@@ -0,0 +1,186 @@
+#
+# This file is part of LiteDRAM.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import unittest
+from operator import and_
+from functools import reduce
+from itertools import zip_longest
+
+from migen import *
+
+from litedram import modules as litedram_modules
+from litedram.phy.model import sdram_module_nphases, get_sdram_phy_settings
+from litedram.core.controller import ControllerSettings, LiteDRAMController
+from litedram.core.crossbar import LiteDRAMCrossbar
+from litedram.frontend.bist import _LiteDRAMBISTGenerator, _LiteDRAMBISTChecker
+from litedram.frontend.bist import _LiteDRAMPatternGenerator, _LiteDRAMPatternChecker
+
+from test.perf_model import ControllerModel, bist_addresses, benchmark_model, model_output
+from test.perf_model import load_access_pattern
+
+
+class BenchmarkDUT(Module):
+    """LiteDRAMController/LiteDRAMCrossbar with the BIST sequence of LiteDRAMBenchmarkSoC (no PHY)"""
+    def __init__(self, module, data_width, settings, num_generators, num_checkers, alternating,
+        bist_length=1024, bist_random=False, access_pattern=None):
+        phy_settings = get_sdram_phy_settings(module.memtype, data_width, 100e6)
+        self.submodules.controller = LiteDRAMController(phy_settings, module.geom_settings,
+            module.timing_settings, clk_freq=100e6, controller_settings=settings)
+        self.submodules.crossbar = LiteDRAMCrossbar(self.controller.interface)
+
+        if access_pattern is not None:
+            make_generator = lambda: _LiteDRAMPatternGenerator(self.crossbar.get_port(), init=access_pattern)
+            make_checker   = lambda: _LiteDRAMPatternChecker(self.crossbar.get_port(),   init=access_pattern)
+            bist_config    = lambda module: []
+        else:
+            make_generator = lambda: _LiteDRAMBISTGenerator(self.crossbar.get_port())
+            make_checker   = lambda: _LiteDRAMBISTChecker(self.crossbar.get_port())
+            bist_config    = lambda module: [
+                module.base.eq(0x0000000),
+                module.end.eq(0x0100000),
+                module.length.eq(bist_length),
+                module.random_addr.eq(bist_random),
+            ]
+        self.generators = generators = [make_generator() for _ in range(num_generators)]
+        self.checkers   = checkers   = [make_checker()   for _ in range(num_checkers)]
+        self.submodules += generators + checkers
+
+        # Wait for the timing controllers (reset as ready) to settle, as SDRAM initialization does.
+        self.done = Signal()
+        init_counter = Signal(8)
+        self.submodules.fsm = fsm = FSM(reset_state="INIT")
+        fsm.act("INIT",
+            NextValue(init_counter, init_counter + 1),
+            If(init_counter == 63,
+                NextState("BIST-GENERATOR")
+            )
+        )
+        if alternating:
+            bist_connections = []
+            for generator, checker in zip_longest(generators, checkers):
+                g = generator or generators[0]
+                c = checker   or checkers[0]
+                bist_connections += [
+                    g.run_cascade_in.eq(c.run_cascade_out),
+                    c.run_cascade_in.eq(g.run_cascade_out),
+                ]
+            fsm.act("BIST-GENERATOR",
+                *[m.start.eq(1) for m in generators + checkers],
+                *bist_connections,
+                *sum(map(bist_config, generators + checkers), []),
+                If(reduce(and_, [c.done for c in checkers]),
+                    NextState("DONE")
+                )
+            )
+        else:
+            fsm.act("BIST-GENERATOR",
+                *[g.start.eq(1) for g in generators],
+                *sum(map(bist_config, generators), []),
+                If(reduce(and_, [g.done for g in generators]),
+                    NextState("BIST-CHECKER")
+                )
+            )
+            fsm.act("BIST-CHECKER",
+                *[c.start.eq(1) for c in checkers],
+                *sum(map(bist_config, checkers), []),
+                If(reduce(and_, [c.done for c in checkers]),
+                    NextState("DONE")
+                )
+            )
+        fsm.act("DONE", self.done.eq(1))
+
+
+class TestPerfModel(unittest.TestCase):
+    def simulate(self, dut):
+        results = {}
+
+        def generator():
+            while not (yield dut.done):
+                yield
+            for attr, modules in [("generator_ticks", dut.generators), ("checker_ticks", dut.checkers)]:
+                ticks = []
+                for m in modules:
+                    ticks.append((yield m.ticks))
+                results[attr] = max(ticks)
+
+        run_simulation(dut, generator())
+        return results
+
+    def compare(self, sdram_module, data_width, num_generators=1, num_checkers=1,
+        alternating=False, bist_length=1024, bist_random=False, access_pattern=None,
+        tolerance=0.01, **settings):
+        module_cls = getattr(litedram_modules, sdram_module)
+        module     = module_cls(100e6, "1:{}".format(sdram_module_nphases[module_cls.memtype]))
+        settings   = dict(with_refresh=False, **settings)
+
+        # Simulation.
+        dut = BenchmarkDUT(module, data_width, ControllerSettings(**settings),
+            num_generators, num_checkers, alternating, bist_length, bist_random, access_pattern)
+        sim = self.simulate(dut)
+
+        # Model.
+        phy_settings = get_sdram_phy_settings(module.memtype, data_width, 100e6)
+        model = ControllerModel(phy_settings, module.geom_settings, module.timing_settings,
+            ControllerSettings(**settings))
+        if access_pattern is not None:
+            addresses = [addr for addr, _ in access_pattern]*2
+            length    = len(access_pattern)
+        else:
+            data_bytes = model.data_width//8
+            addresses  = bist_addresses(0x0, 0x100000, bist_length + 16*data_bytes, bist_random,
+                model.data_width, model.address_width)
+            length     = bist_length//data_bytes
+        results = model.run([addresses[:length]]*num_generators, [addresses]*num_checkers, length,
+            alternating=alternating, pattern=access_pattern is not None)
+
+        for attr in ["generator_ticks", "checker_ticks"]:
+            self.assertAlmostEqual(results[attr], sim[attr], delta=tolerance*sim[attr],
+                msg="{}: model {} / simulation {}".format(attr, results, sim))
+
+    def test_sdr_sequential(self):
+        self.compare("MT48LC16M16", 32, bist_length=4096)
+
+    def test_sdr_alternating_random(self):
+        self.compare("MT48LC16M16", 32, num_generators=2, num_checkers=2, alternating=True,
+            bist_length=2048, bist_random=True)
+
+    def test_ddr3_multiple_ports(self):
+        self.compare("MT41K128M16", 16, num_generators=2, num_checkers=2, bist_length=8192)
+
+    def test_ddr3_alternating_random(self):
+        self.compare("MT41K128M16", 16, alternating=True, bist_length=4096, bist_random=True)
+
+    def test_ddr3_cmd_reordering(self):
+        self.compare("MT41K128M16", 16, num_generators=2, num_checkers=2, alternating=True,
+            bist_length=4096, bist_random=True, with_cmd_reordering=True)
+
+    def test_ddr3_address_mapping(self):
+        self.compare("MT41K128M16", 16, bist_length=8192,
+            address_mapping="ROW_COL_BANK", bank_interleave=64)
+
+    def test_ddr3_write_drain(self):
+        self.compare("MT41K128M16", 16, num_generators=2, num_checkers=2, alternating=True,
+            bist_length=4096, write_drain_high=8, write_drain_low=2)
+
+    def test_ddr4_alternating_random(self):
+        self.compare("MT40A512M16", 16, alternating=True, bist_length=4096, bist_random=True)
+
+    def test_access_pattern(self):
+        access_pattern = load_access_pattern(os.path.join(os.path.dirname(__file__), "access_pattern.csv"))
+        self.compare("MT41K128M16", 16, access_pattern=access_pattern[:256])
+
+    def test_benchmark_model(self):
+        # Same parameters and output as the benchmark SoC.
+        results = benchmark_model(sdram_module="MT41K128M16", sdram_data_width=16, bist_length=4096)
+        self.assertEqual(set(results), {"generator_ticks", "checker_errors", "checker_ticks"})
+        self.assertEqual(results["checker_errors"], 0)
+        output = model_output(["--sdram-module=MT41K128M16", "--sdram-data-width=16",
+            "--bist-length=4096"])
+        self.assertIn("BIST-GENERATOR ticks:  %08d" % results["generator_ticks"], output)
+        self.assertIn("BIST-CHECKER ticks:    %08d" % results["checker_ticks"], output)
+
+        with self.assertRaises(AssertionError):
+            benchmark_model(bist_random=True)
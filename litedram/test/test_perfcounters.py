@@ -0,0 +1,117 @@
+#
+# This file is part of LiteDRAM.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+
+from migen import *
+
+from litedram.modules import MT41K128M16
+from litedram.phy.model import get_sdram_phy_settings
+from litedram.core.controller import ControllerSettings, LiteDRAMController
+from litedram.core.crossbar import LiteDRAMCrossbar
+
+
+class PerfCountersDUT(Module):
+    def __init__(self, **settings):
+        module = MT41K128M16(100e6, "1:4")
+        phy_settings = get_sdram_phy_settings(module.memtype, 16, 100e6)
+        self.submodules.controller = LiteDRAMController(phy_settings, module.geom_settings,
+            module.timing_settings, clk_freq=100e6,
+            controller_settings=ControllerSettings(with_perf_counters=True, **settings))
+        self.submodules.crossbar = LiteDRAMCrossbar(self.controller.interface)
+        self.port = self.crossbar.get_port()
+        self.perf = self.controller.multiplexer.perf
+        self.port_perf = self.crossbar.port0
+
+
+class TestPerfCounters(unittest.TestCase):
+    # MT41K128M16 (16-bit, 1:4): 128 controller words per row, 8 banks (ROW_BANK_COL).
+    row_words = 128*8
+
+    def read(self, port, addresses):
+        yield port.rdata.ready.eq(1)
+        for addr in addresses:
+            yield port.cmd.valid.eq(1)
+            yield port.cmd.we.eq(0)
+            yield port.cmd.addr.eq(addr)
+            yield
+            while not (yield port.cmd.ready):
+                yield
+        yield port.cmd.valid.eq(0)
+        for _ in range(64):
+            yield
+
+    def read_counters(self, perf):
+        yield from perf.update.write(1)
+        yield
+        counters = {}
+        for csr in perf.get_csrs():
+            if csr.name != "update":
+                counters[csr.name] = (yield from csr.read())
+        return counters
+
+    def test_csrs(self):
+        dut = PerfCountersDUT()
+        names = [csr.name for csr in dut.controller.get_csrs()]
+        for name in ["perf_update", "perf_bank0_row_hits", "perf_bank7_row_conflicts",
+            "perf_refresh_stall_cycles"]:
+            self.assertIn(name, names)
+        names = [csr.name for csr in dut.crossbar.get_csrs()]
+        for name in ["port0_update", "port0_reads", "port0_wait_cycles", "port0_read_latency7"]:
+            self.assertIn(name, names)
+
+    def test_row_counters(self):
+        dut = PerfCountersDUT(with_refresh=False)
+        results = {}
+
+        def generator():
+            for _ in range(64): # Wait for the timing controllers.
+                yield
+            # Row miss then hits on bank 0, then a row conflict after the buffer is drained.
+            yield from self.read(dut.port, range(16))
+            yield from self.read(dut.port, [self.row_words])
+            results["perf"] = (yield from self.read_counters(dut.perf))
+            results["port"] = (yield from self.read_counters(dut.port_perf))
+
+        run_simulation(dut, generator())
+        perf = results["perf"]
+        self.assertEqual(perf["bank0_row_hits"],      15)
+        self.assertEqual(perf["bank0_row_misses"],     1)
+        self.assertEqual(perf["bank0_row_conflicts"],  1)
+        self.assertEqual(perf["bank0_activates"],      2)
+        self.assertEqual(perf["bank0_precharges"],     1)
+        self.assertEqual(perf["bank1_activates"],      0)
+        self.assertEqual(perf["refreshes"],            0)
+        self.assertGreater(perf["cycles"], 64)
+
+        port = results["port"]
+        self.assertEqual(port["reads"],  17)
+        self.assertEqual(port["writes"],  0)
+        self.assertGreater(port["cycles"], perf["cycles"])
+        histogram = [port["read_latency{}".format(n)] for n in range(8)]
+        self.assertGreaterEqual(sum(histogram), 2)
+        self.assertLessEqual(sum(histogram), 17)
+        # Row conflict read: at least tRP + tRCD + read latency.
+        self.assertEqual(sum(histogram[:2]), 0)
+
+    def test_refresh_counters(self):
+        dut = PerfCountersDUT()
+        results = {}
+
+        def generator():
+            # Random bank/row reads during more than 2 tREFI.
+            addresses = [(n*0x9e3779b1) % (2**16) for n in range(512)]
+            yield from self.read(dut.port, addresses)
+            results["perf"] = (yield from self.read_counters(dut.perf))
+
+        run_simulation(dut, generator())
+        perf = results["perf"]
+        self.assertGreaterEqual(perf["refreshes"], 2)
+        self.assertGreater(perf["refresh_stall_cycles"], 0)
+        for n in range(8):
+            self.assertEqual(perf["bank{}_activates".format(n)],
+                perf["bank{}_row_misses".format(n)] + perf["bank{}_row_conflicts".format(n)])
+        self.assertEqual(sum(perf["bank{}_{}".format(n, name)] for n in range(8)
+            for name in ["row_hits", "row_misses", "row_conflicts"]), 512)
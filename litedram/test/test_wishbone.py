@@ -11,22 +11,29 @@ from migen import *
 from litex.gen.sim import run_simulation
 from litex.soc.interconnect import wishbone
 
-from litedram.frontend.wishbone import LiteDRAMWishbone2Native
+from litedram.frontend.wishbone import LiteDRAMWishbone2Native, LiteDRAMWishboneCache
 from litedram.common import LiteDRAMNativePort
 
 from test.common import DRAMMemory, MemoryTestDataMixin
 
 
 class TestWishbone(MemoryTestDataMixin, unittest.TestCase):
-    def wishbone_readback_test(self, pattern, mem_expected, wishbone, port, base_address=0):
+    def wishbone_readback_test(self, pattern, mem_expected, wishbone, port, base_address=0, cache=None):
         class DUT(Module):
             def __init__(self):
                 self.port = port
                 self.wb   = wishbone
-                self.submodules += LiteDRAMWishbone2Native(
-                    wishbone     = self.wb,
-                    port         = self.port,
-                    base_address = base_address)
+                if cache is None:
+                    self.submodules.bridge = LiteDRAMWishbone2Native(
+                        wishbone     = self.wb,
+                        port         = self.port,
+                        base_address = base_address)
+                else:
+                    self.submodules.bridge = LiteDRAMWishboneCache(
+                        wishbone     = self.wb,
+                        port         = self.port,
+                        base_address = base_address,
+                        **cache)
                 self.mem = DRAMMemory(port.data_width, len(mem_expected))
 
         def main_generator(dut):
@@ -34,6 +41,14 @@ class TestWishbone(MemoryTestDataMixin, unittest.TestCase):
                 yield from dut.wb.write(adr, data)
                 data_r = (yield from dut.wb.read(adr))
                 self.assertEqual(data_r, data)
+            if cache is not None:
+                # Write back the lines and check that the data is still read back from DRAM.
+                yield from dut.bridge._flush.write(1)
+                for _ in range(64):
+                    yield
+                for adr, data in pattern:
+                    data_r = (yield from dut.wb.read(adr))
+                    self.assertEqual(data_r, data)
 
         dut = DUT()
         generators = [
@@ -134,3 +149,104 @@ class TestWishbone(MemoryTestDataMixin, unittest.TestCase):
         origin  = 0x10000000
         pattern = [(adr + origin//(32//8), data) for adr, data in data["pattern"]]
         self.wishbone_readback_test(pattern, data["expected"], wb, port, base_address=origin)
+
+    def test_wishbone_cache_32bit(self):
+        # Verify Wishbone cache with 32-bit data width (one Wishbone word per line).
+        data = self.pattern_test_data["32bit"]
+        wb   = wishbone.Interface(adr_width=30, data_width=32)
+        port = LiteDRAMNativePort("both", address_width=30, data_width=32)
+        self.wishbone_readback_test(data["pattern"], data["expected"], wb, port, cache={})
+
+    def test_wishbone_cache_32bit_to_128bit(self):
+        # Verify Wishbone cache with 32-bit data width and 128-bit port.
+        data = self.pattern_test_data["32bit_to_128bit"]
+        wb   = wishbone.Interface(adr_width=30, data_width=32)
+        port = LiteDRAMNativePort("both", address_width=30, data_width=128)
+        self.wishbone_readback_test(data["pattern"], data["expected"], wb, port, cache={})
+
+    def test_wishbone_cache_32bit_to_256bit_no_prefetch(self):
+        # Verify Wishbone cache with 32-bit data width, 256-bit port and no prefetch.
+        data = self.pattern_test_data["32bit_to_256bit"]
+        wb   = wishbone.Interface(adr_width=30, data_width=32)
+        port = LiteDRAMNativePort("both", address_width=30, data_width=256)
+        self.wishbone_readback_test(data["pattern"], data["expected"], wb, port,
+            cache=dict(nlines=2, prefetch=False))
+
+    def test_wishbone_cache_32bit_base_address(self):
+        # Verify Wishbone cache with 32-bit data width, 128-bit port and non-zero base address.
+        data    = self.pattern_test_data["32bit_to_128bit"]
+        wb      = wishbone.Interface(adr_width=30, data_width=32)
+        port    = LiteDRAMNativePort("both", address_width=30, data_width=128)
+        origin  = 0x10000000
+        pattern = [(adr + origin//(32//8), data) for adr, data in data["pattern"]]
+        self.wishbone_readback_test(pattern, data["expected"], wb, port, base_address=origin, cache={})
+
+    def wishbone_cache_test(self, generator, mem_depth=64, nlines=4, prefetch=True):
+        wb    = wishbone.Interface(adr_width=30, data_width=32)
+        port  = LiteDRAMNativePort("both", address_width=30, data_width=128)
+        dut   = LiteDRAMWishboneCache(wb, port, nlines=nlines, prefetch=prefetch)
+        mem   = DRAMMemory(128, mem_depth, init=[sum((4*n + i) << 32*i for i in range(4))
+            for n in range(mem_depth)])
+        cmds  = []
+
+        @passive
+        def cmd_monitor():
+            while True:
+                if (yield port.cmd.valid) and (yield port.cmd.ready):
+                    cmds.append(("write" if (yield port.cmd.we) else "read", (yield port.cmd.addr)))
+                yield
+
+        run_simulation(dut, [generator(dut, wb), cmd_monitor(),
+            mem.write_handler(port), mem.read_handler(port)])
+        return mem, cmds
+
+    def test_wishbone_cache_write_combining(self):
+        # Verify that writes to a line (with byte enables) are combined in a single port write.
+        def generator(dut, wb):
+            yield from wb.write(0x10, 0xaaaaaaaa)
+            yield from wb.write(0x11, 0x0000bb00, sel=0b0010)
+            yield from wb.write(0x13, 0xcccccccc)
+            yield from wb.write(0x13, 0xdd000000, sel=0b1000)
+            self.assertEqual((yield from dut._write_misses.read()), 1)
+            self.assertEqual((yield from dut._write_hits.read()), 3)
+            # Reads of the line first write back the written bytes.
+            self.assertEqual((yield from wb.read(0x12)), 0x12)
+            self.assertEqual((yield from wb.read(0x11)), 0x0000bb11)
+            self.assertEqual((yield from wb.read(0x13)), 0xddcccccc)
+        mem, cmds = self.wishbone_cache_test(generator)
+        self.assertEqual(cmds, [("write", 4), ("read", 4), ("read", 5)])
+        self.assertEqual(mem.mem[4], 0xddcccccc_00000012_0000bb11_aaaaaaaa)
+        self.assertEqual(mem.mem[5], sum((4*5 + i) << 32*i for i in range(4)))
+
+    def test_wishbone_cache_prefetch(self):
+        # Verify that sequential reads read the next line from the port on misses.
+        def generator(dut, wb):
+            for adr in range(32):
+                self.assertEqual((yield from wb.read(adr)), adr)
+            self.assertEqual((yield from dut._read_misses.read()), 4)
+            self.assertEqual((yield from dut._read_hits.read()), 32 - 4)
+        mem, cmds = self.wishbone_cache_test(generator)
+        self.assertEqual(cmds, [("read", n) for n in range(8)])
+
+    def test_wishbone_cache_flush(self):
+        # Verify that flush writes back the dirty lines only once and invalidates the lines.
+        def generator(dut, wb):
+            for adr in range(0, 24, 4):
+                yield from wb.write(adr, 0x1000 + adr)
+            self.assertEqual((yield from wb.read(0x21)), 0x21)
+            yield dut.flush.eq(1)
+            yield
+            yield dut.flush.eq(0)
+            for _ in range(64):
+                yield
+            self.assertEqual((yield from wb.read(0x20)), 0x20)
+        mem, cmds = self.wishbone_cache_test(generator)
+        # 6 lines written with 4 lines: 2 write backs on replacement, then 1 for the read miss.
+        self.assertEqual(cmds[:4], [
+            ("write", 0), ("write", 1), # Replacements.
+            ("write", 2), ("read", 8),  # Read miss (next line not prefetched: dirty victim).
+        ])
+        self.assertEqual(sorted(cmds[4:7]), [("write", 3), ("write", 4), ("write", 5)]) # Flush.
+        self.assertEqual(cmds[7:], [("read", 8), ("read", 9)])
+        for n in range(6):
+            self.assertEqual(mem.mem[n] & 0xffffffff, 0x1000 + 4*n)
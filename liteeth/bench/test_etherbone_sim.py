@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of LiteEth
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+# LiteEth Etherbone simulation throughput benchmark.
+
+# Simulates the Etherbone record receiver, Wishbone master and record sender with a Wishbone SRAM
+# and reports the write/read throughput of the Etherbone core (records of `--burst-size` words fed
+# at one word per cycle), to compare with the Ethernet link rate. Records are buffered entirely in
+# the receiver/sender, so `--buffer-depth` has to be larger than `--burst-size`.
+
+import argparse
+
+from migen import *
+
+from litex.gen.sim import run_simulation, passive
+from litex.soc.interconnect import wishbone
+
+from liteeth.frontend.etherbone import LiteEthEtherboneRecordReceiver, LiteEthEtherboneRecordSender
+from liteeth.frontend.etherbone import LiteEthEtherboneWishboneMaster
+
+# Constants ----------------------------------------------------------------------------------------
+
+KiB = 1024
+MiB = 1024*KiB
+
+# Etherbone Core -----------------------------------------------------------------------------------
+
+class EtherboneSim(Module):
+    def __init__(self, pipelined=False, buffer_depth=16):
+        self.submodules.receiver = LiteEthEtherboneRecordReceiver(buffer_depth)
+        self.submodules.master   = LiteEthEtherboneWishboneMaster(pipelined=pipelined)
+        self.submodules.sender   = LiteEthEtherboneRecordSender(buffer_depth)
+        self.submodules.sram     = wishbone.SRAM(4096, bus=self.master.bus)
+        self.comb += [
+            self.receiver.source.connect(self.master.sink),
+            self.master.source.connect(self.sender.sink),
+        ]
+
+# Speed Test ---------------------------------------------------------------------------------------
+
+def speed_test(pipelined, burst_size, nrecords, buffer_depth):
+    dut     = EtherboneSim(pipelined, buffer_depth)
+    sink    = dut.receiver.sink
+    source  = dut.sender.source
+    results = {}
+
+    def send_record(wcount, rcount, words):
+        for i, data in enumerate(words):
+            yield sink.valid.eq(1)
+            yield sink.last.eq(i == len(words) - 1)
+            yield sink.byte_enable.eq(0xf)
+            yield sink.wcount.eq(wcount)
+            yield sink.rcount.eq(rcount)
+            yield sink.data.eq(data)
+            yield
+            while not (yield sink.ready):
+                yield
+        yield sink.valid.eq(0)
+
+    def generator():
+        # Writes: base address + datas.
+        start = cycles[0]
+        for n in range(nrecords):
+            yield from send_record(burst_size, 0, [0] + list(range(burst_size)))
+        while writes[0] < nrecords*burst_size:
+            yield
+        results["write"] = cycles[0] - start
+        # Reads: base return address + addresses; wait for all the read records to be sent back.
+        start = cycles[0]
+        for n in range(nrecords):
+            yield from send_record(0, burst_size, [0] + [4*i for i in range(burst_size)])
+        while sent[0] < nrecords:
+            yield
+        results["read"] = cycles[0] - start
+
+    cycles = [0]
+    writes = [0]
+    sent   = [0]
+
+    @passive
+    def counter():
+        bus = dut.master.bus
+        while True:
+            if (yield bus.stb) and (yield bus.ack) and (yield bus.we):
+                writes[0] += 1
+            cycles[0] += 1
+            yield
+
+    @passive
+    def receiver():
+        yield source.ready.eq(1)
+        while True:
+            if (yield source.valid) and (yield source.last):
+                sent[0] += 1
+            yield
+
+    run_simulation(dut, [generator(), counter(), receiver()])
+    return results
+
+# Run ----------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="LiteEth Etherbone simulation throughput benchmark")
+    parser.add_argument("--sys-clk-freq", default=125e6, type=float, help="System clock frequency")
+    parser.add_argument("--burst-size",   default=128,   type=int,   help="Words per record (1-255)")
+    parser.add_argument("--records",      default=4,     type=int,   help="Number of records")
+    parser.add_argument("--buffer-depth", default=256,   type=int,   help="Record buffers depth")
+    args = parser.parse_args()
+
+    assert args.burst_size < args.buffer_depth
+
+    size = 4*args.burst_size*args.records
+    print("{:<10} {:<6} {:>8} {:>10}".format("Master", "Test", "Cycles", "MiB/s"))
+    for pipelined in [False, True]:
+        results = speed_test(pipelined, args.burst_size, args.records, args.buffer_depth)
+        for test in ["write", "read"]:
+            print("{:<10} {:<6} {:>8} {:>10.2f}".format(
+                {False: "classic", True: "pipelined"}[pipelined], test, results[test],
+                size*args.sys_clk_freq/(results[test]*MiB)))
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,7 @@ from litex.soc.interconnect.packet import Header, HeaderField
 # Ethernet Constants -------------------------------------------------------------------------------
 
 eth_mtu              = 1530
+eth_jumbo_mtu        = 9030 # 9000 bytes payload.
 eth_min_frame_length = 64
 eth_fcs_length       = 4
 eth_interpacket_gap  = 12
@@ -164,6 +165,10 @@ def convert_ip(s):
     else:
         return s
 
+def udp_max_payload_length(mtu=eth_mtu):
+    # eth_mtu: 1500 bytes IP packets + 30 bytes of Ethernet overhead.
+    return mtu - (eth_mtu - 1500) - ipv4_header_length - udp_header_length
+
 # Stream Layouts -----------------------------------------------------------------------------------
 
 # PHY
@@ -217,7 +222,8 @@ def eth_ipv4_user_description(dw):
     param_layout = [
         ("length",     16),
         ("protocol",    8),
-        ("ip_address", 32)
+        ("ip_address", 32),
+        ("target_ip",  32)  # RX only: destination IP address of the received packet.
     ]
     payload_layout = [
         ("data",       dw),
@@ -302,6 +308,14 @@ def eth_etherbone_record_description(dw):
     ]
     return EndpointDescription(payload_layout, param_layout)
 
+def eth_etherbone_replies_description():
+    payload_layout = [
+        ("count",      16),
+        ("length",     16),
+        ("ip_address", 32)
+    ]
+    return EndpointDescription(payload_layout)
+
 def eth_etherbone_mmap_description(dw):
     param_layout = [
         ("we",            1),
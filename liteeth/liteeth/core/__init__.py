@@ -27,6 +27,7 @@ class LiteEthIPCore(LiteXModule):
         rx_cdc_buffered   = True,
         interface         = "crossbar",
         endianness        = "big",
+        mtu               = eth_mtu,
     ):
         # Parameters.
         # -----------
@@ -45,7 +46,8 @@ class LiteEthIPCore(LiteXModule):
             tx_cdc_depth      = tx_cdc_depth,
             tx_cdc_buffered   = tx_cdc_buffered,
             rx_cdc_depth      = rx_cdc_depth,
-            rx_cdc_buffered   = rx_cdc_buffered
+            rx_cdc_buffered   = rx_cdc_buffered,
+            mtu               = mtu,
         )
 
         # ARP.
@@ -92,6 +94,8 @@ class LiteEthUDPIPCore(LiteEthIPCore):
         rx_cdc_buffered   = True,
         interface         = "crossbar",
         endianness        = "big",
+        mtu               = eth_mtu,
+        with_udp_checksum = False,
     ):
         # Parameters.
         # -----------
@@ -116,11 +120,14 @@ class LiteEthUDPIPCore(LiteEthIPCore):
             tx_cdc_buffered   = tx_cdc_buffered,
             rx_cdc_depth      = rx_cdc_depth,
             rx_cdc_buffered   = rx_cdc_buffered,
+            mtu               = mtu,
         )
         # UDP.
         # ----
         self.udp = LiteEthUDP(
-            ip         = self.ip,
-            ip_address = ip_address,
-            dw         = dw,
+            ip            = self.ip,
+            ip_address    = ip_address,
+            dw            = dw,
+            with_checksum = with_udp_checksum,
+            mtu           = mtu,
         )
@@ -4,6 +4,9 @@
 # Copyright (c) 2015-2023 Florent Kermarrec <florent@enjoy-digital.fr>
 # SPDX-License-Identifier: BSD-2-Clause
 
+from functools import reduce
+from operator import or_, xor
+
 from litex.gen import *
 from litex.gen.genlib.misc import WaitTimer
 
@@ -155,7 +158,15 @@ class LiteEthARPRX(LiteXModule):
 # ARP Cache ----------------------------------------------------------------------------------------
 
 class LiteEthARPCache(LiteXModule):
-    def __init__(self, entries, clk_freq):
+    """Set-associative ARP cache
+
+    Entries are organized in sets of `ways` entries, the set of an IP address being selected by a
+    hash (XOR folding) of the address. Requests and updates read the set and compare its ways in
+    parallel, so they take a constant number of cycles whatever the number of entries. An update of
+    an IP address that is not cached replaces the first invalid way of the set or its Least
+    Recently Used way. `hits`/`misses` count the request hits/misses.
+    """
+    def __init__(self, entries, clk_freq, ways=4):
         # Update interface.
         self.update = stream.Endpoint([("ip_address", 32), ("mac_address", 48)])
 
@@ -167,42 +178,95 @@ class LiteEthARPCache(LiteXModule):
         self.enable       = Signal(reset=1)
         self.clear_enable = Signal(reset=1)
 
+        # Counters.
+        self.hits   = Signal(32)
+        self.misses = Signal(32)
+
         # # #
 
         # Parameters.
-        entries = max(entries, 2) # Minimal number of entries is 2.
+        entries  = max(entries, 2) # Minimal number of entries is 2.
+        ways     = min(ways, entries)
+        sets     = 2**log2_int((entries + ways - 1)//ways, need_pow2=False)
+        set_bits = log2_int(sets)
+        way_bits = bits_for(ways - 1)
+        depth    = max(sets, 2) # Minimal Memory depth is 2.
+        self.sets, self.ways = sets, ways
 
         # Signals.
-        update_count = Signal(max=entries)
-        search_count = Signal(max=entries)
-        error        = Signal()
-
-        # Memory
-        mem_width   = 32 + 48 + 1 # IP + MAC + Valid.
-        mem         = Memory(mem_width, entries)
-        mem_wr_port = mem.get_port(write_capable=True)
-        mem_rd_port = mem.get_port(async_read=True) # FIXME: Avoid async_read.
-        self.specials += mem, mem_wr_port, mem_rd_port
-
-        # Memory wr_port aliases.
-        mem_wr_port_valid       = Signal()
-        mem_wr_port_ip_address  = Signal(32)
-        mem_wr_port_mac_address = Signal(48)
+        clear       = Signal()
+        clear_count = Signal(max=max(sets, 2))
+        ip_address  = Signal(32)
+        set_index   = Signal(max(set_bits, 1))
+        adr         = Signal(max(set_bits, 1))
+        hit         = Signal()
+        hit_way     = Signal(way_bits)
+        hit_mac     = Signal(48)
+        victim_way  = Signal(way_bits)
+        write       = Signal()
+        touch       = Signal()
+        touch_way   = Signal(way_bits)
+        mac_address = Signal(48, reset_less=True)
+        error       = Signal()
+
+        # Set index: IP address hash (XOR folding).
+        if set_bits:
+            self.comb += set_index.eq(reduce(xor, [ip_address[i:i + set_bits] for i in range(0, 32, set_bits)]))
+        self.comb += adr.eq(Mux(clear, clear_count, set_index))
+
+        # Ways Memories (IP + MAC + Valid), read/compared in parallel.
+        mem_width = 32 + 48 + 1 # IP + MAC + Valid.
+        way_hits  = []
+        for way in range(ways):
+            mem         = Memory(mem_width, depth)
+            mem_wr_port = mem.get_port(write_capable=True)
+            mem_rd_port = mem.get_port()
+            self.specials += mem, mem_wr_port, mem_rd_port
+
+            mem_rd_port_valid       = mem_rd_port.dat_r[80]
+            mem_rd_port_ip_address  = mem_rd_port.dat_r[0:32]
+            mem_rd_port_mac_address = mem_rd_port.dat_r[32:80]
+            way_hit = Signal()
+            self.comb += [
+                mem_rd_port.adr.eq(adr),
+                mem_wr_port.adr.eq(adr),
+                mem_wr_port.we.eq(clear | (write & (touch_way == way))),
+                mem_wr_port.dat_w[80].eq(~clear),
+                mem_wr_port.dat_w[0:32].eq(self.update.ip_address),
+                mem_wr_port.dat_w[32:80].eq(self.update.mac_address),
+                way_hit.eq(mem_rd_port_valid & (mem_rd_port_ip_address == ip_address)),
+                If(way_hit,
+                    hit_way.eq(way),
+                    hit_mac.eq(mem_rd_port_mac_address)
+                )
+            ]
+            way_hits.append((way_hit, mem_rd_port_valid))
+        self.comb += hit.eq(reduce(or_, [way_hit for way_hit, _ in way_hits]))
+
+        # LRU Memory: order of the ways (Most Recently Used first) of each set.
+        lru_reset       = sum(way << way_bits*way for way in range(ways))
+        lru_mem         = Memory(way_bits*ways, depth, init=[lru_reset]*depth)
+        lru_mem_wr_port = lru_mem.get_port(write_capable=True)
+        lru_mem_rd_port = lru_mem.get_port()
+        self.specials += lru_mem, lru_mem_wr_port, lru_mem_rd_port
+        order     = [lru_mem_rd_port.dat_r[way_bits*i:way_bits*(i + 1)] for i in range(ways)]
+        new_order = [touch_way]
+        for i in range(1, ways):
+            # Ways before touch_way are shifted by one, ways after touch_way are kept.
+            after_touch_way = reduce(or_, [order[j] == touch_way for j in range(i)])
+            new_order.append(Mux(after_touch_way, order[i], order[i - 1]))
         self.comb += [
-            mem_wr_port.dat_w[80].eq(mem_wr_port_valid),
-            mem_wr_port.dat_w[0:32].eq(mem_wr_port_ip_address),
-            mem_wr_port.dat_w[32:80].eq(mem_wr_port_mac_address),
+            lru_mem_rd_port.adr.eq(adr),
+            lru_mem_wr_port.adr.eq(adr),
+            lru_mem_wr_port.we.eq(clear | touch),
+            lru_mem_wr_port.dat_w.eq(Mux(clear, lru_reset, Cat(*new_order))),
         ]
 
-        # Memory rd_port aliases.
-        mem_rd_port_valid       = Signal()
-        mem_rd_port_ip_address  = Signal(32)
-        mem_rd_port_mac_address = Signal(48)
-        self.comb += [
-            mem_rd_port_valid.eq(mem_rd_port.dat_r[80]),
-            mem_rd_port_ip_address.eq(mem_rd_port.dat_r[0:32]),
-            mem_rd_port_mac_address.eq(mem_rd_port.dat_r[32:80]),
-        ]
+        # Victim: first invalid way, else LRU way.
+        self.comb += victim_way.eq(order[ways - 1])
+        for way, (_, valid) in reversed(list(enumerate(way_hits))):
+            self.comb += If(~valid, victim_way.eq(way))
+        self.comb += touch_way.eq(Mux(hit, hit_way, victim_way))
 
         # Clear Timer to clear table every 1s.
         self.clear_timer = WaitTimer(1e-0*clk_freq)
@@ -210,67 +274,58 @@ class LiteEthARPCache(LiteXModule):
         # FSM.
         self.fsm = fsm = FSM(reset_state="CLEAR")
         fsm.act("CLEAR",
-            mem_wr_port.we.eq(1),
-            mem_wr_port.adr.eq(update_count),
-            mem_wr_port_valid.eq(0),
-            NextValue(update_count, update_count + 1),
-            If(update_count == (entries - 1),
-                NextValue(update_count, 0),
+            clear.eq(1),
+            NextValue(clear_count, clear_count + 1),
+            If(clear_count == (sets - 1),
+                NextValue(clear_count, 0),
                 NextState("IDLE")
             )
         )
         fsm.act("IDLE",
+            ip_address.eq(self.update.ip_address),
             If(self.enable & self.update.valid,
                 NextState("MEM_UPDATE")
             ),
             If(self.enable & self.request.valid,
-                NextValue(search_count, 0),
+                ip_address.eq(self.request.ip_address),
                 NextState("MEM_SEARCH")
             ),
             self.clear_timer.wait.eq(self.clear_enable),
             If(self.clear_timer.done,
-                NextValue(update_count, 0),
                 NextState("CLEAR")
             )
         )
         fsm.act("MEM_UPDATE",
-            mem_wr_port.we.eq(1),
-            mem_wr_port.adr.eq(update_count),
-            mem_wr_port_valid.eq(1),
-            mem_wr_port_ip_address.eq( self.update.ip_address),
-            mem_wr_port_mac_address.eq(self.update.mac_address),
+            ip_address.eq(self.update.ip_address),
+            write.eq(1),
+            touch.eq(1),
             self.update.ready.eq(1),
-            If(update_count == (entries - 1),
-                NextValue(update_count, 0)
-            ).Else(
-                NextValue(update_count, update_count + 1)
-            ),
             NextState("IDLE")
         )
         fsm.act("MEM_SEARCH",
-           mem_rd_port.adr.eq(search_count),
-           If(mem_rd_port_valid & (mem_rd_port_ip_address == self.request.ip_address),
-               NextValue(error, 0),
-               NextState("RESPONSE")
-           ).Elif(search_count == (entries - 1),
-               NextValue(error, 1),
-               NextState("RESPONSE")
-           ).Else(
-               NextValue(search_count, search_count + 1)
-           )
+            ip_address.eq(self.request.ip_address),
+            touch.eq(hit),
+            NextValue(mac_address, hit_mac),
+            NextValue(error, ~hit),
+            If(hit,
+                NextValue(self.hits, self.hits + 1)
+            ).Else(
+                NextValue(self.misses, self.misses + 1)
+            ),
+            NextState("RESPONSE")
         )
         fsm.act("RESPONSE",
            self.request.ready.eq(1),
            self.response.valid.eq(1),
            self.response.error.eq(error),
-           self.response.mac_address.eq(mem_rd_port_mac_address),
+           self.response.mac_address.eq(mac_address),
            NextState("IDLE")
        )
 
 # ARP Table ----------------------------------------------------------------------------------------
 
 class LiteEthARPTable(LiteXModule):
-    def __init__(self, clk_freq, entries=1, max_requests=8):
+    def __init__(self, clk_freq, entries=1, max_requests=8, ways=4):
         self.sink   = sink   = stream.Endpoint(_arp_table_layout)  # from arp_rx
         self.source = source = stream.Endpoint(_arp_table_layout)  # to arp_tx
 
@@ -287,7 +342,7 @@ class LiteEthARPTable(LiteXModule):
         self.request_timer = WaitTimer(100e-3*clk_freq)
         self.comb += self.request_timer.wait.eq(request_pending & ~self.request_timer.done)
 
-        self.cache = cache = LiteEthARPCache(entries=entries, clk_freq=clk_freq)
+        self.cache = cache = LiteEthARPCache(entries=entries, clk_freq=clk_freq, ways=ways)
 
         self.fsm = fsm = FSM(reset_state="IDLE")
         fsm.act("IDLE",
@@ -372,10 +427,10 @@ class LiteEthARPTable(LiteXModule):
 # ARP ----------------------------------------------------------------------------------------------
 
 class LiteEthARP(LiteXModule):
-    def __init__(self, mac, mac_address, ip_address, clk_freq, entries=1, dw=8):
+    def __init__(self, mac, mac_address, ip_address, clk_freq, entries=1, dw=8, ways=4):
         self.tx    = tx    = LiteEthARPTX(mac_address, ip_address, dw)
         self.rx    = rx    = LiteEthARPRX(mac_address, ip_address, dw)
-        self.table = table = LiteEthARPTable(clk_freq, entries=entries)
+        self.table = table = LiteEthARPTable(clk_freq, entries=entries, ways=ways)
         self.comb += [
             rx.source.connect(table.sink),
             table.source.connect(tx.sink)
@@ -243,6 +243,7 @@ class LiteEthIPRX(LiteXModule):
                 "last_be"}),
             source.length.eq(depacketizer.source.total_length - ipv4_header_length),
             source.ip_address.eq(depacketizer.source.sender_ip),
+            source.target_ip.eq(depacketizer.source.target_ip),
         ]
         fsm.act("RECEIVE",
             depacketizer.source.connect(source, keep={"valid", "ready"}),
@@ -4,9 +4,14 @@
 # Copyright (c) 2015-2023 Florent Kermarrec <florent@enjoy-digital.fr>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import math
+from functools import reduce
+from operator import add
+
 from litex.gen import *
 
 from litex.soc.interconnect import stream
+from litex.soc.interconnect.packet import PacketFIFO
 
 from liteeth.common import *
 from liteeth.crossbar import LiteEthCrossbar
@@ -92,6 +97,67 @@ class LiteEthUDPCrossbar(LiteEthCrossbar):
 
         return user_port
 
+# UDP Checksum -------------------------------------------------------------------------------------
+
+class LiteEthUDPChecksum(LiteXModule):
+    """Streaming UDP checksum
+
+    Accumulates the 16-bit words of the payload on `ce` (bytes masked with `last_be` on `last`) and
+    computes combinatorially, including the current data, the ones' complement checksum of the
+    pseudo-header, header and payload: `value` (`checksum` set to 0 on TX) is the checksum to
+    insert, or 0 when the checksum of a received packet (`checksum` set to the received one) is
+    valid. The accumulator is cleared after `last`.
+    """
+    def __init__(self, dw=8):
+        self.ce       = Signal()
+        self.data     = Signal(dw)
+        self.last     = Signal()
+        self.last_be  = Signal(dw//8)
+        self.src_ip   = Signal(32)
+        self.dst_ip   = Signal(32)
+        self.src_port = Signal(16)
+        self.dst_port = Signal(16)
+        self.length   = Signal(16) # UDP length (header + payload).
+        self.checksum = Signal(16)
+        self.value    = Signal(16)
+
+        # # #
+
+        # Mask bytes after last_be.
+        data = Signal(dw)
+        for i in range(dw//8):
+            self.comb += If(~self.last | (self.last_be == 0) | (self.last_be[i:] != 0),
+                data[8*i:8*(i+1)].eq(self.data[8*i:8*(i+1)])
+            )
+
+        # Payload words (Big Endian 16-bit words, first byte in LSBs).
+        if dw == 8:
+            odd = Signal()
+            self.sync += If(self.ce, odd.eq(~odd & ~self.last))
+            words = [Mux(odd, data, Cat(Constant(0, 8), data))]
+        else:
+            words = [Cat(data[16*i+8:16*i+16], data[16*i:16*i+8]) for i in range(dw//16)]
+
+        # Accumulator (payloads up to 64KB: no overflow on 32-bit).
+        accumulator      = Signal(32)
+        accumulator_next = Signal(32)
+        self.comb += accumulator_next.eq(accumulator + reduce(add, words))
+        self.sync += If(self.ce, accumulator.eq(Mux(self.last, 0, accumulator_next)))
+
+        # Pseudo-Header / Header / Fold.
+        total = Signal(32)
+        fold  = Signal(17)
+        self.comb += [
+            total.eq(accumulator_next +
+                self.src_ip[16:] + self.src_ip[:16] +
+                self.dst_ip[16:] + self.dst_ip[:16] +
+                udp_protocol + self.length +
+                self.src_port + self.dst_port + self.length +
+                self.checksum),
+            fold.eq(total[:16] + total[16:]),
+            self.value.eq(~(fold[:16] + fold[16])),
+        ]
+
 # UDP TX -------------------------------------------------------------------------------------------
 
 class LiteEthUDPPacketizer(Packetizer):
@@ -104,12 +170,84 @@ class LiteEthUDPPacketizer(Packetizer):
 
 
 class LiteEthUDPTX(LiteXModule):
-    def __init__(self, ip_address, dw=8):
+    def __init__(self, ip_address, dw=8, with_checksum=False, mtu=eth_mtu):
         self.sink   = sink   = stream.Endpoint(eth_udp_user_description(dw))
         self.source = source = stream.Endpoint(eth_ipv4_user_description(dw))
 
         # # #
 
+        # Checksum (Optional).
+        # The checksum is in the header: packets (up to the MTU) are buffered while it is computed.
+        # Packets larger than the MTU can't be buffered and packets with a payload longer than their
+        # length are invalid: they are dropped and counted in oversize_errors.
+        if with_checksum:
+            depth = math.ceil(mtu/(dw//8))
+            self.oversize_errors = Signal(32)
+            self.checksum = checksum = LiteEthUDPChecksum(dw)
+            self.buffer   = buffer   = PacketFIFO(
+                layout = EndpointDescription(
+                    payload_layout = eth_udp_user_description(dw).payload_layout,
+                    param_layout   = eth_udp_user_description(dw).param_layout + [("checksum", 16), ("drop", 1)],
+                ),
+                payload_depth = depth,
+                param_depth   = 2,
+                buffered      = True
+            )
+            count = Signal(max=depth)
+            beats = Signal(16)
+            self.comb += beats.eq((sink.length + (dw//8 - 1)) >> log2_int(dw//8))
+            self.buffer_fsm = buffer_fsm = FSM(reset_state="COPY")
+            buffer_fsm.act("COPY",
+                If(sink.valid & (count == 0) & (sink.length > mtu),
+                    NextState("DROP")
+                ).Else(
+                    sink.connect(buffer.sink),
+                    If(((count + 1) >= beats) & ~sink.last,
+                        # Payload longer than the length: end the buffered packet and drop it.
+                        buffer.sink.last.eq(1),
+                        buffer.sink.drop.eq(1),
+                    ),
+                    If(buffer.sink.valid & buffer.sink.ready,
+                        NextValue(count, count + 1),
+                        If(buffer.sink.last,
+                            NextValue(count, 0),
+                            If(~sink.last,
+                                NextState("DROP")
+                            )
+                        )
+                    )
+                )
+            )
+            buffer_fsm.act("DROP",
+                sink.ready.eq(1),
+                If(sink.valid & sink.last,
+                    NextValue(self.oversize_errors, self.oversize_errors + 1),
+                    NextState("COPY")
+                )
+            )
+            self.comb += [
+                checksum.ce.eq(buffer.sink.valid & buffer.sink.ready),
+                checksum.data.eq(buffer.sink.data),
+                checksum.last.eq(buffer.sink.last),
+                checksum.last_be.eq(buffer.sink.last_be),
+                checksum.src_ip.eq(ip_address),
+                checksum.dst_ip.eq(sink.ip_address),
+                checksum.src_port.eq(sink.src_port),
+                checksum.dst_port.eq(sink.dst_port),
+                checksum.length.eq(sink.length + udp_header.length),
+                # A computed checksum of 0 is transmitted as all ones (0 means no checksum).
+                buffer.sink.checksum.eq(Mux(checksum.value == 0, 0xffff, checksum.value)),
+            ]
+            self.buffer_source = buffer_source = stream.Endpoint(buffer.source.description)
+            self.comb += [
+                buffer.source.connect(buffer_source),
+                If(buffer.source.drop,
+                    buffer_source.valid.eq(0),
+                    buffer.source.ready.eq(1),
+                )
+            ]
+            sink = buffer_source
+
         # Packetizer.
         self.packetizer = packetizer = LiteEthUDPPacketizer(dw=dw)
 
@@ -124,8 +262,11 @@ class LiteEthUDPTX(LiteXModule):
                 "dst_port",
                 "data"}),
             packetizer.sink.length.eq(sink.length + udp_header.length),
-            packetizer.sink.checksum.eq(0), # UDP Checksum is not used, we only rely on MAC CRC.
         ]
+        if with_checksum:
+            self.comb += packetizer.sink.checksum.eq(sink.checksum)
+        else:
+            self.comb += packetizer.sink.checksum.eq(0) # UDP Checksum is not used, we only rely on MAC CRC.
 
         # Control-Path (FSM).
         self.fsm = fsm = FSM(reset_state="IDLE")
@@ -158,7 +299,7 @@ class LiteEthUDPDepacketizer(Depacketizer):
 
 
 class LiteEthUDPRX(LiteXModule):
-    def __init__(self, ip_address, dw=8):
+    def __init__(self, ip_address, dw=8, with_checksum=False):
         self.sink   = sink   = stream.Endpoint(eth_ipv4_user_description(dw))
         self.source = source = stream.Endpoint(eth_udp_user_description(dw))
 
@@ -228,12 +369,41 @@ class LiteEthUDPRX(LiteXModule):
             )
         )
 
+        # Checksum (Optional).
+        # Verified on the fly: packets with an invalid checksum are flagged with error on last.
+        if with_checksum:
+            self.checksum_errors = Signal(32)
+            self.checksum = checksum = LiteEthUDPChecksum(dw)
+            self.comb += [
+                checksum.ce.eq(source.valid & source.ready),
+                checksum.data.eq(source.data),
+                checksum.last.eq(source.last),
+                checksum.last_be.eq(source.last_be),
+                checksum.src_ip.eq(sink.ip_address),
+                checksum.dst_ip.eq(sink.target_ip),
+                checksum.src_port.eq(source.src_port),
+                checksum.dst_port.eq(source.dst_port),
+                checksum.length.eq(depacketizer.source.length),
+                checksum.checksum.eq(depacketizer.source.checksum),
+            ]
+            # Checksums of 0 are not used.
+            checksum_error = Signal()
+            self.comb += [
+                checksum_error.eq((depacketizer.source.checksum != 0) & (checksum.value != 0)),
+                If(source.last & checksum_error,
+                    source.error.eq(2**(dw//8) - 1)
+                )
+            ]
+            self.sync += If(source.valid & source.ready & source.last & checksum_error,
+                self.checksum_errors.eq(self.checksum_errors + 1)
+            )
+
 # UDP ----------------------------------------------------------------------------------------------
 
 class LiteEthUDP(LiteXModule):
-    def __init__(self, ip, ip_address, dw=8):
-        self.tx = tx = LiteEthUDPTX(ip_address, dw)
-        self.rx = rx = LiteEthUDPRX(ip_address, dw)
+    def __init__(self, ip, ip_address, dw=8, with_checksum=False, mtu=eth_mtu):
+        self.tx = tx = LiteEthUDPTX(ip_address, dw, with_checksum, mtu)
+        self.rx = rx = LiteEthUDPRX(ip_address, dw, with_checksum)
         ip_port = ip.crossbar.get_port(udp_protocol, dw)
         self.comb += [
             tx.source.connect(ip_port.sink),
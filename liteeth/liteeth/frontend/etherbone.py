@@ -12,7 +12,7 @@ ethernet network. This re-implementation is meant to be run over ethernet
 and introduces some limitations:
 - no address spaces (rca/bca/wca/wff)
 - 32bits data and address
-- 1 record per frame
+- 1 record per frame (unless packet_buffer_depth is set, see LiteEthEtherboneRecord)
 """
 
 from litex.gen import *
@@ -194,6 +194,107 @@ class LiteEthEtherboneRecordDepacketizer(Depacketizer):
             etherbone_record_header)
 
 
+class LiteEthEtherboneRecordSplitter(LiteXModule):
+    """Splits Etherbone packets in records
+
+    Sets `last` at the end of each record of the packets (records without writes/reads are dropped)
+    and generates, at the end of each packet, the number of reply records (one per record with
+    reads) and the length of the reply packet on `replies`.
+    """
+    def __init__(self):
+        self.sink    = sink    = stream.Endpoint(eth_etherbone_packet_user_description(32))
+        self.source  = source  = stream.Endpoint(eth_etherbone_packet_user_description(32))
+        self.replies = replies = stream.Endpoint(eth_etherbone_replies_description())
+
+        # # #
+
+        header       = Signal(reset=1)
+        wcount       = Signal(8)
+        rcount       = Signal(8)
+        reads        = Signal()
+        empty        = Signal()
+        record_words = Signal(10, reset_less=True)
+        record_last  = Signal()
+        count        = Signal(16)
+        length       = Signal(16)
+
+        # Record header (from the packet's stream, not byte-reversed).
+        self.comb += [
+            wcount.eq(sink.data[16:24]),
+            rcount.eq(sink.data[24:32]),
+            reads.eq(header & (rcount != 0)),
+            empty.eq(header & (wcount == 0) & (rcount == 0)),
+            record_last.eq(~header & (record_words == 1)),
+        ]
+
+        # Records / Replies.
+        self.comb += [
+            sink.connect(source, omit={"valid", "ready", "last"}),
+            source.valid.eq(sink.valid & ~empty & (~sink.last | replies.ready)),
+            source.last.eq(sink.last | record_last),
+            replies.valid.eq(sink.valid & sink.last & (source.ready | empty)),
+            replies.count.eq(count + reads),
+            replies.length.eq(length + Mux(reads, etherbone_record_header.length + 4 + 4*rcount, 0)),
+            replies.ip_address.eq(sink.ip_address),
+            sink.ready.eq((source.ready | empty) & (~sink.last | replies.ready)),
+        ]
+        self.sync += [
+            If(sink.valid & sink.ready,
+                header.eq(empty | record_last),
+                If(header,
+                    record_words.eq(
+                        Mux(wcount != 0, wcount + 1, 0) +
+                        Mux(rcount != 0, rcount + 1, 0))
+                ).Else(
+                    record_words.eq(record_words - 1)
+                ),
+                count.eq(replies.count),
+                length.eq(replies.length),
+                If(sink.last,
+                    header.eq(1),
+                    count.eq(0),
+                    length.eq(0)
+                )
+            )
+        ]
+
+
+class LiteEthEtherboneRecordMerger(LiteXModule):
+    """Merges the reply records of each Etherbone packet in a single packet
+
+    Forwards, for each `replies` entry, `count` records as a single packet of `length` bytes.
+    """
+    def __init__(self):
+        self.sink    = sink    = stream.Endpoint(eth_etherbone_packet_user_description(32))
+        self.source  = source  = stream.Endpoint(eth_etherbone_packet_user_description(32))
+        self.replies = replies = stream.Endpoint(eth_etherbone_replies_description())
+
+        # # #
+
+        count = Signal(16)
+        self.comb += [
+            If(replies.valid,
+                If(replies.count == 0,
+                    replies.ready.eq(1)
+                ).Else(
+                    sink.connect(source, omit={"last", "length", "ip_address"}),
+                    source.last.eq(sink.last & (count == (replies.count - 1))),
+                    source.length.eq(replies.length),
+                    source.ip_address.eq(replies.ip_address),
+                    replies.ready.eq(source.valid & source.ready & source.last)
+                )
+            )
+        ]
+        self.sync += [
+            If(sink.valid & sink.ready & sink.last,
+                count.eq(count + 1),
+                If(source.last,
+                    count.eq(0)
+                )
+            )
+        ]
+
+
 class LiteEthEtherboneRecordReceiver(LiteXModule):
     def __init__(self, buffer_depth=4):
         self.sink   = sink   = stream.Endpoint(eth_etherbone_record_description(32))
@@ -326,7 +427,16 @@ class LiteEthEtherboneRecordSender(LiteXModule):
 
 
 class LiteEthEtherboneRecord(LiteXModule):
-    def __init__(self, endianness="big", buffer_depth=4):
+    """Etherbone records handling
+
+    By default, packets are expected to carry a single record and each reply record is sent in its
+    own packet. With packet_buffer_depth, packets can carry multiple records: records are split
+    and buffered in a packet_buffer_depth words buffer and the reply records of a packet are sent
+    back in a single packet. Since the reply length is only known at the end of the request,
+    packets are only executed once entirely buffered: packets larger than the buffer (366 words
+    for a 1500 bytes MTU) are dropped.
+    """
+    def __init__(self, endianness="big", buffer_depth=4, packet_buffer_depth=None):
         self.sink   = sink   = stream.Endpoint(eth_etherbone_packet_user_description(32))
         self.source = source = stream.Endpoint(eth_etherbone_packet_user_description(32))
 
@@ -335,47 +445,126 @@ class LiteEthEtherboneRecord(LiteXModule):
         # Receive record, decode it and generate mmap stream.
         self.depacketizer = depacketizer = LiteEthEtherboneRecordDepacketizer()
         self.receiver     = receiver     = LiteEthEtherboneRecordReceiver(buffer_depth)
-        self.comb += [
-            sink.connect(depacketizer.sink),
-            depacketizer.source.connect(receiver.sink)
-        ]
+        self.comb += depacketizer.source.connect(receiver.sink)
         if endianness == "big":
             self.comb += receiver.sink.data.eq(reverse_bytes(depacketizer.source.data))
 
-        # Save last ip address.
-        first = Signal(reset=1)
-        last_ip_address = Signal(32, reset_less=True)
-        self.sync += [
-            If(sink.valid & sink.ready,
-                If(first, last_ip_address.eq(sink.ip_address)),
-                first.eq(sink.last)
-            )
-        ]
+        if packet_buffer_depth is None:
+            self.comb += sink.connect(depacketizer.sink)
+
+            # Save last ip address.
+            first = Signal(reset=1)
+            last_ip_address = Signal(32, reset_less=True)
+            self.sync += [
+                If(sink.valid & sink.ready,
+                    If(first, last_ip_address.eq(sink.ip_address)),
+                    first.eq(sink.last)
+                )
+            ]
+        else:
+            # Split packets in records and buffer them.
+            self.splitter = splitter = LiteEthEtherboneRecordSplitter()
+            self.buffer   = buffer   = stream.SyncFIFO([("data", 32), ("last_be", 4)], packet_buffer_depth,
+                buffered = True)
+            self.replies  = replies  = stream.SyncFIFO(eth_etherbone_replies_description(), 4)
+            self.comb += sink.connect(splitter.sink)
+
+            # Store and forward: words of the packets entirely buffered are released (pending),
+            # packets overflowing the buffer are dropped and their buffered words flushed.
+            drop    = Signal()
+            current = Signal(max=packet_buffer_depth + 2)
+            pending = Signal(max=packet_buffer_depth + 2)
+            flush   = Signal(max=packet_buffer_depth + 2)
+            self.comb += [
+                If(drop,
+                    splitter.source.ready.eq(1),
+                    splitter.replies.ready.eq(1),
+                ).Else(
+                    splitter.source.connect(buffer.sink, keep={"valid", "ready", "last", "data", "last_be"}),
+                    splitter.replies.connect(replies.sink),
+                ),
+                If(flush != 0,
+                    buffer.source.ready.eq(1)
+                ).Elif(pending != 0,
+                    buffer.source.connect(depacketizer.sink)
+                )
+            ]
+            write = Signal()
+            read  = Signal()
+            end   = Signal()
+            self.comb += [
+                write.eq(buffer.sink.valid & buffer.sink.ready),
+                read.eq(depacketizer.sink.valid & depacketizer.sink.ready),
+                end.eq(splitter.sink.valid & splitter.sink.ready & splitter.sink.last),
+            ]
+            self.sync += [
+                pending.eq(pending - read),
+                current.eq(current + write),
+                If(flush != 0,
+                    flush.eq(flush - buffer.source.valid)
+                ),
+                If(drop,
+                    If(end,
+                        drop.eq(0)
+                    )
+                ).Elif(end,
+                    pending.eq(pending - read + current + write),
+                    current.eq(0)
+                ).Elif(splitter.source.valid & ~buffer.sink.ready & (pending == 0) & (flush == 0),
+                    # Packet larger than the buffer: drop it.
+                    drop.eq(1),
+                    flush.eq(current),
+                    current.eq(0)
+                )
+            ]
 
         # Receive MMAP stream, encode it and send records.
         self.sender     = sender     = LiteEthEtherboneRecordSender(buffer_depth)
         self.packetizer = packetizer = LiteEthEtherboneRecordPacketizer()
-        self.comb += [
-            sender.source.connect(packetizer.sink),
-            packetizer.source.connect(source),
-            source.length.eq(etherbone_record_header.length +
-                (sender.source.wcount != 0)*4 + sender.source.wcount*4 +
-                (sender.source.rcount != 0)*4 + sender.source.rcount*4),
-            source.ip_address.eq(last_ip_address)
-        ]
+        self.comb += sender.source.connect(packetizer.sink)
         if endianness == "big":
             self.comb += packetizer.sink.data.eq(reverse_bytes(sender.source.data))
 
+        if packet_buffer_depth is None:
+            self.comb += [
+                packetizer.source.connect(source),
+                source.length.eq(etherbone_record_header.length +
+                    (sender.source.wcount != 0)*4 + sender.source.wcount*4 +
+                    (sender.source.rcount != 0)*4 + sender.source.rcount*4),
+                source.ip_address.eq(last_ip_address)
+            ]
+        else:
+            # Merge the reply records of each packet.
+            self.merger = merger = LiteEthEtherboneRecordMerger()
+            self.comb += [
+                packetizer.source.connect(merger.sink),
+                replies.source.connect(merger.replies),
+                merger.source.connect(source),
+            ]
+
 # Etherbone Wishbone Master ------------------------------------------------------------------------
 
 class LiteEthEtherboneWishboneMaster(LiteXModule):
-    def __init__(self):
+    """Etherbone Wishbone Master
+
+    Executes the writes/reads of the MMAP stream on the Wishbone bus and returns the read datas.
+
+    By default, each access is done in a single Wishbone cycle and each read waits for its data to
+    be sent before starting the next access. With `pipelined`, the accesses of a record are issued
+    back-to-back: the read datas are buffered in a response FIFO of `fifo_depth` words and
+    sequential accesses are done in incrementing bursts (CTI/BTE registered feedback cycles).
+    """
+    def __init__(self, pipelined=False, fifo_depth=16):
         self.sink   = sink   = stream.Endpoint(eth_etherbone_mmap_description(32))
         self.source = source = stream.Endpoint(eth_etherbone_mmap_description(32))
-        self.bus    = bus    = wishbone.Interface()
+        self.bus    = bus    = wishbone.Interface(bursting=pipelined)
 
         # # #
 
+        if pipelined:
+            self.add_pipelined(fifo_depth)
+            return
+
         data_update = Signal()
 
         self.fsm = fsm = FSM(reset_state="IDLE")
@@ -434,6 +623,54 @@ class LiteEthEtherboneWishboneMaster(LiteXModule):
             )
         )
 
+    def add_pipelined(self, fifo_depth):
+        sink   = self.sink
+        source = self.source
+        bus    = self.bus
+
+        # Current access (on the bus) and next access (to select the burst type).
+        self.pipe = pipe = stream.PipeValid(eth_etherbone_mmap_description(32))
+        self.comb += sink.connect(pipe.sink)
+        current   = pipe.source
+        following = pipe.sink
+
+        # Response FIFO.
+        self.fifo = fifo = stream.SyncFIFO(eth_etherbone_mmap_description(32), fifo_depth, buffered=True)
+        self.comb += fifo.source.connect(source)
+
+        # Wishbone accesses: an access is started when the next access of the record is known (so
+        # that the CTI is stable during the access) and, for reads, when the response can be stored.
+        # During incrementing bursts, CYC is kept asserted (and only STB deasserted while waiting)
+        # until the CTI_BURST_END access.
+        start      = Signal()
+        sequential = Signal()
+        bursting   = Signal()
+        self.comb += [
+            start.eq(current.valid & (current.last | following.valid) & (current.we | fifo.sink.ready)),
+            sequential.eq(~current.last & (following.we == current.we) & (following.addr == (current.addr + 1))),
+            bus.adr.eq(current.addr),
+            bus.dat_w.eq(current.data),
+            bus.sel.eq(current.be),
+            bus.we.eq(current.we),
+            bus.cyc.eq(start | bursting),
+            bus.stb.eq(start),
+            If(sequential,
+                bus.cti.eq(wishbone.CTI_BURST_INCREMENTING)
+            ).Elif(bursting,
+                bus.cti.eq(wishbone.CTI_BURST_END)
+            ),
+            current.ready.eq(bus.stb & bus.ack),
+        ]
+        self.sync += If(bus.stb & bus.ack, bursting.eq(sequential))
+
+        # Read responses.
+        self.comb += [
+            fifo.sink.valid.eq(bus.stb & bus.ack & ~current.we),
+            current.connect(fifo.sink, keep={"base_addr", "addr", "count", "be", "last", "last_be"}),
+            fifo.sink.we.eq(1),
+            fifo.sink.data.eq(bus.dat_r),
+        ]
+
 # Etherbone Wishbone Slave -------------------------------------------------------------------------
 
 class LiteEthEtherboneWishboneSlave(LiteXModule):
@@ -495,13 +732,19 @@ class LiteEthEtherboneWishboneSlave(LiteXModule):
 # Etherbone ----------------------------------------------------------------------------------------
 
 class LiteEthEtherbone(LiteXModule):
-    def __init__(self, udp, udp_port, mode="master", buffer_depth=4, cd="sys"):
+    def __init__(self, udp, udp_port, mode="master", buffer_depth=4, cd="sys", pipelined=False,
+        packet_buffer_depth=None):
+        # Multiple records per packet are only supported as a master (replies to requests).
+        assert (packet_buffer_depth is None) or (mode == "master")
+
         # Encode/encode etherbone packets.
         self.packet = packet = LiteEthEtherbonePacket(udp, udp_port, cd)
 
         # Packets can be probe (etherbone discovering) or records with writes and reads.
         self.probe  = probe  = LiteEthEtherboneProbe()
-        self.record = record = LiteEthEtherboneRecord(buffer_depth=buffer_depth)
+        self.record = record = LiteEthEtherboneRecord(
+            buffer_depth        = buffer_depth,
+            packet_buffer_depth = packet_buffer_depth)
 
         # Arbitrate/dispatch probe/records packets.
         dispatcher = Dispatcher(packet.source, [probe.sink, record.sink])
@@ -511,7 +754,7 @@ class LiteEthEtherbone(LiteXModule):
 
         # Create MMAP wishbone.
         self.wishbone = {
-            "master": LiteEthEtherboneWishboneMaster(),
+            "master": LiteEthEtherboneWishboneMaster(pipelined=pipelined),
             "slave":  LiteEthEtherboneWishboneSlave(),
         }[mode]
         self.comb += [
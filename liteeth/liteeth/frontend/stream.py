@@ -11,7 +11,7 @@ from liteeth.common import *
 # Stream to UDP TX ---------------------------------------------------------------------------------
 
 class LiteEthStream2UDPTX(LiteXModule):
-    def __init__(self, ip_address=0, udp_port=0, data_width=8, fifo_depth=None, with_csr=False):
+    def __init__(self, ip_address=0, udp_port=0, data_width=8, fifo_depth=None, with_csr=False, mtu=None):
         self.sink   = sink   = stream.Endpoint(eth_tty_tx_description(data_width))
         self.source = source = stream.Endpoint(eth_udp_user_description(data_width))
 
@@ -34,6 +34,11 @@ class LiteEthStream2UDPTX(LiteXModule):
                 source.length.eq(data_width // 8)
             ]
         else:
+            # Packets length: FIFO depth, limited to the UDP payload of the MTU (when specified).
+            packet_depth = fifo_depth
+            if mtu is not None:
+                packet_depth = min(packet_depth, udp_max_payload_length(mtu)//(data_width//8))
+
             level   = Signal(max=fifo_depth+1)
             counter = Signal(max=fifo_depth+1)
 
@@ -61,6 +66,11 @@ class LiteEthStream2UDPTX(LiteXModule):
                     NextValue(level, fifo_depth),
                     NextState("SEND")
                 ),
+                # - Or when FIFO has a packet of the maximum length.
+                If(fifo.level >= packet_depth,
+                    NextValue(level, packet_depth),
+                    NextState("SEND")
+                ) if packet_depth < fifo_depth else [],
             )
             fsm.act("SEND",
                 source.valid.eq(1),
@@ -163,8 +173,8 @@ class LiteEthUDP2StreamRX(LiteXModule):
 # UDP Streamer -------------------------------------------------------------------------------------
 
 class LiteEthUDPStreamer(LiteXModule):
-    def __init__(self, udp, ip_address, udp_port, data_width=8, rx_fifo_depth=64, tx_fifo_depth=64, with_broadcast=True, cd="sys"):
-        self.tx = tx = LiteEthStream2UDPTX(ip_address, udp_port, data_width, tx_fifo_depth)
+    def __init__(self, udp, ip_address, udp_port, data_width=8, rx_fifo_depth=64, tx_fifo_depth=64, with_broadcast=True, cd="sys", mtu=None):
+        self.tx = tx = LiteEthStream2UDPTX(ip_address, udp_port, data_width, tx_fifo_depth, mtu=mtu)
         self.rx = rx = LiteEthUDP2StreamRX(ip_address, udp_port, data_width, rx_fifo_depth, with_broadcast)
         udp_port = udp.crossbar.get_port(udp_port, dw=data_width, cd=cd)
         self.comb += [
@@ -505,7 +505,8 @@ class UDPCore(PHYCore):
             udp_port      = udp_port,
             data_width    = data_width,
             tx_fifo_depth = tx_fifo_depth,
-            rx_fifo_depth = rx_fifo_depth
+            rx_fifo_depth = rx_fifo_depth,
+            mtu           = self.mtu,
         )
         self.submodules += udp_streamer
 
@@ -577,6 +578,10 @@ class UDPCore(PHYCore):
         tx_cdc_buffered = core_config.get("tx_cdc_buffered", False)
         rx_cdc_depth    = core_config.get("rx_cdc_depth", 32)
         rx_cdc_buffered = core_config.get("rx_cdc_buffered", False)
+        udp_checksum    = core_config.get("udp_checksum", False)
+
+        # MTU (Optional, ex 9030 for Jumbo Frames).
+        self.mtu = core_config.get("mtu", None)
 
         # MAC Address.
         mac_address = core_config.get("mac_address", None)
@@ -608,6 +613,8 @@ class UDPCore(PHYCore):
             tx_cdc_buffered   = tx_cdc_buffered,
             rx_cdc_depth      = rx_cdc_depth,
             rx_cdc_buffered   = rx_cdc_buffered,
+            mtu               = eth_mtu if self.mtu is None else self.mtu,
+            with_udp_checksum = udp_checksum,
         )
 
         # DHCP -------------------------------------------------------------------------------------
@@ -629,16 +636,18 @@ class UDPCore(PHYCore):
 
         # Etherbone --------------------------------------------------------------------------------
 
-        etherbone              = core_config.get("etherbone", False)
-        etherbone_port         = core_config.get("etherbone_port", 1234)
-        etherbone_buffer_depth = core_config.get("etherbone_buffer_depth", 16)
+        etherbone                     = core_config.get("etherbone", False)
+        etherbone_port                = core_config.get("etherbone_port", 1234)
+        etherbone_buffer_depth        = core_config.get("etherbone_buffer_depth", 16)
+        etherbone_packet_buffer_depth = core_config.get("etherbone_packet_buffer_depth", None)
 
         if etherbone:
             self.etherbone = LiteEthEtherbone(
-                udp          =  self.core.udp,
-                udp_port     = etherbone_port,
-                buffer_depth = etherbone_buffer_depth,
-                cd           = "sys"
+                udp                 =  self.core.udp,
+                udp_port            = etherbone_port,
+                buffer_depth        = etherbone_buffer_depth,
+                packet_buffer_depth = etherbone_packet_buffer_depth,
+                cd                  = "sys"
             )
             axil_bus = axi.AXILiteInterface(address_width=32, data_width=32)
             platform.add_extension(axil_bus.get_ios("mmap"))
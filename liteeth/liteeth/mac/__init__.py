@@ -11,6 +11,7 @@ from liteeth.common import *
 from liteeth.mac.common import *
 from liteeth.mac.core import LiteEthMACCore
 from liteeth.mac.wishbone import LiteEthMACWishboneInterface
+from liteeth.mac.dma import LiteEthMACDMAInterface
 
 # MAC ----------------------------------------------------------------------------------------------
 
@@ -31,9 +32,10 @@ class LiteEthMAC(LiteXModule):
         tx_cdc_buffered    = False,
         rx_cdc_depth       = 32,
         rx_cdc_buffered    = False,
+        mtu                = eth_mtu,
     ):
         assert dw%8 == 0
-        assert interface  in ["crossbar", "wishbone", "hybrid"]
+        assert interface  in ["crossbar", "wishbone", "hybrid", "dma"]
         assert endianness in ["big", "little"]
 
         # Core.
@@ -69,13 +71,14 @@ class LiteEthMAC(LiteXModule):
             # ---------------------------------------------------
             self.rx_slots  = CSRConstant(nrxslots)
             self.tx_slots  = CSRConstant(ntxslots)
-            self.slot_size = CSRConstant(2**bits_for(eth_mtu))
+            self.slot_size = CSRConstant(2**bits_for(mtu))
             wishbone_interface = LiteEthMACWishboneInterface(
                 dw         = dw,
                 nrxslots   = nrxslots, rxslots_read_only  = rxslots_read_only,
                 ntxslots   = ntxslots, txslots_write_only = txslots_write_only,
                 endianness = endianness,
                 timestamp  = timestamp,
+                mtu        = mtu,
             )
             if full_memory_we:
                 wishbone_interface = self.apply_full_memory_we(wishbone_interface)
@@ -96,6 +99,17 @@ class LiteEthMAC(LiteXModule):
                 self.crossbar     = LiteEthMACCrossbar(dw)
                 self.mac_crossbar = LiteEthMACCoreCrossbar(self.core, self.crossbar, self.interface, dw, hw_mac)
 
+        # DMA Mode.
+        # ---------
+        if interface in ["dma"]:
+            self.interface = LiteEthMACDMAInterface(dw=dw, endianness=endianness, mtu=mtu)
+            self.ev        = self.interface.ev
+            self.bus_rx    = self.interface.bus_rx
+            self.bus_tx    = self.interface.bus_tx
+            self.csrs      = self.interface.get_csrs() + self.core.get_csrs()
+            self.comb += self.interface.source.connect(self.core.sink)
+            self.comb += self.core.source.connect(self.interface.sink)
+
     def apply_full_memory_we(self, interface):
         # FullMemoryWE splits memory into 8-bit blocks to ensure proper block RAM inference on most FPGAs.
         # On some (e.g., ECP5/Yosys), this isn't needed and can increase memory usage.
@@ -0,0 +1,355 @@
+#
+# This file is part of LiteEth.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import math
+
+from litex.gen import *
+
+from liteeth.common import *
+
+from litex.soc.interconnect import wishbone
+from litex.soc.interconnect.csr import *
+from litex.soc.interconnect.csr_eventmanager import *
+from litex.soc.interconnect.packet import PacketFIFO
+
+# MAC DMA Descriptors ------------------------------------------------------------------------------
+
+# Descriptors are 2 32-bit words in memory:
+# - Word 0: Buffer address (bytes).
+# - Word 1: Buffer/Packet length (bytes) in bits 0-15, written back with the done (bit 31) and
+#           error (bit 30) flags. On RX, the error flag reports a truncated or CRC error packet. On
+#           TX, it reports a packet larger than the MAC buffering, not sent (written back length: 0).
+dma_descriptor_length     = 8
+dma_descriptor_done_bit   = 31
+dma_descriptor_error_bit  = 30
+
+# MAC DMA Ring -------------------------------------------------------------------------------------
+
+class _LiteEthMACDMARing(LiteXModule):
+    """Descriptors ring of a MAC DMA
+
+    Software owns the descriptors from `head` (next descriptor to be processed by the hardware) to
+    `tail` (excluded), hands descriptors over to the hardware by advancing `tail` and gets them back
+    when `head` advances. Interrupts are coalesced: the event is triggered once `irq_count`
+    descriptors have been processed, or `irq_timeout` cycles (when not 0) after the first
+    descriptor processed since the last event.
+    """
+    def __init__(self, bus):
+        self.bus = bus
+
+        # CSRs.
+        self._enable      = CSRStorage(description="Enable the ring, reset `head` when disabled.")
+        self._base        = CSRStorage(32, description="Ring base address (bytes).")
+        self._size        = CSRStorage(16, description="Ring size (number of descriptors).")
+        self._tail        = CSRStorage(16, description="Software index (first descriptor not owned by the hardware).")
+        self._head        = CSRStatus(16,  description="Hardware index (next descriptor to be processed).")
+        self._irq_count   = CSRStorage(16, reset=1, description="Interrupt coalescing descriptors count.")
+        self._irq_timeout = CSRStorage(32, description="Interrupt coalescing timeout (cycles, 0: disabled).")
+        self._packets     = CSRStatus(32,  description="Number of packets.")
+        self._bytes       = CSRStatus(32,  description="Number of bytes.")
+
+        # # #
+
+        self.enable    = self._enable.storage
+        self.head      = self._head.status
+        self.available = Signal() # Descriptors available for the hardware.
+        self.processed = Signal() # Descriptor processed, advance head (set by Writer/Reader).
+        self.length    = Signal(16)
+
+        self.comb += self.available.eq(self.enable & (self.head != self._tail.storage))
+        self.sync += [
+            If(~self.enable,
+                self.head.eq(0)
+            ).Elif(self.processed,
+                If(self.head == (self._size.storage - 1),
+                    self.head.eq(0)
+                ).Else(
+                    self.head.eq(self.head + 1)
+                ),
+                self._packets.status.eq(self._packets.status + 1),
+                self._bytes.status.eq(self._bytes.status + self.length)
+            )
+        ]
+
+        # Interrupt coalescing.
+        self.irq = Signal()
+        pending  = Signal(16)
+        timer    = Signal(32)
+        self.comb += self.irq.eq((pending != 0) & (
+            (pending >= self._irq_count.storage) |
+            ((self._irq_timeout.storage != 0) & (timer >= self._irq_timeout.storage))))
+        self.sync += [
+            If(self.irq,
+                pending.eq(self.processed),
+                timer.eq(0)
+            ).Else(
+                pending.eq(pending + self.processed),
+                If(pending != 0,
+                    timer.eq(timer + 1)
+                )
+            )
+        ]
+
+        # Descriptor address (bus words).
+        self.descriptor_adr = Signal(bus.adr_width)
+        self.comb += self.descriptor_adr.eq(self._base.storage[2:] + self.head*(dma_descriptor_length//4))
+
+    def add_bus_access(self, fsm, name, adr, we, dat_w, next_state, actions=[]):
+        """Add a FSM state doing a single bus access"""
+        fsm.act(name,
+            self.bus.stb.eq(1),
+            self.bus.cyc.eq(1),
+            self.bus.we.eq(we),
+            self.bus.adr.eq(adr),
+            self.bus.dat_w.eq(dat_w),
+            If(self.bus.ack,
+                NextState(next_state),
+                *actions
+            )
+        )
+
+# MAC DMA Writer -----------------------------------------------------------------------------------
+
+class LiteEthMACDMAWriter(_LiteEthMACDMARing):
+    """Writes the received packets to the buffers of the RX descriptors
+
+    Packets are dropped when no descriptor is available, packets larger than the descriptor's
+    buffer are truncated and flagged with the error bit.
+    """
+    def __init__(self, dw, depth, endianness="big"):
+        assert dw == 32
+        self.sink = sink = stream.Endpoint(eth_phy_description(dw))
+        _LiteEthMACDMARing.__init__(self, wishbone.Interface(data_width=dw))
+        self._dropped = CSRStatus(32, description="Number of packets dropped (no descriptor available).")
+
+        # Event Manager.
+        self.ev           = EventManager()
+        self.ev.available = EventSourcePulse()
+        self.ev.finalize()
+        self.comb += self.ev.available.trigger.eq(self.irq)
+
+        # # #
+
+        bus     = self.bus
+        address = Signal(32)
+        size    = Signal(16)
+        length  = self.length
+        error   = Signal()
+        dropped = self._dropped.status
+
+        # Buffering (absorbs descriptors/bus accesses latency).
+        self.fifo = fifo = stream.SyncFIFO(eth_phy_description(dw), depth, buffered=True)
+        self.comb += sink.connect(fifo.sink)
+
+        # Decode Length increment from last_be.
+        length_inc = Signal(3)
+        self.comb += Case(fifo.source.last_be, {
+            0b0001    : length_inc.eq(1),
+            0b0010    : length_inc.eq(2),
+            0b0100    : length_inc.eq(3),
+            "default" : length_inc.eq(4),
+        })
+
+        self.comb += bus.sel.eq(2**(dw//8) - 1)
+
+        # FSM.
+        self.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            NextValue(length, 0),
+            NextValue(error,  0),
+            If(fifo.source.valid,
+                If(self.available,
+                    NextState("DESCRIPTOR-ADDRESS")
+                ).Else(
+                    NextState("DROP")
+                )
+            )
+        )
+        self.add_bus_access(fsm, "DESCRIPTOR-ADDRESS",
+            adr        = self.descriptor_adr,
+            we         = 0,
+            dat_w      = 0,
+            next_state = "DESCRIPTOR-LENGTH",
+            actions    = [NextValue(address, bus.dat_r)]
+        )
+        self.add_bus_access(fsm, "DESCRIPTOR-LENGTH",
+            adr        = self.descriptor_adr + 1,
+            we         = 0,
+            dat_w      = 0,
+            next_state = "WRITE",
+            actions    = [NextValue(size, bus.dat_r[0:16])]
+        )
+        fsm.act("WRITE",
+            If((length + length_inc) > size,
+                # Buffer full: truncate.
+                fifo.source.ready.eq(1),
+                If(fifo.source.valid,
+                    NextValue(error, 1),
+                    If(fifo.source.last,
+                        NextState("DESCRIPTOR-WRITEBACK")
+                    )
+                )
+            ).Else(
+                bus.stb.eq(fifo.source.valid),
+                bus.cyc.eq(fifo.source.valid),
+                bus.we.eq(1),
+                bus.adr.eq(address[2:] + length[2:]),
+                bus.dat_w.eq({"big": reverse_bytes(fifo.source.data), "little": fifo.source.data}[endianness]),
+                If(bus.ack,
+                    fifo.source.ready.eq(1),
+                    NextValue(length, length + length_inc),
+                    If((fifo.source.error & fifo.source.last_be) != 0,
+                        NextValue(error, 1)
+                    ),
+                    If(fifo.source.last,
+                        NextState("DESCRIPTOR-WRITEBACK")
+                    )
+                )
+            )
+        )
+        self.add_bus_access(fsm, "DESCRIPTOR-WRITEBACK",
+            adr        = self.descriptor_adr + 1,
+            we         = 1,
+            dat_w      = length | (error << dma_descriptor_error_bit) | (1 << dma_descriptor_done_bit),
+            next_state = "IDLE",
+            actions    = [self.processed.eq(1)]
+        )
+        fsm.act("DROP",
+            fifo.source.ready.eq(1),
+            If(fifo.source.valid & fifo.source.last,
+                NextValue(dropped, dropped + 1),
+                NextState("IDLE")
+            )
+        )
+
+# MAC DMA Reader -----------------------------------------------------------------------------------
+
+class LiteEthMACDMAReader(_LiteEthMACDMARing):
+    """Sends the packets of the buffers of the TX descriptors
+
+    Packets are buffered entirely before being sent, so that the MAC is never starved during a
+    packet. Packets larger than the buffering are not sent and flagged with the error bit.
+    """
+    def __init__(self, dw, depth, endianness="big"):
+        assert dw == 32
+        self.source = source = stream.Endpoint(eth_phy_description(dw))
+        _LiteEthMACDMARing.__init__(self, wishbone.Interface(data_width=dw))
+
+        # Event Manager.
+        self.ev      = EventManager()
+        self.ev.done = EventSourcePulse()
+        self.ev.finalize()
+        self.comb += self.ev.done.trigger.eq(self.irq)
+
+        # # #
+
+        bus     = self.bus
+        address = Signal(32)
+        length  = self.length
+        offset  = Signal(16)
+        error   = Signal()
+
+        # Buffering (store and forward).
+        self.fifo = fifo = PacketFIFO(eth_phy_description(dw),
+            payload_depth = depth,
+            param_depth   = 1,
+            buffered      = True
+        )
+        self.comb += fifo.source.connect(source)
+
+        # Encode Length to last_be.
+        self.comb += If(fifo.sink.last,
+            Case(length[0:2], {
+                1         : fifo.sink.last_be.eq(0b0001),
+                2         : fifo.sink.last_be.eq(0b0010),
+                3         : fifo.sink.last_be.eq(0b0100),
+                "default" : fifo.sink.last_be.eq(0b1000),
+            })
+        )
+
+        self.comb += bus.sel.eq(2**(dw//8) - 1)
+
+        # FSM.
+        self.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            NextValue(offset, 0),
+            NextValue(error,  0),
+            If(self.available,
+                NextState("DESCRIPTOR-ADDRESS")
+            )
+        )
+        self.add_bus_access(fsm, "DESCRIPTOR-ADDRESS",
+            adr        = self.descriptor_adr,
+            we         = 0,
+            dat_w      = 0,
+            next_state = "DESCRIPTOR-LENGTH",
+            actions    = [NextValue(address, bus.dat_r)]
+        )
+        self.add_bus_access(fsm, "DESCRIPTOR-LENGTH",
+            adr        = self.descriptor_adr + 1,
+            we         = 0,
+            dat_w      = 0,
+            next_state = "READ",
+            actions    = [
+                NextValue(length, bus.dat_r[0:16]),
+                # Packets larger than the buffering are rejected.
+                If(bus.dat_r[0:16] > depth*dw//8,
+                    NextValue(length, 0),
+                    NextValue(error,  1),
+                    NextState("DESCRIPTOR-WRITEBACK")
+                ),
+                If(bus.dat_r[0:16] == 0,
+                    NextState("DESCRIPTOR-WRITEBACK")
+                )
+            ]
+        )
+        fsm.act("READ",
+            bus.stb.eq(fifo.sink.ready),
+            bus.cyc.eq(fifo.sink.ready),
+            bus.we.eq(0),
+            bus.adr.eq(address[2:] + offset[2:]),
+            fifo.sink.valid.eq(bus.ack),
+            fifo.sink.last.eq((offset + dw//8) >= length),
+            fifo.sink.data.eq({"big": reverse_bytes(bus.dat_r), "little": bus.dat_r}[endianness]),
+            If(bus.stb & bus.ack,
+                NextValue(offset, offset + dw//8),
+                If(fifo.sink.last,
+                    NextState("DESCRIPTOR-WRITEBACK")
+                )
+            )
+        )
+        self.add_bus_access(fsm, "DESCRIPTOR-WRITEBACK",
+            adr        = self.descriptor_adr + 1,
+            we         = 1,
+            dat_w      = length | (error << dma_descriptor_error_bit) | (1 << dma_descriptor_done_bit),
+            next_state = "IDLE",
+            actions    = [self.processed.eq(1)]
+        )
+
+# MAC DMA Interface --------------------------------------------------------------------------------
+
+class LiteEthMACDMAInterface(LiteXModule):
+    """MAC DMA interface
+
+    Received packets are written to the buffers of the RX descriptors ring and transmitted packets
+    are read from the buffers of the TX descriptors ring, in main memory, through the `bus_rx`/
+    `bus_tx` Wishbone masters (see _LiteEthMACDMARing for the rings handling).
+    """
+    def __init__(self, dw, endianness="big", mtu=eth_mtu):
+        self.sink   = stream.Endpoint(eth_phy_description(dw))
+        self.source = stream.Endpoint(eth_phy_description(dw))
+
+        # # #
+
+        depth = math.ceil(mtu/(dw//8))
+        self.writer = LiteEthMACDMAWriter(dw, depth, endianness)
+        self.reader = LiteEthMACDMAReader(dw, depth, endianness)
+        self.ev     = SharedIRQ(self.writer.ev, self.reader.ev)
+        self.bus_rx = self.writer.bus
+        self.bus_tx = self.reader.bus
+        self.comb += [
+            self.sink.connect(self.writer.sink),
+            self.reader.source.connect(self.source),
+        ]
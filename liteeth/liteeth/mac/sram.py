@@ -81,7 +81,7 @@ class LiteEthMACSRAMWriter(LiteXModule):
                 If(stat_fifo.sink.ready,
                     write.eq(1),
                     NextValue(length, length + length_inc),
-                    If(length >= eth_mtu,
+                    If(length >= depth*dw//8,
                          NextState("DISCARD-REMAINING")
                     ),
                     If(sink.last,
@@ -13,7 +13,7 @@ from litex.soc.interconnect.stream_sim import *
 
 from liteeth.common import *
 from liteeth.mac import LiteEthMAC
-from liteeth.core.arp import LiteEthARP
+from liteeth.core.arp import LiteEthARP, LiteEthARPCache
 
 from test.model import phy, mac, arp
 
@@ -56,3 +56,71 @@ class TestARP(unittest.TestCase):
                   "eth_rx": 10,
                   "eth_tx": 10}
         run_simulation(dut, generators, clocks, vcd_name="sim.vcd")
+
+
+class TestARPCache(unittest.TestCase):
+    def update(self, cache, ip_address, mac_address):
+        yield cache.update.valid.eq(1)
+        yield cache.update.ip_address.eq(ip_address)
+        yield cache.update.mac_address.eq(mac_address)
+        yield
+        while not (yield cache.update.ready):
+            yield
+        yield cache.update.valid.eq(0)
+        yield
+
+    def request(self, cache, ip_address, latencies=None):
+        yield cache.request.valid.eq(1)
+        yield cache.request.ip_address.eq(ip_address)
+        latency = 0
+        yield
+        while not (yield cache.response.valid):
+            latency += 1
+            yield
+        response = ((yield cache.response.error), (yield cache.response.mac_address))
+        yield cache.request.valid.eq(0)
+        yield
+        if latencies is not None:
+            latencies.append(latency)
+        return response
+
+    def test_lookup(self):
+        cache     = LiteEthARPCache(entries=256, clk_freq=100e6)
+        ips       = [0xc0a80000 + i for i in range(256)]
+        latencies = []
+        results   = []
+
+        def generator():
+            for i, ip in enumerate(ips):
+                yield from self.update(cache, ip, 0x10e2d5000000 + i)
+            for ip in ips + [0xc0a80100]:
+                results.append((yield from self.request(cache, ip, latencies)))
+            results.append(((yield cache.hits), (yield cache.misses)))
+
+        run_simulation(cache, generator())
+        self.assertEqual(cache.sets*cache.ways, 256)
+        self.assertEqual(results[:256], [(0, 0x10e2d5000000 + i) for i in range(256)])
+        self.assertEqual(results[256], (1, 0))
+        self.assertEqual(results[257], (256, 1))
+        # Constant lookup latency.
+        self.assertEqual(set(latencies), {2})
+
+    def test_lru(self):
+        cache = LiteEthARPCache(entries=8, clk_freq=100e6, ways=4)
+        # IPs of the same set (XOR folding of the IP on 1 bit).
+        ips     = [0x0a000000 + 3*i for i in range(5)]
+        results = []
+
+        def generator():
+            for ip in ips[:4]:
+                yield from self.update(cache, ip, ip)
+            # Use ips[0], update ips[1]: ips[2] is the LRU way and is replaced by ips[4].
+            yield from self.request(cache, ips[0])
+            yield from self.update(cache, ips[1], 0x1234)
+            yield from self.update(cache, ips[4], ips[4])
+            for ip in ips:
+                results.append((yield from self.request(cache, ip)))
+
+        run_simulation(cache, generator())
+        self.assertEqual(cache.sets, 2)
+        self.assertEqual(results, [(0, ips[0]), (0, 0x1234), (1, 0), (0, ips[3]), (0, ips[4])])
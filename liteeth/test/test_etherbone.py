@@ -4,6 +4,7 @@
 # Copyright (c) 2015-2018 Florent Kermarrec <florent@enjoy-digital.fr>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import random
 import unittest
 
 from migen import *
@@ -13,7 +14,8 @@ from litex.soc.interconnect.stream_sim import *
 
 from liteeth.common import *
 from liteeth.core import LiteEthUDPIPCore
-from liteeth.frontend.etherbone import LiteEthEtherbone
+from liteeth.frontend.etherbone import LiteEthEtherbone, LiteEthEtherboneWishboneMaster
+from liteeth.frontend.etherbone import LiteEthEtherboneRecord
 
 from test.model import phy, mac, arp, ip, udp, etherbone
 
@@ -118,3 +120,201 @@ class TestEtherbone(unittest.TestCase):
                   "eth_rx": 10,
                   "eth_tx": 10}
         #run_simulation(dut, generators, clocks, vcd_name="sim.vcd") # FIXME: hanging
+
+
+class MasterDUT(Module):
+    def __init__(self, pipelined):
+        self.submodules.master = LiteEthEtherboneWishboneMaster(pipelined=pipelined)
+        self.submodules.sram   = wishbone.SRAM(1024, bus=self.master.bus)
+
+
+class TestEtherboneWishboneMaster(unittest.TestCase):
+    def master_test(self, pipelined, ready_random=0, valid_random=0):
+        dut = MasterDUT(pipelined)
+        writes = [(0x40 + i, 0x1000 + i) for i in range(16)]
+        reads  = [0x40 + i for i in range(8)] + [0x4f, 0x41, 0x42, 0x40, 0x4e]
+        datas  = []
+        cycles = []
+
+        def send(accesses, we):
+            prng = random.Random(42)
+            for i, (addr, data) in enumerate(accesses):
+                while prng.randrange(100) < valid_random:
+                    yield dut.master.sink.valid.eq(0)
+                    yield
+                yield dut.master.sink.valid.eq(1)
+                yield dut.master.sink.last.eq(i == len(accesses) - 1)
+                yield dut.master.sink.we.eq(we)
+                yield dut.master.sink.count.eq(len(accesses))
+                yield dut.master.sink.be.eq(0xf)
+                yield dut.master.sink.addr.eq(addr)
+                yield dut.master.sink.data.eq(data)
+                yield
+                while not (yield dut.master.sink.ready):
+                    yield
+            yield dut.master.sink.valid.eq(0)
+
+        def generator():
+            yield from send(writes, we=1)
+            yield from send([(addr, 0) for addr in reads], we=0)
+            while len(datas) < len(reads):
+                yield
+
+        @passive
+        def receiver():
+            prng  = random.Random(42)
+            cycle = 0
+            while True:
+                yield dut.master.source.ready.eq(prng.randrange(100) >= ready_random)
+                yield
+                cycle += 1
+                if (yield dut.master.source.valid) and (yield dut.master.source.ready):
+                    self.assertEqual((yield dut.master.source.we), 1)
+                    self.assertEqual((yield dut.master.source.last), len(datas) == len(reads) - 1)
+                    self.assertEqual((yield dut.master.source.addr), reads[len(datas)])
+                    datas.append((yield dut.master.source.data))
+                    if len(datas) == len(reads):
+                        cycles.append(cycle)
+
+        @passive
+        def bus_monitor():
+            # CYC must stay asserted during incrementing bursts (until the CTI_BURST_END access).
+            bursting = False
+            while True:
+                if bursting:
+                    self.assertEqual((yield dut.master.bus.cyc), 1)
+                if (yield dut.master.bus.cyc) and (yield dut.master.bus.stb) and (yield dut.master.bus.ack):
+                    bursting = (yield dut.master.bus.cti) == wishbone.CTI_BURST_INCREMENTING
+                yield
+
+        run_simulation(dut, [generator(), receiver(), bus_monitor()])
+        self.assertEqual(datas, [0x1000 + addr - 0x40 for addr in reads])
+        return cycles[0]
+
+    def test_master(self):
+        self.master_test(pipelined=False)
+
+    def test_master_pipelined(self):
+        cycles          = self.master_test(pipelined=False)
+        cycles_pipeline = self.master_test(pipelined=True)
+        self.assertLess(cycles_pipeline, 2*cycles//3)
+
+    def test_master_pipelined_backpressure(self):
+        self.master_test(pipelined=True, ready_random=50)
+        self.master_test(pipelined=True, valid_random=50)
+        self.master_test(pipelined=True, ready_random=50, valid_random=50)
+
+
+class RecordDUT(Module):
+    def __init__(self, packet_buffer_depth, buffer_depth=256):
+        self.submodules.record = LiteEthEtherboneRecord(buffer_depth=buffer_depth,
+            packet_buffer_depth=packet_buffer_depth)
+        self.submodules.master = LiteEthEtherboneWishboneMaster()
+        self.submodules.sram   = wishbone.SRAM(1024, bus=self.master.bus)
+        self.comb += [
+            self.record.receiver.source.connect(self.master.sink),
+            self.master.source.connect(self.record.sender.sink),
+        ]
+
+
+class TestEtherboneRecord(unittest.TestCase):
+    def writes_record(self, base_addr, datas):
+        record = etherbone.EtherboneRecord()
+        record.writes = etherbone.EtherboneWrites(base_addr=base_addr, datas=datas)
+        return record
+
+    def reads_record(self, base_ret_addr, addrs):
+        record = etherbone.EtherboneRecord()
+        record.reads = etherbone.EtherboneReads(base_ret_addr=base_ret_addr, addrs=addrs)
+        return record
+
+    def record_test(self, packets, packet_buffer_depth=None, buffer_depth=256, ready_random=0):
+        dut     = RecordDUT(packet_buffer_depth, buffer_depth)
+        replies = []
+        datas   = []
+        for records in packets:
+            packet = etherbone.EtherbonePacket()
+            packet.records = records
+            packet.encode()
+            datas.append(packet.bytes[etherbone_packet_header.length:])
+
+        def generator():
+            for n, data in enumerate(datas):
+                words = [int.from_bytes(data[i:i + 4], "little") for i in range(0, len(data), 4)]
+                for i, word in enumerate(words):
+                    yield dut.record.sink.valid.eq(1)
+                    yield dut.record.sink.last.eq(i == len(words) - 1)
+                    yield dut.record.sink.ip_address.eq(0x12345600 + n)
+                    yield dut.record.sink.length.eq(len(data))
+                    yield dut.record.sink.data.eq(word)
+                    yield
+                    while not (yield dut.record.sink.ready):
+                        yield
+                yield dut.record.sink.valid.eq(0)
+            for i in range(1024):
+                yield
+
+        @passive
+        def receiver():
+            source = dut.record.source
+            prng   = random.Random(42)
+            data   = bytearray()
+            while True:
+                yield source.ready.eq(prng.randrange(100) >= ready_random)
+                yield
+                if (yield source.valid) and (yield source.ready):
+                    data += (yield source.data).to_bytes(4, "little")
+                    if (yield source.last):
+                        self.assertEqual((yield source.length), len(data))
+                        header = etherbone.EtherbonePacket()
+                        header.encode()
+                        packet = etherbone.EtherbonePacket(init=header.bytes + data)
+                        packet.decode()
+                        replies.append(((yield source.ip_address), [(record.writes.base_addr,
+                            record.writes.get_datas()) for record in packet.records]))
+                        data = bytearray()
+
+        run_simulation(dut, [generator(), receiver()])
+        return replies
+
+    def test_single_record(self):
+        replies = self.record_test([
+            [self.writes_record(0x100, [1, 2, 3])],
+            [self.reads_record(0x1234, [0x104, 0x100])],
+        ])
+        self.assertEqual(replies, [(0x12345601, [(0x1234, [2, 1])])])
+
+    def test_multi_records(self):
+        datas   = list(range(0x1000, 0x1000 + 64))
+        packets = lambda: [
+            # Writes then reads, reads in the same packet.
+            [self.writes_record(0x100, datas[:32]),
+             self.reads_record(0x10, [0x100 + 4*i for i in range(32)]),
+             self.writes_record(0x200, datas[32:]),
+             self.reads_record(0x20, [0x200, 0x204]),
+             self.writes_record(0x300, [0xcafe])],
+            # Writes only and empty record (padding): no reply.
+            [self.writes_record(0x400, [1]), self.writes_record(0x404, [2]), etherbone.EtherboneRecord()],
+            # Reads only.
+            [self.reads_record(0x30 + i, [0x300, 0x400, 0x404]) for i in range(4)],
+        ]
+        expected = [
+            (0x12345600, [(0x10, datas[:32]), (0x20, datas[32:34])]),
+            (0x12345602, [(0x30 + i, [0xcafe, 1, 2]) for i in range(4)]),
+        ]
+        for ready_random in [0, 50]:
+            replies = self.record_test(packets(), packet_buffer_depth=512, ready_random=ready_random)
+            self.assertEqual(replies, expected)
+
+    def test_packet_larger_than_buffer(self):
+        packets = lambda: [
+            # 4 records of 32 reads and writes (139 words): larger than the buffer, dropped.
+            [self.reads_record(0x10 + i, [0x100 + 4*j for j in range(32)]) for i in range(4)] +
+            [self.writes_record(0x100, [1])],
+            # Fits in the buffer.
+            [self.writes_record(0x104, [2]), self.reads_record(0x20, [0x100, 0x104])],
+        ]
+        for ready_random in [0, 50]:
+            replies = self.record_test(packets(), packet_buffer_depth=32, buffer_depth=4,
+                ready_random=ready_random)
+            self.assertEqual(replies, [(0x12345601, [(0x20, [0, 2])])])
@@ -0,0 +1,245 @@
+#
+# This file is part of LiteEth.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+
+from migen import *
+
+from litex.soc.interconnect import wishbone
+from litex.soc.interconnect.stream_sim import *
+
+from liteeth.common import *
+from liteeth.mac import LiteEthMAC
+
+from test.model import phy, mac
+
+from litex.gen.sim import *
+
+# Memory map (bytes).
+rx_ring_base   = 0x0000
+tx_ring_base   = 0x0100
+tx_buffer_base = 0x0400
+rx_buffer_base = 0x1000
+buffer_size    = 0x0800
+ring_size      = 4
+
+
+class DUT(Module):
+    def __init__(self):
+        self.submodules.phy_model = phy.PHY(8, debug=False)
+        self.submodules.mac_model = mac.MAC(self.phy_model, debug=False, loopback=True)
+        self.submodules.ethmac = LiteEthMAC(phy=self.phy_model, dw=32, interface="dma", with_preamble_crc=True)
+        self.submodules.sram = wishbone.SRAM(0x4000)
+        self.submodules.arbiter = wishbone.Arbiter([self.ethmac.bus_rx, self.ethmac.bus_tx], self.sram.bus)
+
+
+class DMADriver:
+    def __init__(self, dut):
+        self.mem    = dut.sram.mem
+        self.writer = dut.ethmac.interface.writer
+        self.reader = dut.ethmac.interface.reader
+
+    def write_mem(self, adr, dat):
+        yield self.mem[adr//4].eq(dat)
+
+    def read_mem(self, adr):
+        return (yield self.mem[adr//4])
+
+    def setup(self, ring, base, irq_count=1, irq_timeout=0):
+        yield ring._base.storage.eq(base)
+        yield ring._size.storage.eq(ring_size)
+        yield ring._irq_count.storage.eq(irq_count)
+        yield ring._irq_timeout.storage.eq(irq_timeout)
+        yield ring._enable.storage.eq(1)
+        yield
+
+    def set_tail(self, ring, tail):
+        yield ring._tail.storage.eq(tail % ring_size)
+        yield
+
+    def wait_head(self, ring, head):
+        while (yield ring._head.status) != (head % ring_size):
+            yield
+
+    def clear_pending(self, ring):
+        yield ring.ev.pending.re.eq(1)
+        yield ring.ev.pending.r.eq(1)
+        yield
+        yield ring.ev.pending.re.eq(0)
+        yield ring.ev.pending.r.eq(0)
+        yield
+
+    def add_rx_descriptor(self, n):
+        yield from self.write_mem(rx_ring_base + 8*n + 0, rx_buffer_base + buffer_size*n)
+        yield from self.write_mem(rx_ring_base + 8*n + 4, buffer_size)
+
+    def add_tx_descriptor(self, n, payload):
+        for i in range(0, len(payload), 4):
+            dat = int.from_bytes(bytes(payload[i:i+4]).ljust(4, b"\0"), "big")
+            yield from self.write_mem(tx_buffer_base + buffer_size*n + i, dat)
+        yield from self.write_mem(tx_ring_base + 8*n + 0, tx_buffer_base + buffer_size*n)
+        yield from self.write_mem(tx_ring_base + 8*n + 4, len(payload))
+
+    def get_tx_descriptor(self, n):
+        return (yield from self.read_mem(tx_ring_base + 8*n + 4))
+
+    def get_rx_descriptor(self, n):
+        status  = (yield from self.read_mem(rx_ring_base + 8*n + 4))
+        length  = status & 0xffff
+        payload = []
+        for i in range(0, length, 4):
+            dat = (yield from self.read_mem(rx_buffer_base + buffer_size*n + i))
+            payload += list(dat.to_bytes(4, "big"))
+        return status, payload[:length]
+
+
+class TestMACDMA(unittest.TestCase):
+    def run_dut(self, dut, generator):
+        generators = {
+            "sys" :    generator,
+            "eth_tx": [dut.phy_model.phy_sink.generator(),
+                       dut.phy_model.generator()],
+            "eth_rx":  dut.phy_model.phy_source.generator()
+        }
+        clocks = {"sys":    20,
+                  "eth_rx": 8,
+                  "eth_tx": 8}
+        run_simulation(dut, generators, clocks)
+
+    def payload(self, n, length):
+        return [(seed_to_data(i, True) + n) % 0xff for i in range(length)]
+
+    def test_loopback(self):
+        dut     = DUT()
+        driver  = DMADriver(dut)
+        lengths = [152, 61, 250]
+        results = {}
+
+        def generator():
+            for n in range(ring_size):
+                yield from driver.add_rx_descriptor(n)
+            yield from driver.setup(driver.writer, rx_ring_base)
+            yield from driver.set_tail(driver.writer, ring_size - 1)
+            yield from driver.setup(driver.reader, tx_ring_base)
+            for n, length in enumerate(lengths):
+                yield from driver.add_tx_descriptor(n, self.payload(n, length))
+            yield from driver.set_tail(driver.reader, len(lengths))
+            yield from driver.wait_head(driver.reader, len(lengths))
+            yield from driver.wait_head(driver.writer, len(lengths))
+            results["rx"] = []
+            for n in range(len(lengths)):
+                results["rx"].append((yield from driver.get_rx_descriptor(n)))
+            results["tx"] = []
+            for n in range(len(lengths)):
+                results["tx"].append((yield from driver.get_tx_descriptor(n)))
+            for ring in [driver.writer, driver.reader]:
+                results[ring] = ((yield ring._packets.status), (yield ring._bytes.status))
+            results["dropped"] = (yield driver.writer._dropped.status)
+
+        self.run_dut(dut, generator())
+        for n, length in enumerate(lengths):
+            status, payload = results["rx"][n]
+            self.assertEqual(status >> 30, 0b10) # Done, no error.
+            self.assertEqual(payload, self.payload(n, length))
+        for n, length in enumerate(lengths):
+            self.assertEqual(results["tx"][n], (0b10 << 30) | length) # Done, no error.
+        self.assertEqual(results[driver.reader], (len(lengths), sum(lengths)))
+        self.assertEqual(results[driver.writer], (len(lengths), sum(lengths)))
+        self.assertEqual(results["dropped"], 0)
+
+    def test_truncated_and_dropped(self):
+        dut     = DUT()
+        driver  = DMADriver(dut)
+        results = {}
+
+        def generator():
+            # One RX descriptor with a buffer smaller than the packets.
+            yield from driver.add_rx_descriptor(0)
+            yield from driver.write_mem(rx_ring_base + 4, 64)
+            yield from driver.setup(driver.writer, rx_ring_base)
+            yield from driver.set_tail(driver.writer, 1)
+            yield from driver.setup(driver.reader, tx_ring_base)
+            for n in range(2):
+                yield from driver.add_tx_descriptor(n, self.payload(n, 128))
+            yield from driver.set_tail(driver.reader, 2)
+            yield from driver.wait_head(driver.reader, 2)
+            while (yield driver.writer._dropped.status) == 0:
+                yield
+            results["rx"] = (yield from driver.get_rx_descriptor(0))
+            results["head"] = (yield driver.writer._head.status)
+
+        self.run_dut(dut, generator())
+        status, payload = results["rx"]
+        self.assertEqual(status >> 30, 0b11) # Done, error (truncated).
+        self.assertEqual(payload, self.payload(0, 64))
+        self.assertEqual(results["head"], 1)
+
+    def test_tx_oversize(self):
+        dut     = DUT()
+        driver  = DMADriver(dut)
+        results = {}
+
+        def generator():
+            for n in range(ring_size):
+                yield from driver.add_rx_descriptor(n)
+            yield from driver.setup(driver.writer, rx_ring_base)
+            yield from driver.set_tail(driver.writer, ring_size - 1)
+            # First packet larger than the MAC buffering, second packet valid.
+            yield from driver.setup(driver.reader, tx_ring_base)
+            yield from driver.add_tx_descriptor(0, self.payload(0, 1600))
+            yield from driver.add_tx_descriptor(1, self.payload(1, 64))
+            yield from driver.set_tail(driver.reader, 2)
+            yield from driver.wait_head(driver.reader, 2)
+            yield from driver.wait_head(driver.writer, 1)
+            for i in range(512):
+                yield
+            results["tx"] = []
+            for n in range(2):
+                results["tx"].append((yield from driver.get_tx_descriptor(n)))
+            results["rx"] = (yield from driver.get_rx_descriptor(0))
+            results["head"] = (yield driver.writer._head.status)
+
+        self.run_dut(dut, generator())
+        self.assertEqual(results["tx"][0], 0b11 << 30)         # Done, error (not sent).
+        self.assertEqual(results["tx"][1], (0b10 << 30) | 64)  # Done, no error.
+        status, payload = results["rx"]
+        self.assertEqual(status >> 30, 0b10)
+        self.assertEqual(payload, self.payload(1, 64))
+        self.assertEqual(results["head"], 1)
+
+    def test_irq_coalescing(self):
+        dut     = DUT()
+        driver  = DMADriver(dut)
+        results = {}
+
+        def generator():
+            for n in range(ring_size):
+                yield from driver.add_rx_descriptor(n)
+                yield from driver.add_tx_descriptor(n, self.payload(n, 64))
+            # RX: Interrupt every 2 packets, TX: Interrupt on timeout.
+            yield from driver.setup(driver.writer, rx_ring_base, irq_count=2)
+            yield from driver.set_tail(driver.writer, ring_size - 1)
+            yield from driver.setup(driver.reader, tx_ring_base, irq_count=4, irq_timeout=256)
+
+            # First packet: No RX interrupt, TX interrupt after the timeout.
+            yield from driver.set_tail(driver.reader, 1)
+            yield from driver.wait_head(driver.writer, 1)
+            for i in range(512):
+                yield
+            results["rx_pending_1"] = (yield driver.writer.ev.available.pending)
+            results["tx_pending_1"] = (yield driver.reader.ev.done.pending)
+            yield from driver.clear_pending(driver.reader)
+
+            # Second packet: RX interrupt.
+            yield from driver.set_tail(driver.reader, 2)
+            yield from driver.wait_head(driver.writer, 2)
+            for i in range(8):
+                yield
+            results["rx_pending_2"] = (yield driver.writer.ev.available.pending)
+
+        self.run_dut(dut, generator())
+        self.assertEqual(results["rx_pending_1"], 0)
+        self.assertEqual(results["tx_pending_1"], 1)
+        self.assertEqual(results["rx_pending_2"], 1)
@@ -13,6 +13,8 @@ from litex.soc.interconnect.stream_sim import *
 
 from liteeth.common import *
 from liteeth.core import LiteEthUDPIPCore
+from liteeth.core.udp import LiteEthUDPTX, LiteEthUDPRX
+from liteeth.frontend.stream import LiteEthStream2UDPTX
 
 from test.model import phy, mac, arp, ip, udp
 
@@ -68,3 +70,171 @@ class TestUDP(unittest.TestCase):
                   "eth_rx": 10,
                   "eth_tx": 10}
         run_simulation(dut, generators, clocks, vcd_name="sim.vcd")
+
+
+def udp_checksum(src_ip, dst_ip, data):
+    msg = src_ip.to_bytes(4, "big") + dst_ip.to_bytes(4, "big") + bytes([0, udp_protocol])
+    msg += len(data).to_bytes(2, "big") + bytes(data) + bytes(len(data)%2)
+    s = 0
+    for i in range(0, len(msg), 2):
+        s += (msg[i] << 8) | msg[i+1]
+    while s >> 16:
+        s = (s & 0xffff) + (s >> 16)
+    return (~s & 0xffff) or 0xffff
+
+
+class ChecksumDUT(Module):
+    def __init__(self, dw, mtu=eth_mtu):
+        self.submodules.tx = LiteEthUDPTX(ip_address, dw, with_checksum=True, mtu=mtu)
+        self.submodules.rx = LiteEthUDPRX(ip_address, dw, with_checksum=True)
+
+
+class TestUDPChecksum(unittest.TestCase):
+    remote_ip = 0xc0a80164
+
+    def send(self, endpoint, data, dw, **params):
+        nbytes = dw//8
+        for i in range(0, len(data), nbytes):
+            last = (i + nbytes) >= len(data)
+            yield endpoint.valid.eq(1)
+            yield endpoint.last.eq(last)
+            yield endpoint.last_be.eq((1 << ((len(data) - 1)%nbytes)) if last else 0)
+            yield endpoint.data.eq(int.from_bytes(bytes(data[i:i+nbytes]), "little"))
+            for k, v in params.items():
+                yield getattr(endpoint, k).eq(v)
+            yield
+            while not (yield endpoint.ready):
+                yield
+        yield endpoint.valid.eq(0)
+
+    def receive(self, endpoint, dw, packet):
+        yield endpoint.ready.eq(1)
+        yield
+        while True:
+            if (yield endpoint.valid):
+                data = (yield endpoint.data).to_bytes(dw//8, "little")
+                if (yield endpoint.last):
+                    last_be = (yield endpoint.last_be)
+                    if last_be:
+                        data = data[:last_be.bit_length()]
+                    packet["data"] += list(data)
+                    packet["error"] = (yield endpoint.error)
+                    return
+                packet["data"] += list(data)
+            yield
+
+    def tx_test(self, dw, length, mtu=eth_mtu):
+        dut     = ChecksumDUT(dw, mtu)
+        payload = [(i*7 + 3) % 256 for i in range(length)]
+        packet  = {"data": []}
+        params  = dict(ip_address=self.remote_ip, src_port=0x1234, dst_port=0x5678, length=length)
+        generators = [
+            self.send(dut.tx.sink, payload, dw, **params),
+            self.receive(dut.tx.source, dw, packet),
+        ]
+        run_simulation(dut, generators)
+        header = [0x12, 0x34, 0x56, 0x78, (length + 8) >> 8, (length + 8) & 0xff, 0, 0]
+        self.assertEqual(packet["data"][8:], payload)
+        self.assertEqual(packet["data"][:6], header[:6])
+        checksum = (packet["data"][6] << 8) | packet["data"][7]
+        self.assertEqual(checksum, udp_checksum(ip_address, self.remote_ip, header + payload))
+
+    def test_tx_oversize(self):
+        dut     = ChecksumDUT(32, mtu=64)
+        packet  = {"data": []}
+        payload = [(i*7 + 3) % 256 for i in range(100)]
+        params  = dict(ip_address=self.remote_ip, src_port=0x1234, dst_port=0x5678)
+        results = {}
+
+        def generator():
+            # Larger than the MTU: dropped.
+            yield from self.send(dut.tx.sink, payload, 32, length=100, **params)
+            # Payload longer than the length, larger than the MTU: dropped.
+            yield from self.send(dut.tx.sink, payload, 32, length=32, **params)
+            # Payload longer than the length, smaller than the MTU: dropped.
+            yield from self.send(dut.tx.sink, payload[:48], 32, length=37, **params)
+            # Valid.
+            yield from self.send(dut.tx.sink, payload[:37], 32, length=37, **params)
+            for i in range(64):
+                yield
+            results["oversize_errors"] = (yield dut.tx.oversize_errors)
+
+        run_simulation(dut, [generator(), self.receive(dut.tx.source, 32, packet)])
+        self.assertEqual(packet["data"][8:], payload[:37])
+        header   = [0x12, 0x34, 0x56, 0x78, 0, 37 + 8, 0, 0]
+        checksum = (packet["data"][6] << 8) | packet["data"][7]
+        self.assertEqual(checksum, udp_checksum(ip_address, self.remote_ip, header + payload[:37]))
+        self.assertEqual(results["oversize_errors"], 3)
+
+    def rx_test(self, dw, length, checksum_fn, dst_ip=ip_address, target_ip=None, error=False):
+        dut     = ChecksumDUT(dw)
+        payload = [(i*5 + 1) % 256 for i in range(length)]
+        header  = [0x12, 0x34, 0x56, 0x78, (length + 8) >> 8, (length + 8) & 0xff, 0, 0]
+        checksum = checksum_fn(udp_checksum(self.remote_ip, dst_ip, header + payload))
+        header[6:8] = [checksum >> 8, checksum & 0xff]
+        packet  = {"data": []}
+        params  = dict(ip_address=self.remote_ip, protocol=udp_protocol, length=length + 8,
+            target_ip=dst_ip if target_ip is None else target_ip)
+        generators = [
+            self.send(dut.rx.sink, header + payload, dw, **params),
+            self.receive(dut.rx.source, dw, packet),
+        ]
+        run_simulation(dut, generators)
+        self.assertEqual(packet["data"], payload)
+        self.assertEqual(packet["error"] != 0, error)
+
+    def test_tx_8(self):
+        for length in [1, 37, 64]:
+            self.tx_test(8, length)
+
+    def test_tx_32(self):
+        for length in [1, 37, 64]:
+            self.tx_test(32, length)
+
+    def test_tx_jumbo(self):
+        self.tx_test(32, udp_max_payload_length(eth_jumbo_mtu), mtu=eth_jumbo_mtu)
+
+    def test_rx(self):
+        for dw in [8, 32]:
+            for length in [1, 37, 64]:
+                self.rx_test(dw, length, lambda c: c)
+                self.rx_test(dw, length, lambda c: c ^ 0x0100, error=True)
+                self.rx_test(dw, length, lambda c: 0) # Checksum not used.
+                self.rx_test(dw, length, lambda c: c, dst_ip=0xffffffff) # Limited broadcast.
+                self.rx_test(dw, length, lambda c: c, dst_ip=0x123456ff) # Subnet broadcast.
+                self.rx_test(dw, length, lambda c: c, dst_ip=0xe0000001) # Multicast.
+                self.rx_test(dw, length, lambda c: c, dst_ip=0x0a000001, target_ip=ip_address, error=True)
+
+
+class TestUDPStreamerMTU(unittest.TestCase):
+    def test_packets_length(self):
+        dut     = LiteEthStream2UDPTX(ip_address, 0x1234, data_width=8, fifo_depth=2048, mtu=eth_mtu)
+        lengths = []
+
+        def generator():
+            # Continuous stream: packets limited to the UDP payload of the MTU (FIFO not full).
+            for i in range(3000):
+                yield dut.sink.valid.eq(1)
+                yield dut.sink.data.eq(i % 256)
+                yield
+                while not (yield dut.sink.ready):
+                    yield
+            yield dut.sink.valid.eq(0)
+            while len(lengths) < 2:
+                yield
+
+        @passive
+        def receiver():
+            yield dut.source.ready.eq(1)
+            count = 0
+            while True:
+                if (yield dut.source.valid):
+                    count += 1
+                    if (yield dut.source.last):
+                        self.assertEqual((yield dut.source.length), count)
+                        lengths.append(count)
+                        count = 0
+                yield
+
+        run_simulation(dut, [generator(), receiver()])
+        self.assertEqual(lengths, [udp_max_payload_length(eth_mtu)]*2)
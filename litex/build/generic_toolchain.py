@@ -82,10 +82,10 @@ class GenericToolchain:
             self.fragment = self.fragment.get_fragment()
         platform.finalize(self.fragment)
 
-        # Generate Verilog.
-        v_output = platform.get_verilog(self.fragment, name=build_name, **kwargs)
+        # Generate Verilog (streamed to the Verilog file).
+        v_file   = build_name + ".v"
+        v_output = platform.get_verilog(self.fragment, name=build_name, output=v_file, **kwargs)
         self._vns = v_output.ns
-        v_file = build_name + ".v"
         v_output.write(v_file)
 
         # Finalize toolchain (after gateware is complete)
@@ -226,12 +226,13 @@ class SimVerilatorToolchain:
             platform.finalize(fragment)
 
             # Generate verilog
+            v_file   = build_name + ".v"
             v_output = platform.get_verilog(fragment,
                 name         = build_name,
                 regular_comb = regular_comb,
+                output       = v_file,
             )
             named_sc, named_pc = platform.resolve_signals(v_output.ns)
-            v_file = build_name + ".v"
             v_output.write(v_file)
             platform.add_source(v_file)
 
@@ -74,10 +74,14 @@ def _memory_generate_verilog(name, memory, namespace, add_data_file):
     # ----------------------------------------
     r += f"reg [{memory.width-1}:0] {_get_name(memory)}[0:{memory.depth-1}];\n"
     if memory.init is not None:
-        content = ""
-        formatter = f"{{:0{int(memory.width/4)}x}}\n"
-        for d in memory.init:
-            content += formatter.format(d)
+        if hasattr(memory.init, "readmemh"):
+            # Sparse init (ex SparseMemory of SDRAMPHYModel): only initialized words are written.
+            content = memory.init.readmemh()
+        else:
+            content = ""
+            formatter = f"{{:0{int(memory.width/4)}x}}\n"
+            for d in memory.init:
+                content += formatter.format(d)
         memory_filename = add_data_file(f"{name}_{_get_name(memory)}.init", content)
 
         r += "initial begin\n"
@@ -5,8 +5,6 @@
 # This file is Copyright (c) 2023 Florent Kermarrec <florent@enjoy-digital.fr>
 # SPDX-License-Identifier: BSD-2-Clause
 
-from itertools import combinations
-
 from migen.fhdl.structure import *
 
 # Hierarchy Node Class -----------------------------------------------------------------------------
@@ -20,6 +18,7 @@ class _HierarchyNode:
         use_name    (bool): Flag to determine if the node's name should be used in signal naming.
         use_number  (bool): Flag to determine if the node's number should be used in signal naming.
         children    (dict): A dictionary of child nodes.
+        all_numbers (dict): The numbers of the base node when numbering is used, mapped to their rank.
     """
     def __init__(self):
         self.signal_count = 0
@@ -27,12 +26,22 @@ class _HierarchyNode:
         self.use_name     = False
         self.use_number   = False
         self.children     = {}
-        self.all_numbers  = []
+        self.all_numbers  = {}
+        self._ranks       = None
+
+    def number_ranks(self):
+        """
+        Returns the numbers associated with this node mapped to their rank, computed once and shared
+        by all the nodes numbered after this one.
+        """
+        if self._ranks is None:
+            self._ranks = {n: i for i, n in enumerate(sorted(self.numbers))}
+        return self._ranks
 
     def update(self, name, number, use_number, current_base=None):
         """
         Updates or creates a hierarchy node based on the current position, name, and number.
-        If numbering is used, sorts and stores all numbers associated with the base node.
+        If numbering is used, ranks and stores all numbers associated with the base node.
 
         Parameters:
             name                              (str): The name of the current hierarchy level.
@@ -45,15 +54,17 @@ class _HierarchyNode:
         """
         # Create the appropriate key for the node.
         key = (name, number) if use_number else name
-        # Use setdefault to either get the existing child node or create a new one.
-        child = self.children.setdefault(key, _HierarchyNode())
+        # Get the existing child node or create a new one.
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = _HierarchyNode()
         # Add the number to the set of numbers associated with this node.
         child.numbers.add(number)
         # Increment the count of signals that have traversed this node.
         child.signal_count += 1
-        # If numbering is used, sort and store all numbers associated with the base node.
+        # If numbering is used, store the ranks of all numbers associated with the base node.
         if use_number and current_base:
-            child.all_numbers = sorted(current_base.numbers)
+            child.all_numbers = current_base.number_ranks()
         return child
 
 # Build Hierarchy Tree Function --------------------------------------------------------------------
@@ -103,10 +114,14 @@ def _determine_name_usage(node, node_name=""):
         for child_name, child_node in node.children.items()
     }
 
-    # Check for naming conflicts between all pairs of children.
-    for (child1_name, names1), (child2_name, names2) in combinations(child_name_sets.items(), 2):
-        if names1 & names2:  # If there's an intersection, we have a naming conflict.
-            node.children[child1_name].use_name = node.children[child2_name].use_name = True
+    # Check for naming conflicts between children: index each name by the first child owning it,
+    # any other child owning the same name conflicts with it.
+    owners = {}
+    for child_name, names in child_name_sets.items():
+        for name in names:
+            owner = owners.setdefault(name, child_name)
+            if owner != child_name:
+                node.children[owner].use_name = node.children[child_name].use_name = True
 
     # Collect names, prepending child's name if necessary.
     for child_name, child_names in child_name_sets.items():
@@ -153,7 +168,7 @@ def _build_signal_name_dict_from_tree(tree, signals):
             # If the tree node's name is to be used, add it to the elements.
             if treepos.use_name:
                 # Create the name part, including the number if necessary.
-                element_name = step_name if not use_number else f"{step_name}{treepos.all_numbers.index(step_n)}"
+                element_name = step_name if not use_number else f"{step_name}{treepos.all_numbers[step_n]}"
                 elements.append(element_name)
 
         # Combine the name parts into the signal's full name.
@@ -248,13 +263,6 @@ def _build_signal_name_dict_for_group(group_number, signals):
         dict: A dictionary mapping signals to their hierarchical names.
     """
 
-    def resolve_conflicts_and_rebuild_tree():
-        conflicts = _list_conflicting_signals(name_dict)
-        if conflicts:
-            _set_number_usage(tree, conflicts)
-            return _build_hierarchy_tree(signals, tree)
-        return tree
-
     def disambiguate_signals_with_duid():
         inv_name_dict = _invert_signal_name_dict(name_dict)
         for names, sigs in inv_name_dict.items():
@@ -267,12 +275,14 @@ def _build_signal_name_dict_for_group(group_number, signals):
     _determine_name_usage(tree)
     name_dict = _build_signal_name_dict_from_tree(tree, signals)
 
-    # Address naming conflicts by introducing numbers.
-    tree = resolve_conflicts_and_rebuild_tree()
-
-    # Re-determine name usage and rebuild the name dictionary.
-    _determine_name_usage(tree)
-    name_dict = _build_signal_name_dict_from_tree(tree, signals)
+    # Address naming conflicts by introducing numbers, then re-determine name usage and rebuild
+    # the name dictionary (unchanged when there are no conflicts).
+    conflicts = _list_conflicting_signals(name_dict)
+    if conflicts:
+        _set_number_usage(tree, conflicts)
+        tree = _build_hierarchy_tree(signals, tree)
+        _determine_name_usage(tree)
+        name_dict = _build_signal_name_dict_from_tree(tree, signals)
 
     # Disambiguate remaining conflicts using signal's unique identifier (DUID).
     disambiguate_signals_with_duid()
@@ -169,10 +169,10 @@ class AssignType(IntEnum):
     NON_BLOCKING = 1
     SIGNAL       = 2
 
-def _generate_node(ns, at, level, node, target_filter=None):
+def _generate_node(write, ns, at, level, node, target_filter=None):
     assert at in [item.value for item in AssignType]
     if target_filter is not None and target_filter not in list_targets(node):
-        return ""
+        return
 
     # Assignment.
     elif isinstance(node, _Assign):
@@ -184,40 +184,37 @@ def _generate_node(ns, at, level, node, target_filter=None):
             assignment = " = "
         else:
             assignment = " <= "
-        return _tab*level + _generate_expression(ns, node.l)[0] + assignment + _generate_expression(ns, node.r)[0] + ";\n"
+        write(_tab*level + _generate_expression(ns, node.l)[0] + assignment + _generate_expression(ns, node.r)[0] + ";\n")
 
     # Iterable.
     elif isinstance(node, collections.abc.Iterable):
-        return "".join(_generate_node(ns, at, level, n, target_filter) for n in node)
+        for n in node:
+            _generate_node(write, ns, at, level, n, target_filter)
 
     # If.
     elif isinstance(node, If):
-        r = _tab*level + "if (" + _generate_expression(ns, node.cond)[0] + ") begin\n"
-        r += _generate_node(ns, at, level + 1, node.t, target_filter)
+        write(_tab*level + "if (" + _generate_expression(ns, node.cond)[0] + ") begin\n")
+        _generate_node(write, ns, at, level + 1, node.t, target_filter)
         if node.f:
-            r += _tab*level + "end else begin\n"
-            r += _generate_node(ns, at, level + 1, node.f, target_filter)
-        r += _tab*level + "end\n"
-        return r
+            write(_tab*level + "end else begin\n")
+            _generate_node(write, ns, at, level + 1, node.f, target_filter)
+        write(_tab*level + "end\n")
 
     # Case.
     elif isinstance(node, Case):
         if node.cases:
-            r = _tab*level + "case (" + _generate_expression(ns, node.test)[0] + ")\n"
+            write(_tab*level + "case (" + _generate_expression(ns, node.test)[0] + ")\n")
             css = [(k, v) for k, v in node.cases.items() if isinstance(k, Constant)]
             css = sorted(css, key=lambda x: x[0].value)
             for choice, statements in css:
-                r += _tab*(level + 1) + _generate_expression(ns, choice)[0] + ": begin\n"
-                r += _generate_node(ns, at, level + 2, statements, target_filter)
-                r += _tab*(level + 1) + "end\n"
+                write(_tab*(level + 1) + _generate_expression(ns, choice)[0] + ": begin\n")
+                _generate_node(write, ns, at, level + 2, statements, target_filter)
+                write(_tab*(level + 1) + "end\n")
             if "default" in node.cases:
-                r += _tab*(level + 1) + "default: begin\n"
-                r += _generate_node(ns, at, level + 2, node.cases["default"], target_filter)
-                r += _tab*(level + 1) + "end\n"
-            r += _tab*level + "endcase\n"
-            return r
-        else:
-            return ""
+                write(_tab*(level + 1) + "default: begin\n")
+                _generate_node(write, ns, at, level + 2, node.cases["default"], target_filter)
+                write(_tab*(level + 1) + "end\n")
+            write(_tab*level + "endcase\n")
 
     # Display.
     elif isinstance(node, Display):
@@ -228,11 +225,11 @@ def _generate_node(ns, at, level, node, target_filter=None):
                 s += ns.get_name(arg)
             else:
                 s += str(arg)
-        return _tab*level + "$display(" + s + ");\n"
+        write(_tab*level + "$display(" + s + ");\n")
 
     # Finish.
     elif isinstance(node, Finish):
-        return _tab*level + "$finish;\n"
+        write(_tab*level + "$finish;\n")
 
     # Unknown.
     else:
@@ -316,16 +313,15 @@ def _generate_module(f, ios, name, ns, attr_translate):
 
     return r
 
-def _generate_signals(f, ios, name, ns, attr_translate, regs_init):
+def _generate_signals(write, f, ios, name, ns, attr_translate, regs_init):
     sigs = list_signals(f) | list_special_ios(f, ins=True, outs=True, inouts=True)
     special_outs = list_special_ios(f, ins=False, outs=True,  inouts=True)
     inouts       = list_special_ios(f, ins=False, outs=False, inouts=True)
     targets      = list_targets(f) | special_outs
     wires        = _list_comb_wires(f) | special_outs
 
-    r = ""
     for sig in sorted(sigs - ios, key=lambda x: ns.get_name(x)):
-        r += _generate_attribute(sig.attr, attr_translate)
+        r = _generate_attribute(sig.attr, attr_translate)
         if sig in wires:
             r += "wire " + _generate_signal(ns, sig) + ";\n"
         else:
@@ -333,14 +329,13 @@ def _generate_signals(f, ios, name, ns, attr_translate, regs_init):
             if regs_init:
                 r += " = " + _generate_expression(ns, sig.reset)[0]
             r += ";\n"
-    return r
+        write(r)
 
 # ------------------------------------------------------------------------------------------------ #
 #                                  COMBINATORIAL LOGIC                                             #
 # ------------------------------------------------------------------------------------------------ #
 
-def _generate_combinatorial_logic_sim(f, ns):
-    r = ""
+def _generate_combinatorial_logic_sim(write, f, ns):
     if f.comb:
         target_stmt_map = collections.defaultdict(list)
 
@@ -354,53 +349,49 @@ def _generate_combinatorial_logic_sim(f, ns):
         for n, (t, stmts) in enumerate(target_stmt_map.items()):
             assert isinstance(t, Signal)
             if _use_wire(stmts):
-                r += "assign " + _generate_node(ns, AssignType.BLOCKING, 0, stmts[0])
+                write("assign ")
+                _generate_node(write, ns, AssignType.BLOCKING, 0, stmts[0])
             else:
-                r += "always @(*) begin\n"
-                r += _tab + ns.get_name(t) + " <= " + _generate_expression(ns, t.reset)[0] + ";\n"
-                r += _generate_node(ns, AssignType.NON_BLOCKING, 1, stmts, t)
-                r += "end\n"
-    r += "\n"
-    return r
+                write("always @(*) begin\n")
+                write(_tab + ns.get_name(t) + " <= " + _generate_expression(ns, t.reset)[0] + ";\n")
+                _generate_node(write, ns, AssignType.NON_BLOCKING, 1, stmts, t)
+                write("end\n")
+    write("\n")
 
-def _generate_combinatorial_logic_synth(f, ns):
-    r = ""
+def _generate_combinatorial_logic_synth(write, f, ns):
     if f.comb:
         groups = group_by_targets(f.comb)
 
         for n, g in enumerate(groups):
             if _use_wire(g[1]):
-                r += "assign " + _generate_node(ns, AssignType.BLOCKING, 0, g[1][0])
+                write("assign ")
+                _generate_node(write, ns, AssignType.BLOCKING, 0, g[1][0])
             else:
-                r += "always @(*) begin\n"
+                write("always @(*) begin\n")
                 for t in sorted(g[0], key=lambda x: ns.get_name(x)):
-                    r += _tab + ns.get_name(t) + " <= " + _generate_expression(ns, t.reset)[0] + ";\n"
-                r += _generate_node(ns, AssignType.NON_BLOCKING, 1, g[1])
-                r += "end\n"
-    r += "\n"
-    return r
+                    write(_tab + ns.get_name(t) + " <= " + _generate_expression(ns, t.reset)[0] + ";\n")
+                _generate_node(write, ns, AssignType.NON_BLOCKING, 1, g[1])
+                write("end\n")
+    write("\n")
 
 # ------------------------------------------------------------------------------------------------ #
 #                                    SYNCHRONOUS LOGIC                                             #
 # ------------------------------------------------------------------------------------------------ #
 
-def _generate_synchronous_logic(f, ns):
-    r = ""
+def _generate_synchronous_logic(write, f, ns):
     for k, v in sorted(f.sync.items(), key=itemgetter(0)):
-        r += "always @(posedge " + ns.get_name(f.clock_domains[k].clk) + ") begin\n"
-        r += _generate_node(ns, AssignType.SIGNAL, 1, v)
-        r += "end\n\n"
-    return r
+        write("always @(posedge " + ns.get_name(f.clock_domains[k].clk) + ") begin\n")
+        _generate_node(write, ns, AssignType.SIGNAL, 1, v)
+        write("end\n\n")
 
 # ------------------------------------------------------------------------------------------------ #
 #                                      SPECIALS                                                    #
 # ------------------------------------------------------------------------------------------------ #
 
-def _generate_specials(name, overrides, specials, namespace, add_data_file, attr_translate):
-    r = ""
+def _generate_specials(write, name, overrides, specials, namespace, add_data_file, attr_translate):
     for special in sorted(specials, key=lambda x: x.duid):
         if hasattr(special, "attr"):
-            r += _generate_attribute(special.attr, attr_translate)
+            write(_generate_attribute(special.attr, attr_translate))
         # Replace Migen Memory's emit_verilog with LiteX's implementation.
         if isinstance(special, Memory):
             from litex.gen.fhdl.memory import _memory_generate_verilog
@@ -413,8 +404,7 @@ def _generate_specials(name, overrides, specials, namespace, add_data_file, attr
             pr = call_special_classmethod(overrides, special, "emit_verilog", namespace, add_data_file)
         if pr is None:
             raise NotImplementedError("Special " + str(special) + " failed to implement emit_verilog")
-        r += pr
-    return r
+        write(pr)
 
 # ------------------------------------------------------------------------------------------------ #
 #                                       LOWERER                                                    #
@@ -489,10 +479,20 @@ def convert(f, ios=set(), name="top", platform=None,
     # Sim parameters.
     time_unit      = "1ns",
     time_precision = "1ps",
+    # Output parameters.
+    output = None,
     ):
+    """Convert a design to Verilog.
+
+    The Verilog source is kept in memory in the returned ConvOutput, or, when ``output`` is a
+    filename, streamed directly to that file. Time spent in each phase (lowering, namespace, emit)
+    is reported in the ``timings`` dict of the returned ConvOutput.
+    """
 
     # Build Logic.
     # ------------
+    timings = collections.OrderedDict()
+    start   = time.perf_counter()
 
     # Create ConvOutput.
     r = ConvOutput()
@@ -543,6 +543,9 @@ def convert(f, ios=set(), name="top", platform=None,
             if io_name:
                 io.name_override = io_name
 
+    timings["lowering"] = time.perf_counter() - start
+    start = time.perf_counter()
+
     # Build Signal Namespace.
     # ----------------------
     ns = build_signal_namespace(
@@ -555,63 +558,82 @@ def convert(f, ios=set(), name="top", platform=None,
     )
     ns.clock_domains = f.clock_domains
 
+    timings["namespace"] = time.perf_counter() - start
+    start = time.perf_counter()
+
     # Build Verilog.
     # --------------
-    verilog = ""
-
-    # Banner.
-    verilog += _generate_banner(
-        filename = name,
-        device   = getattr(platform, "device", "Unknown")
-    )
-
-    # Timescale.
-    verilog += _generate_timescale(
-        time_unit      = time_unit,
-        time_precision = time_precision
-    )
-
-    # Module Definition.
-    verilog += _generate_separator("Module")
-    verilog += _generate_module(f, ios, name, ns, attr_translate)
-
-    # Module Hierarchy.
-    verilog += _generate_separator("Hierarchy")
-    verilog += _generate_hierarchy(top=LiteXContext.top)
-
-    # Module Signals.
-    verilog += _generate_separator("Signals")
-    verilog += _generate_signals(f, ios, name, ns, attr_translate, regs_init)
-
-    # Combinatorial Logic.
-    verilog += _generate_separator("Combinatorial Logic")
-    if regular_comb:
-        verilog += _generate_combinatorial_logic_synth(f, ns)
+    # Chunks are written to the output file or collected and joined once at the end.
+    if output is None:
+        chunks = []
+        write  = chunks.append
     else:
-        verilog += _generate_combinatorial_logic_sim(f, ns)
-
-    # Synchronous Logic.
-    verilog += _generate_separator("Synchronous Logic")
-    verilog += _generate_synchronous_logic(f, ns)
-
-    # Specials
-    verilog += _generate_separator("Specialized Logic")
-    verilog += _generate_specials(
-        name           = name,
-        overrides      = special_overrides,
-        specials       = f.specials - lowered_specials,
-        namespace      = ns,
-        add_data_file  = r.add_data_file,
-        attr_translate = attr_translate
-    )
-
-    # Module End.
-    verilog += "endmodule\n"
-
-    # Trailer.
-    verilog += _generate_trailer()
-
-    r.set_main_source(verilog)
+        output_file = open(output, "w", buffering=2**20)
+        write       = output_file.write
+
+    try:
+        # Banner.
+        write(_generate_banner(
+            filename = name,
+            device   = getattr(platform, "device", "Unknown")
+        ))
+
+        # Timescale.
+        write(_generate_timescale(
+            time_unit      = time_unit,
+            time_precision = time_precision
+        ))
+
+        # Module Definition.
+        write(_generate_separator("Module"))
+        write(_generate_module(f, ios, name, ns, attr_translate))
+
+        # Module Hierarchy.
+        write(_generate_separator("Hierarchy"))
+        write(_generate_hierarchy(top=LiteXContext.top))
+
+        # Module Signals.
+        write(_generate_separator("Signals"))
+        _generate_signals(write, f, ios, name, ns, attr_translate, regs_init)
+
+        # Combinatorial Logic.
+        write(_generate_separator("Combinatorial Logic"))
+        if regular_comb:
+            _generate_combinatorial_logic_synth(write, f, ns)
+        else:
+            _generate_combinatorial_logic_sim(write, f, ns)
+
+        # Synchronous Logic.
+        write(_generate_separator("Synchronous Logic"))
+        _generate_synchronous_logic(write, f, ns)
+
+        # Specials
+        write(_generate_separator("Specialized Logic"))
+        _generate_specials(write,
+            name           = name,
+            overrides      = special_overrides,
+            specials       = f.specials - lowered_specials,
+            namespace      = ns,
+            add_data_file  = r.add_data_file,
+            attr_translate = attr_translate
+        )
+
+        # Module End.
+        write("endmodule\n")
+
+        # Trailer.
+        write(_generate_trailer())
+    finally:
+        if output is not None:
+            output_file.close()
+
+    if output is None:
+        r.set_main_source("".join(chunks))
+    else:
+        r.set_main_filename(output)
     r.ns = ns
 
+    timings["emit"] = time.perf_counter() - start
+    r.timings = timings
+
     return r
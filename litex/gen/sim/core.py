@@ -12,6 +12,8 @@
 import operator
 import collections
 import inspect
+import heapq
+import time
 from functools import wraps
 
 from migen.fhdl.structure import *
@@ -19,14 +21,16 @@ from migen.fhdl.structure import (_Value, _Statement,
                                   _Operator, _Slice, _ArrayProxy,
                                   _Assign, _Fragment)
 from migen.fhdl.bitcontainer import value_bits_sign
-from migen.fhdl.tools import (list_targets, list_signals,
+from migen.fhdl.tools import (list_targets, list_signals, group_by_targets,
                               insert_resets, lower_specials)
+from migen.fhdl.visit import NodeVisitor
 from migen.fhdl.simplify import MemoryToArray
 from migen.fhdl.specials import _MemoryLocation
 from migen.fhdl.module import Module
 from migen.genlib.resetsync import AsyncResetSynchronizer
 
 from litex.gen.sim.vcd import VCDWriter, DummyVCDWriter
+from litex.gen.sim.compiler import Compiler
 
 
 class ClockState:
@@ -100,6 +104,33 @@ def _truncate(value, nbits, signed):
     return value
 
 
+def _cat_layout(node):
+    # (element, mask, shift) of each element, cached on the Cat node.
+    try:
+        return node._sim_layout
+    except AttributeError:
+        layout = []
+        shift = 0
+        for element in node.l:
+            nbits = len(element)
+            layout.append((element, (1 << nbits) - 1, shift))
+            shift += nbits
+        node._sim_layout = layout
+        return layout
+
+
+def _replicate_layout(node):
+    # (mask, pattern) such that (v & mask)*pattern replicates v, cached on
+    # the Replicate node.
+    try:
+        return node._sim_layout
+    except AttributeError:
+        nbits = len(node.v)
+        layout = (1 << nbits) - 1, sum(1 << i*nbits for i in range(node.n))
+        node._sim_layout = layout
+        return layout
+
+
 class Evaluator:
     def __init__(self, clock_domains, replaced_memories):
         self.clock_domains = clock_domains
@@ -142,21 +173,16 @@ class Evaluator:
                 return str2op[node.op](*operands)
         elif isinstance(node, _Slice):
             v = self.eval(node.value, postcommit)
-            idx = range(node.start, node.stop)
-            return sum(((v >> i) & 1) << j for j, i in enumerate(idx))
+            return (v >> node.start) & ((1 << (node.stop - node.start)) - 1)
         elif isinstance(node, Cat):
-            shift = 0
             r = 0
-            for element in node.l:
-                nbits = len(element)
+            for element, mask, shift in _cat_layout(node):
                 # make value always positive
-                r |= (self.eval(element, postcommit) & (2**nbits-1)) << shift
-                shift += nbits
+                r |= (self.eval(element, postcommit) & mask) << shift
             return r
         elif isinstance(node, Replicate):
-            nbits = len(node.v)
-            v = self.eval(node.v, postcommit) & (2**nbits - 1)
-            return sum(v << i*nbits for i in range(node.n))
+            mask, pattern = _replicate_layout(node)
+            return (self.eval(node.v, postcommit) & mask)*pattern
         elif isinstance(node, _ArrayProxy):
             idx = min(len(node.choices) - 1, self.eval(node.key, postcommit))
             return self.eval(node.choices[idx], postcommit)
@@ -184,17 +210,15 @@ class Evaluator:
             self.modifications[node] = _truncate(value,
                                                  node.nbits, node.signed)
         elif isinstance(node, Cat):
-            for element in node.l:
-                nbits = len(element)
-                self.assign(element, value & (2**nbits-1))
-                value >>= nbits
+            for element, mask, shift in _cat_layout(node):
+                self.assign(element, (value >> shift) & mask)
         elif isinstance(node, _Slice):
             full_value = self.eval(node.value, True)
+            mask = (1 << (node.stop - node.start)) - 1
             # clear bits assigned to by the slice
-            full_value &= ~((2**node.stop-1) - (2**node.start-1))
+            full_value &= ~(mask << node.start)
             # set them to the new value
-            value &= 2**(node.stop - node.start)-1
-            full_value |= value << node.start
+            full_value |= (value & mask) << node.start
             self.assign(node.value, full_value)
         elif isinstance(node, _ArrayProxy):
             idx = min(len(node.choices) - 1, self.eval(node.key))
@@ -231,14 +255,155 @@ class Evaluator:
                 args = []
                 for arg in s.args:
                     assert isinstance(arg, _Value)
-                    try:
-                        args.append(self.signal_values[arg])
-                    except: # not yet evaluated
-                        args.append(arg.reset.value)
+                    args.append(self.eval(arg))
                 print(s.s %(*args,))
             else:
                 raise NotImplementedError
 
+    def compile(self, statements):
+        return lambda: self.execute(statements)
+
+
+class CompiledEvaluator(Evaluator):
+    """Evaluator running statements lowered to Python functions.
+
+    Signal values live in a flat list indexed by slot instead of
+    dictionaries keyed by signal. ``eval``, ``assign`` and ``execute`` keep
+    interpreting their argument and are used for generator requests and for
+    statements that cannot be compiled.
+    """
+    def __init__(self, clock_domains, replaced_memories):
+        self.clock_domains = clock_domains
+        self.replaced_memories = replaced_memories
+        self.slots = dict()
+        self.signals = []
+        self.values = []
+        self.pending = dict()
+        self.compiler = Compiler(self.get_slot, clock_domains, replaced_memories,
+                                 self.values, self.pending)
+
+    def get_slot(self, signal):
+        try:
+            return self.slots[signal]
+        except KeyError:
+            slot = self.slots[signal] = len(self.signals)
+            self.signals.append(signal)
+            self.values.append(signal.reset.value)
+            return slot
+
+    def commit(self):
+        r = set()
+        values = self.values
+        for slot, value in self.pending.items():
+            if values[slot] != value:
+                values[slot] = value
+                r.add(self.signals[slot])
+        self.pending.clear()
+        return r
+
+    def eval(self, node, postcommit=False):
+        if isinstance(node, Signal):
+            slot = self.get_slot(node)
+            if postcommit:
+                try:
+                    return self.pending[slot]
+                except KeyError:
+                    pass
+            return self.values[slot]
+        return Evaluator.eval(self, node, postcommit)
+
+    def assign(self, node, value):
+        if isinstance(node, Signal):
+            assert not node.variable
+            self.pending[self.get_slot(node)] = _truncate(value,
+                                                          node.nbits, node.signed)
+        else:
+            Evaluator.assign(self, node, value)
+
+    def compile(self, statements):
+        try:
+            return self.compiler.compile(statements)
+        except (NotImplementedError, KeyError, RecursionError, SyntaxError):
+            return Evaluator.compile(self, statements)
+
+
+class _CombInputLister(NodeVisitor):
+    # Unlike list_inputs, also lists the signals indexing assignment targets
+    # and the signals behind ClockSignal/ResetSignal.
+    def __init__(self, clock_domains):
+        self.clock_domains = clock_domains
+        self.output_list = set()
+        self.target_context = False
+
+    def visit_Signal(self, node):
+        if not self.target_context:
+            self.output_list.add(node)
+
+    def visit_ClockSignal(self, node):
+        if node.cd in self.clock_domains:
+            self.visit(self.clock_domains[node.cd].clk)
+
+    def visit_ResetSignal(self, node):
+        if node.cd in self.clock_domains and self.clock_domains[node.cd].rst is not None:
+            self.visit(self.clock_domains[node.cd].rst)
+
+    def visit_index(self, node):
+        target_context = self.target_context
+        self.target_context = False
+        self.visit(node)
+        self.target_context = target_context
+
+    def visit_Part(self, node):
+        self.visit(node.value)
+        self.visit_index(node.offset)
+
+    def visit_ArrayProxy(self, node):
+        for choice in node.choices:
+            self.visit(choice)
+        self.visit_index(node.key)
+
+    def visit_Assign(self, node):
+        self.target_context = True
+        self.visit(node.l)
+        self.target_context = False
+        self.visit(node.r)
+
+
+def _list_comb_inputs(clock_domains, statements):
+    lister = _CombInputLister(clock_domains)
+    lister.visit(statements)
+    return lister.output_list
+
+
+def _sort_comb_groups(groups, inputs):
+    # Orders groups so that drivers come before their readers; groups in
+    # combinational loops keep their original relative order at the end.
+    drivers = dict()
+    for i, (targets, statements) in enumerate(groups):
+        for target in targets:
+            drivers[target] = i
+    successors = [set() for _ in groups]
+    indegree = [0]*len(groups)
+    for i, signals in enumerate(inputs):
+        for signal in signals:
+            j = drivers.get(signal)
+            if j is not None and j != i and i not in successors[j]:
+                successors[j].add(i)
+                indegree[i] += 1
+    ready = [i for i, d in enumerate(indegree) if not d]
+    order = []
+    while ready:
+        i = heapq.heappop(ready)
+        order.append(i)
+        for j in successors[i]:
+            indegree[j] -= 1
+            if not indegree[j]:
+                heapq.heappush(ready, j)
+    if len(order) < len(groups):
+        placed = set(order)
+        order += [i for i in range(len(groups)) if i not in placed]
+    return order
+
 
 class DummyAsyncResetSynchronizerImpl(Module):
     def __init__(self, cd, async_reset):
@@ -254,23 +419,69 @@ class DummyAsyncResetSynchronizer:
         return DummyAsyncResetSynchronizerImpl(dr.cd, dr.async_reset)
 
 
+def _elaborate(fragment, clocks, special_overrides):
+    # Lowers the fragment in place for simulation. The result is kept on the
+    # fragment so that simulating the same design again skips lowering.
+    key = (tuple(clocks.items()), tuple(special_overrides.items()))
+    elaboration = getattr(fragment, "_sim_elaboration", None)
+    if elaboration is not None:
+        if elaboration[0] != key:
+            raise ValueError("Fragment already elaborated for simulation with "
+                             "different clocks or special overrides")
+        return elaboration[1:]
+
+    mta = MemoryToArray()
+    mta.transform_fragment(None, fragment)
+
+    overrides = {AsyncResetSynchronizer: DummyAsyncResetSynchronizer}
+    overrides.update(special_overrides)
+    f, lowered = lower_specials(overrides, fragment)
+    if fragment.specials:
+        raise ValueError("Could not lower all specials", fragment.specials)
+
+    for clock, state in TimeManager(clocks).clocks.items():
+        if clock not in fragment.clock_domains:
+            cd = ClockDomain(name=clock, reset_less=True)
+            cd.clk.reset = C(state.high)
+            fragment.clock_domains.append(cd)
+
+    insert_resets(fragment)
+    # comb signals return to their reset value if nothing assigns them
+    fragment.comb[0:0] = [s.eq(s.reset)
+                          for s in list_targets(fragment.comb)]
+
+    # Comb statements are split into groups driving disjoint targets, in
+    # topological order. Only the groups reading a modified signal are
+    # executed again, see Simulator._commit_and_comb_propagate.
+    groups = group_by_targets(fragment.comb)
+    inputs = [_list_comb_inputs(fragment.clock_domains, statements)
+              for targets, statements in groups]
+    comb = [(groups[i][0], groups[i][1], inputs[i])
+            for i in _sort_comb_groups(groups, inputs)]
+
+    fragment._sim_elaboration = key, mta.replacements, comb
+    return mta.replacements, comb
+
+
+# Called with each Simulator once it has run, e.g. to collect its cycles and
+# timings (see litex.gen.sim.runner).
+run_hooks = []
+
+
 # TODO: instances via Iverilog/VPI
 class Simulator:
     def __init__(self, fragment_or_module, generators, clocks={"sys": 10}, vcd_name=None,
-                 special_overrides={}):
+                 special_overrides={}, compiled=True, vcd_filter=None, vcd_start=None,
+                 vcd_stop=None):
+        start = time.perf_counter()
         if isinstance(fragment_or_module, _Fragment):
             self.fragment = fragment_or_module
+        elif fragment_or_module.get_fragment_called:
+            # simulated before: reuse its elaborated fragment
+            self.fragment = fragment_or_module._fragment
         else:
             self.fragment = fragment_or_module.get_fragment()
-
-        mta = MemoryToArray()
-        mta.transform_fragment(None, self.fragment)
-
-        overrides = {AsyncResetSynchronizer: DummyAsyncResetSynchronizer}
-        overrides.update(special_overrides)
-        f, lowered = lower_specials(overrides, self.fragment)
-        if self.fragment.specials:
-            raise ValueError("Could not lower all specials", self.fragment.specials)
+        self.name = type(fragment_or_module).__name__
 
         if not isinstance(generators, dict):
             generators = {"sys": generators}
@@ -286,35 +497,51 @@ class Simulator:
         clocks = collections.OrderedDict(sorted(clocks.items(),
                                                 key=operator.itemgetter(0)))
         self.time = TimeManager(clocks)
-        for clock in clocks.keys():
-            if clock not in self.fragment.clock_domains:
-                cd = ClockDomain(name=clock, reset_less=True)
-                cd.clk.reset = C(self.time.clocks[clock].high)
-                self.fragment.clock_domains.append(cd)
-
-        insert_resets(self.fragment)
-        # comb signals return to their reset value if nothing assigns them
-        self.fragment.comb[0:0] = [s.eq(s.reset)
-                                   for s in list_targets(self.fragment.comb)]
-        self.evaluator = Evaluator(self.fragment.clock_domains,
-                                   mta.replacements)
+        replacements, comb = _elaborate(self.fragment, clocks, special_overrides)
 
+        if compiled:
+            self.evaluator = CompiledEvaluator(self.fragment.clock_domains,
+                                               replacements)
+        else:
+            self.evaluator = Evaluator(self.fragment.clock_domains,
+                                       replacements)
+        self.sync = {cd: self.evaluator.compile(statements)
+                     for cd, statements in self.fragment.sync.items()}
+
+        self.comb = []
+        self.comb_readers = collections.defaultdict(list)
+        self.comb_drivers = dict()
+        for rank, (targets, statements, inputs) in enumerate(comb):
+            self.comb.append(self.evaluator.compile(statements))
+            for signal in inputs:
+                self.comb_readers[signal].append(rank)
+            for signal in targets:
+                self.comb_drivers[signal] = rank
+        self.comb_queue = []
+        self.comb_queued = [False]*len(self.comb)
+
+        self.trace = vcd_name is not None
         if vcd_name is None:
             self.vcd = DummyVCDWriter()
         else:
-            self.vcd = VCDWriter(vcd_name)
+            self.vcd = VCDWriter(vcd_name, signal_filter=vcd_filter, start=vcd_start, stop=vcd_stop)
 
             signals = list_signals(self.fragment)
             for cd in self.fragment.clock_domains:
                 signals.add(cd.clk)
                 if cd.rst is not None:
                     signals.add(cd.rst)
-            for memory_array in mta.replacements.values():
+            for memory_array in replacements.values():
                 signals |= set(memory_array)
             self.vcd.init(signals)
             for signal in sorted(signals, key=lambda x: x.duid):
                 self.vcd.set(signal, signal.reset.value)
 
+        # rising edges per clock domain
+        self.cycles = collections.Counter()
+        self.elaboration_time = time.perf_counter() - start
+        self.run_time = 0.0
+
     def __enter__(self):
         return self
 
@@ -324,17 +551,39 @@ class Simulator:
     def close(self):
         self.vcd.close()
 
+    def _schedule_comb(self, rank):
+        if not self.comb_queued[rank]:
+            self.comb_queued[rank] = True
+            heapq.heappush(self.comb_queue, rank)
+
     def _commit_and_comb_propagate(self):
-        # TODO: optimize
-        all_modified = set()
+        readers = self.comb_readers
+        queue = self.comb_queue
+        queued = self.comb_queued
         modified = self.evaluator.commit()
-        all_modified |= modified
-        while modified:
-            self.evaluator.execute(self.fragment.comb)
+        all_modified = set(modified)
+        for signal in modified:
+            for rank in readers.get(signal, ()):
+                self._schedule_comb(rank)
+            # a comb signal set from outside (e.g. by a generator) returns to
+            # the value of its driving statements
+            if signal in self.comb_drivers:
+                self._schedule_comb(self.comb_drivers[signal])
+        while queue:
+            rank = heapq.heappop(queue)
+            queued[rank] = False
+            self.comb[rank]()
             modified = self.evaluator.commit()
-            all_modified |= modified
-        for signal in all_modified:
-            self.vcd.set(signal, self.evaluator.signal_values[signal])
+            if modified:
+                all_modified |= modified
+                for signal in modified:
+                    for rank in readers.get(signal, ()):
+                        if not queued[rank]:
+                            queued[rank] = True
+                            heapq.heappush(queue, rank)
+        if self.trace:
+            for signal in all_modified:
+                self.vcd.set(signal, self.evaluator.eval(signal))
 
     def _evalexec_nested_lists(self, x):
         if isinstance(x, list):
@@ -379,16 +628,19 @@ class Simulator:
         return False
 
     def run(self):
-        self.evaluator.execute(self.fragment.comb)
+        start = time.perf_counter()
+        for rank in range(len(self.comb)):
+            self._schedule_comb(rank)
         self._commit_and_comb_propagate()
 
         while True:
             dt, rising, falling = self.time.tick()
             self.vcd.delay(dt)
             for cd in rising:
+                self.cycles[cd] += 1
                 self.evaluator.assign(self.fragment.clock_domains[cd].clk, 1)
-                if cd in self.fragment.sync:
-                    self.evaluator.execute(self.fragment.sync[cd])
+                if cd in self.sync:
+                    self.sync[cd]()
                 if cd in self.generators:
                     self._process_generators(cd)
             for cd in falling:
@@ -398,6 +650,10 @@ class Simulator:
             if not self._continue_simulation():
                 break
 
+        self.run_time = time.perf_counter() - start
+        for hook in run_hooks:
+            hook(self)
+
 
 def run_simulation(*args, **kwargs):
     with Simulator(*args, **kwargs) as s:
@@ -0,0 +1,189 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Parallel simulation test runner.
+
+Runs unittest tests (typically testbenches calling ``run_simulation``) sharded
+across a process pool, and reports the cycles and timings of every simulation
+they ran, e.g. from a project directory::
+
+    python -m litex.gen.sim.runner -j 8 -s test --top 20
+
+Tests are distributed one test method at a time; they must not depend on
+running in the same process as other tests. Projects with clashing test
+package names (``test``) must be run separately.
+"""
+
+import sys
+import json
+import time
+import argparse
+import unittest
+import multiprocessing
+from collections import namedtuple
+
+from migen.sim import core as migen_sim_core
+
+from litex.gen.sim import core as litex_sim_core
+
+# Statistics ---------------------------------------------------------------------------------------
+
+SimulationStatistics = namedtuple("SimulationStatistics",
+    ["test", "design", "cycles", "elaboration_time", "run_time"])
+
+TestOutcome = namedtuple("TestOutcome",
+    ["test", "status", "details", "duration", "simulations"])
+
+
+class collect_statistics:
+    """Collect the statistics of all simulations run in its context.
+
+    Both the migen and LiteX simulators are observed.
+    """
+    def __init__(self, test=None):
+        self.test       = test
+        self.statistics = []
+
+    def _hook(self, sim):
+        self.statistics.append(SimulationStatistics(
+            test             = self.test,
+            design           = sim.name,
+            cycles           = max(sim.cycles.values(), default=0),
+            elaboration_time = sim.elaboration_time,
+            run_time         = sim.run_time,
+        ))
+
+    def __enter__(self):
+        for core in (migen_sim_core, litex_sim_core):
+            core.run_hooks.append(self._hook)
+        return self.statistics
+
+    def __exit__(self, *args):
+        for core in (migen_sim_core, litex_sim_core):
+            core.run_hooks.remove(self._hook)
+
+
+def cycles_per_second(statistics):
+    return statistics.cycles/statistics.run_time if statistics.run_time else 0.0
+
+# Runner -------------------------------------------------------------------------------------------
+
+def list_tests(suite):
+    """Return the ids of all tests of a (nested) unittest suite."""
+    if isinstance(suite, unittest.TestSuite):
+        return [test_id for test in suite for test_id in list_tests(test)]
+    return [suite.id()]
+
+
+def run_test(test_id):
+    """Run a single test by id and return its ``TestOutcome``."""
+    suite  = unittest.defaultTestLoader.loadTestsFromName(test_id)
+    result = unittest.TestResult()
+    start  = time.perf_counter()
+    with collect_statistics(test_id) as simulations:
+        suite.run(result)
+    duration = time.perf_counter() - start
+    details  = [trace for test, trace in result.errors + result.failures]
+    if result.errors:
+        status = "error"
+    elif result.failures or result.unexpectedSuccesses:
+        status = "fail"
+    elif result.skipped:
+        status = "skip"
+    else:
+        status = "ok"
+    return TestOutcome(test_id, status, details, duration, simulations)
+
+
+def run_parallel(test_ids, processes=None, callback=None):
+    """Run tests across ``processes`` worker processes.
+
+    ``callback`` is called with each ``TestOutcome`` as it completes. Returns
+    the outcomes in completion order. With ``processes=1``, tests are run in
+    the current process.
+    """
+    outcomes = []
+    def complete(outcome):
+        outcomes.append(outcome)
+        if callback is not None:
+            callback(outcome)
+    if processes == 1:
+        for test_id in test_ids:
+            complete(run_test(test_id))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            for outcome in pool.imap_unordered(run_test, test_ids, chunksize=1):
+                complete(outcome)
+    return outcomes
+
+# Report -------------------------------------------------------------------------------------------
+
+def print_report(outcomes, wall_time, top=None):
+    simulations = [s for outcome in outcomes for s in outcome.simulations]
+    simulations.sort(key=lambda s: s.elaboration_time + s.run_time, reverse=True)
+    if top is not None:
+        simulations = simulations[:top]
+    if simulations:
+        print("{:<60} {:<24} {:>9} {:>9} {:>9} {:>10}".format(
+            "test", "design", "cycles", "elab (s)", "run (s)", "cycles/s"))
+        for s in simulations:
+            print("{:<60} {:<24} {:>9} {:>9.3f} {:>9.3f} {:>10.0f}".format(
+                s.test[-60:], s.design[:24], s.cycles, s.elaboration_time, s.run_time,
+                cycles_per_second(s)))
+        print()
+
+    total_cycles = sum(s.cycles for outcome in outcomes for s in outcome.simulations)
+    total_run    = sum(s.run_time for outcome in outcomes for s in outcome.simulations)
+    total_elab   = sum(s.elaboration_time for outcome in outcomes for s in outcome.simulations)
+    counts = {status: sum(o.status == status for o in outcomes)
+              for status in ("ok", "fail", "error", "skip")}
+    print("{} tests in {:.1f}s: {ok} ok, {fail} failed, {error} errors, {skip} skipped".format(
+        len(outcomes), wall_time, **counts))
+    print("{} simulations, {} cycles: {:.1f}s elaborating, {:.1f}s running ({:.0f} cycles/s)".format(
+        sum(len(o.simulations) for o in outcomes), total_cycles, total_elab, total_run,
+        total_cycles/total_run if total_run else 0.0))
+
+# Run ----------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel simulation test runner.")
+    parser.add_argument("tests",                     nargs="*",        help="Test ids to run (default: discover).")
+    parser.add_argument("-j", "--processes",         type=int,         help="Worker processes (default: CPU count).")
+    parser.add_argument("-s", "--start-directory",   default=".",      help="Directory to start discovery.")
+    parser.add_argument("-p", "--pattern",           default="test*.py", help="Pattern to match test files.")
+    parser.add_argument("-t", "--top-level-directory", default=None,   help="Top level directory of the project.")
+    parser.add_argument("--top",                     type=int,         help="Only report the N longest simulations.")
+    parser.add_argument("--json",                    default=None,     help="Write simulation statistics to this JSON file.")
+    parser.add_argument("-v", "--verbose",           action="store_true", help="Print each test outcome.")
+    args = parser.parse_args()
+
+    test_ids = args.tests
+    if not test_ids:
+        suite = unittest.defaultTestLoader.discover(args.start_directory, args.pattern,
+            args.top_level_directory)
+        test_ids = list_tests(suite)
+
+    def callback(outcome):
+        if args.verbose:
+            print("{} ... {} ({:.2f}s)".format(outcome.test, outcome.status, outcome.duration))
+        for trace in outcome.details:
+            print("=" * 70)
+            print("{}: {}".format(outcome.status.upper(), outcome.test))
+            print("-" * 70)
+            print(trace)
+
+    start    = time.perf_counter()
+    outcomes = run_parallel(test_ids, args.processes, callback)
+    print_report(outcomes, time.perf_counter() - start, args.top)
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump([s._asdict() for o in outcomes for s in o.simulations], f, indent=4)
+
+    if any(o.status in ("fail", "error") for o in outcomes):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
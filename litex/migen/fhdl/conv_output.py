@@ -1,13 +1,28 @@
+import os
+import shutil
 from operator import itemgetter
 
 
 class ConvOutput:
     def __init__(self):
         self.main_source = ""
+        self.main_filename = None
         self.data_files = dict()
 
     def set_main_source(self, src):
         self.main_source = src
+        self.main_filename = None
+
+    def set_main_filename(self, filename):
+        # the main source has already been written to this file
+        self.main_source = None
+        self.main_filename = filename
+
+    def get_main_source(self):
+        if self.main_filename is not None:
+            with open(self.main_filename) as f:
+                return f.read()
+        return self.main_source
 
     def add_data_file(self, filename_base, content):
         filename = filename_base
@@ -21,15 +36,18 @@ class ConvOutput:
         return filename
 
     def __str__(self):
-        r = self.main_source + "\n"
+        r = self.get_main_source() + "\n"
         for filename, content in sorted(self.data_files.items(),
                                         key=itemgetter(0)):
             r += filename + ":\n" + content
         return r
 
     def write(self, main_filename):
-        with open(main_filename, "w") as f:
-            f.write(self.main_source)
+        if self.main_filename is None:
+            with open(main_filename, "w") as f:
+                f.write(self.main_source)
+        elif os.path.abspath(main_filename) != os.path.abspath(self.main_filename):
+            shutil.copyfile(self.main_filename, main_filename)
         for filename, content in self.data_files.items():
             with open(filename, "w") as f:
                 f.write(content)
@@ -27,6 +27,9 @@ class _TargetLister(NodeVisitor):
         self.visit(node.l)
         self.target_context = False
 
+    def visit_Part(self, node):
+        self.visit(node.value)
+
     def visit_ArrayProxy(self, node):
         for choice in node.choices:
             self.visit(choice)
@@ -0,0 +1,390 @@
+"""Lowering of simulator statements to Python functions.
+
+Signals are mapped to slots of a flat list holding the committed values
+(``v``). Assignments go to a dictionary of pending values keyed by slot
+(``m``) that the evaluator commits at the end of each delta cycle, exactly
+like the interpreted ``Evaluator`` does with its ``modifications``.
+"""
+
+import collections.abc
+from itertools import count
+
+from migen.fhdl.structure import *
+from migen.fhdl.structure import (_Operator, _Slice, _Part, _ArrayProxy,
+                                  _Assign)
+from migen.fhdl.bitcontainer import value_bits_sign
+from migen.fhdl.specials import _MemoryLocation
+
+
+__all__ = ["Compiler"]
+
+
+_binary_ops = {
+    "+": "+",
+    "-": "-",
+    "*": "*",
+
+    ">>>": ">>",
+    "<<<": "<<",
+
+    "&": "&",
+    "^": "^",
+    "|": "|",
+
+    "<": "<",
+    "<=": "<=",
+    "==": "==",
+    "!=": "!=",
+    ">": ">",
+    ">=": ">=",
+}
+
+
+def _truncate_signed(value, nbits):
+    value &= (1 << nbits) - 1
+    if value & (1 << (nbits - 1)):
+        value -= 1 << nbits
+    return value
+
+
+def _reset_less_error(cd):
+    raise ValueError("Attempted to get reset signal of resetless"
+                     " domain '{}'".format(cd))
+
+
+def _shape(node, signals):
+    # Structural key of an expression with signals abstracted away, used to
+    # share one generated function between similar array choices.
+    if isinstance(node, Signal):
+        if node not in signals:
+            signals[node] = len(signals)
+        return ("s", node.nbits, node.signed, node.variable, signals[node])
+    elif isinstance(node, Constant):
+        return ("c", node.value, node.nbits, node.signed)
+    elif isinstance(node, _Operator):
+        return ("o", node.op) + tuple(_shape(o, signals) for o in node.operands)
+    elif isinstance(node, _Slice):
+        return ("sl", node.start, node.stop, _shape(node.value, signals))
+    elif isinstance(node, _Part):
+        return ("p", node.width, _shape(node.value, signals),
+                _shape(node.offset, signals))
+    elif isinstance(node, Cat):
+        return ("cat",) + tuple(_shape(e, signals) for e in node.l)
+    elif isinstance(node, Replicate):
+        return ("r", node.n, _shape(node.v, signals))
+    else:
+        return None
+
+
+class _Writer:
+    def __init__(self, level=1):
+        self.lines = []
+        self.level = level
+
+    def line(self, s):
+        self.lines.append("    "*self.level + s)
+
+    def fork(self):
+        return _Writer(self.level)
+
+
+class Compiler:
+    # Expressions nested deeper than this are split into temporaries to stay
+    # below the parser nesting limits.
+    max_depth = 32
+
+    def __init__(self, get_slot, clock_domains, replaced_memories, values, pending):
+        self.get_slot = get_slot
+        self.clock_domains = clock_domains
+        self.replaced_memories = replaced_memories
+        self.namespace = {
+            "_v": values,
+            "_m": pending,
+            "_truncate_signed": _truncate_signed,
+            "_reset_less_error": _reset_less_error,
+            "_print": print,
+        }
+        self.counter = count()
+        self.params = dict()
+
+    def _name(self, prefix):
+        return "{}{}".format(prefix, next(self.counter))
+
+    def _bind(self, obj):
+        name = self._name("_k")
+        self.namespace[name] = obj
+        return name
+
+    def _temp(self, w, expr):
+        name = self._name("_t")
+        w.line("{} = {}".format(name, expr))
+        return name
+
+    def _function(self, name, args, body):
+        w = _Writer()
+        body(w)
+        if not w.lines:
+            w.line("pass")
+        src = "def {}({}):\n{}\n".format(name, args, "\n".join(w.lines))
+        exec(compile(src, "<migen.sim {}>".format(name), "exec"), self.namespace)
+        return self.namespace[name]
+
+    def _slot(self, signal):
+        try:
+            return self.params[signal]
+        except KeyError:
+            return str(self.get_slot(signal))
+
+    # expressions
+
+    def _choices(self, choices, index, w, postcommit):
+        # Reads one of `choices`, selected at run time by the Python
+        # expression `index`.
+        if all(isinstance(c, Constant) for c in choices):
+            return "{}[{}]".format(self._bind(tuple(c.value for c in choices)), index)
+        if all(isinstance(c, Signal) for c in choices):
+            slots = self._bind(tuple(self.get_slot(c) for c in choices))
+            if postcommit:
+                slot = self._temp(w, "{}[{}]".format(slots, index))
+                return "m.get({0}, v[{0}])".format(slot)
+            return "v[{}[{}]]".format(slots, index)
+
+        template = self._template(choices)
+        if template is not None:
+            params, slots = template
+            name = self._name("_f")
+            self._function(name, "v, m, " + ", ".join(params),
+                lambda fw: fw.line("return " + self._expr(choices[0], fw, postcommit)))
+            self._unparametrize()
+            return "{}(v, m, *{}[{}])".format(name, self._bind(slots), index)
+
+        functions = []
+        for choice in choices:
+            name = self._name("_f")
+            functions.append(self._function(name, "v, m",
+                lambda fw, c=choice: fw.line("return " + self._expr(c, fw, postcommit))))
+        return "{}[{}](v, m)".format(self._bind(tuple(functions)), index)
+
+    def _template(self, choices):
+        shapes = []
+        for choice in choices:
+            signals = dict()
+            shape = _shape(choice, signals)
+            if shape is None:
+                return None
+            shapes.append((shape, list(signals)))
+        if any(shape != shapes[0][0] for shape, _ in shapes):
+            return None
+        params = ["s{}".format(i) for i in range(len(shapes[0][1]))]
+        self.params = dict(zip(shapes[0][1], params))
+        slots = tuple(tuple(self.get_slot(s) for s in signals)
+                      for _, signals in shapes)
+        return params, slots
+
+    def _unparametrize(self):
+        self.params = dict()
+
+    def _expr(self, node, w, postcommit=False, depth=0):
+        if isinstance(node, Constant):
+            return "({})".format(node.value)
+        elif isinstance(node, Signal):
+            slot = self._slot(node)
+            if postcommit:
+                return "m.get({0}, v[{0}])".format(slot)
+            return "v[{}]".format(slot)
+        elif isinstance(node, _Operator):
+            operands = [self._expr(o, w, postcommit, depth + 1) for o in node.operands]
+            if node.op == "m":
+                r = "({1} if {0} else {2})".format(*operands)
+            elif len(operands) == 1 and node.op in ("-", "~"):
+                r = "({}{})".format(node.op, operands[0])
+            elif len(operands) == 2 and node.op in _binary_ops:
+                r = "({} {} {})".format(operands[0], _binary_ops[node.op], operands[1])
+            else:
+                raise NotImplementedError(node)
+        elif isinstance(node, _Slice):
+            v = self._expr(node.value, w, postcommit, depth + 1)
+            r = "(({} >> {}) & {})".format(v, node.start,
+                                            (1 << (node.stop - node.start)) - 1)
+        elif isinstance(node, _Part):
+            v = self._expr(node.value, w, postcommit, depth + 1)
+            offset = self._expr(node.offset, w, postcommit, depth + 1)
+            r = "(({} >> {}) & {})".format(v, offset, (1 << node.width) - 1)
+        elif isinstance(node, Cat):
+            terms = []
+            shift = 0
+            for element in node.l:
+                nbits = len(element)
+                e = self._expr(element, w, postcommit, depth + 1)
+                terms.append("(({} & {}) << {})".format(e, (1 << nbits) - 1, shift))
+                shift += nbits
+            r = "({})".format(" | ".join(terms)) if terms else "0"
+        elif isinstance(node, Replicate):
+            nbits = len(node.v)
+            e = self._expr(node.v, w, postcommit, depth + 1)
+            pattern = sum(1 << i*nbits for i in range(node.n))
+            r = "(({} & {}) * {})".format(e, (1 << nbits) - 1, pattern)
+        elif isinstance(node, _ArrayProxy):
+            key = self._expr(node.key, w, postcommit, depth + 1)
+            index = "min({}, {})".format(len(node.choices) - 1, key)
+            r = self._choices(node.choices, index, w, postcommit)
+        elif isinstance(node, _MemoryLocation):
+            array = self.replaced_memories[node.memory]
+            index = self._expr(node.index, w, postcommit, depth + 1)
+            r = self._choices(list(array), index, w, postcommit)
+        elif isinstance(node, ClockSignal):
+            return self._expr(self.clock_domains[node.cd].clk, w, postcommit, depth)
+        elif isinstance(node, ResetSignal):
+            rst = self.clock_domains[node.cd].rst
+            if rst is None:
+                if node.allow_reset_less:
+                    return "0"
+                return "_reset_less_error({!r})".format(node.cd)
+            return self._expr(rst, w, postcommit, depth)
+        else:
+            raise NotImplementedError(node)
+        if depth and not depth % self.max_depth:
+            r = self._temp(w, r)
+        return r
+
+    # assignments
+
+    def _assign_choices(self, choices, index, value, w):
+        if all(isinstance(c, Signal) and not c.variable for c in choices):
+            shapes = {(c.nbits, c.signed) for c in choices}
+            if len(shapes) == 1:
+                slot = "{}[{}]".format(
+                    self._bind(tuple(self.get_slot(c) for c in choices)), index)
+                self._assign_slot(slot, choices[0].nbits, choices[0].signed, value, w)
+                return
+
+        template = self._template(choices)
+        if template is not None:
+            params, slots = template
+            name = self._name("_f")
+            self._function(name, "v, m, value, " + ", ".join(params),
+                lambda fw: self._assign(choices[0], "value", fw))
+            self._unparametrize()
+            w.line("{}(v, m, {}, *{}[{}])".format(name, value, self._bind(slots), index))
+            return
+
+        functions = []
+        for choice in choices:
+            name = self._name("_f")
+            functions.append(self._function(name, "v, m, value",
+                lambda fw, c=choice: self._assign(c, "value", fw)))
+        w.line("{}[{}](v, m, {})".format(self._bind(tuple(functions)), index, value))
+
+    def _assign_slot(self, slot, nbits, signed, value, w):
+        if signed:
+            w.line("m[{}] = _truncate_signed({}, {})".format(slot, value, nbits))
+        else:
+            w.line("m[{}] = {} & {}".format(slot, value, (1 << nbits) - 1))
+
+    def _assign(self, node, value, w):
+        if isinstance(node, Signal):
+            if node.variable:
+                raise NotImplementedError(node)
+            self._assign_slot(self._slot(node), node.nbits, node.signed, value, w)
+        elif isinstance(node, Cat):
+            value = self._temp(w, value)
+            shift = 0
+            for element in node.l:
+                nbits = len(element)
+                self._assign(element, "(({} >> {}) & {})".format(
+                    value, shift, (1 << nbits) - 1), w)
+                shift += nbits
+        elif isinstance(node, _Slice):
+            full_value = self._temp(w, self._expr(node.value, w, True))
+            mask = (1 << (node.stop - node.start)) - 1
+            self._assign(node.value, "(({} & {}) | (({} & {}) << {}))".format(
+                full_value, ~(mask << node.start), value, mask, node.start), w)
+        elif isinstance(node, _Part):
+            full_value = self._temp(w, self._expr(node.value, w, True))
+            offset = self._temp(w, self._expr(node.offset, w, True))
+            mask = (1 << node.width) - 1
+            self._assign(node.value, "(({0} & ~({1} << {2})) | (({3} & {1}) << {2}))".format(
+                full_value, mask, offset, value), w)
+        elif isinstance(node, _ArrayProxy):
+            key = self._expr(node.key, w)
+            index = self._temp(w, "min({}, {})".format(len(node.choices) - 1, key))
+            self._assign_choices(node.choices, index, value, w)
+        elif isinstance(node, _MemoryLocation):
+            array = self.replaced_memories[node.memory]
+            index = self._temp(w, self._expr(node.index, w))
+            self._assign_choices(list(array), index, value, w)
+        else:
+            raise NotImplementedError(node)
+
+    # statements
+
+    def _block(self, statements, w):
+        w.level += 1
+        n = len(w.lines)
+        self._statements(statements, w)
+        if len(w.lines) == n:
+            w.line("pass")
+        w.level -= 1
+
+    def _if(self, s, w):
+        cond = self._expr(s.cond, w)
+        w.line("if {} & {}:".format(cond, (1 << len(s.cond)) - 1))
+        self._block(s.t, w)
+        f = s.f
+        # Flatten Elif chains so they do not nest one indentation level each.
+        while len(f) == 1 and isinstance(f[0], If):
+            cw = w.fork()
+            cond = self._expr(f[0].cond, cw)
+            if cw.lines:
+                break
+            w.line("elif {} & {}:".format(cond, (1 << len(f[0].cond)) - 1))
+            self._block(f[0].t, w)
+            f = f[0].f
+        if f:
+            w.line("else:")
+            self._block(f, w)
+
+    def _case(self, s, w):
+        nbits, signed = value_bits_sign(s.test)
+        test = self._expr(s.test, w)
+        if signed:
+            test = self._temp(w, "_truncate_signed({}, {})".format(test, nbits))
+        else:
+            test = self._temp(w, "{} & {}".format(test, (1 << nbits) - 1))
+        keyword = "if"
+        for k, v in s.cases.items():
+            if isinstance(k, Constant):
+                w.line("{} {} == {}:".format(keyword, test, k.value))
+                self._block(v, w)
+                keyword = "elif"
+        if "default" in s.cases:
+            if keyword == "if":
+                self._statements(s.cases["default"], w)
+            else:
+                w.line("else:")
+                self._block(s.cases["default"], w)
+
+    def _statements(self, statements, w):
+        for s in statements:
+            if isinstance(s, _Assign):
+                self._assign(s.l, self._expr(s.r, w), w)
+            elif isinstance(s, If):
+                self._if(s, w)
+            elif isinstance(s, Case):
+                self._case(s, w)
+            elif isinstance(s, Display):
+                args = [self._expr(arg, w) for arg in s.args]
+                w.line("_print({!r} % ({}))".format(s.s, "".join(a + ", " for a in args)))
+            elif isinstance(s, collections.abc.Iterable):
+                self._statements(s, w)
+            else:
+                raise NotImplementedError(s)
+
+    def compile(self, statements):
+        """Returns a function executing `statements`.
+
+        Raises `NotImplementedError` for constructs that have no compiled
+        form; the caller is expected to fall back to the interpreter."""
+        name = self._name("_statements")
+        return self._function(name, "v=_v, m=_m",
+            lambda w: self._statements(statements, w))
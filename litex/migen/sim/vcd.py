@@ -1,8 +1,8 @@
 from itertools import count
-import tempfile
-import os
 from collections import OrderedDict
-import shutil
+from fnmatch import fnmatchcase
+import gzip
+import io
 
 from migen.fhdl.namer import build_namespace
 
@@ -18,85 +18,180 @@ def vcd_codes():
         yield code
 
 
+def _open_output(filename, compression):
+    if compression is None:
+        if filename.endswith(".gz"):
+            compression = "gzip"
+        elif filename.endswith(".zst"):
+            compression = "zstd"
+    if compression is None:
+        return open(filename, "w")
+    elif compression == "gzip":
+        return gzip.open(filename, "wt", compresslevel=6)
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd compressed VCD output requires the zstandard module")
+        raw = open(filename, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw))
+    else:
+        raise ValueError("Unknown VCD compression: '{}'".format(compression))
+
+
 class VCDWriter:
-    def __init__(self, filename, module_name=None):
+    """Value change dump writer
+
+    Changes passed to ``set`` are accumulated for the current timestamp and
+    only the values that differ from the last dumped ones are written, in
+    blocks of about ``buffer_size`` characters, when time advances.
+
+    The header is written when the first timestamp is dumped: only signals
+    known at that point (the simulator declares all of them at startup) are
+    traced.
+
+    Parameters
+    ----------
+    filename : str
+        Output file; compressed if ``compression`` is given or the name ends
+        in ``.gz`` (gzip) or ``.zst`` (zstd, requires ``zstandard``).
+    module_name : str or None
+        Name of the enclosing scope.
+    signal_filter : str or list of str or None
+        Glob patterns; only signals whose name matches one of them are traced.
+    start, stop : int or None
+        Only dump changes in the ``[start, stop)`` time window. The state at
+        ``start`` is dumped as the initial values.
+    compression : None, "gzip" or "zstd"
+    buffer_size : int
+        Size of the blocks written to the output.
+    """
+    def __init__(self, filename, module_name=None, signal_filter=None,
+                 start=None, stop=None, compression=None, buffer_size=2**20):
         self.filename = filename
         self.module_name = module_name
-        self.buffer_file = tempfile.TemporaryFile(
-            dir=os.path.dirname(filename), mode="w+")
+        if isinstance(signal_filter, str):
+            signal_filter = [signal_filter]
+        self.signal_filter = signal_filter
+        self.start = start
+        self.stop = stop
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.out_file = None
         self.codegen = vcd_codes()
         self.codes = OrderedDict()
-        self.signal_values = dict()
+        self.formats = dict()
+        self.signal_values = OrderedDict()
+        self.changes = dict()
+        self.chunks = []
+        self.chunks_size = 0
         self.t = 0
 
-    def _get_code(self, signal):
-        try:
-            code = self.codes[signal]
-        except KeyError:
-            code = next(self.codegen)
-            self.codes[signal] = code
-        return code
-
-    def _write_primitive_value(self, f, signal, value):
-        l = len(signal)
-        if value < 0:
-            value += 2**l
-        if l > 1:
-            fmtstr = "b{:0" + str(l) + "b} {}\n"
-        else:
-            fmtstr = "{}{}\n"
-        code = self._get_code(signal)
-        f.write(fmtstr.format(value, code))
-
-    def _write_enum_value(self, f, signal, value):
-        val = "b"
-        for c in signal._enumeration[value].encode():
-            val += "{:08b}".format(c)
-        code = self._get_code(signal)
-        f.write("{} {}\n".format(val, code))
-
-    def _write_value(self, f, signal, value):
+    def _format_value(self, signal, value):
         if hasattr(signal, "_enumeration"):
-            self._write_enum_value(self.buffer_file, signal, value)
-        else:
-            self._write_primitive_value(self.buffer_file, signal, value)
+            val = "b"
+            for c in signal._enumeration[value].encode():
+                val += "{:08b}".format(c)
+            return "{} {}\n".format(val, self.codes[signal])
+        if value < 0:
+            value += 2**len(signal)
+        return self.formats[signal].format(value)
+
+    def _write(self, s):
+        self.chunks.append(s)
+        self.chunks_size += len(s)
+        if self.chunks_size >= self.buffer_size:
+            self._flush_chunks()
+
+    def _flush_chunks(self):
+        self.out_file.write("".join(self.chunks))
+        self.chunks.clear()
+        self.chunks_size = 0
+
+    def _traced(self, name):
+        if self.signal_filter is None:
+            return True
+        return any(fnmatchcase(name, pattern) for pattern in self.signal_filter)
+
+    def _write_header(self):
+        self.out_file = _open_output(self.filename, self.compression)
+        if self.module_name:
+            self._write("$scope module {name} $end\n".format(name=self.module_name))
+        ns = build_namespace(self.signal_values.keys())
+        for signal in self.signal_values.keys():
+            name = ns.get_name(signal)
+            if not self._traced(name):
+                continue
+            code = self.codes[signal] = next(self.codegen)
+            if hasattr(signal, "_enumeration"):
+                size = max([len(v) for v in signal._enumeration.values()])*8
+            else:
+                size = len(signal)
+                escaped = code.replace("{", "{{").replace("}", "}}")
+                if size > 1:
+                    self.formats[signal] = "b{:0" + str(size) + "b} " + escaped + "\n"
+                else:
+                    self.formats[signal] = "{}" + escaped + "\n"
+            self._write("$var wire {size} {code} {name} $end\n"
+                        .format(name=name, code=code, size=size))
+        if self.module_name:
+            self._write("$enddefinitions $end\n")
+        self._write("$dumpvars\n")
+        for signal in self.codes.keys():
+            self._write(self._format_value(signal, self.signal_values[signal]))
+        self._write("$end\n")
+        self._write("#{}\n".format(self.start or 0))
+
+    def _dump_changes(self):
+        changes = self.changes
+        if self.stop is not None and self.t >= self.stop:
+            changes.clear()
+            return
+        if self.out_file is None:
+            if self.start is not None and self.t < self.start:
+                for signal, value in changes.items():
+                    self.signal_values[signal] = value
+                changes.clear()
+                return
+            # signals seen for the first time at this timestamp start at
+            # their reset value
+            for signal in changes.keys():
+                if signal not in self.signal_values:
+                    self.signal_values[signal] = signal.reset.value
+            if self.t == (self.start or 0):
+                # changes at the first timestamp are the initial values
+                self.signal_values.update(changes)
+                changes.clear()
+                self._write_header()
+                return
+            self._write_header()
+        codes = self.codes
+        signal_values = self.signal_values
+        lines = []
+        for signal, value in changes.items():
+            if signal in codes and signal_values[signal] != value:
+                lines.append(self._format_value(signal, value))
+                signal_values[signal] = value
+        changes.clear()
+        if lines:
+            self._write("#{}\n".format(self.t))
+            self._write("".join(lines))
 
     def set(self, signal, value):
-        if signal not in self.signal_values or self.signal_values[signal] != value:
-            self._write_value(self.buffer_file, signal, value)
-            self.signal_values[signal] = value
+        if self.out_file is None or signal in self.codes:
+            self.changes[signal] = value
 
     def delay(self, delay):
+        if self.changes:
+            self._dump_changes()
         self.t += delay
-        self.buffer_file.write("#{}\n".format(self.t))
 
     def close(self):
-        out = open(self.filename, "w")
-        try:
-            if self.module_name:
-                out.write("$scope module {name} $end\n".format(name=self.module_name))
-            ns = build_namespace(self.codes.keys())
-            for signal, code in self.codes.items():
-                name = ns.get_name(signal)
-                if hasattr(signal, "_enumeration"):
-                    size = max([len(v) for v in signal._enumeration.values()])*8
-                else:
-                    size = len(signal)
-                out.write("$var wire {size} {code} {name} $end\n"
-                          .format(name=name, code=code, size=size))
-            if self.module_name:
-                out.write("$enddefinitions $end\n")
-            out.write("$dumpvars\n")
-            for signal in self.codes.keys():
-                self._write_value(out, signal, signal.reset.value)
-            out.write("$end\n")
-            out.write("#0\n")
-
-            self.buffer_file.seek(0)
-            shutil.copyfileobj(self.buffer_file, out)
-            self.buffer_file.close()
-        finally:
-            out.close()
+        self._dump_changes()
+        if self.out_file is None:
+            self._write_header()
+        self._flush_chunks()
+        self.out_file.close()
 
 
 class DummyVCDWriter:
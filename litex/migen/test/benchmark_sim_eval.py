@@ -0,0 +1,81 @@
+"""Micro-benchmark of simulator expression evaluation.
+
+Reports the time taken to execute ``o.eq(expr)`` for each operator and
+several operand widths, with the interpreted ``Evaluator`` and with the
+statement compiled by ``CompiledEvaluator``::
+
+    python -m migen.test.benchmark_sim_eval --widths 8 64 512 --json eval.json
+"""
+
+import argparse
+import json
+import timeit
+from random import Random
+
+from migen import *
+from migen.sim.core import Evaluator, CompiledEvaluator
+
+
+def operators(width):
+    a = Signal(width)
+    b = Signal(width)
+    sel = Signal(max=width)
+    expressions = {
+        "add":       a + b,
+        "and":       a & b,
+        "compare":   a < b,
+        "slice":     a[width//4:3*width//4],
+        "part":      a.part(sel, width//2),
+        "cat":       Cat(a[:width//2], b[width//2:]),
+        "replicate": Replicate(a[:8], max(width//8, 1)),
+        "mux":       Mux(sel[0], a, b),
+        "array":     Array([a, b, ~a, ~b])[sel[:2]],
+    }
+    return [a, b, sel], expressions
+
+
+def benchmark(widths, number, seed=0):
+    rng = Random(seed)
+    results = []
+    for width in widths:
+        inputs, expressions = operators(width)
+        for name, expr in expressions.items():
+            o = Signal(len(expr))
+            statement = o.eq(expr)
+            entry = {"operator": name, "width": width}
+            for mode, evaluator in (("interpreted", Evaluator([], {})),
+                                    ("compiled", CompiledEvaluator([], {}))):
+                for s in inputs:
+                    evaluator.assign(s, rng.randrange(2**len(s)))
+                evaluator.commit()
+                if mode == "compiled":
+                    f = evaluator.compile([statement])
+                else:
+                    f = lambda: evaluator.execute([statement])
+                entry[mode] = timeit.timeit(f, number=number)/number
+            results.append(entry)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulator expression evaluation micro-benchmark.")
+    parser.add_argument("--widths", type=int, nargs="+", default=[8, 32, 128, 256, 512],
+                        help="Operand widths to benchmark.")
+    parser.add_argument("--number", type=int, default=10000,
+                        help="Evaluations per operator and width.")
+    parser.add_argument("--json", default=None,
+                        help="Write results to this JSON file.")
+    args = parser.parse_args()
+
+    results = benchmark(args.widths, args.number)
+    print("{:<10} {:>6} {:>16} {:>16}".format("operator", "width", "interpreted (ns)", "compiled (ns)"))
+    for entry in results:
+        print("{:<10} {:>6} {:>16.0f} {:>16.0f}".format(entry["operator"], entry["width"],
+            entry["interpreted"]*1e9, entry["compiled"]*1e9))
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
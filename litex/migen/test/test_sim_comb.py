@@ -0,0 +1,107 @@
+import unittest
+
+from migen import *
+from migen.sim.core import Simulator
+
+
+class _Chain(Module):
+    def __init__(self, n):
+        self.i = Signal(8)
+        self.other = Signal(8)
+        self.other_o = Signal(8)
+        self.stages = [Signal(8) for _ in range(n)]
+        # Declared last stage first so a single in-order pass cannot settle.
+        for a, b in reversed(list(zip([self.i] + self.stages, self.stages))):
+            self.comb += b.eq(a + 1)
+        self.comb += self.other_o.eq(self.other)
+
+
+def _count_executions(sim):
+    counts = [0]*len(sim.comb)
+    def counting(rank, f):
+        def wrapper():
+            counts[rank] += 1
+            f()
+        return wrapper
+    sim.comb = [counting(rank, f) for rank, f in enumerate(sim.comb)]
+    return counts
+
+
+class TestCombPropagation(unittest.TestCase):
+    def test_chain(self):
+        dut = _Chain(32)
+        results = []
+        def gen():
+            for value in (3, 10, 200):
+                yield dut.i.eq(value)
+                yield
+                results.append((yield dut.stages[-1]))
+        run_simulation(dut, gen())
+        self.assertEqual(results, [(v + 32) & 0xff for v in (3, 10, 200)])
+
+    def test_only_sensitive_groups(self):
+        dut = _Chain(16)
+        def gen():
+            yield
+            counts[:] = [0]*len(counts)
+            yield dut.other.eq(1)
+            yield
+            self.assertEqual(sum(counts), 1)
+            self.assertEqual((yield dut.other_o), 1)
+            counts[:] = [0]*len(counts)
+            yield dut.i.eq(1)
+            yield
+            self.assertEqual(sum(counts), 16)
+        with Simulator(dut, gen()) as sim:
+            counts = _count_executions(sim)
+            sim.run()
+
+    def test_forced_comb_signal(self):
+        dut = _Chain(4)
+        def gen():
+            yield dut.i.eq(5)
+            yield
+            yield dut.stages[1].eq(0)
+            yield
+            self.assertEqual((yield dut.stages[1]), 7)
+            self.assertEqual((yield dut.stages[3]), 9)
+        run_simulation(dut, gen())
+
+    def test_target_index(self):
+        class DUT(Module):
+            def __init__(self):
+                self.sel = Signal(2)
+                self.part_sel = Signal(2)
+                self.regs = Array(Signal(4) for _ in range(4))
+                self.o = Signal(16)
+                self.part = Signal(8)
+                self.comb += [
+                    self.regs[self.sel].eq(0xf),
+                    self.o.eq(Cat(*self.regs)),
+                    self.part.part(self.part_sel*2, 2).eq(3),
+                ]
+
+        dut = DUT()
+        def gen():
+            for i in range(4):
+                yield dut.sel.eq(i)
+                yield dut.part_sel.eq(i)
+                yield
+                self.assertEqual((yield dut.o), 0xf << 4*i)
+                self.assertEqual((yield dut.part), 3 << 2*i)
+        run_simulation(dut, gen())
+
+    def test_clock_signal(self):
+        class DUT(Module):
+            def __init__(self):
+                self.o = Signal()
+                self.comb += self.o.eq(ClockSignal("slow"))
+
+        dut = DUT()
+        results = []
+        def gen():
+            for i in range(4):
+                yield
+                results.append((yield dut.o))
+        run_simulation(dut, gen(), clocks={"sys": 10, "slow": 20})
+        self.assertEqual(results, [1, 0, 1, 0])
@@ -0,0 +1,224 @@
+import unittest
+from functools import reduce
+from operator import or_, add
+from random import Random
+
+from migen import *
+from migen.fhdl.structure import _Operator, _Slice, _Part
+from migen.genlib.fsm import FSM, NextState, NextValue
+from migen.sim.core import Evaluator, CompiledEvaluator
+
+
+def _run_traced(tb_factory, stimulus, compiled, cycles):
+    tb = tb_factory()
+    rng = Random(0)
+    trace = []
+    def gen():
+        for i in range(cycles):
+            yield from stimulus(tb, i, rng)
+            yield
+            values = []
+            for s in tb.observed():
+                values.append((yield s))
+            trace.append(values)
+    run_simulation(tb, gen(), compiled=compiled)
+    return trace
+
+
+class _Design(Module):
+    def __init__(self):
+        self.a = Signal(8)
+        self.b = Signal((8, True))
+        self.sel = Signal(2)
+        self.o_sum = Signal((10, True))
+        self.o_cat = Signal(16)
+        self.o_rep = Signal(12)
+        self.o_mux = Signal(8)
+        self.o_part = Signal(4)
+        self.o_arr = Signal(8)
+        self.o_case = Signal(4)
+        self.counter = Signal(6)
+        self.lhs = Signal(16)
+        self.lhs_part = Signal(16)
+        self.regs = Array(Signal(8, name="reg{}".format(i)) for i in range(4))
+        self.state_out = Signal(2)
+
+        self.comb += [
+            self.o_sum.eq(self.a - self.b + (self.a[2:6] * 3)),
+            self.o_cat.eq(Cat(self.a[4:], self.b, self.sel)),
+            self.o_rep.eq(Replicate(self.sel, 6)),
+            self.o_mux.eq(Mux(self.b < 0, ~self.a, self.a >> self.sel)),
+            self.o_part.eq(self.a.part(self.sel, 4)),
+            self.o_arr.eq(self.regs[self.sel]),
+            Case(self.sel, {
+                0: self.o_case.eq(1),
+                2: self.o_case.eq(self.a[:4]),
+                "default": self.o_case.eq(0xf),
+            }),
+        ]
+        self.sync += [
+            self.counter.eq(self.counter + 1),
+            self.regs[self.sel].eq(self.a ^ self.counter),
+            Cat(self.lhs[8:], self.lhs[:8]).eq(Cat(self.b, self.a)),
+            self.lhs_part.part(self.sel*4, 4).eq(self.counter),
+            If(self.counter[0],
+                self.lhs[0].eq(1)
+            ).Elif(self.counter[1],
+                self.lhs[1].eq(1)
+            ).Else(
+                self.lhs[2].eq(0)
+            )
+        ]
+
+        fsm = FSM()
+        self.submodules += fsm
+        fsm.act("A",
+            self.state_out.eq(1),
+            If(self.a[0], NextState("B"))
+        )
+        fsm.act("B",
+            self.state_out.eq(2),
+            NextValue(self.a, self.a + 1),
+            If(self.sel == 3, NextState("A"))
+        )
+
+    def observed(self):
+        return [self.o_sum, self.o_cat, self.o_rep, self.o_mux, self.o_part,
+                self.o_arr, self.o_case, self.counter, self.lhs, self.lhs_part,
+                self.state_out] + list(self.regs)
+
+
+class _MemoryDesign(Module):
+    def __init__(self):
+        self.specials.mem = Memory(32, 16, init=[i*0x01010101 for i in range(8)])
+        self.specials.wport = self.mem.get_port(write_capable=True, we_granularity=8)
+        self.specials.rport = self.mem.get_port(async_read=True)
+        self.adr = Signal(4)
+        self.comb += [
+            self.wport.adr.eq(self.adr),
+            self.rport.adr.eq(~self.adr),
+        ]
+
+    def observed(self):
+        return [self.wport.dat_r, self.rport.dat_r]
+
+
+class TestEquivalence(unittest.TestCase):
+    def assertEquivalent(self, tb_factory, stimulus, cycles=64):
+        interpreted = _run_traced(tb_factory, stimulus, False, cycles)
+        compiled = _run_traced(tb_factory, stimulus, True, cycles)
+        self.assertEqual(interpreted, compiled)
+
+    def test_design(self):
+        def stimulus(tb, i, rng):
+            yield tb.b.eq(rng.randrange(-128, 128))
+            yield tb.sel.eq(rng.randrange(4))
+            if i % 5 == 0:
+                yield tb.a.eq(rng.randrange(256))
+        self.assertEquivalent(_Design, stimulus)
+
+    def test_memory(self):
+        def stimulus(tb, i, rng):
+            yield tb.adr.eq(rng.randrange(16))
+            yield tb.wport.we.eq(rng.randrange(16))
+            yield tb.wport.dat_w.eq(rng.randrange(2**32))
+        self.assertEquivalent(_MemoryDesign, stimulus)
+
+    def test_deep_expression(self):
+        class Deep(Module):
+            def __init__(self):
+                self.i = [Signal(8) for _ in range(300)]
+                self.o_or = Signal(8)
+                self.o_add = Signal(16)
+                self.comb += [
+                    self.o_or.eq(reduce(or_, self.i)),
+                    self.o_add.eq(reduce(add, self.i)),
+                ]
+
+            def observed(self):
+                return [self.o_or, self.o_add]
+
+        def stimulus(tb, i, rng):
+            for s in tb.i[:i]:
+                yield s.eq(rng.randrange(256))
+        self.assertEquivalent(Deep, stimulus, cycles=8)
+
+
+class TestExpressions(unittest.TestCase):
+    def setUp(self):
+        self.rng = Random(3)
+        self.signals = [Signal((self.rng.randrange(1, 40), self.rng.choice([False, True])))
+                        for _ in range(8)]
+
+    def random_expr(self, depth=0):
+        rng = self.rng
+        if depth > 4 or rng.random() < 0.2:
+            if rng.random() < 0.2:
+                return Constant(rng.randrange(-50, 50))
+            return rng.choice(self.signals)
+        kind = rng.randrange(8)
+        if kind == 0:
+            op = rng.choice(["+", "-", "*", "&", "|", "^", "<", "<=", "==", "!=", ">", ">="])
+            return _Operator(op, [self.random_expr(depth + 1), self.random_expr(depth + 1)])
+        elif kind == 1:
+            return rng.choice([~self.random_expr(depth + 1), -self.random_expr(depth + 1)])
+        elif kind == 2:
+            value = self.random_expr(depth + 1)
+            start = rng.randrange(len(value))
+            return _Slice(value, start, rng.randrange(start + 1, len(value) + 1))
+        elif kind == 3:
+            return Cat(*[self.random_expr(depth + 1) for _ in range(rng.randrange(1, 4))])
+        elif kind == 4:
+            return Replicate(self.random_expr(depth + 1), rng.randrange(1, 4))
+        elif kind == 5:
+            return Mux(self.random_expr(depth + 1), self.random_expr(depth + 1),
+                       self.random_expr(depth + 1))
+        elif kind == 6:
+            return _Part(self.random_expr(depth + 1), rng.choice(self.signals)[:3], 5)
+        else:
+            return Array(self.random_expr(depth + 1) for _ in range(3))[rng.choice(self.signals)[:2]]
+
+    def test_random(self):
+        target = Signal((64, True))
+        for _ in range(200):
+            statement = target.eq(self.random_expr())
+            values = {s: self.rng.randrange(-2**(s.nbits - 1), 2**(s.nbits - 1))
+                         if s.signed else self.rng.randrange(2**s.nbits)
+                      for s in self.signals}
+            results = []
+            for evaluator in (Evaluator([], {}), CompiledEvaluator([], {})):
+                for s, v in values.items():
+                    evaluator.assign(s, v)
+                evaluator.commit()
+                evaluator.compile([statement])()
+                evaluator.commit()
+                results.append(evaluator.eval(target))
+            self.assertEqual(results[0], results[1])
+
+
+class TestFallback(unittest.TestCase):
+    def test_variable(self):
+        evaluator = CompiledEvaluator([], {})
+        s = Signal(variable=True)
+        with self.assertRaises(AssertionError):
+            evaluator.compile([s.eq(1)])()
+
+
+class TestWideValues(unittest.TestCase):
+    def test_bit_operators(self):
+        rng = Random(4)
+        a = Signal(512)
+        sel = Signal(9)
+        bits = lambda v, start, n: sum(((v >> (start + j)) & 1) << j for j in range(n))
+        for evaluator in (Evaluator([], {}), CompiledEvaluator([], {})):
+            for _ in range(20):
+                va, vsel = rng.randrange(2**512), rng.randrange(256)
+                evaluator.assign(a, va)
+                evaluator.assign(sel, vsel)
+                evaluator.commit()
+                self.assertEqual(evaluator.eval(a[100:400]), bits(va, 100, 300))
+                self.assertEqual(evaluator.eval(a.part(sel, 256)), bits(va, vsel, 256))
+                self.assertEqual(evaluator.eval(Cat(a[3:200], a[:5], a[300:])),
+                                 bits(va, 3, 197) | (bits(va, 0, 5) << 197) | (bits(va, 300, 212) << 202))
+                self.assertEqual(evaluator.eval(Replicate(a[:7], 70)),
+                                 sum(bits(va, 0, 7) << 7*i for i in range(70)))
@@ -0,0 +1,52 @@
+import unittest
+
+from migen import *
+from migen.sim.core import Simulator, run_hooks
+
+
+class _Counter(Module):
+    def __init__(self):
+        self.count = Signal(8)
+        self.specials.mem = Memory(8, 4, init=[1, 2, 3, 4])
+        self.specials.port = self.mem.get_port()
+        self.sync += self.count.eq(self.count + 1)
+        self.comb += self.port.adr.eq(self.count)
+
+
+class TestReuse(unittest.TestCase):
+    def run_counter(self, dut, **kwargs):
+        results = []
+        def gen():
+            for i in range(6):
+                yield
+                results.append(((yield dut.count), (yield dut.port.dat_r)))
+        run_simulation(dut, gen(), **kwargs)
+        return results
+
+    def test_resimulate(self):
+        dut = _Counter()
+        first = self.run_counter(dut)
+        fragment = dut._fragment
+        comb = list(fragment.comb)
+        self.assertEqual(self.run_counter(dut), first)
+        self.assertEqual(self.run_counter(dut, compiled=False), first)
+        self.assertEqual(fragment.comb, comb)
+
+    def test_different_clocks(self):
+        dut = _Counter()
+        self.run_counter(dut)
+        with self.assertRaises(ValueError):
+            self.run_counter(dut, clocks={"sys": 20})
+
+    def test_statistics(self):
+        simulators = []
+        run_hooks.append(simulators.append)
+        try:
+            self.run_counter(_Counter(), clocks={"sys": 10, "slow": 20})
+        finally:
+            run_hooks.remove(simulators.append)
+        sim, = simulators
+        self.assertEqual(sim.name, "_Counter")
+        self.assertEqual(sim.cycles["sys"], 7)
+        self.assertEqual(sim.cycles["slow"], 3)
+        self.assertGreater(sim.run_time, 0)
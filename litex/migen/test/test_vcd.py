@@ -1,7 +1,9 @@
 import unittest
 import os
+import gzip
 import tempfile
 
+from migen import *
 from migen.sim.vcd import VCDWriter
 
 
@@ -42,3 +44,99 @@ class VcdWriter(unittest.TestCase):
             filename = self.get_file_path(dir)
             self.vcd = VCDWriter(filename, module_name="name1")
             self.check_expectation(filename, expected_content)
+
+    def test_changes_only(self):
+        a = Signal(4, name="a")
+        b = Signal(name="b")
+
+        expected_content = (
+            "$var wire 4 ! a $end\n"
+            "$var wire 1 \" b $end\n"
+            "$dumpvars\n"
+            "b0000 !\n"
+            "0\"\n"
+            "$end\n"
+            "#0\n"
+            "#10\n"
+            "b0011 !\n"
+            "#30\n"
+            "1\"\n"
+        )
+
+        with tempfile.TemporaryDirectory() as dir:
+            filename = self.get_file_path(dir)
+            self.vcd = VCDWriter(filename, buffer_size=1)
+            for value_a, value_b in [(0, 0), (3, 0), (3, 0), (3, 1)]:
+                self.vcd.set(a, value_a)
+                self.vcd.set(b, value_b)
+                self.vcd.delay(10)
+            self.check_expectation(filename, expected_content)
+
+    def test_filter_and_window(self):
+        a = Signal(4, name="a")
+        b = Signal(name="b")
+
+        expected_content = (
+            "$var wire 4 ! a $end\n"
+            "$dumpvars\n"
+            "b0010 !\n"
+            "$end\n"
+            "#20\n"
+            "#30\n"
+            "b0011 !\n"
+        )
+
+        with tempfile.TemporaryDirectory() as dir:
+            filename = self.get_file_path(dir)
+            self.vcd = VCDWriter(filename, signal_filter="a*", start=20, stop=40)
+            for i in range(6):
+                self.vcd.set(a, i)
+                self.vcd.set(b, i & 1)
+                self.vcd.delay(10)
+            self.check_expectation(filename, expected_content)
+
+    def test_gzip(self):
+        a = Signal(name="a")
+        with tempfile.TemporaryDirectory() as dir:
+            filename = self.get_file_path(dir) + ".gz"
+            vcd = VCDWriter(filename)
+            for i in range(4):
+                vcd.set(a, i & 1)
+                vcd.delay(10)
+            vcd.close()
+            with gzip.open(filename, "rt") as f:
+                self.assertEqual(f.read().splitlines()[-2:], ["#30", "1!"])
+
+    def test_simulator(self):
+        class Counter(Module):
+            def __init__(self):
+                self.count = Signal(4)
+                self.sync += self.count.eq(self.count + 1)
+
+        with tempfile.TemporaryDirectory() as dir:
+            filename = self.get_file_path(dir)
+            def gen():
+                for i in range(20):
+                    yield
+            run_simulation(Counter(), gen(), vcd_name=filename,
+                           vcd_filter="count", vcd_stop=100)
+            with open(filename) as f:
+                content = f.read()
+        self.assertIn("$var wire 4 ! count $end\n", content)
+        self.assertNotIn("sys_clk", content)
+        self.assertNotIn("#100\n", content)
+
+    def test_many_signals(self):
+        signals = [Signal(2, name="s{}".format(i)) for i in range(200)]
+        with tempfile.TemporaryDirectory() as dir:
+            filename = self.get_file_path(dir)
+            vcd = VCDWriter(filename)
+            for i, s in enumerate(signals):
+                vcd.set(s, i & 3)
+            vcd.delay(10)
+            vcd.close()
+            with open(filename) as f:
+                lines = f.read().splitlines()
+        self.assertEqual(sum(line.startswith("$var") for line in lines), 200)
+        self.assertIn("b10 {", lines)
+        self.assertIn("b00 }", lines)
@@ -1432,6 +1432,7 @@ class LiteXSoC(SoC):
         ntxslots                = 2, txslots_write_only = False,
         full_memory_we          = False,
         with_timestamp          = False,
+        with_dma                = False,
         with_timing_constraints = True,
         local_ip                = None,
         remote_ip               = None,
@@ -1442,6 +1443,7 @@ class LiteXSoC(SoC):
 
         # MAC.
         assert data_width in [8, 32, 64]
+        assert not (with_dma and data_width == 64)
         with_sys_datapath = (data_width == 32)
         self.check_if_exists(name)
         if with_timestamp:
@@ -1449,7 +1451,7 @@ class LiteXSoC(SoC):
         ethmac = LiteEthMAC(
             phy               = phy,
             dw                = {8: 32, 32: 32, 64: 64}[data_width],
-            interface         = "wishbone",
+            interface         = {False: "wishbone", True: "dma"}[with_dma],
             endianness        = self.cpu.endianness,
             nrxslots          = nrxslots, rxslots_read_only  = rxslots_read_only,
             ntxslots          = ntxslots, txslots_write_only = txslots_write_only,
@@ -1464,30 +1466,36 @@ class LiteXSoC(SoC):
                 "eth_rx": phy_cd + "_rx"})(ethmac)
         self.add_module(name=name, module=ethmac)
 
-        # Compute Regions size and add it to the SoC.
-        ethmac_rx_region_size = ethmac.rx_slots.constant*ethmac.slot_size.constant
-        ethmac_tx_region_size = ethmac.tx_slots.constant*ethmac.slot_size.constant
-        ethmac_region_size    = ethmac_rx_region_size + ethmac_tx_region_size
-        self.bus.add_region(name, SoCRegion(
-            origin = self.mem_map.get(name, None),
-            size   = ethmac_region_size,
-            linker = True,
-            cached = False,
-        ))
-        ethmac_rx_region = SoCRegion(
-            origin = self.bus.regions[name].origin + 0,
-            size   = ethmac_rx_region_size,
-            linker = True,
-            cached = False,
-        )
-        self.bus.add_slave(name=f"{name}_rx", slave=ethmac.bus_rx, region=ethmac_rx_region)
-        ethmac_tx_region = SoCRegion(
-            origin = self.bus.regions[name].origin + ethmac_rx_region_size,
-            size   = ethmac_tx_region_size,
-            linker = True,
-            cached = False,
-        )
-        self.bus.add_slave(name=f"{name}_tx", slave=ethmac.bus_tx, region=ethmac_tx_region)
+        # DMA: Add RX/TX Bus Masters to the SoC (descriptors rings/buffers in main memory).
+        if with_dma:
+            self.bus.add_master(name=f"{name}_rx", master=ethmac.bus_rx)
+            self.bus.add_master(name=f"{name}_tx", master=ethmac.bus_tx)
+            self.add_constant(f"{name.upper()}_DMA")
+        else:
+            # Compute Regions size and add it to the SoC.
+            ethmac_rx_region_size = ethmac.rx_slots.constant*ethmac.slot_size.constant
+            ethmac_tx_region_size = ethmac.tx_slots.constant*ethmac.slot_size.constant
+            ethmac_region_size    = ethmac_rx_region_size + ethmac_tx_region_size
+            self.bus.add_region(name, SoCRegion(
+                origin = self.mem_map.get(name, None),
+                size   = ethmac_region_size,
+                linker = True,
+                cached = False,
+            ))
+            ethmac_rx_region = SoCRegion(
+                origin = self.bus.regions[name].origin + 0,
+                size   = ethmac_rx_region_size,
+                linker = True,
+                cached = False,
+            )
+            self.bus.add_slave(name=f"{name}_rx", slave=ethmac.bus_rx, region=ethmac_rx_region)
+            ethmac_tx_region = SoCRegion(
+                origin = self.bus.regions[name].origin + ethmac_rx_region_size,
+                size   = ethmac_tx_region_size,
+                linker = True,
+                cached = False,
+            )
+            self.bus.add_slave(name=f"{name}_tx", slave=ethmac.bus_tx, region=ethmac_tx_region)
 
         # Add IRQs (if enabled).
         if self.irq.enabled:
@@ -1531,6 +1539,8 @@ class LiteXSoC(SoC):
         arp_entries             = 1,
         udp_port                = 1234,
         buffer_depth            = 16,
+        packet_buffer_depth     = None,
+        pipelined               = False,
         with_ip_broadcast       = True,
         with_timing_constraints = True,
         with_ethmac             = False,
@@ -1578,7 +1588,8 @@ class LiteXSoC(SoC):
 
         # Etherbone
         self.check_if_exists(name)
-        etherbone = LiteEthEtherbone(ethcore.udp, udp_port, buffer_depth=buffer_depth, cd=etherbone_cd)
+        etherbone = LiteEthEtherbone(ethcore.udp, udp_port, buffer_depth=buffer_depth, cd=etherbone_cd,
+            pipelined=pipelined, packet_buffer_depth=packet_buffer_depth)
         self.add_module(name=name, module=etherbone)
         self.bus.add_master(name=name, master=etherbone.wishbone.bus)
 
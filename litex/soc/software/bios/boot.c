@@ -298,7 +298,7 @@ int serialboot(void)
 /* Ethernet Boot                                                         */
 /*-----------------------------------------------------------------------*/
 
-#ifdef CSR_ETHMAC_BASE
+#if defined(CSR_ETHMAC_BASE) && !defined(ETHMAC_DMA)
 
 #ifndef TFTP_SERVER_PORT
 #define TFTP_SERVER_PORT 69
@@ -4,6 +4,7 @@
 #include <stdlib.h>
 
 #include <generated/csr.h>
+#include <generated/soc.h>
 
 #include "../command.h"
 #include "../helpers.h"
@@ -112,7 +113,7 @@ define_command(serialboot, serialboot, "Boot from Serial (SFL)", BOOT_CMDS);
  * Boot software from TFTP server
  *
  */
-#ifdef CSR_ETHMAC_BASE
+#if defined(CSR_ETHMAC_BASE) && !defined(ETHMAC_DMA)
 define_command(netboot, netboot, "Boot via Ethernet (TFTP)", BOOT_CMDS);
 #endif
 
@@ -71,7 +71,7 @@ static void boot_sequence(void)
 #if defined(CSR_SATA_SECTOR2MEM_BASE)
 	sataboot();
 #endif
-#ifdef CSR_ETHMAC_BASE
+#if defined(CSR_ETHMAC_BASE) && !defined(ETHMAC_DMA)
 #ifdef CSR_ETHPHY_MODE_DETECTION_MODE_ADDR
 	eth_mode();
 #endif
@@ -183,7 +183,7 @@ __attribute__((__used__)) int main(int i, char **c)
 
 #if defined(CSR_ETHMAC_BASE) || defined(MAIN_RAM_BASE) || defined(CSR_SPIFLASH_CORE_BASE)
     printf("--========== \e[1mInitialization\e[0m ============--\n");
-#ifdef CSR_ETHMAC_BASE
+#if defined(CSR_ETHMAC_BASE) && !defined(ETHMAC_DMA)
 	eth_init();
 #endif
 
@@ -9,7 +9,7 @@
 #include <generated/mem.h>
 #include <generated/soc.h>
 
-#ifdef CSR_ETHMAC_BASE
+#if defined(CSR_ETHMAC_BASE) && !defined(ETHMAC_DMA)
 
 #include <stdio.h>
 
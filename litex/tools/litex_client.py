@@ -13,8 +13,7 @@ import threading
 import argparse
 import socket
 
-from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord
-from litex.tools.remote.etherbone import EtherboneReads, EtherboneWrites
+from litex.tools.remote.etherbone import EtherboneCodec
 from litex.tools.remote.etherbone import EtherboneIPC
 from litex.tools.remote.csr_builder import CSRBuilder
 
@@ -52,6 +51,7 @@ class RemoteClient(EtherboneIPC, CSRBuilder):
     def open(self):
         if self.binded:
             return
+        self.codec  = EtherboneCodec(self.csr_bus_address_width)
         self.socket = socket.create_connection((self.host, self.port))
         self.socket.settimeout(2.0)
         self._receive_server_info()
@@ -76,19 +76,11 @@ class RemoteClient(EtherboneIPC, CSRBuilder):
     def read(self, addr, length=None, burst="incr"):
         length_int = 1 if length is None else length
         addr_size  = self.csr_bus_address_width // 8
-        # Prepare packet
-        record = EtherboneRecord(addr_size)
-        incr = (burst == "incr")
-        record.reads  = EtherboneReads(
-            addr_size = addr_size,
-            addrs     = [self.base_address + addr + 4*incr*j for j in range(length_int)]
-        )
-        record.rcount = len(record.reads)
-
         # Send packet
-        packet = EtherbonePacket(self.csr_bus_address_width)
-        packet.records = [record]
-        packet.encode()
+        if burst == "incr":
+            packet = self.codec.encode_read(self.base_address + addr, length_int)
+        else:
+            packet = self.codec.encode_reads([self.base_address + addr]*length_int)
         self.send_packet(self.socket, packet)
 
         # Receive response
@@ -100,12 +92,7 @@ class RemoteClient(EtherboneIPC, CSRBuilder):
             self.clear_socket_buffer()
             return 0 if length is None else [0] * length_int
 
-        packet = EtherbonePacket(
-            addr_width = self.csr_bus_address_width,
-            init       = response
-        )
-        packet.decode()
-        datas = packet.records.pop().writes.get_datas()
+        datas = self.codec.decode(response)[0].datas.tolist()
         if self.debug:
             for i, data in enumerate(datas):
                 print("read 0x{:08x} @ 0x{:08x}".format(data, self.base_address + addr + 4*i))
@@ -113,19 +100,7 @@ class RemoteClient(EtherboneIPC, CSRBuilder):
 
     def write(self, addr, datas):
         datas = datas if isinstance(datas, list) else [datas]
-        addr_size = self.csr_bus_address_width // 8
-        record = EtherboneRecord(addr_size)
-        record.writes = EtherboneWrites(
-            base_addr = self.base_address + addr,
-            addr_size = addr_size,
-            datas     = [d for d in datas]
-        )
-        record.wcount = len(record.writes)
-
-        packet = EtherbonePacket(self.csr_bus_address_width)
-        packet.records = [record]
-        packet.encode()
-        self.send_packet(self.socket, packet)
+        self.send_packet(self.socket, self.codec.encode_writes(self.base_address + addr, datas))
 
         if self.debug:
             for i, data in enumerate(datas):
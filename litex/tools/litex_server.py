@@ -15,6 +15,7 @@ import sys
 import socket
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord, EtherboneWrites
 from litex.tools.remote.etherbone import EtherboneIPC
@@ -67,6 +68,16 @@ def _read_merger(addrs, max_length=256, bursts=["incr", "fixed"]):
             burst_type   = "incr"
     yield (burst_base, burst_length, burst_type)
 
+# Comm Bursts --------------------------------------------------------------------------------------
+
+# Maximum burst length and supported read bursts of the Comm backends (JTAGBone uses CommUART).
+_comm_bursts = {
+    "CommUART": (255, ["incr", "fixed"]),
+    "CommUDP":  (255, ["incr"]), # Etherbone bursts are limited to 255 accesses.
+    "CommPCIe": (255, ["incr"]),
+    "CommUSB":  (255, ["incr"]),
+}
+
 # Remote Server ------------------------------------------------------------------------------------
 
 class RemoteServer(EtherboneIPC):
@@ -74,8 +85,11 @@ class RemoteServer(EtherboneIPC):
         self.comm       = comm
         self.bind_ip    = bind_ip
         self.bind_port  = bind_port
-        self.lock       = False
         self.addr_width = addr_width
+        # Hardware accesses of the client threads are queued and executed in order by a single
+        # thread, while the other client threads receive/decode their next packets.
+        self.arbiter    = ThreadPoolExecutor(max_workers=1)
+        self.max_length, self.bursts = _comm_bursts.get(self.comm.__class__.__name__, (1, ["incr"]))
 
     def open(self):
         if hasattr(self, "socket"):
@@ -106,9 +120,80 @@ class RemoteServer(EtherboneIPC):
         info = ":".join(info)
         client_socket.sendall(bytes(info, "UTF-8"))
 
+    def _read(self, addrs):
+        bursts = list(_read_merger(addrs, max_length=self.max_length, bursts=self.bursts))
+        # Keep several reads in flight when supported by the Comm.
+        if hasattr(self.comm, "read_bursts"):
+            return self.comm.read_bursts(bursts)
+        reads = []
+        for addr, length, burst in bursts:
+            reads += self.comm.read(addr, length, burst)
+        return reads
+
+    def _write_fifo(self, addr, datas):
+        # Fixed write bursts when supported by the Comm, else one write per data.
+        if "fixed" in self.bursts:
+            for offset in range(0, len(datas), self.max_length):
+                self.comm.write(addr, datas[offset:offset + self.max_length], burst="fixed")
+        else:
+            for data in datas:
+                self.comm.write(addr, [data])
+
+    def _execute(self, records):
+        """Execute the writes/reads of the records and return the read datas of each record.
+
+        Records are executed in order (writes then reads of each record), but contiguous writes and
+        reads of consecutive records are grouped in large bursts. FIFO writes (wff: all the datas
+        written to base_addr) are never grouped.
+        """
+        # Group accesses of consecutive records.
+        accesses = [] # ("write", base_addr, datas, wff) or ("read", addrs, lengths)
+        for record in records:
+            if record.writes is not None:
+                base_addr = record.writes.base_addr
+                datas     = record.writes.get_datas()
+                last      = accesses[-1] if accesses else None
+                if (last is not None and last[0] == "write" and not last[3] and not record.wff and
+                    last[1] + 4*len(last[2]) == base_addr):
+                    last[2].extend(datas)
+                else:
+                    accesses.append(("write", base_addr, datas, record.wff))
+            if record.reads is not None:
+                addrs = record.reads.get_addrs()
+                last  = accesses[-1] if accesses else None
+                if last is not None and last[0] == "read":
+                    last[1].extend(addrs)
+                    last[2].append(len(addrs))
+                else:
+                    accesses.append(("read", addrs, [len(addrs)]))
+
+        # Execute accesses.
+        reads = []
+        for access in accesses:
+            if access[0] == "write":
+                _, base_addr, datas, wff = access
+                if wff:
+                    self._write_fifo(base_addr, datas)
+                    continue
+                for offset in range(0, len(datas), self.max_length):
+                    self.comm.write(base_addr + 4*offset, datas[offset:offset + self.max_length])
+            else:
+                _, addrs, lengths = access
+                datas  = self._read(addrs)
+                offset = 0
+                for length in lengths:
+                    reads.append(datas[offset:offset + length])
+                    offset += length
+        return reads
+
     def _serve_thread(self):
+        server_socket = self.socket
         while True:
-            client_socket, addr = self.socket.accept()
+            try:
+                client_socket, addr = server_socket.accept()
+            except OSError:
+                # Server closed.
+                return
             self._send_server_info(client_socket)
             print("Connected with " + addr[0] + ":" + str(addr[1]))
             try:
@@ -125,46 +210,26 @@ class RemoteServer(EtherboneIPC):
                     packet = EtherbonePacket(self.addr_width, packet)
                     packet.decode()
 
-                    # Get Packet's Record.
-                    record = packet.records.pop()
-
-                    # Hardware lock/reservation.
-                    while self.lock:
-                        time.sleep(0.01)
-                    self.lock = True
-
-                    # Handle Etherbone writes.
-                    if record.writes != None:
-                        self.comm.write(record.writes.base_addr, record.writes.get_datas())
-
-                    # Handle Etherbone reads.
-                    if record.reads != None:
-                        max_length = {
-                            "CommUART": 256,
-                            "CommUDP":    1,
-                        }.get(self.comm.__class__.__name__, 1)
-                        bursts = {
-                            "CommUART": ["incr", "fixed"]
-                        }.get(self.comm.__class__.__name__, ["incr"])
-                        reads = []
-                        for addr, length, burst in _read_merger(record.reads.get_addrs(),
-                            max_length  = max_length,
-                            bursts      = bursts):
-                            reads += self.comm.read(addr, length, burst)
+                    # Execute Packet's Records on the hardware.
+                    reads = self.arbiter.submit(self._execute, packet.records).result()
 
+                    # Reply with a record for each Record's reads.
+                    if reads:
                         addr_size = self.addr_width // 8
-                        record = EtherboneRecord(addr_size)
-                        record.writes = EtherboneWrites(addr_size=addr_size, datas=reads)
-                        record.wcount = len(record.writes)
+                        records   = []
+                        for record, datas in zip([r for r in packet.records if r.reads is not None], reads):
+                            reply = EtherboneRecord(addr_size)
+                            reply.writes = EtherboneWrites(
+                                addr_size = addr_size,
+                                base_addr = record.reads.base_ret_addr,
+                                datas     = datas)
+                            records.append(reply)
 
                         packet = EtherbonePacket(self.addr_width)
-                        packet.records = [record]
+                        packet.records = records
                         packet.encode()
                         self.send_packet(client_socket, packet)
 
-                    # Release hardware lock.
-                    self.lock = False
-
             finally:
                 print("Disconnect")
                 client_socket.close()
@@ -172,7 +237,7 @@ class RemoteServer(EtherboneIPC):
     def start(self, nthreads):
         for i in range(nthreads):
             self.serve_thread = threading.Thread(target=self._serve_thread)
-            self.serve_thread.setDaemon(True)
+            self.serve_thread.daemon = True
             self.serve_thread.start()
 
 # Run ----------------------------------------------------------------------------------------------
@@ -200,6 +265,7 @@ def main():
     parser.add_argument("--udp-ip",          default="192.168.1.50", help="Set UDP remote IP address.")
     parser.add_argument("--udp-port",        default=1234,           help="Set UDP remote port.")
     parser.add_argument("--udp-scan",        action="store_true",    help="Scan network for available UDP devices.")
+    parser.add_argument("--udp-records",     default=1,              help="Maximum Etherbone records per UDP packet (requires multi-records gateware).")
 
     # PCIe arguments
     parser.add_argument("--pcie",            action="store_true",    help="Select PCIe interface.")
@@ -250,7 +316,8 @@ def main():
             exit()
         else:
             print("[CommUDP] ip: {} / port: {} / ".format(udp_ip, udp_port), end="")
-            comm = CommUDP(udp_ip, udp_port, debug=args.debug, addr_width=int(args.addr_width))
+            comm = CommUDP(udp_ip, udp_port, debug=args.debug, addr_width=int(args.addr_width),
+                max_records=int(args.udp_records))
 
     # PCIe mode
     elif args.pcie:
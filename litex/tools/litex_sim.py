@@ -9,6 +9,7 @@
 # 版权所有 (c) 2023 Victor Suarez Rovere <suarezvictor@gmail.com>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import os
 import sys
 import argparse
 
@@ -31,7 +32,8 @@ from litex.soc.cores.video   import VideoGenericPHY
 from litedram           import modules as litedram_modules
 from litedram.modules   import parse_spd_hexdump
 from litedram.phy.model import sdram_module_nphases, get_sdram_phy_settings
-from litedram.phy.model import SDRAMPHYModel
+from litedram.phy.model import SDRAMPHYModel, SparseMemory
+from litedram.core.controller import ControllerSettings
 
 from liteeth.common             import *
 from liteeth.phy.gmii           import LiteEthPHYGMII
@@ -172,6 +174,7 @@ class SimSoC(SoCCore):
         sdram_data_width       = 32,
         sdram_spd_data         = None,
         sdram_verbosity        = 0,
+        sdram_controller_settings = None,
         with_i2c               = False,
         with_sdcard            = False,
         with_spi_flash         = False,
@@ -227,7 +230,8 @@ class SimSoC(SoCCore):
                 l2_cache_size           = kwargs.get("l2_size", 8192),
                 l2_cache_min_data_width = kwargs.get("min_l2_data_width", 128),
                 l2_cache_reverse        = False,
-                with_bist               = with_sdram_bist
+                with_bist               = with_sdram_bist,
+                controller_settings     = sdram_controller_settings or ControllerSettings()
             )
             if sdram_init != []:
                 # Skip SDRAM test to avoid corrupting pre-initialized contents.
@@ -383,6 +387,19 @@ class SimSoC(SoCCore):
 
 # Build --------------------------------------------------------------------------------------------
 
+def get_sdram_init(filename_or_regions, endianness="big", offset=0):
+    # Map the init files instead of loading them: only their pages are copied to SDRAMPHYModel.
+    regions   = get_mem_regions(filename_or_regions, offset)
+    data_size = 0
+    for filename, base in regions.items():
+        if not os.path.isfile(filename):
+            raise OSError(f"Unable to find {filename} memory content file.")
+        data_size = max(int(base, 16) + os.path.getsize(filename) - offset, data_size)
+    sdram_init = SparseMemory(32, (data_size + 3)//4)
+    for filename, base in regions.items():
+        sdram_init.add_file(filename, base=int(base, 16) - offset, endianness=endianness)
+    return sdram_init
+
 def generate_gtkw_savefile(builder, vns, trace_fst):
     from litex.build.sim import gtkwave as gtkw
     dumpfile = os.path.join(builder.gateware_dir, "sim.{}".format("fst" if trace_fst else "vcd"))
@@ -520,8 +537,7 @@ def main():
         if args.sdram_from_spd_dump:
             soc_kwargs["sdram_spd_data"] = parse_spd_hexdump(args.sdram_from_spd_dump)
         if args.sdram_init is not None:
-            soc_kwargs["sdram_init"] = get_mem_data(args.sdram_init,
-                data_width = conf_soc.bus.data_width,
+            soc_kwargs["sdram_init"] = get_sdram_init(args.sdram_init,
                 endianness = conf_soc.cpu.endianness,
                 offset     = conf_soc.mem_map["main_ram"]
             )
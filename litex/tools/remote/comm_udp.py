@@ -5,18 +5,34 @@
 # Copyright (c) 2016 Tim 'mithro' Ansell <mithro@mithis.com>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import sys
 import socket
 import time
+from array import array
 
-from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord
-from litex.tools.remote.etherbone import EtherboneReads, EtherboneWrites
+from litex.tools.remote.etherbone import EtherbonePacket, EtherboneCodec
 
 from litex.tools.remote.csr_builder import CSRBuilder
 
 # CommUDP ------------------------------------------------------------------------------------------
 
 class CommUDP(CSRBuilder):
-    def __init__(self, server="192.168.1.50", port=1234, csr_csv=None, debug=False, timeout=1.0, addr_width=32):
+    """Etherbone over UDP.
+
+    Besides single reads/writes, read_bursts/read_block/write_block keep up to window requests in
+    flight: read requests are identified by their base_ret_addr, responses are reassembled in any
+    order and only the requests whose response is lost are re-sent.
+
+    Responses are received on local_port (default: port, as sent by LiteEth's Etherbone).
+
+    Up to max_records requests (records) are packed per packet of at most max_packet_size bytes
+    (default: UDP payload of a 1500 bytes MTU); gateware has to be built with multi-records support
+    (LiteEthEtherbone's packet_buffer_depth) for max_records > 1.
+    """
+    max_length = 255 # Etherbone bursts are limited to 255 accesses.
+
+    def __init__(self, server="192.168.1.50", port=1234, csr_csv=None, debug=False, timeout=1.0, addr_width=32,
+        window=16, retries=10, local_port=None, max_records=1, max_packet_size=1472):
         CSRBuilder.__init__(self, comm=self, csr_csv=csr_csv)
         self.server = server
         self.port   = port
@@ -24,12 +40,18 @@ class CommUDP(CSRBuilder):
         self.timeout= timeout
         self.read_counter = 0
         self.addr_width   = addr_width
+        self.window       = window
+        self.retries      = retries
+        self.local_port   = port if local_port is None else local_port
+        self.max_records  = max_records
+        self.codec        = EtherboneCodec(addr_width, max_length=self.max_length,
+            max_packet_size=max_packet_size)
 
     def open(self, probe=True):
         if hasattr(self, "socket"):
             return
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind(("", self.port))
+        self.socket.bind(("", self.local_port))
         self.socket.settimeout(self.timeout)
         if probe:
             self.probe(self.server, self.port)
@@ -81,45 +103,65 @@ class CommUDP(CSRBuilder):
             if self.probe(ip=ip.format(str(i)), port=self.port, loose=True):
                 print("- {}".format(ip.format(i)))
 
+    def _next_read_id(self):
+        self.read_counter = (self.read_counter + 1) % 2**self.addr_width
+        return self.read_counter
+
+    def _send(self):
+        self.socket.sendto(self.codec.end(), (self.server, self.port))
+        self.codec.begin()
+
+    def _send_read(self, addr, length):
+        read_id = self._next_read_id()
+        self.socket.sendto(self.codec.encode_read(addr, length, base_ret_addr=read_id), (self.server, self.port))
+        return read_id
+
+    def _send_reads(self, bursts, indices, pending):
+        """Send the read requests of bursts[indices], packed up to max_records per packet."""
+        self.codec.begin()
+        records = 0
+        for index in indices:
+            addr, length, burst = bursts[index]
+            assert burst == "incr"
+            read_id = self._next_read_id()
+            if records == self.max_records or not self.codec.add_read(addr, length, read_id):
+                self._send()
+                self.codec.add_read(addr, length, read_id)
+                records = 0
+            pending[read_id] = index
+            records += 1
+        if records:
+            self._send()
+
+    def _receive_reads(self):
+        datas, dummy = self.socket.recvfrom(65536)
+        return [(record.base_addr, record.datas) for record in self.codec.decode(datas)]
+
     def read(self, addr, length=None, burst="incr"):
         assert burst == "incr"
         length_int = 1 if length is None else length
 
-        retries = 10
+        retries = self.retries
 
         for r in range(retries):
-            self.read_counter += 1
-
-            record = EtherboneRecord(addr_size=self.addr_width//8)
-            record.reads = EtherboneReads(addr_size=self.addr_width//8, addrs=[addr+4*j for j in range(length_int)])
-            record.rcount = len(record.reads)
-            record.reads.base_ret_addr = self.read_counter
-
-            packet = EtherbonePacket(addr_width=self.addr_width)
-            packet.records = [record]
-            packet.encode()
-
-            self.socket.sendto(packet.bytes, (self.server, self.port))
+            read_id = self._send_read(addr, length_int)
 
             timed_out = False
-            while True:
+            datas     = None
+            while datas is None:
                 try:
-                    datas, dummy = self.socket.recvfrom(8192)
+                    responses = self._receive_reads()
                 except socket.timeout:
                     if self.debug:
                         print("socket timeout, retrying ({}/{})".format(r+1, retries))
                     timed_out = True
                     break
 
-                packet = EtherbonePacket(self.addr_width, datas)
-                packet.decode()
-                record = packet.records.pop()
-                datas = record.writes.get_datas()
-                if record.writes.base_addr == self.read_counter:
-                    break
-                else:
-                    if self.debug:
-                        print(f"WARNING: request/response id mismatch: 0x{self.read_counter:08x} != 0x{record.writes.base_addr:08x}")
+                for ret_id, ret_datas in responses:
+                    if ret_id == read_id:
+                        datas = ret_datas
+                    elif self.debug:
+                        print(f"WARNING: request/response id mismatch: 0x{read_id:08x} != 0x{ret_id:08x}")
 
             if not timed_out:
                 break
@@ -131,20 +173,97 @@ class CommUDP(CSRBuilder):
             for i, value in enumerate(datas):
                 print("read 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i))
 
-        return datas[0] if length is None else datas
+        return datas[0] if length is None else datas.tolist()
 
-    def write(self, addr, datas):
-        datas = datas if isinstance(datas, list) else [datas]
-        length = len(datas)
-        record = EtherboneRecord(addr_size=self.addr_width//8)
-        record.writes = EtherboneWrites(addr_size=self.addr_width//8, base_addr=addr, datas=iter(datas))
-        record.wcount = len(record.writes)
+    def read_bursts(self, bursts, window=None):
+        """Read a list of (addr, length, burst) bursts and return the concatenated datas.
 
-        packet = EtherbonePacket(self.addr_width)
-        packet.records = [record]
-        packet.encode()
+        Up to window read requests are kept in flight, packed up to max_records per packet.
+        """
+        return self._read_bursts(bursts, window).tolist()
+
+    def _read_bursts(self, bursts, window=None):
+        window  = self.window if window is None else window
+        results = [None]*len(bursts)
+        pending = {} # read_id -> burst index.
+        retries = [0]*len(bursts)
+        issued  = 0
+        while issued < len(bursts) or pending:
+            # Fill the window (once a full packet of requests can be sent).
+            count = min(len(bursts) - issued, window - len(pending))
+            if count == len(bursts) - issued or count >= self.max_records or not pending:
+                self._send_reads(bursts, range(issued, issued + count), pending)
+                issued += count
 
-        self.socket.sendto(packet.bytes, (self.server, self.port))
+            # Receive responses.
+            try:
+                responses = self._receive_reads()
+            except socket.timeout:
+                # Re-send the requests whose response is lost.
+                if self.debug:
+                    print("socket timeout, re-sending {} reads".format(len(pending)))
+                lost    = list(pending.values())
+                pending = {}
+                for index in lost:
+                    retries[index] += 1
+                    if retries[index] >= self.retries:
+                        raise socket.timeout
+                self._send_reads(bursts, lost, pending)
+                continue
+            for ret_id, datas in responses:
+                index = pending.pop(ret_id, None)
+                if index is None:
+                    # Late response to a re-sent request.
+                    continue
+                results[index] = datas
+
+        datas = array("I")
+        for (addr, length, burst), result in zip(bursts, results):
+            if self.debug:
+                for i, value in enumerate(result):
+                    print("read 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i))
+            datas.extend(result)
+        return datas
+
+    def read_block(self, addr, nbytes, endianness="little"):
+        """Read nbytes (rounded up to 32-bit words) from addr and return them as bytes."""
+        length = (nbytes + 3)//4
+        bursts = [(addr + 4*i, min(self.max_length, length - i), "incr")
+            for i in range(0, length, self.max_length)]
+        datas  = self._read_bursts(bursts)
+        if endianness != sys.byteorder:
+            datas.byteswap()
+        return datas.tobytes()[:nbytes]
+
+    def write_block(self, addr, data, endianness="little"):
+        """Write data (bytes, padded to 32-bit words) to addr.
+
+        Write requests are packed up to max_records per packet. Writes are not acknowledged: the
+        last word written by every window write requests (and by the last one) is read back to avoid
+        overflowing the device.
+        """
+        datas = array("I")
+        datas.frombytes(bytes(data) + bytes(-len(data) % 4))
+        if endianness != sys.byteorder:
+            datas.byteswap()
+        self.codec.begin()
+        records = 0
+        for n, i in enumerate(range(0, len(datas), self.max_length)):
+            burst = datas[i:i + self.max_length]
+            if records == self.max_records or not self.codec.add_writes(addr + 4*i, burst):
+                self._send()
+                self.codec.add_writes(addr + 4*i, burst)
+                records = 0
+            records += 1
+            if (n + 1) % self.window == 0 or (i + len(burst)) == len(datas):
+                self._send()
+                records = 0
+                self.read(addr + 4*(i + len(burst) - 1))
+                self.codec.begin()
+
+    def write(self, addr, datas):
+        datas = datas if isinstance(datas, list) else [datas]
+        self.socket.sendto(self.codec.encode_writes(addr, datas), (self.server, self.port))
 
         if self.debug:
             for i, value in enumerate(datas):
@@ -5,8 +5,11 @@
 # Copyright (c) 2017 Tim Ansell <mithro@mithis.com>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import sys
 import math
 import struct
+from array import array
+from collections import namedtuple
 
 from litex.soc.interconnect.packet import HeaderField, Header
 
@@ -62,6 +65,147 @@ unpack_uint32_from = struct.Struct('>I').unpack
 pack_to_uint64 = struct.Struct('>Q').pack
 unpack_uint64_from = struct.Struct('>Q').unpack
 
+# Etherbone Codec ----------------------------------------------------------------------------------
+
+# Packet header: magic, version/nr/pr/pf, addr_size/port_size, padding.
+etherbone_packet_header_struct = struct.Struct(">HBB4x")
+# Record header: bca/rca/rff/cyc/wca/wff, byte_enable, wcount, rcount.
+etherbone_record_header_struct = struct.Struct(">BBBB")
+
+def _encode_words(typecode, values):
+    """Return values as big-endian words (array)."""
+    words = array(typecode, values)
+    if sys.byteorder == "little":
+        words.byteswap()
+    return words
+
+def _decode_words(typecode, data):
+    """Return big-endian words of data as an array."""
+    words = array(typecode)
+    words.frombytes(data)
+    if sys.byteorder == "little":
+        words.byteswap()
+    return words
+
+EtherboneCodecRecord = namedtuple("EtherboneCodecRecord",
+    ["flags", "byte_enable", "base_addr", "datas", "base_ret_addr", "addrs"])
+
+
+class EtherboneCodec:
+    """Precompiled Etherbone codec.
+
+    Encodes packets of write/read burst records into a preallocated buffer and returns them as a
+    memoryview, valid until the next encode. Records are added to the current packet (begin/add_*/
+    end) up to max_packet_size bytes, a single record always fits. Decodes packets to
+    EtherboneCodecRecords with the datas/addresses as arrays.
+    """
+    def __init__(self, addr_width=32, max_length=255, max_packet_size=None):
+        assert addr_width in [32, 64]
+        self.addr_size     = addr_width//8
+        self.addr_typecode = {4: "I", 8: "Q"}[self.addr_size]
+        self.addr_struct   = struct.Struct({4: ">I", 8: ">Q"}[self.addr_size])
+        self.max_length    = max_length
+        self.header_length = etherbone_packet_header_length + etherbone_record_header_length
+        record_size        = self.header_length + (max_length + 1)*self.addr_size
+        self.max_packet_size = record_size if max_packet_size is None else max_packet_size
+        self.buffer = bytearray(max(self.max_packet_size, record_size))
+        self.view   = memoryview(self.buffer)
+        self.offset = etherbone_packet_header_length
+        etherbone_packet_header_struct.pack_into(self.buffer, 0,
+            etherbone_magic,
+            etherbone_version << 4,
+            (self.addr_size << 4) | 4)
+
+    def writes_size(self, length):
+        """Size (in bytes) of a record of length writes."""
+        return etherbone_record_header_length + self.addr_size + 4*length
+
+    def reads_size(self, length):
+        """Size (in bytes) of a record of length reads."""
+        return etherbone_record_header_length + self.addr_size*(length + 1)
+
+    def begin(self):
+        """Start a new packet."""
+        self.offset = etherbone_packet_header_length
+
+    def end(self):
+        """Return the current packet."""
+        return self.view[:self.offset]
+
+    def _add(self, flags, wcount, rcount, base_addr, words):
+        if len(words) > self.max_length:
+            raise ValueError(f"Burst size of {len(words)} exceeds maximum of {self.max_length} allowed.")
+        words  = memoryview(words).cast("B")
+        offset = self.offset
+        size   = etherbone_record_header_length + self.addr_size + len(words)
+        if offset != etherbone_packet_header_length and offset + size > self.max_packet_size:
+            return False
+        etherbone_record_header_struct.pack_into(self.buffer, offset, flags, 0xf, wcount, rcount)
+        offset += etherbone_record_header_length
+        self.addr_struct.pack_into(self.buffer, offset, base_addr)
+        offset += self.addr_size
+        self.view[offset:offset + len(words)] = words
+        self.offset = offset + len(words)
+        return True
+
+    def add_writes(self, base_addr, datas, wff=0):
+        """Add a write burst of datas at base_addr (fixed address if wff) to the current packet.
+
+        Returns False (and does not add it) when the record does not fit in the packet.
+        """
+        datas = _encode_words("I", datas)
+        return self._add(wff << 6, len(datas), 0, base_addr, datas)
+
+    def add_reads(self, addrs, base_ret_addr=0):
+        """Add reads of addrs, replied to base_ret_addr, to the current packet (see add_writes)."""
+        addrs = _encode_words(self.addr_typecode, addrs)
+        return self._add(0, 0, len(addrs), base_ret_addr, addrs)
+
+    def add_read(self, addr, length, base_ret_addr=0):
+        """Add an incrementing read burst of length words at addr to the current packet."""
+        return self.add_reads(range(addr, addr + 4*length, 4), base_ret_addr)
+
+    def encode_writes(self, base_addr, datas, wff=0):
+        """Encode a write burst of datas at base_addr (fixed address if wff)."""
+        self.begin()
+        self.add_writes(base_addr, datas, wff)
+        return self.end()
+
+    def encode_reads(self, addrs, base_ret_addr=0):
+        """Encode reads of addrs, replied to base_ret_addr."""
+        self.begin()
+        self.add_reads(addrs, base_ret_addr)
+        return self.end()
+
+    def encode_read(self, addr, length, base_ret_addr=0):
+        """Encode an incrementing read burst of length words at addr."""
+        return self.encode_reads(range(addr, addr + 4*length, 4), base_ret_addr)
+
+    def decode(self, data):
+        """Decode the records of an Etherbone packet."""
+        view = memoryview(data)
+        magic, version, sizes = etherbone_packet_header_struct.unpack_from(view)
+        if magic != etherbone_magic:
+            raise ValueError("Invalid Etherbone magic: 0x{:04x}".format(magic))
+        records = []
+        offset  = etherbone_packet_header_length
+        while offset < len(view):
+            flags, byte_enable, wcount, rcount = etherbone_record_header_struct.unpack_from(view, offset)
+            offset += etherbone_record_header_length
+            base_addr = datas = base_ret_addr = addrs = None
+            if wcount:
+                base_addr = self.addr_struct.unpack_from(view, offset)[0]
+                offset   += self.addr_size
+                datas     = _decode_words("I", view[offset:offset + 4*wcount])
+                offset   += 4*wcount
+            if rcount:
+                base_ret_addr = self.addr_struct.unpack_from(view, offset)[0]
+                offset       += self.addr_size
+                addrs         = _decode_words(self.addr_typecode, view[offset:offset + self.addr_size*rcount])
+                offset       += self.addr_size*rcount
+            records.append(EtherboneCodecRecord(flags, byte_enable, base_addr, datas, base_ret_addr, addrs))
+        return records
+
 # Packet -------------------------------------------------------------------------------------------
 
 class Packet(list):
@@ -119,8 +263,7 @@ class EtherboneWrites(Packet):
             ba += pack_to_uint32(self.base_addr)
         else:
             ba += pack_to_uint64(self.base_addr)
-        for write in self.writes:
-            ba += pack_to_uint32(write.data)
+        ba += _encode_words("I", [write.data for write in self.writes])
         self.bytes   = ba
         self.encoded = True
 
@@ -132,13 +275,9 @@ class EtherboneWrites(Packet):
             self.base_addr = unpack_uint32_from(ba[:self.addr_size])[0]
         else:
             self.base_addr = unpack_uint64_from(ba[:self.addr_size])[0]
-        writes = []
-        offset = self.addr_size
-        length = len(ba)
-        while length > offset:
-            writes.append(EtherboneWrite(unpack_uint32_from(ba[offset:offset+4])[0]))
-            offset += 4
-        self.writes  = writes
+        datas = ba[self.addr_size:]
+        datas = _decode_words("I", datas[:len(datas) - len(datas)%4])
+        self.writes  = [EtherboneWrite(data) for data in datas]
         self.encoded = False
 
     def __repr__(self):
@@ -179,13 +318,10 @@ class EtherboneReads(Packet):
         ba = bytearray()
         if (self.addr_size == 4):
             ba += pack_to_uint32(self.base_ret_addr)
+            ba += _encode_words("I", [read.addr for read in self.reads])
         else:
             ba += pack_to_uint64(self.base_ret_addr)
-        for read in self.reads:
-            if self.addr_size == 4:
-                ba += pack_to_uint32(read.addr)
-            else:
-                ba += pack_to_uint64(read.addr)
+            ba += _encode_words("Q", [read.addr for read in self.reads])
         self.bytes   = ba
         self.encoded = True
 
@@ -194,20 +330,14 @@ class EtherboneReads(Packet):
             raise ValueError
         ba = self.bytes
         if self.addr_size == 4:
-            base_ret_addr = unpack_uint32_from(ba[:self.addr_size])[0]
+            self.base_ret_addr = unpack_uint32_from(ba[:self.addr_size])[0]
+            typecode = "I"
         else:
-            base_ret_addr = unpack_uint64_from(ba[:self.addr_size])[0]
-        reads  = []
-        offset = self.addr_size
-        length = len(ba)
-        while length > offset:
-            v = ba[offset:offset+self.addr_size]
-            if self.addr_size == 4:
-                reads.append(EtherboneRead(unpack_uint32_from(v)[0]))
-            else:
-                reads.append(EtherboneRead(unpack_uint64_from(v)[0]))
-            offset += self.addr_size
-        self.reads   = reads
+            self.base_ret_addr = unpack_uint64_from(ba[:self.addr_size])[0]
+            typecode = "Q"
+        addrs = ba[self.addr_size:]
+        addrs = _decode_words(typecode, addrs[:len(addrs) - len(addrs)%self.addr_size])
+        self.reads   = [EtherboneRead(addr) for addr in addrs]
         self.encoded = False
 
     def __repr__(self):
@@ -244,9 +374,14 @@ class EtherboneRecord(Packet):
             raise ValueError
 
         # Decode header
-        header = list(self.bytes[:etherbone_record_header.length])
-        for k, v in sorted(etherbone_record_header.fields.items()):
-            setattr(self, k, get_field_data(v, header))
+        flags, self.byte_enable, self.wcount, self.rcount = etherbone_record_header_struct.unpack_from(
+            bytes(self.bytes[:etherbone_record_header.length]))
+        self.bca = (flags >> 0) & 0b1
+        self.rca = (flags >> 1) & 0b1
+        self.rff = (flags >> 2) & 0b1
+        self.cyc = (flags >> 4) & 0b1
+        self.wca = (flags >> 5) & 0b1
+        self.wff = (flags >> 6) & 0b1
         offset = etherbone_record_header.length
 
         # Decode writes
@@ -280,11 +415,14 @@ class EtherboneRecord(Packet):
         ba = bytearray()
 
         # Encode header
-        header = 0
-        for k, v in sorted(etherbone_record_header.fields.items()):
-            value = int.from_bytes(getattr(self, k).to_bytes(math.ceil(v.width/8), "big"), "little")
-            header += (value << v.offset+(v.byte*8))
-        ba += header.to_bytes(etherbone_record_header.length, "little")
+        flags = (
+            (self.bca << 0) |
+            (self.rca << 1) |
+            (self.rff << 2) |
+            (self.cyc << 4) |
+            (self.wca << 5) |
+            (self.wff << 6))
+        ba += etherbone_record_header_struct.pack(flags, self.byte_enable, self.wcount, self.rcount)
 
         # Encode writes
         if self.wcount:
@@ -299,6 +437,15 @@ class EtherboneRecord(Packet):
         self.bytes   = ba
         self.encoded = True
 
+    def get_length(self):
+        """Length (in bytes) of the encoded record."""
+        length = etherbone_record_header.length
+        if self.writes is not None and len(self.writes.writes):
+            length += self.addr_size + 4*len(self.writes.writes)
+        if self.reads is not None and len(self.reads.reads):
+            length += self.addr_size*(len(self.reads.reads) + 1)
+        return length
+
     def __repr__(self, n=0):
         r = "Record {}\n".format(n)
         r += "--------\n"
@@ -338,23 +485,31 @@ class EtherbonePacket(Packet):
 
         ba = self.bytes
 
-        # Decode header
-        header = list(ba[:etherbone_packet_header.length])
-        for k, v in sorted(etherbone_packet_header.fields.items()):
-            setattr(self, k, get_field_data(v, header))
+        # Decode header (missing bytes decoded as 0)
+        header = bytes(ba[:etherbone_packet_header.length]).ljust(etherbone_packet_header.length, b"\x00")
+        self.magic, flags, sizes = etherbone_packet_header_struct.unpack(header)
+        self.version   = (flags >> 4) & 0xf
+        self.nr        = (flags >> 2) & 0b1
+        self.pr        = (flags >> 1) & 0b1
+        self.pf        = (flags >> 0) & 0b1
+        self.addr_size = (sizes >> 4) & 0xf
+        self.port_size = (sizes >> 0) & 0xf
         offset = etherbone_packet_header.length
 
         # Decode records
         length = len(ba)
         while length > offset:
-            record = EtherboneRecord(addr_size=self.addr_size, init=ba[offset:])
+            wcount = ba[offset + 2]
+            rcount = ba[offset + 3]
+            record_length = etherbone_record_header.length
+            if wcount:
+                record_length += (4*wcount) + self.addr_size
+            if rcount:
+                record_length += (rcount + 1) * self.addr_size
+            record = EtherboneRecord(addr_size=self.addr_size, init=ba[offset:offset + record_length])
             record.decode()
             self.records.append(record)
-            offset += etherbone_record_header.length
-            if record.wcount:
-                offset += (4*record.wcount) + self.addr_size
-            if record.rcount:
-                offset += (record.rcount + 1) * self.addr_size
+            offset += record_length
 
         self.encoded = False
 
@@ -365,11 +520,10 @@ class EtherbonePacket(Packet):
         ba = bytearray()
 
         # Encode header
-        header = 0
-        for k, v in sorted(etherbone_packet_header.fields.items()):
-            value = int.from_bytes(getattr(self, k).to_bytes(math.ceil(v.width/8), "big"), "little")
-            header += (value << v.offset+(v.byte*8))
-        ba += header.to_bytes(etherbone_packet_header.length, "little")
+        ba += etherbone_packet_header_struct.pack(
+            self.magic,
+            (self.version << 4) | (self.nr << 2) | (self.pr << 1) | self.pf,
+            (self.addr_size << 4) | self.port_size)
 
         # Encode records
         for record in self.records:
@@ -379,6 +533,24 @@ class EtherbonePacket(Packet):
         self.bytes   = ba
         self.encoded = True
 
+    @classmethod
+    def pack(cls, records, addr_width=32, max_size=1472):
+        """Pack records (in order) into packets of at most max_size bytes.
+
+        Returns the list of (non-encoded) packets, a record larger than max_size gets its own
+        packet. The default max_size is the UDP payload of a 1500 bytes MTU.
+        """
+        packets = []
+        length  = max_size
+        for record in records:
+            record_length = record.get_length()
+            if length + record_length > max_size:
+                packets.append(cls(addr_width))
+                length = etherbone_packet_header.length
+            packets[-1].records.append(record)
+            length += record_length
+        return packets
+
     def __repr__(self):
         r = "Packet\n"
         r += "--------\n"
@@ -394,38 +566,33 @@ class EtherbonePacket(Packet):
 
 # Etherbone IPC ------------------------------------------------------------------------------------
 
+# Packets are prefixed with their length on the TCP stream between litex_server and its clients
+# (TCP does not preserve the packet boundaries).
+etherbone_ipc_length_struct = struct.Struct(">I")
+
 class EtherboneIPC:
     def send_packet(self, socket, packet):
-        socket.sendall(packet.bytes)
+        """Send packet (EtherbonePacket or encoded bytes)."""
+        data = packet.bytes if isinstance(packet, EtherbonePacket) else packet
+        socket.sendall(etherbone_ipc_length_struct.pack(len(data)) + bytes(data))
 
     def receive_packet(self, socket, addr_size):
         assert addr_size in [1, 2, 4, 8]
-        header_length = etherbone_packet_header_length + etherbone_record_header_length
-        packet = bytes()
         try:
-            while len(packet) < header_length:
-                chunk = socket.recv(header_length - len(packet))
-                if len(chunk) == 0:
-                    return 0
-                else:
-                    packet += chunk
-
-            wcount, rcount = struct.unpack(">BB", packet[header_length - 2:])
-            counts = wcount + rcount
-            packet_size = header_length
-            if wcount != 0:
-                packet_size += 4 * (wcount) + addr_size
-            if rcount != 0:
-                packet_size += (rcount + 1) * addr_size
-
-            while len(packet) < packet_size:
-                chunk = socket.recv(packet_size - len(packet))
-                if len(chunk) == 0:
-                    return 0
-                else:
-                    packet += chunk
-
-            return packet
+            length = self._receive(socket, bytes(), etherbone_ipc_length_struct.size)
+            if length is None:
+                return 0
+            length = etherbone_ipc_length_struct.unpack(length)[0]
+            packet = self._receive(socket, bytes(), length)
+            return packet if packet else 0
 
         except TimeoutError:
-            return 0
\ No newline at end of file
+            return 0
+
+    def _receive(self, socket, packet, size):
+        while len(packet) < size:
+            chunk = socket.recv(size - len(packet))
+            if len(chunk) == 0:
+                return None
+            packet += chunk
+        return packet
@@ -0,0 +1,86 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Benchmark of the Etherbone packet codecs.
+
+Measures the packets/second encoded and decoded by the EtherbonePacket classes and by the
+precompiled EtherboneCodec, for read requests and read responses (write bursts) of a given length::
+
+    python -m test.benchmark_etherbone --length 1 --length 255
+"""
+
+import time
+import argparse
+
+from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord
+from litex.tools.remote.etherbone import EtherboneReads, EtherboneWrites
+from litex.tools.remote.etherbone import EtherboneCodec
+
+# Packets ------------------------------------------------------------------------------------------
+
+def encode_reads_packet(addr, length):
+    record = EtherboneRecord()
+    record.reads = EtherboneReads(addrs=[addr + 4*i for i in range(length)])
+    packet = EtherbonePacket()
+    packet.records = [record]
+    packet.encode()
+    return packet.bytes
+
+
+def encode_writes_packet(addr, datas):
+    record = EtherboneRecord()
+    record.writes = EtherboneWrites(base_addr=addr, datas=datas)
+    packet = EtherbonePacket()
+    packet.records = [record]
+    packet.encode()
+    return packet.bytes
+
+
+def decode_writes_packet(data):
+    packet = EtherbonePacket(init=data)
+    packet.decode()
+    return packet.records[0].writes.get_datas()
+
+# Benchmark ----------------------------------------------------------------------------------------
+
+def packets_per_second(function, duration):
+    packets = 0
+    start   = time.perf_counter()
+    while True:
+        for i in range(100):
+            function()
+        packets += 100
+        elapsed  = time.perf_counter() - start
+        if elapsed >= duration:
+            return packets/elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Etherbone codec benchmark.")
+    parser.add_argument("--length",   type=int, action="append", help="Burst length (can be repeated).")
+    parser.add_argument("--duration", type=float, default=1.0,   help="Duration of each measurement (s).")
+    args = parser.parse_args()
+
+    codec = EtherboneCodec()
+    for length in args.length or [1, 16, 255]:
+        datas    = list(range(length))
+        response = encode_writes_packet(0x1000, datas)
+        assert bytes(codec.encode_read(0x1000, length)) == bytes(encode_reads_packet(0x1000, length))
+        assert codec.decode(response)[0].datas.tolist() == decode_writes_packet(response)
+
+        print("Burst length: {}".format(length))
+        print("{:<24} {:>14} {:>14}".format("", "packets", "codec"))
+        for name, packet_function, codec_function in [
+            ("encode reads",  lambda: encode_reads_packet(0x1000, length), lambda: codec.encode_read(0x1000, length)),
+            ("encode writes", lambda: encode_writes_packet(0x1000, datas), lambda: codec.encode_writes(0x1000, datas)),
+            ("decode writes", lambda: decode_writes_packet(response),      lambda: codec.decode(response)),
+        ]:
+            print("{:<24} {:>12.0f}/s {:>12.0f}/s".format(name,
+                packets_per_second(packet_function, args.duration),
+                packets_per_second(codec_function,  args.duration)))
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Benchmark of the hierarchical signal namer.
+
+Builds the signals of a synthetic SoC (many identical peripherals with wide CSR banks), names them
+with ``build_signal_namespace`` and checks the names against the digest of the reference namer
+output::
+
+    python -m test.benchmark_namer --peripherals 512 --registers 48
+"""
+
+import time
+import hashlib
+import argparse
+from collections import defaultdict
+
+from migen import Signal
+
+from litex.gen.fhdl.namer import build_signal_namespace
+
+# Synthetic SoC ------------------------------------------------------------------------------------
+
+# Digests of the names of synthetic_soc(peripherals, registers).
+REFERENCE_DIGESTS = {
+    (  8,  4): "4fcb2257aeaeb0df62e78721efba201ac6a28036a76f33e6a3444d78cd7d0822",
+    ( 64, 16): "d3d11386ab306de92e05296cc92d420c86b727c7ab895ec718199c1f58ecdcee",
+    (512, 48): "d43c71686816695a0b2ed5097ceea06384c1ac489a20ac20f511391128b30581",
+}
+
+def synthetic_soc(peripherals, registers):
+    """Return the signals of a synthetic SoC with explicit backtraces.
+
+    Backtraces mimic the ones built by the tracer: numbers are per name counters and peripherals of
+    the same kind, registers and CSR fields share names, CSR banks have many distinctly named
+    fields, some signals are related to others (as FSM next values) and a few have identical
+    backtraces.
+    """
+    counters = defaultdict(int)
+    def step(name):
+        number = counters[name]
+        counters[name] += 1
+        return (name, number)
+
+    def signal(backtrace, width=1, related=None):
+        s = Signal(width, related=related)
+        s.backtrace = backtrace
+        signals.append(s)
+        return s
+
+    signals = []
+    kinds   = ["uart", "timer", "spi", "gpio", "i2c", "dma"]
+    top     = [("main", 0), ("basesoc", 0)]
+    for p in range(peripherals):
+        kind = kinds[p % len(kinds)]
+        base = top + [step("add_" + kind), (kind, p // len(kinds))]
+        for r in range(registers):
+            csr = base + [step("csrstorage")]
+            storage = signal(csr + [step("storage")], 32)
+            signal(csr + [step("re")])
+            signal(csr + [step("we")])
+            signal(csr + [step("dat_w")], 32)
+            signal(csr + [step("next_value")], 32, related=storage)
+        fsm = base + [step("fsm")]
+        state = signal(fsm + [step("state")], 4)
+        signal(fsm + [step("next_state")], 4, related=state)
+        for i in range(4):
+            signal(base + [("sink", 0), step("valid")])
+            signal(base + [("sink", 0), step("data")], 8)
+        # Identical backtraces, disambiguated by duid.
+        signal(base + [("pending", 0)])
+        signal(base + [("pending", 0)])
+        # CSR bank with distinctly named fields.
+        bank = top + [("csr_bankarray", 0), ("csrbank{}".format(p), 0)]
+        for r in range(registers):
+            signal(bank + [("{}_reg{}_re".format(kind, r), 0)])
+            signal(bank + [("{}_reg{}_w".format(kind, r), 0)], 32)
+    for i in range(registers):
+        signal(top + [step("csr_bankarray"), step("interface"), step("dat_r")], 32)
+    return signals
+
+
+def names(signals):
+    ns = build_signal_namespace(signals)
+    return "\n".join(ns.get_name(s) for s in signals)
+
+
+def digest(names):
+    return hashlib.sha256(names.encode()).hexdigest()
+
+# Benchmark ----------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Signal namer benchmark.")
+    parser.add_argument("--peripherals", type=int, default=512, help="Number of peripherals.")
+    parser.add_argument("--registers",   type=int, default=48,  help="CSR registers per peripheral.")
+    args = parser.parse_args()
+
+    signals = synthetic_soc(args.peripherals, args.registers)
+    start   = time.perf_counter()
+    result  = digest(names(signals))
+    elapsed = time.perf_counter() - start
+
+    print("{} signals named in {:.2f}s".format(len(signals), elapsed))
+    print("digest: {}".format(result))
+    reference = REFERENCE_DIGESTS.get((args.peripherals, args.registers))
+    if reference is not None:
+        assert result == reference, "names differ from the reference namer"
+        print("names match the reference namer")
+
+if __name__ == "__main__":
+    main()
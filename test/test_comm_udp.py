@@ -0,0 +1,163 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import random
+import socket
+import threading
+
+from litex.tools.remote.comm_udp import CommUDP
+from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord, EtherboneWrites
+
+
+class EtherboneResponder:
+    """Local stand-in of a UDP Etherbone slave on a dict of 32-bit words.
+
+    Read responses are delayed and reordered up to reorder responses, and the responses whose index
+    is in drop are lost.
+    """
+    def __init__(self, drop=(), reorder=1, seed=0):
+        self.mem        = {}
+        self.drop       = set(drop)
+        self.reorder    = reorder
+        self.rng        = random.Random(seed)
+        self.reads      = 0
+        self.read_addrs = []
+        self.responses  = 0
+        self.packets    = 0
+        self.socket  = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("127.0.0.1", 0))
+        self.socket.settimeout(0.01)
+        self.port    = self.socket.getsockname()[1]
+        self.running = True
+        self.thread  = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        self.socket.close()
+
+    def _handle(self, datas):
+        packet = EtherbonePacket(32, datas)
+        packet.decode()
+        self.packets += 1
+        if packet.pf:
+            reply = EtherbonePacket(32)
+            reply.pr = 1
+            reply.encode()
+            return reply.bytes
+        replies = []
+        for record in packet.records:
+            if record.writes is not None:
+                for i, data in enumerate(record.writes.get_datas()):
+                    self.mem[record.writes.base_addr + 4*i] = data
+            if record.reads is not None:
+                self.reads += 1
+                self.read_addrs += record.reads.get_addrs()
+                reply = EtherboneRecord()
+                reply.writes = EtherboneWrites(
+                    base_addr = record.reads.base_ret_addr,
+                    datas     = [self.mem.get(addr, 0) for addr in record.reads.get_addrs()])
+                replies.append(reply)
+        if replies:
+            self.responses += 1
+            if self.responses - 1 in self.drop:
+                return None
+            reply = EtherbonePacket(32)
+            reply.records = replies
+            reply.encode()
+            return reply.bytes
+
+    def _serve(self):
+        delayed = []
+        while self.running:
+            try:
+                datas, addr = self.socket.recvfrom(8192)
+            except socket.timeout:
+                # Flush delayed responses when idle.
+                for reply in delayed:
+                    self.socket.sendto(reply, addr)
+                delayed = []
+                continue
+            reply = self._handle(datas)
+            if reply is None:
+                continue
+            delayed.insert(self.rng.randrange(len(delayed) + 1), reply)
+            if len(delayed) >= self.reorder:
+                self.socket.sendto(delayed.pop(0), addr)
+
+
+class TestCommUDP(unittest.TestCase):
+    def open(self, max_records=1, max_packet_size=1472, window=16, **kwargs):
+        responder = EtherboneResponder(**kwargs)
+        self.addCleanup(responder.close)
+        # Responses are only lost when dropped by the responder: the timeout is long enough to never
+        # expire otherwise.
+        comm = CommUDP("127.0.0.1", responder.port, local_port=0, timeout=1.0, window=window,
+            max_records=max_records, max_packet_size=max_packet_size)
+        comm.open()
+        self.addCleanup(comm.close)
+        return responder, comm
+
+    def test_read_write(self):
+        responder, comm = self.open()
+        comm.write(0x100, [1, 2, 3])
+        self.assertEqual(comm.read(0x104), 2)
+        self.assertEqual(comm.read(0x100, 3), [1, 2, 3])
+
+    def test_read_block(self):
+        responder, comm = self.open(reorder=4)
+        responder.mem.update({4*i: i for i in range(4096)})
+        data = comm.read_block(0x0, 4*4096 - 2)
+        self.assertEqual(len(data), 4*4096 - 2)
+        self.assertEqual(data[:8], bytes([0, 0, 0, 0, 1, 0, 0, 0]))
+        self.assertEqual(data[4*4095 - 4:4*4095], (4094).to_bytes(4, "little"))
+        self.assertEqual(responder.reads, 17)
+
+    def test_lost_responses(self):
+        responder, comm = self.open(drop={2, 6}, reorder=3, seed=1)
+        responder.mem.update({4*i: 2*i for i in range(2048)})
+        data = comm.read_block(0x0, 4*2048, endianness="big")
+        self.assertEqual(data, b"".join((2*i).to_bytes(4, "big") for i in range(2048)))
+        # Only lost responses are re-sent.
+        self.assertEqual(responder.reads, 9 + 2)
+
+    def test_write_block(self):
+        responder, comm = self.open()
+        data = bytes(random.Random(2).randrange(256) for i in range(4*1000 + 3))
+        comm.write_block(0x1000, data)
+        self.assertEqual(responder.read_addrs, [0x1000 + 4*1000])
+        self.assertEqual(comm.read_block(0x1000, len(data)), data)
+
+    def test_write_block_window(self):
+        responder, comm = self.open(window=2)
+        data = bytes(random.Random(5).randrange(256) for i in range(4*1000))
+        comm.write_block(0x1000, data)
+        # The last written word is read back every 2 write requests (of 255 words) and at the end.
+        self.assertEqual(responder.read_addrs, [0x1000 + 4*509, 0x1000 + 4*999])
+        self.assertEqual(comm.read_block(0x1000, len(data)), data)
+
+    def test_read_bursts_records(self):
+        responder, comm = self.open(max_records=8, reorder=2)
+        responder.mem.update({4*i: i for i in range(256)})
+        bursts = [(8*i, 2, "incr") for i in range(128)]
+        self.assertEqual(comm.read_bursts(bursts), list(range(256)))
+        self.assertEqual(responder.reads, 128)
+        self.assertEqual(responder.packets, 128//8 + 1) # + probe.
+
+    def test_write_block_records(self):
+        responder, comm = self.open(max_records=4, max_packet_size=8192, drop={0})
+        data = bytes(random.Random(4).randrange(256) for i in range(4*1000))
+        comm.write_block(0x1000, data)
+        writes = responder.packets
+        self.assertEqual(responder.read_addrs, 2*[0x1000 + 4*999])
+        self.assertEqual(comm.read_block(0x1000, len(data)), data)
+        # Probe, 4 write records of at most 255 words in a packet and a final read (re-sent once).
+        self.assertEqual(writes, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
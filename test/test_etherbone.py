@@ -0,0 +1,128 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import random
+
+from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord
+from litex.tools.remote.etherbone import EtherboneReads, EtherboneWrites
+from litex.tools.remote.etherbone import EtherboneCodec
+
+
+class TestEtherbone(unittest.TestCase):
+    def random_packet(self, prng, addr_width):
+        addr_size = addr_width//8
+        packet    = EtherbonePacket(addr_width)
+        for i in range(prng.randrange(1, 4)):
+            record = EtherboneRecord(addr_size)
+            record.cyc         = prng.randrange(2)
+            record.wff         = prng.randrange(2)
+            record.byte_enable = prng.randrange(256)
+            if prng.randrange(2):
+                record.writes = EtherboneWrites(addr_size,
+                    base_addr = prng.randrange(2**addr_width),
+                    datas     = [prng.randrange(2**32) for j in range(prng.randrange(1, 32))])
+            record.reads = EtherboneReads(addr_size,
+                base_ret_addr = prng.randrange(2**addr_width),
+                addrs         = [prng.randrange(2**addr_width) for j in range(prng.randrange(1, 32))])
+            packet.records.append(record)
+        return packet
+
+    def test_packet_codec(self):
+        prng = random.Random(42)
+        for addr_width in [32, 64]:
+            codec = EtherboneCodec(addr_width)
+            for i in range(32):
+                packet = self.random_packet(prng, addr_width)
+                packet.encode()
+                data = bytes(packet.bytes)
+
+                decoded = EtherbonePacket(addr_width, data)
+                decoded.decode()
+                self.assertEqual(decoded.magic, 0x4e6f)
+                self.assertEqual(decoded.addr_size, addr_width//8)
+                records = codec.decode(data)
+                self.assertEqual(len(records), len(packet.records))
+                for record, decoded_record, codec_record in zip(packet.records, decoded.records, records):
+                    for k in ["cyc", "wff", "byte_enable", "wcount", "rcount"]:
+                        self.assertEqual(getattr(record, k), getattr(decoded_record, k))
+                    self.assertEqual(codec_record.flags >> 6, record.wff)
+                    self.assertEqual(codec_record.byte_enable, record.byte_enable)
+                    if record.writes is not None:
+                        self.assertEqual(decoded_record.writes.base_addr, record.writes.base_addr)
+                        self.assertEqual(decoded_record.writes.get_datas(), record.writes.get_datas())
+                        self.assertEqual(codec_record.base_addr, record.writes.base_addr)
+                        self.assertEqual(codec_record.datas.tolist(), record.writes.get_datas())
+                    self.assertEqual(decoded_record.reads.base_ret_addr, record.reads.base_ret_addr)
+                    self.assertEqual(decoded_record.reads.get_addrs(), record.reads.get_addrs())
+                    self.assertEqual(codec_record.base_ret_addr, record.reads.base_ret_addr)
+                    self.assertEqual(codec_record.addrs.tolist(), record.reads.get_addrs())
+
+    def test_codec_encode(self):
+        codec = EtherboneCodec()
+
+        record = EtherboneRecord()
+        record.reads = EtherboneReads(base_ret_addr=0x1234, addrs=[0x100 + 4*i for i in range(8)])
+        packet = EtherbonePacket()
+        packet.records = [record]
+        packet.encode()
+        self.assertEqual(bytes(codec.encode_read(0x100, 8, base_ret_addr=0x1234)), bytes(packet.bytes))
+
+        record = EtherboneRecord()
+        record.writes = EtherboneWrites(base_addr=0x200, datas=[0xdeadbeef, 1, 2])
+        packet = EtherbonePacket()
+        packet.records = [record]
+        packet.encode()
+        self.assertEqual(bytes(codec.encode_writes(0x200, [0xdeadbeef, 1, 2])), bytes(packet.bytes))
+
+        with self.assertRaises(ValueError):
+            codec.encode_read(0x0, 256)
+
+    def test_codec_encode_records(self):
+        codec = EtherboneCodec(max_packet_size=64)
+
+        writes = EtherboneRecord()
+        writes.writes = EtherboneWrites(base_addr=0x200, datas=[1, 2, 3])
+        reads = EtherboneRecord()
+        reads.reads = EtherboneReads(base_ret_addr=0x5678, addrs=[0x100 + 4*i for i in range(4)])
+        packet = EtherbonePacket()
+        packet.records = [writes, reads]
+        packet.encode()
+        codec.begin()
+        self.assertTrue(codec.add_writes(0x200, [1, 2, 3]))
+        self.assertTrue(codec.add_read(0x100, 4, base_ret_addr=0x5678))
+        self.assertEqual(bytes(codec.end()), bytes(packet.bytes))
+        # Header padding is zero.
+        self.assertEqual(bytes(codec.end()[:8]), bytes.fromhex("4e6f104400000000"))
+
+        # 8 + 20 + 24 = 52 bytes used: a 16 bytes record does not fit, a 12 bytes record fits.
+        self.assertFalse(codec.add_read(0x0, 2))
+        self.assertEqual(len(codec.end()), 52)
+        self.assertTrue(codec.add_read(0x0, 1))
+        self.assertEqual(len(codec.end()), 64)
+        self.assertEqual(len(codec.decode(codec.end())), 3)
+
+        # A single record always fits.
+        codec.begin()
+        self.assertTrue(codec.add_read(0x0, 255))
+        self.assertEqual(len(codec.end()), 8 + codec.reads_size(255))
+
+    def test_packet_pack(self):
+        records = []
+        for i in range(64):
+            record = EtherboneRecord()
+            record.reads = EtherboneReads(base_ret_addr=i, addrs=[4*j for j in range(i % 8 + 1)])
+            records.append(record)
+        packets = EtherbonePacket.pack(records, max_size=256)
+        self.assertEqual(sum(len(packet.records) for packet in packets), 64)
+        self.assertLess(len(packets), 16)
+        ret_addrs = []
+        for packet in packets:
+            packet.encode()
+            self.assertLessEqual(len(packet.bytes), 256)
+            decoded = EtherbonePacket(32, packet.bytes)
+            decoded.decode()
+            ret_addrs += [record.reads.base_ret_addr for record in decoded.records]
+        self.assertEqual(ret_addrs, list(range(64)))
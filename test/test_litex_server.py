@@ -0,0 +1,183 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import time
+import unittest
+import socket
+
+from litex.tools.litex_server import RemoteServer
+from litex.tools.litex_client import RemoteClient
+from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord
+from litex.tools.remote.etherbone import EtherboneReads, EtherboneWrites
+from litex.tools.remote.etherbone import etherbone_ipc_length_struct
+
+
+class CommMemory:
+    """Comm backend on a dict of 32-bit words, logging its accesses."""
+    def __init__(self):
+        self.mem      = {}
+        self.accesses = []
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read(self, addr, length=None, burst="incr"):
+        self.accesses.append(("read", addr, length, burst))
+        step = 4 if burst == "incr" else 0
+        return [self.mem.get(addr + step*i, 0) for i in range(length)]
+
+    def write(self, addr, datas, burst="incr"):
+        self.accesses.append(("write", addr, len(datas), burst))
+        step = 4 if burst == "incr" else 0
+        for i, data in enumerate(datas):
+            self.mem[addr + step*i] = data
+
+
+class CommUART(CommMemory):
+    pass
+
+
+class CommUDP(CommMemory):
+    def read_bursts(self, bursts):
+        self.accesses.append(("read_bursts", len(bursts)))
+        return [data for addr, length, burst in bursts for data in self.read(addr, length, burst)]
+
+
+class TestLiteXServer(unittest.TestCase):
+    def start_server(self, comm):
+        server = RemoteServer(comm, "localhost", 0)
+        server.open()
+        server.start(2)
+        self.addCleanup(server.close)
+        return server.socket.getsockname()[1]
+
+    def connect(self, port):
+        client = RemoteClient(port=port)
+        client.open()
+        self.addCleanup(client.close)
+        return client
+
+    def test_read_write(self):
+        comm   = CommUART()
+        client = self.connect(self.start_server(comm))
+        client.write(0x100, [1, 2, 3])
+        self.assertEqual(client.read(0x104), 2)
+        self.assertEqual(client.read(0x100, 4), [1, 2, 3, 0])
+
+    def test_multi_record(self):
+        comm   = CommUART()
+        client = self.connect(self.start_server(comm))
+        comm.mem.update({0x200 + 4*i: i for i in range(16)})
+
+        records = []
+        for base_addr, datas in [(0x0, [10, 11]), (0x8, [12, 13])]:
+            record = EtherboneRecord()
+            record.writes = EtherboneWrites(base_addr=base_addr, datas=datas)
+            records.append(record)
+        for base_ret_addr, addrs in [(0x1, [0x0, 0x4, 0x8]), (0x2, [0xc, 0x200, 0x200])]:
+            record = EtherboneRecord()
+            record.reads = EtherboneReads(base_ret_addr=base_ret_addr, addrs=addrs)
+            records.append(record)
+        packet = EtherbonePacket()
+        packet.records = records
+        packet.encode()
+        client.send_packet(client.socket, packet)
+
+        reply = EtherbonePacket(init=client.receive_packet(client.socket, 4))
+        reply.decode()
+        self.assertEqual([(r.writes.base_addr, r.writes.get_datas()) for r in reply.records],
+            [(0x1, [10, 11, 12]), (0x2, [13, 0, 0])])
+        # Writes and reads of consecutive records are grouped in bursts.
+        self.assertEqual(comm.accesses, [
+            ("write", 0x0,   4, "incr"),
+            ("read",  0x0,   4, "incr"),
+            ("read",  0x200, 2, "fixed"),
+        ])
+
+    def test_fragmented_packet(self):
+        comm   = CommUART()
+        client = self.connect(self.start_server(comm))
+        client.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        comm.mem.update({0x100 + 4*i: i for i in range(4)})
+
+        records = []
+        for base_ret_addr, addrs in [(0x1, [0x100, 0x104]), (0x2, [0x108, 0x10c])]:
+            record = EtherboneRecord()
+            record.reads = EtherboneReads(base_ret_addr=base_ret_addr, addrs=addrs)
+            records.append(record)
+        packet = EtherbonePacket()
+        packet.records = records
+        packet.encode()
+        # Send the packet one byte at a time: TCP does not preserve the packet boundaries.
+        data = etherbone_ipc_length_struct.pack(len(packet.bytes)) + bytes(packet.bytes)
+        for b in data:
+            client.socket.sendall(bytes([b]))
+            time.sleep(0.001)
+
+        reply = EtherbonePacket(init=client.receive_packet(client.socket, 4))
+        reply.decode()
+        self.assertEqual([(r.writes.base_addr, r.writes.get_datas()) for r in reply.records],
+            [(0x1, [0, 1]), (0x2, [2, 3])])
+        # Server is still in sync with the stream.
+        self.assertEqual(client.read(0x100, 4), [0, 1, 2, 3])
+
+    def fifo_writes_test(self, comm):
+        client = self.connect(self.start_server(comm))
+        records = []
+        for base_addr, datas, wff in [(0x300, [1, 2, 3], 1), (0x30c, [4, 5], 0), (0x314, [6], 0)]:
+            record = EtherboneRecord()
+            record.wff    = wff
+            record.writes = EtherboneWrites(base_addr=base_addr, datas=datas)
+            records.append(record)
+        record = EtherboneRecord()
+        record.reads = EtherboneReads(base_ret_addr=0x0, addrs=[0x300, 0x30c, 0x310, 0x314])
+        records.append(record)
+        packet = EtherbonePacket()
+        packet.records = records
+        packet.encode()
+        client.send_packet(client.socket, packet)
+
+        reply = EtherbonePacket(init=client.receive_packet(client.socket, 4))
+        reply.decode()
+        self.assertEqual(reply.records[0].writes.get_datas(), [3, 4, 5, 6])
+        return [access for access in comm.accesses if access[0] == "write"]
+
+    def test_fifo_writes(self):
+        # FIFO writes are kept separate from the following (contiguous) writes.
+        self.assertEqual(self.fifo_writes_test(CommUART()), [
+            ("write", 0x300, 3, "fixed"),
+            ("write", 0x30c, 3, "incr"),
+        ])
+        self.assertEqual(self.fifo_writes_test(CommUDP()), [
+            ("write", 0x300, 1, "incr"),
+            ("write", 0x300, 1, "incr"),
+            ("write", 0x300, 1, "incr"),
+            ("write", 0x30c, 3, "incr"),
+        ])
+
+    def test_read_bursts(self):
+        comm   = CommUDP()
+        client = self.connect(self.start_server(comm))
+        comm.mem.update({4*i: i for i in range(512)})
+        self.assertEqual(client.read(0x0, 255), list(range(255)))
+        self.assertEqual(client.read(0x400, 8, burst="fixed"), [256]*8)
+        self.assertEqual(comm.accesses[0], ("read_bursts", 1))
+        self.assertEqual(comm.accesses[2], ("read_bursts", 8))
+
+    def test_clients(self):
+        comm    = CommUART()
+        port    = self.start_server(comm)
+        clients = [self.connect(port) for i in range(2)]
+        for i, client in enumerate(clients):
+            client.write(0x10*i, [i]*4)
+        for i, client in enumerate(clients):
+            self.assertEqual(client.read(0x10*i, 4), [i]*4)
+
+
+if __name__ == "__main__":
+    unittest.main()
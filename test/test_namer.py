@@ -0,0 +1,53 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+
+from migen import *
+
+from litex.gen.fhdl.namer import build_signal_namespace
+
+from test.benchmark_namer import REFERENCE_DIGESTS, synthetic_soc, names, digest
+
+
+class TestNamer(unittest.TestCase):
+    def test_reference_names(self):
+        for peripherals, registers in [(8, 4), (64, 16)]:
+            signals = synthetic_soc(peripherals, registers)
+            self.assertEqual(digest(names(signals)), REFERENCE_DIGESTS[(peripherals, registers)])
+
+    def test_names(self):
+        signals = synthetic_soc(8, 4)
+        ns      = build_signal_namespace(signals)
+        result  = [ns.get_name(s) for s in signals]
+        self.assertEqual(len(set(result)), len(result))
+        self.assertEqual(result[:5], [
+            "add_uart0_csrstorage0_storage",
+            "add_uart0_csrstorage0_re",
+            "add_uart0_csrstorage0_we",
+            "add_uart0_csrstorage0_dat_w",
+            "add_uart0_csrstorage0_storage_add_uart0_next_value0",
+        ])
+        self.assertIn("add_timer1_pending0", result)
+        self.assertIn("add_timer1_pending1", result)
+
+    def test_shared_names(self):
+        class Sub(Module):
+            def __init__(self):
+                self.data = Signal()
+                self.valid = Signal()
+
+        class Top(Module):
+            def __init__(self):
+                self.a = Sub()
+                self.b = Sub()
+                self.valid = Signal()
+
+        top     = Top()
+        signals = [top.a.data, top.a.valid, top.b.data, top.b.valid, top.valid]
+        ns      = build_signal_namespace(signals)
+        result  = [ns.get_name(s) for s in signals]
+        self.assertEqual(len(set(result)), len(result))
+        self.assertEqual(result[-1], "valid")
@@ -0,0 +1,77 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import random
+
+from migen import *
+
+from litex.gen.sim import run_simulation
+
+from litex.soc.interconnect import wishbone
+from litex.soc.interconnect.stream import SyncFIFO
+
+
+class SimRunnerTarget(unittest.TestCase):
+    # Self-contained test run through the simulation runner by TestSim.test_runner_run_test.
+    def test_fifo(self):
+        def generator():
+            for i in range(16):
+                yield
+        run_simulation(SyncFIFO([("data", 8)], 4), generator())
+
+
+class TestSim(unittest.TestCase):
+    def run_traced(self, dut_cls, generator, compiled):
+        dut   = dut_cls()
+        trace = []
+        run_simulation(dut, generator(dut, trace, random.Random(42)), compiled=compiled)
+        return trace
+
+    def check_equivalence(self, dut_cls, generator):
+        interpreted = self.run_traced(dut_cls, generator, compiled=False)
+        compiled    = self.run_traced(dut_cls, generator, compiled=True)
+        self.assertEqual(interpreted, compiled)
+
+    def test_sram_equivalence(self):
+        def generator(dut, trace, prng):
+            for i in range(64):
+                adr = prng.randrange(16)
+                if prng.randrange(2):
+                    yield from dut.bus.write(adr, prng.randrange(2**32), sel=prng.randrange(16))
+                else:
+                    trace.append((yield from dut.bus.read(adr)))
+        self.check_equivalence(lambda: wishbone.SRAM(64), generator)
+
+    def test_fifo_equivalence(self):
+        def generator(dut, trace, prng):
+            for i in range(256):
+                yield dut.sink.valid.eq(prng.randrange(2))
+                yield dut.sink.data.eq(i)
+                yield dut.source.ready.eq(prng.randrange(2))
+                yield
+                trace.append(((yield dut.source.valid), (yield dut.source.data), (yield dut.level)))
+        self.check_equivalence(lambda: SyncFIFO([("data", 8)], 4), generator)
+
+    def test_runner_statistics(self):
+        from litex.gen.sim.runner import collect_statistics, cycles_per_second
+        def generator(dut, trace, prng):
+            for i in range(32):
+                yield
+        with collect_statistics("fifo") as statistics:
+            self.run_traced(lambda: SyncFIFO([("data", 8)], 4), generator, compiled=True)
+        self.assertEqual(len(statistics), 1)
+        self.assertEqual(statistics[0].test,   "fifo")
+        self.assertEqual(statistics[0].design, "SyncFIFO")
+        self.assertEqual(statistics[0].cycles, 33)
+        self.assertGreater(cycles_per_second(statistics[0]), 0)
+
+    def test_runner_run_test(self):
+        from litex.gen.sim.runner import run_parallel
+        outcome, = run_parallel([SimRunnerTarget("test_fifo").id()], processes=1)
+        self.assertEqual(outcome.status, "ok")
+        self.assertEqual(len(outcome.simulations), 1)
+        self.assertEqual(outcome.simulations[0].design, "SyncFIFO")
+        self.assertEqual(outcome.simulations[0].cycles, 17)
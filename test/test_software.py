@@ -0,0 +1,87 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import shutil
+import unittest
+import tempfile
+import subprocess
+
+from migen import *
+
+from litex.soc.integration.soc import SoCRegion, SoCCSRRegion
+from litex.soc.integration.export import get_csr_header, get_soc_header, get_mem_header, get_git_header
+
+from liteeth.phy.model import LiteEthPHYModel
+from liteeth.mac import LiteEthMAC
+
+software_dir = os.path.join(os.path.dirname(__file__), "..", "litex", "soc", "software")
+cpu_dir      = os.path.join(os.path.dirname(__file__), "..", "litex", "soc", "cores", "cpu", "vexriscv")
+
+
+class TestSoftware(unittest.TestCase):
+    def export_headers(self, path, csr_regions, constants, mem_regions):
+        generated_dir = os.path.join(path, "generated")
+        os.makedirs(generated_dir)
+        for name, content in [
+            ("csr.h", get_csr_header(csr_regions, constants)),
+            ("soc.h", get_soc_header(constants)),
+            ("mem.h", get_mem_header(mem_regions)),
+            ("git.h", get_git_header())]:
+            with open(os.path.join(generated_dir, name), "w") as f:
+                f.write(content)
+
+    def compile(self, path, source, args=["-fsyntax-only"]):
+        cmd = ["gcc", *args,
+            "-I" + path,
+            "-I" + os.path.join(software_dir, "include"),
+            "-I" + software_dir,
+            "-I" + os.path.join(software_dir, "bios"),
+            "-I" + cpu_dir,
+            os.path.join(software_dir, source)]
+        r = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        self.assertEqual(r.returncode, 0, msg=r.stderr)
+        return r.stdout
+
+    @unittest.skipIf(shutil.which("gcc") is None, "gcc not found")
+    def test_bios_ethmac_dma(self):
+        # Export the headers of a SoC with an Ethernet MAC in DMA mode.
+        pads = Record([
+            ("source_valid", 1), ("source_ready", 1), ("source_data", 8),
+            ("sink_valid",   1), ("sink_ready",   1), ("sink_data",   8),
+        ])
+        ethphy = LiteEthPHYModel(pads)
+        ethmac = LiteEthMAC(phy=ethphy, dw=32, interface="dma", endianness="little", with_preamble_crc=False)
+        csr_regions = {
+            "ethmac" : SoCCSRRegion(0xf0000000, 32, ethmac.get_csrs()),
+            "ethphy" : SoCCSRRegion(0xf0000800, 32, ethphy.get_csrs()),
+        }
+        constants = {
+            "CONFIG_CLOCK_FREQUENCY"   : 100000000,
+            "CONFIG_CPU_TYPE_VEXRISCV" : None,
+            "CONFIG_CPU_HUMAN_NAME"    : "VexRiscv",
+            "CONFIG_CPU_NOP"           : "nop",
+            "CONFIG_CSR_DATA_WIDTH"    : 32,
+            "CONFIG_CSR_ALIGNMENT"     : 32,
+            "CONFIG_BUS_STANDARD"      : "WISHBONE",
+            "CONFIG_BUS_DATA_WIDTH"    : 32,
+            "CONFIG_BUS_ADDRESS_WIDTH" : 32,
+            "ETHMAC_DMA"               : None,
+        }
+        mem_regions = {
+            "rom"      : SoCRegion(origin=0x00000000, size=0x00020000),
+            "sram"     : SoCRegion(origin=0x10000000, size=0x00002000),
+            "main_ram" : SoCRegion(origin=0x40000000, size=0x10000000),
+            "csr"      : SoCRegion(origin=0xf0000000, size=0x00010000),
+        }
+        with tempfile.TemporaryDirectory() as d:
+            self.export_headers(d, csr_regions, constants, mem_regions)
+            # Ethernet sources must build without the SRAM MAC definitions.
+            for source in ["libliteeth/udp.c", "libliteeth/tftp.c", "bios/boot.c", "bios/main.c", "bios/cmds/cmd_boot.c"]:
+                self.compile(d, source)
+            # And the BIOS must not reference the SRAM MAC driver.
+            self.assertNotIn("eth_init();", self.compile(d, "bios/main.c", args=["-E"]))
+            self.assertNotIn("netboot_from_bin", self.compile(d, "bios/boot.c", args=["-E"]))
+            self.assertNotIn("\"netboot\"", self.compile(d, "bios/cmds/cmd_boot.c", args=["-E"]))
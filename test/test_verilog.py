@@ -0,0 +1,62 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import unittest
+import tempfile
+
+from migen import *
+
+from litex.gen.fhdl.verilog import convert
+
+
+class DUT(Module):
+    def __init__(self):
+        self.clock_domains.cd_sys = ClockDomain("sys")
+        self.adr = Signal(4)
+        self.dat = Signal(8)
+        self.out = Signal(8)
+        self.specials.mem = Memory(8, 16, init=list(range(16)))
+        port = self.mem.get_port()
+        self.specials += port
+        self.comb += port.adr.eq(self.adr)
+        self.sync += If(self.adr[0],
+            self.out.eq(port.dat_r)
+        ).Else(
+            self.out.eq(self.dat)
+        )
+
+
+def strip_dates(source):
+    return "\n".join(l for l in source.splitlines() if "Date" not in l and "Auto-Generated" not in l)
+
+
+class TestVerilog(unittest.TestCase):
+    def convert(self, **kwargs):
+        dut = DUT()
+        return convert(dut, ios={dut.cd_sys.clk, dut.adr, dut.dat, dut.out}, name="dut", **kwargs)
+
+    def test_streamed_output(self):
+        in_memory = self.convert()
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "dut.v")
+            streamed = self.convert(output=filename)
+            self.assertIsNone(streamed.main_source)
+            self.assertEqual(strip_dates(streamed.get_main_source()), strip_dates(in_memory.main_source))
+            cwd = os.getcwd()
+            os.chdir(d)
+            try:
+                streamed.write("dut.v")
+                with open("dut.v") as f:
+                    self.assertIn("endmodule", f.read())
+                for data_file in streamed.data_files:
+                    self.assertTrue(os.path.exists(data_file))
+            finally:
+                os.chdir(cwd)
+
+    def test_timings(self):
+        r = self.convert()
+        self.assertEqual(list(r.timings.keys()), ["lowering", "namespace", "emit"])
+        self.assertTrue(all(t >= 0 for t in r.timings.values()))